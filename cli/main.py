@@ -36,6 +36,7 @@ from cli.utils import (
     select_shallow_thinking_agent,
 )
 from tradingagents.default_config import DEFAULT_CONFIG
+from tradingagents.graph.streaming import STREAM_TOKEN, iter_graph_events
 from tradingagents.graph.trading_graph import TradingAgentsGraph
 from tradingagents.utils.logging_manager import get_logger
 
@@ -49,6 +50,13 @@ DEFAULT_MAX_CONTENT_LENGTH = 200
 DEFAULT_MAX_DISPLAY_MESSAGES = 12
 DEFAULT_REFRESH_RATE = 4
 DEFAULT_API_KEY_DISPLAY_LENGTH = 12
+DEFAULT_STREAM_TAIL_LENGTH = 1500
+DEFAULT_STREAM_REFRESH_INTERVAL = 0.25
+
+# 图节点名称与进度面板中智能体名称不同的映射
+STREAM_NODE_AGENTS = {
+    "Risk Judge": "Portfolio Manager",
+}
 
 # 初始化日志系统
 logger = get_logger("cli")
@@ -184,6 +192,9 @@ class MessageBuffer:
             "trader_investment_plan": None,
             "final_trade_decision": None,
         }
+        # Live output of the agent that is currently generating
+        self.streaming_agent = None
+        self.streaming_text = ""
 
     def add_message(self, message_type, content):
         timestamp = datetime.datetime.now().strftime("%H:%M:%S")
@@ -198,6 +209,20 @@ class MessageBuffer:
             self.agent_status[agent] = status
             self.current_agent = agent
 
+    def add_token_delta(self, node, text):
+        agent = STREAM_NODE_AGENTS.get(node, node)
+        if agent != self.streaming_agent:
+            self.streaming_agent = agent
+            self.streaming_text = ""
+            if self.agent_status.get(agent) == "pending":
+                self.update_agent_status(agent, "in_progress")
+        # Keep only the tail, the full text arrives with the node's report
+        self.streaming_text = (self.streaming_text + text)[-DEFAULT_STREAM_TAIL_LENGTH:]
+
+    def clear_stream(self):
+        self.streaming_agent = None
+        self.streaming_text = ""
+
     def update_report_section(self, section_name, content):
         if section_name in self.report_sections:
             self.report_sections[section_name] = content
@@ -479,8 +504,17 @@ def update_display(layout, spinner_text=None):
         )
     )
 
-    # Analysis panel showing current report
-    if message_buffer.current_report:
+    # Analysis panel showing live output while an agent is generating, otherwise the current report
+    if message_buffer.streaming_text:
+        layout["analysis"].update(
+            Panel(
+                Markdown(message_buffer.streaming_text),
+                title=f"Live: {message_buffer.streaming_agent}",
+                border_style="yellow",
+                padding=(1, 2),
+            )
+        )
+    elif message_buffer.current_report:
         layout["analysis"].update(
             Panel(
                 Markdown(message_buffer.current_report),
@@ -1264,7 +1298,19 @@ def run_analysis():
         # 跟踪已完成的分析师，避免重复提示
         completed_analysts = set()
 
-        for chunk in graph.graph.stream(init_agent_state, **args):
+        last_stream_refresh = 0.0
+
+        for kind, chunk in iter_graph_events(graph.graph, init_agent_state, args):
+            if kind == STREAM_TOKEN:
+                # 流式输出：实时显示当前智能体正在生成的内容（限制刷新频率）
+                message_buffer.add_token_delta(chunk.node, chunk.text)
+                if time.time() - last_stream_refresh >= DEFAULT_STREAM_REFRESH_INTERVAL:
+                    update_display(layout)
+                    last_stream_refresh = time.time()
+                continue
+
+            # 节点完成，完整内容已写入状态
+            message_buffer.clear_stream()
             if len(chunk["messages"]) > 0:
                 # Get the last message from the chunk
                 last_message = chunk["messages"][-1]
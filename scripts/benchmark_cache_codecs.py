@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缓存序列化格式基准测试
+
+对比旧版缓存格式（CSV、pickle、JSON records）与 cache_codec 各编解码器
+在长历史K线和文本报告上的写入/读取耗时与体积。
+
+使用方法:
+    python scripts/benchmark_cache_codecs.py
+    python scripts/benchmark_cache_codecs.py --rows 20000 --repeat 5
+"""
+
+import argparse
+import io
+import os
+import pickle
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tradingagents.dataflows import cache_codec
+
+
+def make_history(rows: int) -> pd.DataFrame:
+    """生成模拟的长历史日线"""
+    rng = np.random.default_rng(42)
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, rows)))
+    return pd.DataFrame({
+        'date': pd.bdate_range('1990-12-19', periods=rows),
+        'code': '600519',
+        'open': close * (1 + rng.normal(0, 0.005, rows)),
+        'high': close * 1.02,
+        'low': close * 0.98,
+        'close': close,
+        'volume': rng.integers(1_000, 5_000_000, rows),
+        'amount': close * rng.integers(1_000, 5_000_000, rows),
+        'pct_chg': np.concatenate([[0.0], np.diff(close) / close[:-1] * 100]),
+    })
+
+
+def make_report(paragraphs: int) -> str:
+    """生成模拟的基本面分析报告"""
+    lines = [f"## 第{i}部分\n营业收入同比增长{i % 30}%，毛利率{40 + i % 20}%，"
+             f"经营活动现金流净额{i * 1.7:.1f}亿元。\n" for i in range(paragraphs)]
+    return "# 贵州茅台(600519)基本面分析报告\n" + "".join(lines)
+
+
+def timed(func, repeat: int):
+    """返回最优耗时（毫秒）和最后一次结果"""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def frame_formats():
+    """DataFrame缓存格式: 名称 -> (编码, 解码)"""
+    formats = {
+        'csv': (lambda df: df.to_csv(index=False).encode('utf-8'),
+                lambda raw: pd.read_csv(io.BytesIO(raw))),
+        'pickle': (pickle.dumps, pickle.loads),
+        'json_records': (lambda df: df.to_json(orient='records', date_format='iso').encode('utf-8'),
+                         lambda raw: pd.read_json(io.BytesIO(raw), orient='records')),
+    }
+    for name in cache_codec.get_codec_info()['available_frame_codecs']:
+        def encode(df, codec=name):
+            os.environ['TRADINGAGENTS_CACHE_FRAME_CODEC'] = codec
+            return cache_codec.dumps(df)
+        formats[f'codec:{name}'] = (encode, lambda raw: cache_codec.loads(raw)[0])
+    return formats
+
+
+def text_formats():
+    """文本缓存格式: 名称 -> (编码, 解码)"""
+    formats = {
+        'raw_utf8': (lambda text: text.encode('utf-8'), lambda raw: raw.decode('utf-8')),
+    }
+    for name in cache_codec.get_codec_info()['available_text_codecs']:
+        def encode(text, codec=name):
+            os.environ['TRADINGAGENTS_CACHE_TEXT_CODEC'] = codec
+            return cache_codec.dumps(text)
+        formats[f'codec:{name}'] = (encode, lambda raw: cache_codec.loads(raw)[0])
+    return formats
+
+
+def run(title: str, value, formats, repeat: int):
+    """对每种格式测量写入/读取耗时和体积并打印表格"""
+    print(f"\n📊 {title}")
+    print(f"{'格式':<16}{'体积(KB)':>12}{'写入(ms)':>12}{'读取(ms)':>12}")
+    for name, (encode, decode) in formats.items():
+        encode_ms, raw = timed(lambda: encode(value), repeat)
+        decode_ms, _ = timed(lambda: decode(raw), repeat)
+        print(f"{name:<16}{len(raw) / 1024:>12.1f}{encode_ms:>12.2f}{decode_ms:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="缓存序列化格式基准测试")
+    parser.add_argument('--rows', type=int, default=8000, help="模拟K线行数 (默认8000，约30年日线)")
+    parser.add_argument('--paragraphs', type=int, default=500, help="模拟报告段落数 (默认500)")
+    parser.add_argument('--repeat', type=int, default=3, help="每项重复次数，取最优值 (默认3)")
+    args = parser.parse_args()
+
+    saved_env = {key: os.environ.get(key) for key in
+                 ('TRADINGAGENTS_CACHE_FRAME_CODEC', 'TRADINGAGENTS_CACHE_TEXT_CODEC')}
+    try:
+        run(f"K线历史 ({args.rows}行)", make_history(args.rows), frame_formats(), args.repeat)
+        run(f"文本报告 ({args.paragraphs}段)", make_report(args.paragraphs), text_formats(), args.repeat)
+    finally:
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+A股全市场日线快照入库脚本
+
+按交易日调用 Tushare daily 接口一次获取全市场日线，写入本地K线缓存。
+适合在收盘后定时运行，之后的批量筛选/分析直接从本地读取单只股票的行情。
+
+使用方法:
+    python scripts/ingest_market_snapshots.py                 # 最近30天
+    python scripts/ingest_market_snapshots.py --days 365
+    python scripts/ingest_market_snapshots.py --start 2025-01-01 --end 2025-06-30
+    python scripts/ingest_market_snapshots.py --status
+"""
+
+import argparse
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tradingagents.dataflows.market_snapshot import get_snapshot_coverage, ingest_china_daily_snapshots
+
+
+def main():
+    parser = argparse.ArgumentParser(description="A股全市场日线快照入库")
+    parser.add_argument('--start', help="开始日期 (YYYY-MM-DD)")
+    parser.add_argument('--end', help="结束日期 (YYYY-MM-DD)，默认今天")
+    parser.add_argument('--days', type=int, default=30, help="未指定开始日期时回看的天数 (默认30)")
+    parser.add_argument('--status', action='store_true', help="只显示最近 --days 天内尚未入库的区间")
+    args = parser.parse_args()
+
+    if args.status:
+        coverage = get_snapshot_coverage(days=args.days)
+        missing = coverage['missing_ranges']
+        print(f"📅 {coverage['start_date']} 到 {coverage['end_date']}")
+        if missing:
+            print("⏳ 尚未入库的区间:")
+            for start, end in missing:
+                print(f"   {start} ~ {end}")
+        else:
+            print("✅ 已全部入库")
+        return 0
+
+    end_date = args.end or date.today().isoformat()
+    start_date = args.start or (date.fromisoformat(end_date) - timedelta(days=args.days)).isoformat()
+
+    print(f"📦 开始入库全市场日线: {start_date} 到 {end_date}")
+    stats = ingest_china_daily_snapshots(start_date, end_date)
+    if stats.get('error'):
+        print(f"❌ 入库失败: {stats['error']}")
+        return 1
+
+    print(f"✅ 入库完成: {stats['trade_dates']}个交易日, {stats['symbols']}只股票, "
+          f"{stats['rows']}条K线, API调用{stats['api_calls']}次")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -19,6 +19,13 @@ def get_activity_dir():
     """获取活动记录目录"""
     return Path(__file__).parent.parent / "web" / "data" / "user_activities"
 
+def get_activity_store():
+    """获取活动存储（首次使用时迁移旧的每日JSONL文件）"""
+    from web.utils.activity_store import ActivityStore
+    store = ActivityStore(get_activity_dir() / "activities.db")
+    store.import_legacy_jsonl(get_activity_dir())
+    return store
+
 def load_activities(start_date: datetime = None, end_date: datetime = None) -> List[Dict[str, Any]]:
     """加载活动记录"""
     activity_dir = get_activity_dir()
@@ -34,29 +41,14 @@ def load_activities(start_date: datetime = None, end_date: datetime = None) -> L
     if end_date is None:
         end_date = datetime.now()
     
-    # 遍历日期范围内的文件
-    current_date = start_date.date()
-    end_date_only = end_date.date()
-    
-    while current_date <= end_date_only:
-        date_str = current_date.strftime("%Y-%m-%d")
-        activity_file = activity_dir / f"user_activities_{date_str}.jsonl"
-        
-        if activity_file.exists():
-            try:
-                with open(activity_file, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        if line.strip():
-                            activity = json.loads(line.strip())
-                            activity_time = datetime.fromtimestamp(activity['timestamp'])
-                            if start_date <= activity_time <= end_date:
-                                activities.append(activity)
-            except Exception as e:
-                print(f"❌ 读取文件失败 {activity_file}: {e}")
-        
-        current_date += timedelta(days=1)
-    
-    return sorted(activities, key=lambda x: x['timestamp'], reverse=True)
+    try:
+        return get_activity_store().query(
+            start_ts=start_date.timestamp(),
+            end_ts=end_date.timestamp() + 1e-6
+        )
+    except Exception as e:
+        print(f"❌ 读取活动记录失败: {e}")
+        return activities
 
 def list_activities(args):
     """列出用户活动"""
@@ -269,7 +261,6 @@ def cleanup_activities(args):
     
     days_to_keep = args.days or 90
     cutoff_date = datetime.now() - timedelta(days=days_to_keep)
-    deleted_count = 0
     
     print(f"🗓️ 将删除 {cutoff_date.strftime('%Y-%m-%d')} 之前的记录")
     
@@ -280,22 +271,8 @@ def cleanup_activities(args):
             return
     
     try:
-        for activity_file in activity_dir.glob("user_activities_*.jsonl"):
-            try:
-                # 从文件名提取日期
-                date_str = activity_file.stem.replace("user_activities_", "")
-                file_date = datetime.strptime(date_str, "%Y-%m-%d")
-                
-                if file_date < cutoff_date:
-                    activity_file.unlink()
-                    deleted_count += 1
-                    print(f"🗑️ 删除: {activity_file.name}")
-                    
-            except ValueError:
-                # 文件名格式不正确，跳过
-                continue
-                
-        print(f"✅ 成功删除 {deleted_count} 个文件")
+        deleted_count = get_activity_store().delete_before(cutoff_date)
+        print(f"✅ 成功删除 {deleted_count} 条记录")
         
     except Exception as e:
         print(f"❌ 清理失败: {e}")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+用户活动存储测试
+验证索引查询按时间倒序提前截断、小时/天汇总统计与明细一致以及旧JSONL文件迁移
+"""
+
+import json
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from web.utils.activity_store import ActivityStore
+
+
+def _activity(ts, username, action_type, success=True, duration_ms=None):
+    return {
+        'timestamp': ts,
+        'username': username,
+        'user_role': 'user',
+        'action_type': action_type,
+        'action_name': f"{action_type}_action",
+        'details': {},
+        'session_id': 's1',
+        'duration_ms': duration_ms,
+        'success': success,
+        'datetime': datetime.fromtimestamp(ts).isoformat(),
+    }
+
+
+def _naive_statistics(activities, start_ts, end_ts):
+    """按旧实现逐条统计，作为对照"""
+    selected = [a for a in activities if start_ts <= a['timestamp'] < end_ts]
+    stats = {"activity_types": {}, "user_activities": {}, "daily_activities": {}}
+    for a in selected:
+        stats["activity_types"][a['action_type']] = stats["activity_types"].get(a['action_type'], 0) + 1
+        stats["user_activities"][a['username']] = stats["user_activities"].get(a['username'], 0) + 1
+        day = datetime.fromtimestamp(a['timestamp']).strftime('%Y-%m-%d')
+        stats["daily_activities"][day] = stats["daily_activities"].get(day, 0) + 1
+    stats["total_activities"] = len(selected)
+    stats["success_rate"] = sum(1 for a in selected if a['success']) / len(selected) * 100 if selected else 0
+    durations = [a['duration_ms'] for a in selected if a['duration_ms']]
+    stats["average_duration"] = sum(durations) / len(durations) if durations else 0
+    return stats
+
+
+class TestActivityStore(unittest.TestCase):
+    """用户活动存储测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="ta_activity_store_"))
+        self.store = ActivityStore(self.temp_dir / "activities.db", batch_size=50)
+
+        # 覆盖最近3天、每17分钟一条的活动
+        base = datetime.now().replace(minute=0, second=0, microsecond=0) - timedelta(days=3)
+        self.activities = []
+        for i in range(3 * 24 * 60 // 17):
+            ts = (base + timedelta(minutes=17 * i, seconds=7)).timestamp()
+            self.activities.append(_activity(
+                ts, ['alice', 'bob', 'carol'][i % 3], ['auth', 'analysis'][i % 2],
+                success=(i % 5 != 0), duration_ms=(i * 10 if i % 4 == 0 else None)))
+        for activity in self.activities:
+            self.store.append(activity)
+
+    def tearDown(self):
+        """测试后清理"""
+        self.store.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_query_newest_first_with_limit(self):
+        """测试按用户/类型过滤后按时间倒序截断"""
+        print("\n🧪 测试活动查询...")
+        self.assertEqual(self.store.count(), len(self.activities))
+        result = self.store.query(username='bob', action_type='analysis', limit=5)
+        expected = sorted((a for a in self.activities
+                           if a['username'] == 'bob' and a['action_type'] == 'analysis'),
+                          key=lambda a: a['timestamp'], reverse=True)[:5]
+        self.assertEqual(result, expected)
+
+        window_start = self.activities[10]['timestamp']
+        window_end = self.activities[20]['timestamp']
+        window = self.store.query(start_ts=window_start, end_ts=window_end)
+        self.assertEqual([a['timestamp'] for a in window],
+                         [a['timestamp'] for a in reversed(self.activities[10:20])])
+        print("  ✅ 活动查询测试通过")
+
+    def test_rollup_statistics_match_raw_scan(self):
+        """测试跨越整天、整小时和零散时段的汇总统计与逐条统计一致"""
+        print("\n🧪 测试汇总统计...")
+        now = datetime.now().timestamp()
+        ranges = [
+            (now - 2.5 * 86400 + 123, now),
+            (now - 3600 * 5 - 77, now - 3600 * 2 + 31),
+            (now - 1000, now - 10),
+        ]
+        for start_ts, end_ts in ranges:
+            expected = _naive_statistics(self.activities, start_ts, end_ts)
+            stats = self.store.get_statistics(start_ts, end_ts)
+            for key in ("total_activities", "activity_types", "user_activities", "daily_activities"):
+                self.assertEqual(stats[key], expected[key], key)
+            self.assertAlmostEqual(stats["success_rate"], expected["success_rate"])
+            self.assertAlmostEqual(stats["average_duration"], expected["average_duration"])
+
+        filtered = self.store.get_statistics(ranges[0][0], ranges[0][1], username='alice')
+        self.assertEqual(list(filtered["user_activities"]), ['alice'])
+        self.assertEqual(filtered["unique_users"], 1)
+        print("  ✅ 汇总统计测试通过")
+
+    def test_legacy_import_and_cleanup(self):
+        """测试迁移旧的每日JSONL文件以及按日期清理"""
+        print("\n🧪 测试迁移与清理...")
+        legacy_dir = self.temp_dir / "legacy"
+        legacy_dir.mkdir()
+        old_ts = (datetime.now() - timedelta(days=120)).timestamp()
+        legacy_file = legacy_dir / "user_activities_2000-01-01.jsonl"
+        with open(legacy_file, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(_activity(old_ts, 'dave', 'config'), ensure_ascii=False) + '\n')
+
+        self.assertEqual(self.store.import_legacy_jsonl(legacy_dir), 1)
+        self.assertFalse(legacy_file.exists())
+        self.assertEqual(self.store.query(username='dave')[0]['action_type'], 'config')
+
+        removed = self.store.delete_before(datetime.now() - timedelta(days=90))
+        self.assertEqual(removed, 1)
+        self.assertEqual(self.store.query(username='dave'), [])
+        stats = self.store.get_statistics(old_ts - 86400 * 2, old_ts + 86400 * 2)
+        self.assertEqual(stats["total_activities"], 0)
+        print("  ✅ 迁移与清理测试通过")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
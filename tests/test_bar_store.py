@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+K线缓存测试
+验证子区间直接命中本地数据，以及只请求缺失的首尾区间
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows.bar_store import OHLCVBarStore
+
+
+def _make_bars(start_date: str, end_date: str, date_index: bool = False) -> pd.DataFrame:
+    """生成工作日K线"""
+    dates = pd.bdate_range(start_date, end_date)
+    data = pd.DataFrame({
+        'open': range(len(dates)),
+        'high': range(1, len(dates) + 1),
+        'low': range(len(dates)),
+        'close': [float(i) + 0.5 for i in range(len(dates))],
+        'volume': [1000] * len(dates),
+    })
+    if date_index:
+        data.index = pd.DatetimeIndex(dates, name='Date')
+    else:
+        data.insert(0, 'date', dates)
+    return data
+
+
+class RecordingFetcher:
+    """记录请求区间的模拟数据源"""
+
+    def __init__(self, date_index: bool = False):
+        self.calls = []
+        self.date_index = date_index
+
+    def __call__(self, symbol, start_date, end_date):
+        self.calls.append((start_date, end_date))
+        return _make_bars(start_date, end_date, self.date_index)
+
+
+class TestOHLCVBarStore(unittest.TestCase):
+    """K线缓存测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.store_dir = tempfile.mkdtemp(prefix="ta_bar_store_")
+        self.store = OHLCVBarStore(self.store_dir)
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+
+    def test_sub_range_served_locally(self):
+        """测试子区间直接从本地读取"""
+        print("\n🧪 测试子区间命中...")
+        fetcher = RecordingFetcher()
+        full = self.store.get_bars("tushare", "000001", "2023-01-01", "2024-12-31", fetcher)
+        self.assertEqual(fetcher.calls, [("2023-01-01", "2024-12-31")])
+        self.assertEqual(len(full), len(pd.bdate_range("2023-01-01", "2024-12-31")))
+
+        sub = self.store.get_bars("tushare", "000001", "2024-01-01", "2024-06-30", fetcher)
+        self.assertEqual(len(fetcher.calls), 1)
+        self.assertEqual(len(sub), len(pd.bdate_range("2024-01-01", "2024-06-30")))
+        self.assertEqual(list(sub.columns), ['date', 'open', 'high', 'low', 'close', 'volume'])
+        self.assertEqual(pd.Timestamp(sub['date'].iloc[0]), pd.Timestamp("2024-01-01"))
+        print("  ✅ 子区间命中测试通过")
+
+    def test_only_missing_edges_fetched(self):
+        """测试只补齐首尾缺口"""
+        print("\n🧪 测试缺口补齐...")
+        fetcher = RecordingFetcher()
+        self.store.get_bars("akshare", "600519", "2024-03-01", "2024-03-31", fetcher)
+        data = self.store.get_bars("akshare", "600519", "2024-02-01", "2024-04-30", fetcher)
+
+        self.assertEqual(fetcher.calls[1:], [("2024-02-01", "2024-02-29"), ("2024-04-01", "2024-04-30")])
+        self.assertEqual(len(data), len(pd.bdate_range("2024-02-01", "2024-04-30")))
+        self.assertTrue(data['date'].is_monotonic_increasing)
+        self.assertEqual(self.store.missing_ranges("akshare", "600519", "2024-02-01", "2024-04-30"), [])
+        print("  ✅ 缺口补齐测试通过")
+
+    def test_datetime_index_round_trip(self):
+        """测试日期索引格式（yfinance）保持不变"""
+        print("\n🧪 测试日期索引格式...")
+        fetcher = RecordingFetcher(date_index=True)
+        self.store.get_bars("yfinance", "AAPL", "2024-01-01", "2024-02-29", fetcher)
+        data = self.store.get_bars("yfinance", "AAPL", "2024-01-15", "2024-01-31", fetcher)
+
+        self.assertEqual(len(fetcher.calls), 1)
+        self.assertIsInstance(data.index, pd.DatetimeIndex)
+        self.assertEqual(data.index.name, 'Date')
+        self.assertNotIn('Date', data.columns)
+        print("  ✅ 日期索引格式测试通过")
+
+    def test_failed_fetch_not_marked_covered(self):
+        """测试获取失败的区间不会被登记为已覆盖"""
+        print("\n🧪 测试获取失败处理...")
+
+        def failing_fetcher(symbol, start_date, end_date):
+            raise ConnectionError("network down")
+
+        data = self.store.get_bars("tushare", "000002", "2024-01-01", "2024-01-31", failing_fetcher)
+        self.assertTrue(data.empty)
+        self.assertEqual(self.store.missing_ranges("tushare", "000002", "2024-01-01", "2024-01-31"),
+                         [("2024-01-01", "2024-01-31")])
+
+        # 短区间（周末）空结果视为已覆盖
+        self.store.get_bars("tushare", "000002", "2024-01-06", "2024-01-07",
+                            lambda s, a, b: pd.DataFrame())
+        self.assertEqual(self.store.missing_ranges("tushare", "000002", "2024-01-06", "2024-01-07"), [])
+        print("  ✅ 获取失败处理测试通过")
+
+    def test_partial_fetch_covers_returned_range(self):
+        """测试数据源只返回部分区间时，只登记实际返回的日期范围"""
+        print("\n🧪 测试部分返回处理...")
+
+        def partial_fetcher(symbol, start_date, end_date):
+            return _make_bars(start_date, "2024-01-19")
+
+        self.store.get_bars("tushare", "000003", "2024-01-01", "2024-01-31", partial_fetcher)
+        self.assertEqual(self.store.missing_ranges("tushare", "000003", "2024-01-01", "2024-01-31"),
+                         [("2024-01-20", "2024-01-31")])
+
+        fetcher = RecordingFetcher()
+        data = self.store.get_bars("tushare", "000003", "2024-01-01", "2024-01-31", fetcher)
+        self.assertEqual(fetcher.calls, [("2024-01-20", "2024-01-31")])
+        self.assertEqual(len(data), len(pd.bdate_range("2024-01-01", "2024-01-31")))
+        print("  ✅ 部分返回处理测试通过")
+
+    def test_empty_holiday_gap_uses_trading_calendar(self):
+        """测试长假空区间按交易日历登记为已覆盖"""
+        print("\n🧪 测试长假空区间...")
+
+        def holiday_calendar(start_date, end_date):
+            days = pd.bdate_range(start_date, end_date)
+            return [d.strftime('%Y%m%d') for d in days
+                    if not pd.Timestamp("2024-02-09") <= d <= pd.Timestamp("2024-02-17")]
+
+        empty_fetcher = lambda s, a, b: pd.DataFrame()
+        self.store.get_bars("tushare", "000004", "2024-02-09", "2024-02-17", empty_fetcher,
+                            trading_days=holiday_calendar)
+        self.assertEqual(self.store.missing_ranges("tushare", "000004", "2024-02-09", "2024-02-17"), [])
+
+        # 区间内有交易日但没有返回数据时不登记
+        self.store.get_bars("tushare", "000004", "2024-02-19", "2024-02-29", empty_fetcher,
+                            trading_days=holiday_calendar)
+        self.assertEqual(self.store.missing_ranges("tushare", "000004", "2024-02-19", "2024-02-29"),
+                         [("2024-02-19", "2024-02-29")])
+        print("  ✅ 长假空区间测试通过")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缓存编解码测试
+验证DataFrame列类型/索引往返、文本压缩，以及文件缓存写入新格式后仍可读取旧版CSV/pickle缓存
+"""
+
+import os
+import sys
+import pickle
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows import cache_codec
+
+
+def make_bars(rows: int = 300) -> pd.DataFrame:
+    """生成带日期索引和多种列类型的K线数据"""
+    index = pd.date_range('2020-01-01', periods=rows, freq='D', name='Date')
+    return pd.DataFrame({
+        'open': np.linspace(10, 20, rows),
+        'close': np.linspace(10.5, 20.5, rows).astype('float32'),
+        'volume': np.arange(rows, dtype='int64') * 100,
+        'suspended': np.arange(rows) % 7 == 0,
+        'code': ['000001'] * rows,
+        'board': pd.Categorical(['主板', '创业板'] * (rows // 2)),
+        'turnover': pd.array([1, None] * (rows // 2), dtype='Int64'),
+    }, index=index)
+
+
+class TestCacheCodec(unittest.TestCase):
+    """缓存编解码测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp(prefix="ta_cache_codec_")
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_frame_round_trip(self):
+        """测试所有可用的DataFrame编解码器保留列类型和索引"""
+        print("\n🧪 测试DataFrame往返...")
+        bars = make_bars()
+        bars_with_tz = bars.copy()
+        bars_with_tz.index = bars_with_tz.index.tz_localize('Asia/Shanghai')
+        mixed = pd.DataFrame({0: [1, 'a', None], 'date': ['2024-01-01'] * 3})
+
+        for codec in cache_codec.get_codec_info()['available_frame_codecs']:
+            with mock.patch.dict(os.environ, {'TRADINGAGENTS_CACHE_FRAME_CODEC': codec}):
+                for frame in (bars, bars_with_tz, mixed, bars.reset_index()):
+                    blob = cache_codec.dumps(frame, {'source': 'test'})
+                    self.assertTrue(cache_codec.is_encoded(blob))
+                    data, meta = cache_codec.loads(blob)
+                    assert_frame_equal(data, frame, check_freq=False)
+                    self.assertEqual(meta, {'source': 'test'})
+        print("  ✅ DataFrame往返测试通过")
+
+    def test_text_and_json(self):
+        """测试文本和JSON压缩，未编码数据不会被误识别"""
+        print("\n🧪 测试文本和JSON...")
+        report = "# 贵州茅台基本面分析\n" + "营业收入同比增长15%。\n" * 200
+        blob = cache_codec.dumps(report)
+        self.assertLess(len(blob), len(report.encode('utf-8')) // 5)
+        self.assertEqual(cache_codec.loads(blob)[0], report)
+        self.assertEqual(cache_codec.loads(cache_codec.dumps({'pe': 12.5, 'tags': ['白酒']}))[0],
+                         {'pe': 12.5, 'tags': ['白酒']})
+
+        self.assertFalse(cache_codec.is_encoded(pickle.dumps({'data': 1})))
+        self.assertFalse(cache_codec.is_encoded('plain text'))
+        with self.assertRaises(cache_codec.CacheCodecError):
+            cache_codec.loads(b'{"data": 1}')
+        with self.assertRaises(cache_codec.CacheCodecError):
+            cache_codec.dumps(object())
+        print("  ✅ 文本和JSON测试通过")
+
+    def test_stock_cache_reads_legacy_csv(self):
+        """测试文件缓存以新格式保存，旧版CSV缓存仍可读取"""
+        print("\n🧪 测试文件缓存新旧格式...")
+        from tradingagents.dataflows.cache_manager import StockDataCache
+
+        cache = StockDataCache(self.cache_dir)
+        self.addCleanup(cache.metadata_index.close)
+        bars = make_bars()
+
+        key = cache.save_stock_data("000001", bars, "2020-01-01", "2020-10-26", "tushare")
+        metadata = cache.metadata_index.get(key)
+        self.assertEqual(metadata['file_format'], StockDataCache.CODEC_SUFFIX)
+        self.assertTrue(metadata['file_path'].endswith('.tac'))
+        cache.memory_cache.clear()
+        assert_frame_equal(cache.load_stock_data(key), bars, check_freq=False)
+
+        # 旧版CSV缓存
+        legacy_key = cache.save_stock_data("000002", "placeholder", "2020-01-01", "2020-10-26", "tushare")
+        legacy_path = os.path.join(self.cache_dir, 'legacy.csv')
+        bars.to_csv(legacy_path, index=True)
+        metadata = cache.metadata_index.get(legacy_key)
+        metadata.update({'file_path': legacy_path, 'file_format': 'csv'})
+        cache.metadata_index.upsert(legacy_key, metadata)
+        cache.memory_cache.clear()
+        legacy = cache.load_stock_data(legacy_key)
+        self.assertEqual(list(legacy.columns), list(bars.columns))
+        self.assertEqual(len(legacy), len(bars))
+        print("  ✅ 文件缓存新旧格式测试通过")
+
+    def test_adaptive_cache_reads_legacy_pickle(self):
+        """测试自适应缓存的文件后端写入新格式，旧版pickle文件仍可读取"""
+        print("\n🧪 测试自适应缓存新旧格式...")
+        from tradingagents.dataflows.adaptive_cache import AdaptiveCacheSystem
+
+        cache = AdaptiveCacheSystem.__new__(AdaptiveCacheSystem)
+        cache.logger = mock.Mock()
+        cache.cache_dir = Path(tempfile.mkdtemp(prefix="adaptive_", dir=self.cache_dir))
+        bars = make_bars()
+
+        self.assertTrue(cache._save_to_file('bars', bars, {'symbol': '000001'}))
+        self.assertTrue((cache.cache_dir / 'bars.tac').exists())
+        entry = cache._load_from_file('bars')
+        assert_frame_equal(entry['data'], bars, check_freq=False)
+        self.assertEqual(entry['metadata'], {'symbol': '000001'})
+        self.assertIsInstance(entry['timestamp'], datetime)
+
+        # 旧版pickle文件
+        legacy = {'data': '旧报告', 'metadata': {}, 'timestamp': datetime.now(), 'backend': 'file'}
+        with open(cache.cache_dir / 'report.pkl', 'wb') as f:
+            pickle.dump(legacy, f)
+        self.assertEqual(cache._load_from_file('report')['data'], '旧报告')
+
+        # 覆盖写入后旧文件被移除
+        self.assertTrue(cache._save_to_file('report', '新报告', {}))
+        self.assertFalse((cache.cache_dir / 'report.pkl').exists())
+        self.assertEqual(cache._load_from_file('report')['data'], '新报告')
+        print("  ✅ 自适应缓存新旧格式测试通过")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
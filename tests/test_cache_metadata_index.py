@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缓存元数据索引测试
+验证 StockDataCache 使用SQLite索引进行查找、TTL校验、统计、清理以及旧版元数据迁移
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows.cache_manager import StockDataCache
+
+
+class TestCacheMetadataIndex(unittest.TestCase):
+    """缓存元数据索引测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp(prefix="ta_cache_index_")
+        self.cache = StockDataCache(self.cache_dir)
+
+    def tearDown(self):
+        """测试后清理"""
+        self.cache.metadata_index.close()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_exact_and_partial_lookup(self):
+        """测试精确匹配和部分匹配查找"""
+        print("\n🧪 测试索引查找...")
+        key = self.cache.save_stock_data("AAPL", "price data", "2024-01-01", "2024-06-30", "yfinance")
+
+        self.assertEqual(
+            self.cache.find_cached_stock_data("AAPL", "2024-01-01", "2024-06-30", "yfinance"), key)
+        # 不同日期范围时回退到同一股票的其他缓存
+        self.assertEqual(
+            self.cache.find_cached_stock_data("AAPL", "2023-01-01", "2023-06-30", "yfinance"), key)
+        self.assertIsNone(self.cache.find_cached_stock_data("MSFT", data_source="yfinance"))
+        self.assertEqual(self.cache.load_stock_data(key), "price data")
+
+        fundamentals_key = self.cache.save_fundamentals_data("600519", "基本面报告", "tushare")
+        self.assertEqual(self.cache.find_cached_fundamentals_data("600519", "tushare"), fundamentals_key)
+        self.assertIsNone(self.cache.find_cached_fundamentals_data("600519", "openai"))
+        print("  ✅ 索引查找测试通过")
+
+    def test_ttl_filtering(self):
+        """测试TTL过滤"""
+        print("\n🧪 测试TTL过滤...")
+        key = self.cache.save_stock_data("AAPL", "old data", "2024-01-01", "2024-06-30", "yfinance")
+        metadata = self.cache.metadata_index.get(key)
+        metadata['cached_at'] = (datetime.now() - timedelta(hours=5)).isoformat()
+        self.cache.metadata_index.upsert(key, metadata)
+
+        self.assertIsNone(self.cache.find_cached_stock_data("AAPL", data_source="yfinance", max_age_hours=2))
+        self.assertEqual(self.cache.find_cached_stock_data("AAPL", data_source="yfinance", max_age_hours=6), key)
+        print("  ✅ TTL过滤测试通过")
+
+    def test_stats_and_clear(self):
+        """测试统计与过期清理"""
+        print("\n🧪 测试统计与清理...")
+        old_key = self.cache.save_stock_data("000001", "旧数据", "2024-01-01", "2024-01-31", "tushare")
+        self.cache.save_fundamentals_data("000001", "基本面", "tushare")
+
+        stats = self.cache.get_cache_stats()
+        self.assertEqual(stats['total_files'], 2)
+        self.assertEqual(stats['stock_data_count'], 1)
+        self.assertEqual(stats['fundamentals_count'], 1)
+
+        metadata = self.cache.metadata_index.get(old_key)
+        metadata['cached_at'] = (datetime.now() - timedelta(days=30)).isoformat()
+        self.cache.metadata_index.upsert(old_key, metadata)
+        old_file = Path(metadata['file_path'])
+
+        self.cache.clear_old_cache(max_age_days=7)
+        self.assertFalse(old_file.exists())
+        self.assertIsNone(self.cache.metadata_index.get(old_key))
+        self.assertEqual(self.cache.get_cache_stats()['total_files'], 1)
+        print("  ✅ 统计与清理测试通过")
+
+    def test_legacy_metadata_migration(self):
+        """测试旧版 *_meta.json 迁移"""
+        print("\n🧪 测试旧版元数据迁移...")
+        self.cache.metadata_index.close()
+
+        legacy_dir = Path(tempfile.mkdtemp(prefix="ta_cache_legacy_"))
+        try:
+            metadata_dir = legacy_dir / "metadata"
+            metadata_dir.mkdir()
+            data_file = legacy_dir / "AAPL_stock_data_legacy.txt"
+            data_file.write_text("legacy data", encoding='utf-8')
+            with open(metadata_dir / "AAPL_stock_data_legacy_meta.json", 'w', encoding='utf-8') as f:
+                json.dump({
+                    'symbol': 'AAPL',
+                    'data_type': 'stock_data',
+                    'market_type': 'us',
+                    'start_date': '2024-01-01',
+                    'end_date': '2024-06-30',
+                    'data_source': 'yfinance',
+                    'file_path': str(data_file),
+                    'file_format': 'txt',
+                    'cached_at': datetime.now().isoformat(),
+                }, f)
+
+            cache = StockDataCache(str(legacy_dir))
+            try:
+                self.assertEqual(list(metadata_dir.glob("*_meta.json")), [])
+                key = cache.find_cached_stock_data("AAPL", data_source="yfinance")
+                self.assertEqual(key, "AAPL_stock_data_legacy")
+                self.assertEqual(cache.load_stock_data(key), "legacy data")
+            finally:
+                cache.metadata_index.close()
+        finally:
+            shutil.rmtree(legacy_dir, ignore_errors=True)
+            self.cache = StockDataCache(self.cache_dir)
+        print("  ✅ 旧版元数据迁移测试通过")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+embedding缓存与批量请求测试
+验证按内容哈希缓存、持久化后跨实例复用、淘汰，以及记忆库批量请求embedding
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from tradingagents.agents.utils.embedding_cache import EmbeddingCache
+from tradingagents.agents.utils.memory import FinancialSituationMemory
+
+
+class _FakeEmbeddings:
+    """记录请求的OpenAI兼容embedding接口"""
+
+    def __init__(self):
+        self.requests = []
+
+    def create(self, model, input):
+        texts = [input] if isinstance(input, str) else list(input)
+        self.requests.append(texts)
+        # 倒序返回，验证按 index 还原顺序
+        data = [SimpleNamespace(index=i, embedding=[float(len(text)), float(i + 1), 1.0])
+                for i, text in enumerate(texts)]
+        return SimpleNamespace(data=list(reversed(data)))
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    """embedding缓存测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp(prefix="ta_embedding_cache_")
+        self.db_path = os.path.join(self.cache_dir, "embedding_cache.db")
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_persistent_cache_and_eviction(self):
+        """测试持久化复用与按最近访问淘汰"""
+        print("\n🧪 测试embedding持久缓存...")
+        cache = EmbeddingCache(self.db_path, max_memory_entries=2, max_disk_entries=10)
+        cache.put_many("m", [f"text {i}" for i in range(10)], [[float(i), 0.5] for i in range(10)])
+        self.assertEqual(cache.get("m", "text 3"), [3.0, 0.5])
+        self.assertIsNone(cache.get("other-model", "text 3"))
+        cache.put("m", "text 10", [10.0, 0.5])
+
+        stats = cache.get_stats()
+        self.assertEqual(stats['memory_entries'], 2)
+        self.assertEqual(stats['disk_entries'], 9)
+        self.assertEqual(stats['evictions'], 2)
+        self.assertIsNone(cache.get("m", "text 0"))
+        cache.close()
+
+        reopened = EmbeddingCache(self.db_path)
+        self.assertEqual(reopened.get_many("m", ["text 3", "text 10", "missing"]),
+                         [[3.0, 0.5], [10.0, 0.5], None])
+        self.assertEqual(reopened.get_stats()['disk_hits'], 2)
+        reopened.close()
+        print("  ✅ embedding持久缓存测试通过")
+
+    def test_memory_batches_and_reuses_embeddings(self):
+        """测试记忆库批量请求并在多个记忆库间复用"""
+        print("\n🧪 测试批量embedding...")
+        config = {"llm_provider": "openai", "backend_url": "https://api.openai.com/v1"}
+        with mock.patch.dict(os.environ, {"OPENAI_API_KEY": "test",
+                                         "TRADINGAGENTS_EMBEDDING_CACHE_ENABLED": "false"}):
+            bull = FinancialSituationMemory("test_bull_memory", config)
+            bear = FinancialSituationMemory("test_bear_memory", config)
+
+        fake = _FakeEmbeddings()
+        shared_cache = EmbeddingCache(self.db_path)
+        for memory in (bull, bear):
+            memory.client = SimpleNamespace(embeddings=fake)
+            memory.embedding_cache = shared_cache
+
+        situations = [("situation a", "buy"), ("situation bb", "sell"), ("situation a", "hold")]
+        bull.add_situations(situations)
+        self.assertEqual(fake.requests, [["situation a", "situation bb"]])
+        self.assertEqual(bull.situation_collection.count(), 3)
+
+        report = "market report " * 20
+        first = bull.get_embedding(report)
+        second = bear.get_embedding(report)
+        self.assertEqual(first, second)
+        self.assertEqual(len(fake.requests), 2)
+
+        embeddings = bear.get_embeddings(["situation bb", "new text", "situation a"])
+        self.assertEqual(fake.requests[-1], ["new text"])
+        self.assertEqual(embeddings[0], [12.0, 2.0, 1.0])
+        self.assertEqual(embeddings[2], [11.0, 1.0, 1.0])
+        shared_cache.close()
+        print("  ✅ 批量embedding测试通过")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM适配器异步生成测试
+验证DashScope/DeepSeek/OpenAI兼容适配器的异步路径不调用同步接口、多个请求在同一事件循环中并发，
+并保留token统计和LLM响应缓存
+"""
+
+import os
+import sys
+import time
+import asyncio
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+
+def dashscope_response(content: str):
+    """构造DashScope Generation响应"""
+    message = SimpleNamespace(content=content)
+    return SimpleNamespace(status_code=200, output=SimpleNamespace(choices=[SimpleNamespace(message=message)]),
+                           usage=SimpleNamespace(input_tokens=100, output_tokens=20))
+
+
+def openai_result(content: str) -> ChatResult:
+    """构造带token统计的ChatOpenAI回复"""
+    return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))],
+                      llm_output={'token_usage': {'prompt_tokens': 100, 'completion_tokens': 20}})
+
+
+class TestLLMAsyncGeneration(unittest.TestCase):
+    """LLM适配器异步生成测试类"""
+
+    def test_dashscope_concurrent_on_one_loop(self):
+        """测试DashScope异步请求在同一事件循环中并发，且不调用阻塞的同步接口"""
+        print("\n🧪 测试DashScope异步并发...")
+        from tradingagents.llm_adapters import dashscope_adapter
+
+        async def fake_call(**params):
+            await asyncio.sleep(0.2)
+            return dashscope_response(f"回复: {params['messages'][-1]['content']}")
+
+        async def run_all(llm):
+            return await asyncio.gather(*(llm.ainvoke(f"分析股票{i}") for i in range(5)))
+
+        with mock.patch.object(dashscope_adapter, 'AIO_GENERATION_AVAILABLE', True), \
+                mock.patch.object(dashscope_adapter, 'AioGeneration', create=True) as aio, \
+                mock.patch.object(dashscope_adapter.Generation, 'call') as sync_call, \
+                mock.patch.object(dashscope_adapter, 'token_tracker') as tracker:
+            aio.call.side_effect = fake_call
+            llm = dashscope_adapter.ChatDashScope(api_key='test-key')
+            start = time.perf_counter()
+            results = asyncio.run(run_all(llm))
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual([r.content for r in results], [f"回复: 分析股票{i}" for i in range(5)])
+        self.assertLess(elapsed, 0.6)
+        sync_call.assert_not_called()
+        self.assertEqual(tracker.track_usage.call_count, 5)
+        print(f"  ✅ DashScope异步并发测试通过 (5个请求耗时 {elapsed:.2f}s)")
+
+    def test_openai_based_adapters_use_async_client(self):
+        """测试DeepSeek和OpenAI兼容适配器走父类异步路径并记录token"""
+        print("\n🧪 测试OpenAI兼容适配器异步路径...")
+        from langchain_openai import ChatOpenAI
+        from tradingagents.llm_adapters.deepseek_adapter import ChatDeepSeek
+        from tradingagents.llm_adapters.openai_compatible_base import ChatDeepSeekOpenAI
+
+        with mock.patch.object(ChatOpenAI, '_agenerate', new_callable=mock.AsyncMock,
+                               return_value=openai_result("持有")) as upstream, \
+                mock.patch.object(ChatOpenAI, '_generate') as sync_generate, \
+                mock.patch('tradingagents.llm_adapters.deepseek_adapter.token_tracker') as tracker:
+            deepseek = ChatDeepSeek(api_key='test-key')
+            self.assertEqual(asyncio.run(deepseek.ainvoke("分析000001")).content, "持有")
+            self.assertEqual(tracker.track_usage.call_args.kwargs['input_tokens'], 100)
+
+            compatible = ChatDeepSeekOpenAI(api_key='test-key')
+            with mock.patch.object(compatible, '_track_token_usage') as track:
+                self.assertEqual(asyncio.run(compatible.ainvoke("分析000001")).content, "持有")
+                track.assert_called_once()
+
+        self.assertEqual(upstream.await_count, 2)
+        sync_generate.assert_not_called()
+        print("  ✅ OpenAI兼容适配器异步路径测试通过")
+
+    def test_async_path_uses_response_cache(self):
+        """测试异步路径同样经过LLM响应缓存"""
+        print("\n🧪 测试异步路径响应缓存...")
+        from langchain_openai import ChatOpenAI
+        from tradingagents.llm_adapters.deepseek_adapter import ChatDeepSeek
+        from tradingagents.llm_adapters.response_cache import LLMCacheMissError
+
+        cache_dir = tempfile.mkdtemp(prefix="ta_llm_async_")
+        self.addCleanup(shutil.rmtree, cache_dir, True)
+        env = {'TRADINGAGENTS_LLM_CACHE_MODE': 'record',
+               'TRADINGAGENTS_LLM_CACHE_PATH': os.path.join(cache_dir, 'llm.db')}
+        with mock.patch.dict(os.environ, env), \
+                mock.patch.object(ChatOpenAI, '_agenerate', new_callable=mock.AsyncMock,
+                                  return_value=openai_result("卖出")) as upstream, \
+                mock.patch('tradingagents.llm_adapters.deepseek_adapter.token_tracker') as tracker:
+            llm = ChatDeepSeek(api_key='test-key')
+            for _ in range(2):
+                self.assertEqual(asyncio.run(llm.ainvoke("分析600519")).content, "卖出")
+            os.environ['TRADINGAGENTS_LLM_CACHE_MODE'] = 'replay'
+            with self.assertRaises(LLMCacheMissError):
+                asyncio.run(llm.ainvoke("分析000002"))
+
+        self.assertEqual(upstream.await_count, 1)
+        self.assertEqual(tracker.track_usage.call_count, 1)
+        print("  ✅ 异步路径响应缓存测试通过")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
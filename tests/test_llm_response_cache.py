@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM响应缓存测试
+验证规范化缓存键、SQLite/文件后端的有效期与淘汰，以及适配器先记录后离线回放
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from tradingagents.llm_adapters.response_cache import (
+    LLMCacheMissError, LLMResponseCache, make_cache_key,
+)
+
+
+def make_result(content: str, tool_calls=None) -> ChatResult:
+    """构造带token统计的模型回复"""
+    message = AIMessage(content=content, tool_calls=tool_calls or [])
+    return ChatResult(generations=[ChatGeneration(message=message)],
+                      llm_output={'token_usage': {'prompt_tokens': 120, 'completion_tokens': 30}})
+
+
+class TestLLMResponseCache(unittest.TestCase):
+    """LLM响应缓存测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp(prefix="ta_llm_cache_")
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_canonical_key(self):
+        """测试消息id等运行时字段不影响缓存键，模型、采样参数、工具和停止词影响缓存键"""
+        print("\n🧪 测试规范化缓存键...")
+        call = {'name': 'get_stock_market_data_unified', 'args': {'ticker': '000001'}, 'id': 'call_1'}
+        history = [SystemMessage(content="你是股票分析师"), HumanMessage(content="分析000001"),
+                   AIMessage(content="", tool_calls=[call], id="run-1"),
+                   ToolMessage(content="最新价格: ¥14.50", tool_call_id='call_1')]
+        rerun = [SystemMessage(content="你是股票分析师"), HumanMessage(content="分析000001", id="m-2"),
+                 AIMessage(content="", tool_calls=[call], id="run-2",
+                           response_metadata={'finish_reason': 'tool_calls'}),
+                 ToolMessage(content="最新价格: ¥14.50", tool_call_id='call_1')]
+        tools = [{'type': 'function', 'function': {'name': 'get_stock_market_data_unified'}}]
+        key = make_cache_key('deepseek', 'deepseek-chat', history, tools, None, {'temperature': 0.1})
+
+        self.assertEqual(key, make_cache_key('deepseek', 'deepseek-chat', rerun, tools, [], {'temperature': 0.1}))
+        for other in (make_cache_key('dashscope', 'deepseek-chat', history, tools, None, {'temperature': 0.1}),
+                      make_cache_key('deepseek', 'deepseek-reasoner', history, tools, None, {'temperature': 0.1}),
+                      make_cache_key('deepseek', 'deepseek-chat', history, None, None, {'temperature': 0.1}),
+                      make_cache_key('deepseek', 'deepseek-chat', history, tools, ['\n'], {'temperature': 0.1}),
+                      make_cache_key('deepseek', 'deepseek-chat', history, tools, None, {'temperature': 0.7}),
+                      make_cache_key('deepseek', 'deepseek-chat', history[:2], tools, None, {'temperature': 0.1})):
+            self.assertNotEqual(key, other)
+        print("  ✅ 规范化缓存键测试通过")
+
+    def test_backends_ttl_and_eviction(self):
+        """测试两种后端的往返、有效期（replay忽略有效期）和条目上限"""
+        print("\n🧪 测试缓存后端...")
+        call = {'name': 'get_stock_fundamentals_unified', 'args': {'ticker': '600519'}, 'id': 'call_9'}
+        for backend, path in (('sqlite', os.path.join(self.cache_dir, 'llm.db')),
+                              ('file', os.path.join(self.cache_dir, 'llm_responses'))):
+            cache = LLMResponseCache('record', backend, path, ttl_seconds=3600, max_entries=10)
+            self.assertIsNone(cache.get('k0'))
+            cache.put('k0', 'deepseek', 'deepseek-chat', make_result("调用工具", [call]))
+            cached = cache.get('k0')
+            self.assertEqual(cached.generations[0].message.tool_calls[0]['args'], {'ticker': '600519'})
+            self.assertEqual(cached.llm_output['token_usage']['prompt_tokens'], 120)
+
+            # 过期记录在 record 模式下视为未命中，replay 模式仍可回放
+            replay = LLMResponseCache('replay', backend, path, ttl_seconds=3600)
+            with mock.patch('tradingagents.llm_adapters.response_cache.time.time', return_value=4e9):
+                self.assertEqual(replay.get('k0').generations[0].message.content, "调用工具")
+                replay.put('k1', 'deepseek', 'deepseek-chat', make_result("不应写入"))
+                self.assertIsNone(cache.get('k0'))
+            self.assertIsNone(replay.get('k1'))
+            replay.close()
+
+            for i in range(11):
+                cache.put(f'k{i}', 'deepseek', 'deepseek-chat', make_result(f"回复{i}"))
+            stats = cache.get_stats()
+            self.assertLessEqual(stats['entries'], 10)
+            self.assertGreater(stats['evictions'], 0)
+            self.assertEqual(stats['expired'], 1)
+            self.assertEqual(cache.get('k10').generations[0].message.content, "回复10")
+            cache.close()
+        print("  ✅ 缓存后端测试通过")
+
+    def test_adapter_record_then_replay(self):
+        """测试适配器记录回复后离线回放：不再调用API、不重复计费，未记录的请求直接失败"""
+        print("\n🧪 测试适配器记录与回放...")
+        from langchain_openai import ChatOpenAI
+        from tradingagents.llm_adapters.deepseek_adapter import ChatDeepSeek
+
+        env = {'TRADINGAGENTS_LLM_CACHE_MODE': 'record',
+               'TRADINGAGENTS_LLM_CACHE_PATH': os.path.join(self.cache_dir, 'llm.db')}
+        with mock.patch.dict(os.environ, env), \
+                mock.patch.object(ChatOpenAI, '_generate', return_value=make_result("买入")) as upstream, \
+                mock.patch('tradingagents.llm_adapters.deepseek_adapter.token_tracker') as tracker:
+            llm = ChatDeepSeek(api_key='test-key')
+            self.assertEqual(llm.invoke("分析000001").content, "买入")
+            self.assertEqual(llm.invoke("分析000001").content, "买入")
+            self.assertEqual(upstream.call_count, 1)
+            self.assertEqual(tracker.track_usage.call_count, 1)
+
+            os.environ['TRADINGAGENTS_LLM_CACHE_MODE'] = 'replay'
+            self.assertEqual(llm.invoke("分析000001").content, "买入")
+            with self.assertRaises(LLMCacheMissError):
+                llm.invoke("分析600519")
+            self.assertEqual(upstream.call_count, 1)
+
+            os.environ['TRADINGAGENTS_LLM_CACHE_MODE'] = 'off'
+            llm.invoke("分析000001")
+            self.assertEqual(upstream.call_count, 2)
+        print("  ✅ 适配器记录与回放测试通过")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM流式输出测试
+验证适配器流式生成的token统计和响应缓存、图执行中按节点输出的增量文本，
+以及Web进度事件对流式输出的合并
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from langchain_core.messages import AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGenerationChunk
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+
+def dashscope_stream(pieces):
+    """构造DashScope增量输出的响应序列，usage为截至当前的累计值"""
+    for i, text in enumerate(pieces, 1):
+        message = SimpleNamespace(content=text)
+        yield SimpleNamespace(status_code=200, output=SimpleNamespace(choices=[SimpleNamespace(message=message)]),
+                              usage=SimpleNamespace(input_tokens=100, output_tokens=5 * i))
+
+
+def openai_stream(pieces):
+    """构造ChatOpenAI的流式块，最后一块带用量"""
+    for text in pieces:
+        yield ChatGenerationChunk(message=AIMessageChunk(content=text))
+    yield ChatGenerationChunk(message=AIMessageChunk(
+        content="", usage_metadata={'input_tokens': 100, 'output_tokens': 20, 'total_tokens': 120}))
+
+
+class TestLLMStreaming(unittest.TestCase):
+    """LLM流式输出测试类"""
+
+    def test_dashscope_stream_tracks_usage_once(self):
+        """测试DashScope流式输出逐段返回，流结束后记录一次token使用量"""
+        print("\n🧪 测试DashScope流式输出...")
+        from tradingagents.llm_adapters import dashscope_adapter
+
+        with mock.patch.object(dashscope_adapter.Generation, 'call',
+                               return_value=dashscope_stream(["建议", "买入"])) as call, \
+                mock.patch.object(dashscope_adapter, 'token_tracker') as tracker:
+            llm = dashscope_adapter.ChatDashScope(api_key='test-key')
+            pieces = [chunk.content for chunk in llm.stream("分析000001") if chunk.content]
+
+        self.assertEqual(pieces, ["建议", "买入"])
+        self.assertTrue(call.call_args.kwargs['stream'])
+        tracker.track_usage.assert_called_once()
+        self.assertEqual(tracker.track_usage.call_args.kwargs['output_tokens'], 10)
+        print("  ✅ DashScope流式输出测试通过")
+
+    def test_deepseek_stream_uses_cache(self):
+        """测试DeepSeek流式输出记录用量，相同请求重放时直接返回缓存"""
+        print("\n🧪 测试流式输出响应缓存...")
+        from langchain_openai import ChatOpenAI
+        from tradingagents.llm_adapters.deepseek_adapter import ChatDeepSeek
+
+        cache_dir = tempfile.mkdtemp(prefix="ta_llm_stream_")
+        self.addCleanup(shutil.rmtree, cache_dir, True)
+        env = {'TRADINGAGENTS_LLM_CACHE_MODE': 'record',
+               'TRADINGAGENTS_LLM_CACHE_PATH': os.path.join(cache_dir, 'llm.db')}
+        with mock.patch.dict(os.environ, env), \
+                mock.patch.object(ChatOpenAI, '_stream', side_effect=lambda *a, **k: openai_stream(["持", "有"])) as upstream, \
+                mock.patch('tradingagents.llm_adapters.deepseek_adapter.token_tracker') as tracker:
+            llm = ChatDeepSeek(api_key='test-key')
+            first = "".join(chunk.content for chunk in llm.stream("分析600519"))
+            os.environ['TRADINGAGENTS_LLM_CACHE_MODE'] = 'replay'
+            replayed = "".join(chunk.content for chunk in llm.stream("分析600519"))
+
+        self.assertEqual(first, "持有")
+        self.assertEqual(replayed, "持有")
+        self.assertEqual(upstream.call_count, 1)
+        self.assertTrue(upstream.call_args.kwargs['stream_usage'])
+        tracker.track_usage.assert_called_once()
+        self.assertEqual(tracker.track_usage.call_args.kwargs['input_tokens'], 100)
+        print("  ✅ 流式输出响应缓存测试通过")
+
+    def test_google_stream_tracks_usage(self):
+        """测试Google适配器流式输出记录token使用量并补充新闻内容格式"""
+        print("\n🧪 测试Google流式输出...")
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        from tradingagents.llm_adapters import google_openai_adapter
+
+        report = "平安银行股票业绩分析：" + "公司财报显示市场表现稳定。" * 30
+
+        def google_stream(*args, **kwargs):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=report[:100]))
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content=report[100:], usage_metadata={'input_tokens': 100, 'output_tokens': 20, 'total_tokens': 120}))
+
+        with mock.patch.dict(os.environ, {'TRADINGAGENTS_LLM_CACHE_MODE': 'off'}), \
+                mock.patch.object(ChatGoogleGenerativeAI, '_stream', side_effect=google_stream), \
+                mock.patch.object(google_openai_adapter, 'token_tracker') as tracker:
+            llm = google_openai_adapter.ChatGoogleOpenAI(google_api_key='test-key', model='gemini-2.5-flash')
+            text = "".join(chunk.content for chunk in llm.stream("分析000001"))
+
+        self.assertTrue(text.startswith(report))
+        self.assertIn("文章来源", text)
+        tracker.track_usage.assert_called_once()
+        self.assertEqual(tracker.track_usage.call_args.kwargs['input_tokens'], 100)
+        self.assertEqual(tracker.track_usage.call_args.kwargs['output_tokens'], 20)
+        print("  ✅ Google流式输出测试通过")
+
+    def test_graph_events_report_node_tokens(self):
+        """测试图执行时按节点输出增量文本，并保留每步的完整状态"""
+        print("\n🧪 测试图流式事件...")
+        from langchain_core.language_models import GenericFakeChatModel
+        from langgraph.graph import END, START, MessagesState, StateGraph
+        from tradingagents.graph.streaming import STREAM_TOKEN, STREAM_VALUES, iter_graph_events
+
+        llm = GenericFakeChatModel(messages=iter(["买入 评级"]))
+        graph = StateGraph(MessagesState)
+        graph.add_node("Market Analyst", lambda state: {"messages": [llm.invoke(state["messages"])]})
+        graph.add_edge(START, "Market Analyst")
+        graph.add_edge("Market Analyst", END)
+
+        events = list(iter_graph_events(graph.compile(), {"messages": [HumanMessage(content="分析")]}, {}))
+        deltas = [payload for kind, payload in events if kind == STREAM_TOKEN]
+        states = [payload for kind, payload in events if kind == STREAM_VALUES]
+
+        self.assertEqual({delta.node for delta in deltas}, {"Market Analyst"})
+        self.assertEqual("".join(delta.text for delta in deltas), "买入 评级")
+        self.assertEqual(states[-1]["messages"][-1].content, "买入 评级")
+        print("  ✅ 图流式事件测试通过")
+
+    def test_progress_events_merge_tokens(self):
+        """测试进度事件合并流式输出：同一节点追加，切换节点重新开始"""
+        print("\n🧪 测试进度事件流式输出合并...")
+        from web.utils.progress_events import EVENT_INIT, EVENT_TOKENS, apply_progress_events
+
+        events = [
+            {'seq': 1, 'type': EVENT_INIT, 'data': {'status': 'running'}},
+            {'seq': 2, 'type': EVENT_TOKENS, 'data': {'node': 'Bull Researcher', 'text': '看多'}},
+            {'seq': 3, 'type': EVENT_TOKENS, 'data': {'node': 'Bull Researcher', 'text': '理由'}},
+        ]
+        state = apply_progress_events(None, events)
+        self.assertEqual(state['streaming'], {'node': 'Bull Researcher', 'text': '看多理由'})
+
+        state = apply_progress_events(state, [
+            {'seq': 4, 'type': EVENT_TOKENS, 'data': {'node': 'Bear Researcher', 'text': '看空'}}])
+        self.assertEqual(state['streaming'], {'node': 'Bear Researcher', 'text': '看空'})
+        self.assertEqual(state['seq'], 4)
+        print("  ✅ 进度事件流式输出合并测试通过")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
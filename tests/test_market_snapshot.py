@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+A股全市场日线快照测试
+验证按交易日批量入库、已入库交易日跳过、未发布交易日的截断，以及单只股票请求从快照读取
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows import market_snapshot
+from tradingagents.dataflows.bar_store import OHLCVBarStore
+from tradingagents.dataflows.market_snapshot import ingest_china_daily_snapshots, get_snapshot_bars
+from tradingagents.dataflows.rate_limiter import RateLimiter, LocalTokenBucketBackend
+
+TRADE_DATES = ['20250106', '20250107', '20250108', '20250109', '20250110']
+
+
+class FakeTushareProvider:
+    """按交易日返回全市场日线的模拟Tushare提供器"""
+
+    connected = True
+
+    def __init__(self, unpublished=()):
+        self.calls = []
+        self.unpublished = set(unpublished)
+
+    def get_trade_dates(self, start_date, end_date):
+        self.calls.append(('trade_cal', start_date, end_date))
+        start, end = start_date.replace('-', ''), end_date.replace('-', '')
+        return [d for d in TRADE_DATES if start <= d <= end]
+
+    def get_daily_snapshot(self, trade_date):
+        self.calls.append(('daily', trade_date))
+        if trade_date in self.unpublished:
+            return pd.DataFrame()
+        day = TRADE_DATES.index(trade_date)
+        codes = ['000001.SZ', '600036.SH', '300750.SZ']
+        if trade_date == '20250108':
+            codes.remove('600036.SH')  # 停牌
+        return pd.DataFrame({
+            'ts_code': codes,
+            'trade_date': trade_date,
+            'open': [10.0 + day] * len(codes),
+            'high': [11.0 + day] * len(codes),
+            'low': [9.0 + day] * len(codes),
+            'close': [10.5 + day] * len(codes),
+            'pct_chg': [1.0] * len(codes),
+            'vol': [1000.0] * len(codes),
+        })
+
+
+class TestMarketSnapshot(unittest.TestCase):
+    """全市场日线快照测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.store_dir = tempfile.mkdtemp(prefix="ta_market_snapshot_")
+        self.store = OHLCVBarStore(self.store_dir)
+        self.limiter = RateLimiter(LocalTokenBucketBackend(), {})
+        patcher = mock.patch.object(market_snapshot, 'get_rate_limiter', return_value=self.limiter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+
+    def test_ingest_by_trade_date(self):
+        """测试每个交易日只调用一次API，单只股票从快照读取，重复入库跳过"""
+        print("\n🧪 测试按交易日批量入库...")
+        provider = FakeTushareProvider()
+        stats = ingest_china_daily_snapshots('2025-01-04', '2025-01-12', provider=provider, store=self.store)
+        self.assertEqual(stats, {'trade_dates': 5, 'api_calls': 6, 'symbols': 3, 'rows': 14})
+
+        bars = get_snapshot_bars('000001', '2025-01-06', '2025-01-10', store=self.store)
+        self.assertEqual(list(bars['trade_date']), TRADE_DATES)
+        # 停牌日没有K线，但区间仍视为已覆盖
+        bars = get_snapshot_bars('600036.SH', '20250107', '20250109', store=self.store)
+        self.assertEqual(list(bars['trade_date']), ['20250107', '20250109'])
+        # 未入库的股票和区间返回None
+        self.assertIsNone(get_snapshot_bars('002594', '2025-01-06', '2025-01-10', store=self.store))
+        self.assertIsNone(get_snapshot_bars('000001', '2025-01-06', '2025-01-20', store=self.store))
+
+        provider.calls.clear()
+        stats = ingest_china_daily_snapshots('2025-01-06', '2025-01-10', provider=provider, store=self.store)
+        self.assertEqual(stats['api_calls'], 0)
+        self.assertEqual(provider.calls, [])
+        print("  ✅ 按交易日批量入库测试通过")
+
+    def test_unpublished_trade_date_is_retried(self):
+        """测试当日数据未发布时只登记到前一天，下次从该交易日继续"""
+        print("\n🧪 测试未发布交易日...")
+        provider = FakeTushareProvider(unpublished={'20250109'})
+        stats = ingest_china_daily_snapshots('2025-01-06', '2025-01-10', provider=provider, store=self.store)
+        self.assertEqual(stats['trade_dates'], 3)
+        self.assertIsNotNone(get_snapshot_bars('000001', '2025-01-06', '2025-01-08', store=self.store))
+        self.assertIsNone(get_snapshot_bars('000001', '2025-01-06', '2025-01-09', store=self.store))
+
+        provider.unpublished.clear()
+        provider.calls.clear()
+        ingest_china_daily_snapshots('2025-01-06', '2025-01-10', provider=provider, store=self.store)
+        self.assertEqual(provider.calls, [('trade_cal', '2025-01-09', '2025-01-10'),
+                                          ('daily', '20250109'), ('daily', '20250110')])
+        self.assertEqual(len(get_snapshot_bars('000001', '2025-01-06', '2025-01-10', store=self.store)), 5)
+        print("  ✅ 未发布交易日测试通过")
+
+    def test_per_symbol_reads_served_from_snapshot(self):
+        """测试数据源管理器的Tushare请求由快照提供，不调用API也不消耗令牌"""
+        print("\n🧪 测试单只股票请求读取快照...")
+        from tradingagents.dataflows.data_source_manager import DataSourceManager, ChinaDataSource
+        from tradingagents.dataflows.tushare_adapter import TushareDataAdapter
+        from tradingagents.dataflows.tushare_utils import TushareProvider
+        from tradingagents.dataflows.rate_limiter import RateLimitRule
+
+        ingest_china_daily_snapshots('2025-01-06', '2025-01-10', provider=FakeTushareProvider(), store=self.store)
+
+        adapter = TushareDataAdapter.__new__(TushareDataAdapter)
+        adapter.provider = TushareProvider(token='', enable_cache=False)
+        limiter = RateLimiter(LocalTokenBucketBackend(), {'tushare': RateLimitRule(rate=0.001, burst=1)})
+        manager = DataSourceManager.__new__(DataSourceManager)
+        api_calls = []
+
+        def fetcher(symbol, start_date, end_date):
+            api_calls.append((symbol, start_date, end_date))
+            return None
+
+        bar_store = OHLCVBarStore(os.path.join(self.store_dir, 'per_symbol'))
+        with mock.patch.object(market_snapshot, 'get_bar_store', return_value=self.store), \
+                mock.patch('tradingagents.dataflows.bar_store.get_bar_store', return_value=bar_store), \
+                mock.patch('tradingagents.dataflows.data_source_manager.get_rate_limiter', return_value=limiter):
+            for _ in range(3):
+                data = manager._get_cached_bars(ChinaDataSource.TUSHARE, '000001', '2025-01-06', '2025-01-10',
+                                                fetcher, local_fetcher=adapter.get_snapshot_data)
+            self.assertEqual(len(data), 5)
+            self.assertIn('volume', data.columns)
+            self.assertEqual(data['close'].iloc[-1], 14.5)
+            # 快照读取的是未复权日线，复权在拼接完整区间后统一计算
+            self.assertNotIn('close_raw', data.columns)
+            # 快照未覆盖的区间才请求API
+            manager._get_cached_bars(ChinaDataSource.TUSHARE, '000001', '2025-01-06', '2025-01-14',
+                                     fetcher, local_fetcher=adapter.get_snapshot_data)
+
+        self.assertEqual(api_calls, [('000001', '2025-01-11', '2025-01-14')])
+        self.assertEqual(limiter.get_stats()['tushare']['acquired'], 1)
+        print("  ✅ 单只股票请求读取快照测试通过")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+L1内存缓存测试
+验证按字节LRU淘汰、按类型TTL、统计计数、single-flight以及与 StockDataCache 的集成
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows.memory_cache import MemoryCacheTier
+from tradingagents.dataflows.cache_manager import StockDataCache
+
+
+class TestMemoryCacheTier(unittest.TestCase):
+    """L1内存缓存测试类"""
+
+    def test_lru_eviction_by_size(self):
+        """测试按字节大小LRU淘汰"""
+        print("\n🧪 测试LRU淘汰...")
+        value = "x" * 1000
+        cache = MemoryCacheTier(max_bytes=3500)
+        for key in ("a", "b", "c"):
+            self.assertTrue(cache.put(key, value))
+        self.assertIsNotNone(cache.get("a"))  # a 变为最近使用
+
+        cache.put("d", value)
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("d"))
+
+        stats = cache.get_stats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['entries'], 3)
+        self.assertLessEqual(stats['current_bytes'], 3500)
+        self.assertFalse(cache.put("huge", "x" * 5000))
+        print("  ✅ LRU淘汰测试通过")
+
+    def test_ttl_by_cache_type(self):
+        """测试按数据类型TTL过期"""
+        print("\n🧪 测试TTL...")
+        cache = MemoryCacheTier(ttl_config={
+            'china_stock_data': {'ttl_hours': 1},
+            'us_news': {'ttl_hours': 0.1 / 3600},
+        })
+        self.assertEqual(cache.ttl_for('china_stock_data'), 3600)
+        cache.put("price", "data", cache_type='china_stock_data')
+        cache.put("news", "data", cache_type='us_news')
+        time.sleep(0.2)
+
+        self.assertEqual(cache.get("price"), "data")
+        self.assertIsNone(cache.get("news"))
+        stats = cache.get_stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['expirations'], 1)
+        print("  ✅ TTL测试通过")
+
+    def test_single_flight(self):
+        """测试并发请求同一键只加载一次"""
+        print("\n🧪 测试single-flight...")
+        cache = MemoryCacheTier()
+        calls = []
+        started = threading.Event()
+
+        def loader():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return "loaded"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("k", loader)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["loaded"] * 8)
+        self.assertEqual(cache.get_stats()['loads'], 1)
+        self.assertEqual(cache.get_or_load("k", loader), "loaded")
+        self.assertEqual(len(calls), 1)
+        print("  ✅ single-flight测试通过")
+
+    def test_stock_data_cache_integration(self):
+        """测试 StockDataCache 读取走L1且保存后失效"""
+        print("\n🧪 测试StockDataCache集成...")
+        cache_dir = tempfile.mkdtemp(prefix="ta_memory_cache_")
+        try:
+            cache = StockDataCache(cache_dir)
+            cache.memory_cache = MemoryCacheTier(ttl_config=cache.cache_config)
+
+            frame = pd.DataFrame({'close': [1.0, 2.0]}, index=['2024-01-02', '2024-01-03'])
+            key = cache.save_stock_data("AAPL", frame, "2024-01-01", "2024-01-31", "yfinance")
+            first = cache.load_stock_data(key)
+            first['close'] = 0.0  # 调用方修改不影响缓存
+            second = cache.load_stock_data(key)
+            self.assertEqual(list(second['close']), [1.0, 2.0])
+            self.assertEqual(cache.memory_cache.get_stats()['loads'], 1)
+
+            frame['close'] = [3.0, 4.0]
+            cache.save_stock_data("AAPL", frame, "2024-01-01", "2024-01-31", "yfinance")
+            self.assertEqual(list(cache.load_stock_data(key)['close']), [3.0, 4.0])
+            cache.metadata_index.close()
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+        print("  ✅ StockDataCache集成测试通过")
+
+    def test_db_cache_ttl_from_updated_at(self):
+        """测试数据库缓存的L1有效期从文档更新时间算起，不随重新加载而重置"""
+        print("\n🧪 测试数据库缓存L1有效期...")
+        from datetime import datetime, timedelta
+        from types import SimpleNamespace
+        from tradingagents.dataflows import cache_codec
+        from tradingagents.dataflows.db_cache_manager import DatabaseCacheManager
+
+        docs = {}
+        calls = []
+
+        def find_one(query):
+            calls.append(query['_id'])
+            return docs.get(query['_id'])
+
+        manager = DatabaseCacheManager.__new__(DatabaseCacheManager)
+        manager.redis_client = None
+        manager.mongodb_db = SimpleNamespace(stock_data=SimpleNamespace(find_one=find_one))
+        manager.memory_cache = MemoryCacheTier(ttl_config={'china_stock_data': {'ttl_hours': 1}})
+        frame = pd.DataFrame({'close': [1.0, 2.0]})
+        for key, age_minutes in (('stock:000001:fresh', 50), ('stock:000001:stale', 90)):
+            docs[key] = {'_id': key, 'data': cache_codec.dumps(frame), 'data_format': 'codec',
+                         'updated_at': datetime.utcnow() - timedelta(minutes=age_minutes)}
+
+        for _ in range(2):
+            self.assertEqual(list(manager.load_stock_data('stock:000001:fresh')['close']), [1.0, 2.0])
+            self.assertEqual(list(manager.load_stock_data('stock:000001:stale')['close']), [1.0, 2.0])
+        # 更新于50分钟前的文档在L1中只剩约10分钟，已超过1小时的文档不进入L1
+        self.assertEqual(calls, ['stock:000001:fresh', 'stock:000001:stale', 'stock:000001:stale'])
+        remaining = manager.memory_cache._entries[('db', 'stock:000001:fresh')].expires_at - time.monotonic()
+        self.assertLess(remaining, 11 * 60)
+        self.assertGreater(remaining, 9 * 60)
+        print("  ✅ 数据库缓存L1有效期测试通过")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分析师并行模式测试
+使用桩节点替换各智能体，验证并行分支的耗时、消息隔离以及最终状态与串行模式一致
+"""
+
+import os
+import sys
+import time
+import unittest
+from unittest import mock
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+from langgraph.prebuilt import ToolNode
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from tradingagents.graph import setup as graph_setup
+from tradingagents.graph.conditional_logic import ConditionalLogic
+from tradingagents.graph.propagation import Propagator
+
+ANALYST_DELAY = 0.3
+ANALYSTS = ["market", "social", "news", "fundamentals"]
+
+
+@tool
+def noop_tool(symbol: str) -> str:
+    """Placeholder tool."""
+    return symbol
+
+
+def _analyst_factory(report_field):
+    def factory(llm, toolkit):
+        def analyst(state):
+            time.sleep(ANALYST_DELAY)
+            # 每个分支只应看到自己的初始消息
+            seen = len(state["messages"])
+            return {
+                "messages": [AIMessage(content=f"{report_field} done")],
+                report_field: f"{report_field} for {state['company_of_interest']} (messages={seen})",
+            }
+        return analyst
+    return factory
+
+
+def _bull_factory(llm, memory):
+    def bull(state):
+        return {"investment_debate_state": {
+            "history": "bull", "bull_history": "bull", "bear_history": "",
+            "current_response": "Bull: buy", "judge_decision": "", "count": 2,
+        }}
+    return bull
+
+
+def _single_field_factory(field, value):
+    def factory(*args):
+        return lambda state: {field: value}
+    return factory
+
+
+def _risky_factory(llm):
+    def risky(state):
+        return {"risk_debate_state": {
+            "history": "risky", "risky_history": "risky", "safe_history": "", "neutral_history": "",
+            "latest_speaker": "Risky", "current_risky_response": "risky",
+            "current_safe_response": "", "current_neutral_response": "",
+            "judge_decision": "hold", "count": 3,
+        }}
+    return risky
+
+
+STUBS = {
+    "create_market_analyst": _analyst_factory("market_report"),
+    "create_social_media_analyst": _analyst_factory("sentiment_report"),
+    "create_news_analyst": _analyst_factory("news_report"),
+    "create_fundamentals_analyst": _analyst_factory("fundamentals_report"),
+    "create_bull_researcher": _bull_factory,
+    "create_bear_researcher": _bull_factory,
+    "create_research_manager": _single_field_factory("investment_plan", "plan"),
+    "create_trader": _single_field_factory("trader_investment_plan", "trade"),
+    "create_risky_debator": _risky_factory,
+    "create_neutral_debator": _risky_factory,
+    "create_safe_debator": _risky_factory,
+    "create_risk_manager": _single_field_factory("final_trade_decision", "BUY"),
+}
+
+
+class TestParallelAnalysts(unittest.TestCase):
+    """分析师并行模式测试类"""
+
+    def _run_graph(self, parallel: bool):
+        tool_nodes = {name: ToolNode([noop_tool]) for name in ANALYSTS}
+        with mock.patch.multiple(graph_setup, **STUBS):
+            setup = graph_setup.GraphSetup(
+                None, None, None, tool_nodes, None, None, None, None, None,
+                ConditionalLogic(), {"parallel_analysts": parallel},
+            )
+            graph = setup.setup_graph(ANALYSTS)
+            propagator = Propagator()
+            start = time.monotonic()
+            final_state = graph.invoke(
+                propagator.create_initial_state("AAPL", "2024-05-10"),
+                **propagator.get_graph_args(),
+            )
+            return final_state, time.monotonic() - start
+
+    def test_parallel_matches_sequential_state(self):
+        """测试并行模式的最终状态与串行模式一致且耗时接近最慢分析师"""
+        print("\n🧪 测试分析师并行模式...")
+        sequential_state, sequential_time = self._run_graph(parallel=False)
+        parallel_state, parallel_time = self._run_graph(parallel=True)
+
+        self.assertEqual(set(parallel_state.keys()), set(sequential_state.keys()))
+        for field in ["market_report", "sentiment_report", "news_report", "fundamentals_report",
+                      "investment_plan", "trader_investment_plan", "final_trade_decision"]:
+            self.assertEqual(parallel_state[field], sequential_state[field])
+        self.assertIn("(messages=1)", parallel_state["market_report"])
+        self.assertEqual([m.content for m in parallel_state["messages"]],
+                         [m.content for m in sequential_state["messages"]])
+
+        self.assertGreaterEqual(sequential_time, ANALYST_DELAY * len(ANALYSTS))
+        self.assertLess(parallel_time, ANALYST_DELAY * 2.5)
+        print(f"  ✅ 串行 {sequential_time:.2f}s，并行 {parallel_time:.2f}s")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
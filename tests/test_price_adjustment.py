@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+复权计算引擎测试
+验证向量化前复权与逐行计算结果一致、后复权锚定首日、以及追加数据时的增量计算
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows.price_adjustment import PriceAdjustmentEngine, get_adjustment_engine
+
+
+def _daily_bars(days: int, seed: int = 0, ts_code: str = "000001.SZ") -> pd.DataFrame:
+    """生成带一次除权跳空的日线数据"""
+    rng = np.random.default_rng(seed)
+    pct_chg = np.round(rng.normal(0, 2, days), 2)
+    close = 10 * np.cumprod(1 + pct_chg / 100)
+    # 中间某天除权：原始价格减半，但涨跌幅按除权后的昨收计算
+    close[days // 2:] /= 2
+    return pd.DataFrame({
+        'ts_code': ts_code,
+        'trade_date': pd.bdate_range('2020-01-01', periods=days),
+        'open': close * 0.99,
+        'high': close * 1.02,
+        'low': close * 0.97,
+        'close': close,
+        'pct_chg': pct_chg,
+    })
+
+
+def _reference_forward(data: pd.DataFrame) -> pd.DataFrame:
+    """原逐行实现，作为对照"""
+    closes = [float(data.iloc[-1]['close'])]
+    for i in range(len(data) - 2, -1, -1):
+        closes.insert(0, closes[0] / (1 + float(data.iloc[i + 1]['pct_chg']) / 100.0))
+    ratio = np.asarray(closes) / data['close'].to_numpy()
+    result = data[['open', 'high', 'low']].mul(ratio, axis=0)
+    result['close'] = closes
+    return result
+
+
+class TestPriceAdjustmentEngine(unittest.TestCase):
+    """复权计算引擎测试类"""
+
+    def test_forward_matches_reference(self):
+        """测试前复权与逐行实现一致"""
+        print("\n🧪 测试前复权...")
+        data = _daily_bars(300)
+        adjusted = PriceAdjustmentEngine().adjust(data.sample(frac=1, random_state=1), mode='forward')
+        expected = _reference_forward(data)
+
+        for col in ('open', 'high', 'low', 'close'):
+            np.testing.assert_allclose(adjusted[col].to_numpy(), expected[col].to_numpy(), rtol=1e-10)
+        np.testing.assert_allclose(adjusted['close_raw'].to_numpy(), data['close'].to_numpy())
+        self.assertEqual(adjusted['close'].iloc[-1], data['close'].iloc[-1])
+        self.assertTrue((adjusted['price_type'] == 'forward_adjusted').all())
+        # 除权日不再出现价格跳空
+        jump = adjusted['close'].pct_change().abs().max()
+        self.assertLess(jump, 0.1)
+        print("  ✅ 前复权测试通过")
+
+    def test_backward_anchors_first_close(self):
+        """测试后复权以首日收盘价为基准"""
+        print("\n🧪 测试后复权...")
+        data = _daily_bars(120, seed=2)
+        adjusted = PriceAdjustmentEngine().adjust(data, mode='backward')
+        forward = PriceAdjustmentEngine().adjust(data, mode='forward')
+
+        self.assertAlmostEqual(adjusted['close'].iloc[0], data['close'].iloc[0])
+        np.testing.assert_allclose(adjusted['close'] / forward['close'],
+                                   adjusted['close'].iloc[0] / forward['close'].iloc[0])
+        self.assertTrue((adjusted['price_type'] == 'backward_adjusted').all())
+        with self.assertRaises(ValueError):
+            PriceAdjustmentEngine().adjust(data, mode='none')
+        print("  ✅ 后复权测试通过")
+
+    def test_incremental_append(self):
+        """测试追加交易日时复用缓存的累计因子"""
+        print("\n🧪 测试增量复权...")
+        data = _daily_bars(500, seed=3)
+        engine = PriceAdjustmentEngine()
+        engine.adjust(data.iloc[:400], mode='forward')
+        incremental = engine.adjust(data.iloc[100:], mode='forward')
+        self.assertEqual(engine.full_builds, 1)
+        self.assertEqual(engine.incremental_builds, 1)
+
+        full = PriceAdjustmentEngine().adjust(data.iloc[100:], mode='forward')
+        for col in ('open', 'high', 'low', 'close'):
+            np.testing.assert_allclose(incremental[col].to_numpy(), full[col].to_numpy(), rtol=1e-10)
+
+        # 与缓存不连续的数据重新全量计算
+        engine.adjust(_daily_bars(50, seed=4).assign(trade_date=pd.bdate_range('2010-01-01', periods=50)))
+        self.assertEqual(engine.full_builds, 2)
+        print("  ✅ 增量复权测试通过")
+
+    def test_cached_range_split_across_dividend(self):
+        """测试K线缓存分段获取跨越除权日时，拼接后的前复权价格与一次获取完整区间一致"""
+        print("\n🧪 测试跨除权日分段缓存...")
+        from unittest import mock
+        from types import SimpleNamespace
+        from tradingagents.dataflows.bar_store import OHLCVBarStore
+        from tradingagents.dataflows.data_source_manager import DataSourceManager
+        from tradingagents.dataflows.rate_limiter import RateLimiter, LocalTokenBucketBackend
+        from tradingagents.dataflows.tushare_adapter import TushareDataAdapter
+        from tradingagents.dataflows.tushare_utils import TushareProvider
+
+        # 01-09 除权：原始收盘价 10 -> 9，但涨跌幅为 0
+        raw = pd.DataFrame({
+            'ts_code': '000001.SZ',
+            'trade_date': ['20250106', '20250107', '20250108', '20250109', '20250110'],
+            'open': [10.0, 10.0, 10.0, 9.0, 9.0], 'high': [10.0, 10.0, 10.0, 9.0, 9.0],
+            'low': [10.0, 10.0, 10.0, 9.0, 9.0], 'close': [10.0, 10.0, 10.0, 9.0, 9.0],
+            'pct_chg': [0.0] * 5, 'vol': [1000.0] * 5,
+        })
+
+        def daily(ts_code, start_date, end_date):
+            return raw[(raw['trade_date'] >= start_date) & (raw['trade_date'] <= end_date)].copy()
+
+        adapter = TushareDataAdapter.__new__(TushareDataAdapter)
+        adapter.provider = TushareProvider(token='', enable_cache=False)
+        adapter.enable_cache = False
+        adapter.provider.connected = True
+        adapter.provider.api = SimpleNamespace(daily=daily)
+        adapter.get_stock_info = lambda symbol: {'name': '平安银行'}
+        manager = DataSourceManager.__new__(DataSourceManager)
+        # 全局引擎按股票缓存累计指数，清除其他测试留下的同代码数据
+        get_adjustment_engine().clear()
+
+        store_dir = tempfile.mkdtemp(prefix="ta_adjust_split_")
+        self.addCleanup(shutil.rmtree, store_dir, True)
+        with mock.patch('tradingagents.dataflows.bar_store.get_bar_store', return_value=OHLCVBarStore(store_dir)), \
+                mock.patch('tradingagents.dataflows.tushare_adapter.get_tushare_adapter', return_value=adapter), \
+                mock.patch('tradingagents.dataflows.data_source_manager.get_rate_limiter',
+                           return_value=RateLimiter(LocalTokenBucketBackend(), {})), \
+                mock.patch('tradingagents.dataflows.market_snapshot.get_snapshot_bars', return_value=None):
+            first = manager._load_tushare_bars('000001', '2025-01-06', '2025-01-08')
+            merged = manager._load_tushare_bars('000001', '2025-01-06', '2025-01-10')
+
+        self.assertEqual(first.bars['close'].tolist(), [10.0, 10.0, 10.0])
+        self.assertEqual(merged.bars['close'].tolist(), [9.0] * 5)
+        self.assertEqual(merged.bars['close_raw'].tolist(), [10.0, 10.0, 10.0, 9.0, 9.0])
+        print("  ✅ 跨除权日分段缓存测试通过")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
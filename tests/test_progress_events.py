@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分析进度事件流测试
+验证进度跟踪器只追加变化字段、读取方按序号增量合并状态以及Redis Stream存储
+"""
+
+import json
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from web.utils import progress_events
+from web.utils import async_progress_tracker
+from web.utils.progress_events import (
+    FileProgressEventLog, RedisProgressEventLog, ProgressStateCache, apply_progress_events,
+)
+
+
+class _FakePipeline:
+    """模拟 redis pipeline，按顺序执行缓存的命令"""
+
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+        return queue
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class _FakeRedis:
+    """模拟进度事件用到的 Stream / 有序集合命令"""
+
+    def __init__(self):
+        self.streams = {}
+        self.zsets = {}
+        self.expires = {}
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+    def xadd(self, key, fields, id):
+        self.streams.setdefault(key, []).append((id, dict(fields)))
+        return id
+
+    def xrange(self, key, min='-', max='+'):
+        start = int(min.split('-')[0]) if min != '-' else 0
+        return [(entry_id, fields) for entry_id, fields in self.streams.get(key, [])
+                if int(entry_id.split('-')[0]) >= start]
+
+    def expire(self, key, ttl):
+        self.expires[key] = ttl
+
+    def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    def zremrangebyscore(self, key, low, high):
+        zset = self.zsets.get(key, {})
+        for member in [m for m, score in zset.items() if low <= score <= high]:
+            del zset[member]
+
+    def zrevrange(self, key, start, end):
+        ranked = sorted(self.zsets.get(key, {}).items(), key=lambda item: item[1], reverse=True)
+        return [member for member, _ in ranked[start:end + 1]]
+
+
+class TestProgressEvents(unittest.TestCase):
+    """分析进度事件流测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="ta_progress_events_"))
+        self.file_log = FileProgressEventLog(str(self.temp_dir))
+        self.patches = [
+            mock.patch.object(progress_events, 'file_event_log', self.file_log),
+            mock.patch.object(async_progress_tracker, 'file_event_log', self.file_log),
+            mock.patch.object(progress_events, 'progress_state_cache', ProgressStateCache()),
+            mock.patch.object(async_progress_tracker, 'progress_state_cache', ProgressStateCache()),
+            mock.patch.dict(os.environ, {'REDIS_ENABLED': 'false'}),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        """测试后清理"""
+        for patch in reversed(self.patches):
+            patch.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _new_tracker(self, analysis_id):
+        with mock.patch('web.utils.progress_log_handler.register_analysis_tracker'):
+            return async_progress_tracker.AsyncProgressTracker(analysis_id, ['market'], 1, 'dashscope')
+
+    def test_tracker_appends_only_changed_fields(self):
+        """测试首个事件包含完整状态，后续事件只包含变化字段"""
+        print("\n🧪 测试增量事件写入...")
+        tracker = self._new_tracker('a1')
+        tracker.update_progress("📊 [模块开始] market_analyst")
+        tracker.mark_completed("✅ 分析完成", results={'decision': 'BUY'})
+
+        lines = self.file_log.path('a1').read_text(encoding='utf-8').splitlines()
+        events = [json.loads(line) for line in lines]
+        self.assertEqual([e['seq'] for e in events], list(range(1, len(events) + 1)))
+        self.assertEqual(events[0]['type'], 'init')
+        self.assertIn('steps', events[0]['data'])
+        for event in events[1:]:
+            self.assertEqual(event['type'], 'update')
+            self.assertNotIn('steps', event['data'])
+            self.assertNotIn('analysis_id', event['data'])
+        self.assertEqual(events[-1]['data']['raw_results'], {'decision': 'BUY'})
+
+        state = async_progress_tracker.get_progress_by_id('a1')
+        self.assertEqual(state['status'], 'completed')
+        self.assertEqual(state['progress_percentage'], 100.0)
+        self.assertEqual(len(state['steps']), tracker.progress_data['total_steps'])
+        self.assertEqual(state['seq'], len(events))
+        print("  ✅ 增量事件写入测试通过")
+
+    def test_incremental_file_reads(self):
+        """测试读取方从上次偏移处继续，忽略未写完的行"""
+        print("\n🧪 测试文件增量读取...")
+        self.file_log.append('a2', {'seq': 1, 'type': 'init', 'data': {'status': 'running', 'n': 1}})
+        first = self.file_log.read_since('a2', 0)
+        self.assertEqual(len(first), 1)
+
+        self.file_log.append('a2', {'seq': 2, 'type': 'update', 'data': {'n': 2}})
+        with open(self.file_log.path('a2'), 'a', encoding='utf-8') as f:
+            f.write('{"seq": 3, "type": "upd')
+        second = self.file_log.read_since('a2', 1)
+        self.assertEqual([e['seq'] for e in second], [2])
+
+        # 其他读取方从头读取
+        self.assertEqual(len(self.file_log.read_since('a2', 0)), 2)
+        state = apply_progress_events(None, first + second)
+        self.assertEqual(state, {'status': 'running', 'n': 2, 'seq': 2})
+
+        self.assertEqual(async_progress_tracker.get_latest_analysis_id(), 'a2')
+        print("  ✅ 文件增量读取测试通过")
+
+    def test_redis_stream_backend(self):
+        """测试Redis Stream存储的写入、增量读取和最新分析查找"""
+        print("\n🧪 测试Redis Stream存储...")
+        client = _FakeRedis()
+        with mock.patch.object(progress_events, '_redis_client', client), \
+             mock.patch.dict(os.environ, {'REDIS_ENABLED': 'true'}):
+            tracker = self._new_tracker('r1')
+            self.assertTrue(tracker.use_redis)
+            tracker.update_progress("📊 [模块开始] market_analyst")
+
+            stream = client.streams['progress_events:r1']
+            self.assertEqual([entry_id for entry_id, _ in stream], ['1-0', '2-0'])
+            self.assertEqual(client.expires['progress_events:r1'], 3600)
+
+            log = RedisProgressEventLog(client)
+            self.assertEqual([e['seq'] for e in log.read_since('r1', 1)], [2])
+            self.assertEqual(async_progress_tracker.get_latest_analysis_id(), 'r1')
+            state = async_progress_tracker.get_progress_by_id('r1')
+            self.assertEqual(state['last_message'], "📊 [模块开始] market_analyst")
+            self.assertFalse(self.file_log.path('r1').exists())
+        print("  ✅ Redis Stream存储测试通过")
+
+    def test_redis_failover_continues_sequence(self):
+        """测试Redis写入失败切换到文件后序号继续递增，读取方不会停在旧序号"""
+        print("\n🧪 测试Redis故障切换...")
+        client = _FakeRedis()
+        with mock.patch.object(progress_events, '_redis_client', client), \
+             mock.patch.dict(os.environ, {'REDIS_ENABLED': 'true'}):
+            tracker = self._new_tracker('f1')
+            tracker.update_progress("📊 [模块开始] market_analyst")
+            cache = ProgressStateCache()
+            self.assertEqual(cache.get('f1')['seq'], 2)
+
+            with mock.patch.object(client, 'xadd', side_effect=ConnectionError("redis down")):
+                tracker.update_progress("📊 [模块完成] market_analyst")
+            self.assertFalse(tracker.use_redis)
+
+            events = self.file_log.read_since('f1', 0)
+            self.assertEqual([(e['seq'], e['type']) for e in events], [(3, 'init')])
+            self.assertIn('steps', events[0]['data'])
+            tracker.mark_completed("✅ 分析完成")
+
+            state = cache.get('f1')
+            self.assertEqual(state['status'], 'completed')
+            self.assertGreater(state['seq'], 3)
+        print("  ✅ Redis故障切换测试通过")
+
+    def test_expired_progress_files_removed(self):
+        """测试过期分析的事件文件和旧版本快照文件一起删除"""
+        print("\n🧪 测试过期进度文件清理...")
+        self.file_log.append('old', {'seq': 1, 'type': 'init', 'data': {'status': 'completed'}})
+        (self.temp_dir / 'progress_old.json').write_text('{}', encoding='utf-8')
+        self.file_log.append('new', {'seq': 1, 'type': 'init', 'data': {'status': 'running'}})
+        expired = self.file_log.ttl + 60
+        for name in ('progress_old.events.jsonl', 'progress_old.json'):
+            path = self.temp_dir / name
+            os.utime(path, (path.stat().st_atime - expired, path.stat().st_mtime - expired))
+
+        self.assertEqual(async_progress_tracker.get_latest_analysis_id(), 'new')
+        self.assertEqual(sorted(p.name for p in self.temp_dir.iterdir()), ['progress_new.events.jsonl'])
+        self.assertEqual(self.file_log.cleanup_expired(), 0)
+        print("  ✅ 过期进度文件清理测试通过")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+提示词token预算测试
+验证按提供商选择分词器、按token截断，以及超出预算时按优先级压缩提示词各部分
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+REPORT = "贵州茅台(600519)技术面分析：RSI=65.2，MACD金叉，成交量放大。"
+
+
+class TestPromptBudget(unittest.TestCase):
+    """提示词token预算测试类"""
+
+    def test_token_counter_truncates_precisely(self):
+        """测试token计数与截断：截断结果不超过指定token数并保留指定位置"""
+        print("\n🧪 测试token计数与截断...")
+        from tradingagents.llm_adapters.token_counter import TokenCounter, get_token_counter
+
+        text = REPORT * 100
+        for counter in (get_token_counter("dashscope", "qwen-plus"), TokenCounter("heuristic")):
+            total = counter.count(text)
+            self.assertGreater(total, 100)
+            head = counter.truncate(text, 60, keep="head", marker="…")
+            tail = counter.truncate(text, 60, keep="tail", marker="…")
+            self.assertLessEqual(counter.count(head), 60)
+            self.assertLessEqual(counter.count(tail), 60)
+            self.assertTrue(head.startswith("贵州茅台") and head.endswith("…"))
+            self.assertTrue(tail.startswith("…") and tail.endswith("成交量放大。"))
+            self.assertEqual(counter.truncate(REPORT, 60), REPORT)
+        print("  ✅ token计数与截断测试通过")
+
+    def test_budget_compacts_lowest_priority_first(self):
+        """测试超出预算时先压缩辩论历史到预留量，不压缩固定部分"""
+        print("\n🧪 测试提示词预算压缩顺序...")
+        from tradingagents.agents.utils.prompt_budget import (
+            PromptBudget, history_section, memory_section, pinned_section, report_sections,
+        )
+        from tradingagents.llm_adapters.token_counter import TokenCounter
+
+        counter = TokenCounter("heuristic")
+        state = {field: REPORT * 20 for field in ("market_report", "sentiment_report", "news_report", "fundamentals_report")}
+        history = "".join(f"Bull Analyst: 第{i}轮看涨论点。\nBear Analyst: 第{i}轮看跌论点。\n" for i in range(300))
+        sections = report_sections(state) + [history_section(history), memory_section("过去的经验：避免追高。"),
+                                             pinned_section("current_response", "Bear Analyst: 估值过高。")]
+
+        reports_total = sum(counter.count(state[field]) for field in state)
+        budget = PromptBudget(reports_total * 2, counter)
+        fitted = budget.fit(sections)
+
+        self.assertLessEqual(sum(counter.count(text) for text in fitted.values()), budget.max_tokens)
+        for field in state:
+            self.assertEqual(fitted[field], state[field])
+        self.assertEqual(fitted["memories"], "过去的经验：避免追高。")
+        self.assertEqual(fitted["current_response"], "Bear Analyst: 估值过高。")
+        self.assertLess(counter.count(fitted["history"]), counter.count(history))
+        self.assertTrue(fitted["history"].endswith("第299轮看跌论点。\n"))
+
+        # 预算足够时原样返回
+        self.assertEqual(PromptBudget(10 ** 6, counter).fit(sections)["history"], history)
+        print("  ✅ 提示词预算压缩顺序测试通过")
+
+    def test_reports_shrink_proportionally_after_history(self):
+        """测试预算很紧时分析报告等比例压缩，并按环境变量读取预算"""
+        print("\n🧪 测试分析报告等比例压缩...")
+        from tradingagents.agents.utils.prompt_budget import fit_prompt_sections, history_section, report_sections
+
+        state = {"market_report": REPORT * 80, "sentiment_report": REPORT * 20,
+                 "news_report": REPORT * 20, "fundamentals_report": REPORT * 20}
+        llm = mock.Mock(spec=[], model_name="qwen-plus", provider_name="dashscope")
+        with mock.patch.dict(os.environ, {"TRADINGAGENTS_PROMPT_TOKEN_BUDGET": "1000"}):
+            fitted = fit_prompt_sections(llm, report_sections(state) + [history_section("Bull Analyst: 看涨。" * 200)])
+
+        from tradingagents.llm_adapters.token_counter import get_token_counter
+        counter = get_token_counter("dashscope", "qwen-plus")
+        counts = {name: counter.count(text) for name, text in fitted.items()}
+        self.assertLessEqual(sum(counts.values()), 1000)
+        # 辩论历史先压缩到预留量（25%）
+        self.assertLessEqual(counts["history"], 250)
+        self.assertGreater(counts["market_report"], counts["news_report"])
+        self.assertIn("内容过长", fitted["market_report"])
+
+        with mock.patch.dict(os.environ, {"TRADINGAGENTS_PROMPT_TOKEN_BUDGET": "0"}):
+            self.assertEqual(fit_prompt_sections(llm, report_sections(state))["market_report"], REPORT * 80)
+        print("  ✅ 分析报告等比例压缩测试通过")
+
+    def test_qianfan_truncates_oldest_message_content(self):
+        """测试千帆输入超长时截断最早消息的内容而不是整条丢弃"""
+        print("\n🧪 测试千帆消息截断...")
+        from tradingagents.llm_adapters.openai_compatible_base import ChatQianfanOpenAI
+
+        llm = ChatQianfanOpenAI(model="ernie-3.5-8k", api_key="bce-v3/ALTAK-test/test")
+        system = SystemMessage(content="你是股票分析师。" + REPORT * 200)
+        question = HumanMessage(content="请给出投资建议。")
+        truncated = llm._truncate_messages([system, question], max_tokens=500)
+
+        self.assertEqual(len(truncated), 2)
+        self.assertIs(truncated[1], question)
+        self.assertTrue(truncated[0].content.startswith("你是股票分析师。"))
+        self.assertTrue(truncated[0].content.endswith("...(内容已截断)"))
+        self.assertNotEqual(system.content, truncated[0].content)
+        self.assertLessEqual(sum(llm._estimate_tokens(m.content) for m in truncated), 500)
+        print("  ✅ 千帆消息截断测试通过")
+
+    def test_qianfan_truncates_streaming_and_async_calls(self):
+        """测试千帆流式和异步调用同样截断超长输入"""
+        print("\n🧪 测试千帆流式/异步截断...")
+        import asyncio
+        from langchain_core.messages import AIMessage, AIMessageChunk
+        from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+        from langchain_openai import ChatOpenAI
+        from tradingagents.llm_adapters.openai_compatible_base import ChatQianfanOpenAI
+
+        sent = []
+
+        def stream(messages, *args, **kwargs):
+            sent.append(messages)
+            yield ChatGenerationChunk(message=AIMessageChunk(content="持有"))
+
+        async def agenerate(messages, *args, **kwargs):
+            sent.append(messages)
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content="持有"))])
+
+        llm = ChatQianfanOpenAI(model="ernie-3.5-8k", api_key="bce-v3/ALTAK-test/test")
+        prompt = [HumanMessage(content="分析" * 40000)]
+        with mock.patch.dict(os.environ, {'TRADINGAGENTS_LLM_CACHE_MODE': 'off'}), \
+                mock.patch.object(ChatOpenAI, '_stream', side_effect=stream), \
+                mock.patch.object(ChatOpenAI, '_agenerate', side_effect=agenerate):
+            self.assertEqual("".join(chunk.content for chunk in llm.stream(prompt)), "持有")
+            self.assertEqual(asyncio.run(llm.ainvoke(prompt)).content, "持有")
+
+        self.assertEqual(len(sent), 2)
+        for messages in sent:
+            self.assertLessEqual(llm._estimate_tokens(messages[0].content), 4500)
+        print("  ✅ 千帆流式/异步截断测试通过")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
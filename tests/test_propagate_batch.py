@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量分析测试
+验证批量数据预取、有界并发、按完成顺序返回结果以及单只股票失败不影响其他股票
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows import prefetch
+from tradingagents.graph import trading_graph
+from tradingagents.graph.propagation import Propagator
+from tradingagents.graph.trading_graph import TradingAgentsGraph
+
+
+class _FakeGraph:
+    """记录并发数的桩图"""
+
+    def __init__(self, delay: float, failing: set):
+        self.delay = delay
+        self.failing = failing
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def invoke(self, state, **kwargs):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay)
+            ticker = state["company_of_interest"]
+            if ticker in self.failing:
+                raise RuntimeError(f"{ticker} failed")
+            return _final_state(ticker, state["trade_date"])
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def _final_state(ticker: str, trade_date: str) -> dict:
+    debate = {"bull_history": "", "bear_history": "", "history": "",
+              "current_response": "", "judge_decision": ""}
+    risk = {"risky_history": "", "safe_history": "", "neutral_history": "",
+            "history": "", "judge_decision": ""}
+    return {
+        "company_of_interest": ticker, "trade_date": trade_date,
+        "market_report": "", "sentiment_report": "", "news_report": "", "fundamentals_report": "",
+        "investment_debate_state": debate, "trader_investment_plan": "",
+        "risk_debate_state": risk, "investment_plan": "",
+        "final_trade_decision": f"BUY {ticker}",
+    }
+
+
+class _FakeSignalProcessor:
+    def process_signal(self, full_signal, stock_symbol=None):
+        return {"action": full_signal.split()[0], "symbol": stock_symbol}
+
+
+class TestPropagateBatch(unittest.TestCase):
+    """批量分析测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.work_dir = tempfile.mkdtemp(prefix="ta_batch_")
+        self.old_cwd = os.getcwd()
+        os.chdir(self.work_dir)
+
+    def tearDown(self):
+        """测试后清理"""
+        os.chdir(self.old_cwd)
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def _make_graph(self, fake_graph: _FakeGraph) -> TradingAgentsGraph:
+        graph = TradingAgentsGraph.__new__(TradingAgentsGraph)
+        graph.debug = False
+        graph.config = {"batch_max_workers": 3}
+        graph.graph = fake_graph
+        graph.propagator = Propagator()
+        graph.signal_processor = _FakeSignalProcessor()
+        graph.curr_state = None
+        graph.ticker = None
+        graph.log_states_dict = {}
+        graph._log_states_by_ticker = {}
+        graph._state_lock = threading.Lock()
+        return graph
+
+    def test_batch_bounded_and_isolated(self):
+        """测试批量分析的并发上限与失败隔离"""
+        print("\n🧪 测试批量分析...")
+        tickers = ["AAPL", "MSFT", "BAD", "000001", "0700.HK", "NVDA"]
+        fake_graph = _FakeGraph(delay=0.2, failing={"BAD"})
+        graph = self._make_graph(fake_graph)
+
+        with mock.patch.object(trading_graph, "prefetch_stock_data") as prefetch_mock:
+            start = time.monotonic()
+            results = list(graph.propagate_batch([(t, "2024-05-10") for t in tickers]))
+            elapsed = time.monotonic() - start
+
+        prefetch_mock.assert_called_once()
+        self.assertEqual(len(prefetch_mock.call_args[0][0]), len(tickers))
+        self.assertEqual(sorted(r["ticker"] for r in results), sorted(tickers))
+        self.assertEqual(fake_graph.peak, 3)
+        self.assertLess(elapsed, 0.2 * len(tickers))
+
+        by_ticker = {r["ticker"]: r for r in results}
+        self.assertIn("BAD failed", by_ticker["BAD"]["error"])
+        self.assertIsNone(by_ticker["BAD"]["decision"])
+        self.assertEqual(by_ticker["AAPL"]["decision"], {"action": "BUY", "symbol": "AAPL"})
+        self.assertTrue(os.path.exists("eval_results/MSFT/TradingAgentsStrategy_logs/full_states_log.json"))
+        self.assertEqual(list(graph._log_states_by_ticker["NVDA"].keys()), ["2024-05-10"])
+        print(f"  ✅ 批量分析测试通过 ({elapsed:.2f}s)")
+
+    def test_results_stream_in_completion_order(self):
+        """测试结果按完成顺序逐个返回"""
+        print("\n🧪 测试结果流式返回...")
+        graph = self._make_graph(_FakeGraph(delay=0.0, failing=set()))
+        delays = {"SLOW": 0.4, "FAST": 0.05}
+        original_run = graph._run_graph
+
+        def run_graph(company_name, trade_date):
+            time.sleep(delays[company_name])
+            return original_run(company_name, trade_date)
+
+        with mock.patch.object(graph, "_run_graph", side_effect=run_graph):
+            stream = graph.propagate_batch([("SLOW", "2024-05-10"), ("FAST", "2024-05-10")],
+                                           max_workers=2, prefetch=False)
+            first = next(stream)
+            self.assertEqual(first["ticker"], "FAST")
+            self.assertEqual(next(stream)["ticker"], "SLOW")
+        print("  ✅ 结果流式返回测试通过")
+
+    def test_web_runner_leases_graph_per_run(self):
+        """测试Web分析任务独占借出的图实例，归还后复用，空闲实例数量有上限"""
+        print("\n🧪 测试Web交易图复用...")
+        from web.utils import analysis_runner
+
+        with mock.patch.object(trading_graph, "TradingAgentsGraph",
+                               side_effect=lambda *args, **kwargs: object()), \
+                mock.patch.object(analysis_runner, "_graph_cache", analysis_runner.OrderedDict()), \
+                mock.patch.object(analysis_runner, "GRAPH_CACHE_MAX_SIZE", 2):
+            config = {"llm_provider": "dashscope"}
+            with analysis_runner.lease_trading_graph(["market"], config) as first, \
+                    analysis_runner.lease_trading_graph(["market"], config) as second:
+                # 并发的相同配置不共享实例
+                self.assertIsNot(first, second)
+            with analysis_runner.lease_trading_graph(["market"], config) as reused:
+                self.assertIn(reused, (first, second))
+
+            with analysis_runner.lease_trading_graph(["news"], config):
+                pass
+            idle = analysis_runner._graph_cache
+            self.assertEqual(sum(len(graphs) for graphs in idle.values()), 2)
+            self.assertEqual(list(idle), [(("market",), analysis_runner.json.dumps(config, sort_keys=True)),
+                                          (("news",), analysis_runner.json.dumps(config, sort_keys=True))])
+        print("  ✅ Web交易图复用测试通过")
+
+
+class TestPrefetchStockData(unittest.TestCase):
+    """批量数据预取测试类"""
+
+    def test_prefetch_concurrent_and_isolated(self):
+        """测试预取任务并发执行且单个失败不影响其他任务"""
+        print("\n🧪 测试批量预取...")
+
+        def tasks(ticker, trade_date, price_lookback_days):
+            def fail():
+                raise ConnectionError("timeout")
+            return {
+                'price': lambda: time.sleep(0.2),
+                'news': fail if ticker == "BAD" else (lambda: time.sleep(0.2)),
+            }
+
+        with mock.patch.object(prefetch, "build_prefetch_tasks", side_effect=tasks):
+            start = time.monotonic()
+            report = prefetch.prefetch_stock_data(
+                [("AAPL", "2024-05-10"), ("BAD", "2024-05-10"), ("AAPL", "2024-05-10")], max_workers=4)
+            elapsed = time.monotonic() - start
+
+        self.assertEqual(set(report), {("AAPL", "2024-05-10"), ("BAD", "2024-05-10")})
+        self.assertEqual(report[("AAPL", "2024-05-10")], {'price': 'ok', 'news': 'ok'})
+        self.assertEqual(report[("BAD", "2024-05-10")]['news'], 'timeout')
+        self.assertLess(elapsed, 0.35)
+        print(f"  ✅ 批量预取测试通过 ({elapsed:.2f}s)")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+上游API令牌桶限流测试
+验证突发容量与补充速率、跨连接（跨进程）共享令牌桶、不阻塞获取以及数据源管理器的限流接入
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows import rate_limiter
+from tradingagents.dataflows.rate_limiter import (
+    RateLimiter, RateLimitRule, RateLimitExceeded, LocalTokenBucketBackend,
+    SQLiteTokenBucketBackend, load_rate_limit_rules,
+)
+
+
+class TestRateLimiter(unittest.TestCase):
+    """令牌桶限流测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="ta_rate_limiter_"))
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_burst_and_refill(self):
+        """测试突发容量用完后拒绝，按速率补充，未配置的API不限流"""
+        print("\n🧪 测试突发与补充...")
+        limiter = RateLimiter(LocalTokenBucketBackend(), {'tushare': RateLimitRule(rate=20.0, burst=3)})
+        self.assertEqual([limiter.try_acquire('tushare') for _ in range(4)], [True, True, True, False])
+        time.sleep(0.06)
+        self.assertTrue(limiter.try_acquire('tushare'))
+        self.assertTrue(all(limiter.try_acquire('akshare') for _ in range(100)))
+
+        started = time.time()
+        self.assertTrue(limiter.acquire('tushare'))
+        self.assertLess(time.time() - started, 0.2)
+        self.assertFalse(limiter.acquire('tushare', cost=3, timeout=0.01))
+        with self.assertRaises(RateLimitExceeded) as ctx:
+            limiter.check('tushare', cost=3)
+        self.assertGreater(ctx.exception.retry_after, 0)
+
+        stats = limiter.get_stats()['tushare']
+        self.assertEqual(stats['acquired'], 5)
+        self.assertGreaterEqual(stats['rejected'], 2)
+        print("  ✅ 突发与补充测试通过")
+
+    def test_unsatisfiable_acquire_fails_fast(self):
+        """测试永远拿不到令牌的请求立即报错，而不是无限等待"""
+        print("\n🧪 测试无法满足的令牌请求...")
+        limiter = RateLimiter(LocalTokenBucketBackend(), {'tushare': RateLimitRule(rate=0.0, burst=2)})
+        self.assertTrue(limiter.acquire('tushare', cost=2))
+
+        started = time.time()
+        with self.assertRaises(RateLimitExceeded) as ctx:
+            limiter.acquire('tushare')
+        self.assertEqual(ctx.exception.retry_after, float('inf'))
+        with self.assertRaises(ValueError):
+            limiter.acquire('tushare', cost=3, timeout=10)
+        with self.assertRaises(ValueError):
+            limiter.try_acquire('tushare', cost=3)
+        self.assertLess(time.time() - started, 0.1)
+        print("  ✅ 无法满足的令牌请求测试通过")
+
+    def test_sqlite_backend_shared_between_connections(self):
+        """测试多个SQLite连接（模拟多个进程）共享同一个令牌桶"""
+        print("\n🧪 测试跨进程共享令牌桶...")
+        db_path = self.temp_dir / "rate_limits.sqlite3"
+        rules = {'finnhub': RateLimitRule(rate=0.001, burst=5)}
+        limiters = [RateLimiter(SQLiteTokenBucketBackend(db_path), rules) for _ in range(4)]
+
+        results = []
+        lock = threading.Lock()
+
+        def worker(limiter):
+            for _ in range(5):
+                ok = limiter.try_acquire('finnhub')
+                with lock:
+                    results.append(ok)
+
+        threads = [threading.Thread(target=worker, args=(limiter,)) for limiter in limiters]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sum(results), 5)
+        self.assertEqual(len(results), 20)
+
+        # 重新打开的后端看到相同的状态
+        reopened = RateLimiter(SQLiteTokenBucketBackend(db_path), rules)
+        self.assertFalse(reopened.try_acquire('finnhub'))
+        print("  ✅ 跨进程共享令牌桶测试通过")
+
+    def test_rules_from_environment(self):
+        """测试环境变量覆盖限流规则"""
+        print("\n🧪 测试限流配置...")
+        with mock.patch.dict(os.environ, {'RATE_LIMIT_TUSHARE': '5:10', 'RATE_LIMIT_BAOSTOCK': '3',
+                                          'RATE_LIMIT_FINNHUB': 'bad', 'RATE_LIMIT_YFINANCE': '1:0.5',
+                                          'RATE_LIMIT_BACKEND': 'memory'}):
+            rules = load_rate_limit_rules()
+        self.assertEqual(rules['tushare'], RateLimitRule(rate=5.0, burst=10.0))
+        self.assertEqual(rules['baostock'], RateLimitRule(rate=3.0, burst=3.0))
+        self.assertEqual(rules['finnhub'], rate_limiter.DEFAULT_RATE_LIMITS['finnhub'])
+        self.assertEqual(rules['yfinance'], rate_limiter.DEFAULT_RATE_LIMITS['yfinance'])
+        self.assertNotIn('backend', rules)
+        print("  ✅ 限流配置测试通过")
+
+    def test_data_source_manager_raises_instead_of_sleeping(self):
+        """测试数据源令牌不足时立即抛出 RateLimitExceeded，缓存命中不消耗令牌"""
+        print("\n🧪 测试数据源管理器限流接入...")
+        from tradingagents.dataflows.data_source_manager import DataSourceManager, ChinaDataSource
+
+        limiter = RateLimiter(LocalTokenBucketBackend(), {'tushare': RateLimitRule(rate=0.001, burst=1)})
+        manager = DataSourceManager.__new__(DataSourceManager)
+        calls = []
+
+        def fetcher(symbol, start_date, end_date):
+            calls.append(symbol)
+            return None
+
+        with mock.patch('tradingagents.dataflows.data_source_manager.get_rate_limiter', return_value=limiter):
+            manager._get_cached_bars(ChinaDataSource.TUSHARE, '000001', None, None, fetcher)
+            started = time.time()
+            with self.assertRaises(RateLimitExceeded):
+                manager._get_cached_bars(ChinaDataSource.TUSHARE, '000001', None, None, fetcher)
+            self.assertLess(time.time() - started, 0.5)
+            # 未配置规则的数据源不受影响
+            manager._get_cached_bars(ChinaDataSource.AKSHARE, '000001', None, None, fetcher)
+        self.assertEqual(calls, ['000001', '000001'])
+        print("  ✅ 数据源管理器限流接入测试通过")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
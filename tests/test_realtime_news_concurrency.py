@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+实时新闻并发获取测试
+验证并发获取、全局截止时间、单源超时以及慢速/失败新闻源的自动降级
+"""
+
+import os
+import sys
+import time
+import unittest
+from datetime import datetime
+from unittest import mock
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows.realtime_news_utils import (
+    NewsItem,
+    RealtimeNewsAggregator,
+    get_news_source_health,
+)
+
+
+def _news(source: str, title: str) -> NewsItem:
+    return NewsItem(title=title, content="", source=source, publish_time=datetime.now(),
+                    url="", urgency="low", relevance_score=0.5)
+
+
+def _slow_source(source: str, delay: float):
+    def fetcher(ticker, hours_back):
+        time.sleep(delay)
+        return [_news(source, f"{source} headline for {ticker}")]
+    return fetcher
+
+
+class TestRealtimeNewsConcurrency(unittest.TestCase):
+    """实时新闻并发获取测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        get_news_source_health().reset()
+
+    def tearDown(self):
+        """测试后清理"""
+        get_news_source_health().reset()
+
+    def _make_aggregator(self, **kwargs) -> RealtimeNewsAggregator:
+        aggregator = RealtimeNewsAggregator(**kwargs)
+        aggregator.finnhub_key = "test"
+        aggregator.alpha_vantage_key = "test"
+        aggregator.newsapi_key = "test"
+        return aggregator
+
+    def test_sources_fetched_concurrently(self):
+        """测试各新闻源并发获取"""
+        print("\n🧪 测试并发获取...")
+        aggregator = self._make_aggregator()
+        with mock.patch.object(aggregator, '_get_finnhub_realtime_news', _slow_source('FinnHub', 0.3)), \
+             mock.patch.object(aggregator, '_get_alpha_vantage_news', _slow_source('Alpha Vantage', 0.3)), \
+             mock.patch.object(aggregator, '_get_newsapi_news', _slow_source('NewsAPI', 0.3)), \
+             mock.patch.object(aggregator, '_get_chinese_finance_news', _slow_source('东方财富', 0.3)):
+            start = time.monotonic()
+            news = aggregator.get_realtime_stock_news("AAPL", hours_back=6, max_news=10)
+            elapsed = time.monotonic() - start
+
+        self.assertEqual(len(news), 4)
+        self.assertLess(elapsed, 0.9)
+        stats = get_news_source_health().get_stats()
+        self.assertEqual(stats['FinnHub']['successes'], 1)
+        self.assertIsNotNone(stats['中文财经']['avg_latency'])
+        print(f"  ✅ 并发获取测试通过 ({elapsed:.2f}s)")
+
+    def test_deadline_returns_finished_sources(self):
+        """测试全局截止时间到期后返回已完成的新闻源"""
+        print("\n🧪 测试截止时间...")
+        aggregator = self._make_aggregator(deadline_seconds=0.5)
+        with mock.patch.object(aggregator, '_get_finnhub_realtime_news', _slow_source('FinnHub', 0.05)), \
+             mock.patch.object(aggregator, '_get_alpha_vantage_news', _slow_source('Alpha Vantage', 1.0)), \
+             mock.patch.object(aggregator, '_get_newsapi_news', _slow_source('NewsAPI', 0.05)), \
+             mock.patch.object(aggregator, '_get_chinese_finance_news', lambda t, h: []):
+            start = time.monotonic()
+            news = aggregator.get_realtime_stock_news("AAPL")
+            elapsed = time.monotonic() - start
+
+        self.assertEqual(sorted(item.source for item in news), ['FinnHub', 'NewsAPI'])
+        self.assertLess(elapsed, 0.9)
+        self.assertEqual(get_news_source_health().get_stats()['Alpha Vantage']['timeouts'], 1)
+        print("  ✅ 截止时间测试通过")
+
+    def test_per_source_timeout(self):
+        """测试单源超时早于全局截止时间"""
+        print("\n🧪 测试单源超时...")
+        aggregator = self._make_aggregator(deadline_seconds=5.0, source_timeouts={'NewsAPI': 0.2})
+        with mock.patch.object(aggregator, '_get_finnhub_realtime_news', _slow_source('FinnHub', 0.4)), \
+             mock.patch.object(aggregator, '_get_alpha_vantage_news', lambda t, h: []), \
+             mock.patch.object(aggregator, '_get_newsapi_news', _slow_source('NewsAPI', 0.8)), \
+             mock.patch.object(aggregator, '_get_chinese_finance_news', lambda t, h: []):
+            start = time.monotonic()
+            news = aggregator.get_realtime_stock_news("AAPL")
+            elapsed = time.monotonic() - start
+
+        self.assertEqual([item.source for item in news], ['FinnHub'])
+        self.assertLess(elapsed, 0.75)
+        print("  ✅ 单源超时测试通过")
+
+    def test_failing_source_demoted(self):
+        """测试连续失败的新闻源被降级跳过"""
+        print("\n🧪 测试新闻源降级...")
+        calls = []
+
+        def failing(ticker, hours_back):
+            calls.append(ticker)
+            raise ConnectionError("network down")
+
+        aggregator = self._make_aggregator()
+        with mock.patch.object(aggregator, '_get_finnhub_realtime_news', failing), \
+             mock.patch.object(aggregator, '_get_alpha_vantage_news', lambda t, h: []), \
+             mock.patch.object(aggregator, '_get_newsapi_news', lambda t, h: []), \
+             mock.patch.object(aggregator, '_get_chinese_finance_news', _slow_source('东方财富', 0.0)):
+            for _ in range(4):
+                news = aggregator.get_realtime_stock_news("AAPL")
+                self.assertEqual(len(news), 1)
+
+        health = get_news_source_health()
+        self.assertEqual(len(calls), 3)
+        self.assertTrue(health.is_demoted('FinnHub'))
+        self.assertEqual(health.get_stats()['FinnHub']['failures'], 3)
+        print("  ✅ 新闻源降级测试通过")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
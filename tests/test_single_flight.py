@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据获取请求合并测试
+验证并发相同请求只调用一次上游、异常共享、同线程重入以及合并比例统计
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows import single_flight
+from tradingagents.dataflows.single_flight import SingleFlight, coalesce
+
+
+class TestSingleFlight(unittest.TestCase):
+    """请求合并测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.group = SingleFlight()
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def _slow_fetch(self, symbol, start_date, end_date):
+        with self.lock:
+            self.calls.append((symbol, start_date, end_date))
+        time.sleep(0.2)
+        return f"{symbol}:{start_date}:{end_date}"
+
+    def test_concurrent_identical_requests_share_one_call(self):
+        """测试并发相同请求只调用一次上游，不同请求各自调用"""
+        print("\n🧪 测试并发请求合并...")
+        requests = [('000001', '2025-01-01', '2025-01-31')] * 8 + [('600036', '2025-01-01', '2025-01-31')] * 2
+        with ThreadPoolExecutor(max_workers=len(requests)) as executor:
+            results = list(executor.map(
+                lambda args: self.group.do('stock_data', args, self._slow_fetch, *args), requests))
+
+        self.assertEqual(results, [':'.join(args) for args in requests])
+        self.assertEqual(sorted(set(self.calls)), sorted(set(requests)))
+        self.assertEqual(len(self.calls), 2)
+
+        stats = self.group.get_stats()
+        self.assertEqual(stats['namespaces']['stock_data']['requests'], 10)
+        self.assertEqual(stats['namespaces']['stock_data']['executions'], 2)
+        self.assertEqual(stats['total']['shared'], 8)
+        self.assertEqual(stats['total']['coalescing_ratio'], 0.8)
+        self.assertEqual(self.group.in_flight(), 0)
+
+        # 调用结束后的相同请求重新调用上游
+        self.group.do('stock_data', requests[0], self._slow_fetch, *requests[0])
+        self.assertEqual(len(self.calls), 3)
+        print("  ✅ 并发请求合并测试通过")
+
+    def test_errors_are_shared_and_reentry_runs_directly(self):
+        """测试上游异常传递给所有等待者，同线程重入不死锁"""
+        print("\n🧪 测试异常共享与重入...")
+        attempts = []
+
+        def failing():
+            attempts.append(1)
+            time.sleep(0.2)
+            raise ConnectionError("rate limited")
+
+        def call():
+            try:
+                self.group.do('news', 'AAPL', failing)
+            except ConnectionError as e:
+                return str(e)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda _: call(), range(4)))
+        self.assertEqual(results, ["rate limited"] * 4)
+        self.assertEqual(len(attempts), 1)
+
+        def outer():
+            return self.group.do('reentry', 'k', lambda: 'inner') + '+outer'
+        self.assertEqual(self.group.do('reentry', 'k', outer), 'inner+outer')
+        print("  ✅ 异常共享与重入测试通过")
+
+    def test_decorator_normalizes_arguments(self):
+        """测试装饰器按签名绑定参数，位置参数和关键字参数写法共享同一请求"""
+        print("\n🧪 测试装饰器...")
+        calls = []
+
+        @coalesce('decorated_test')
+        def fetch(symbol, start_date, end_date, force_refresh=False):
+            calls.append(symbol)
+            time.sleep(0.2)
+            return symbol
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [
+                executor.submit(fetch, 'AAPL', '2025-01-01', '2025-01-31'),
+                executor.submit(fetch, 'AAPL', start_date='2025-01-01', end_date='2025-01-31'),
+                executor.submit(fetch, symbol='AAPL', start_date='2025-01-01', end_date='2025-01-31',
+                                force_refresh=False),
+            ]
+            self.assertEqual([f.result() for f in futures], ['AAPL'] * 3)
+        self.assertEqual(calls, ['AAPL'])
+        self.assertEqual(fetch.__name__, 'fetch')
+        self.assertIn('decorated_test', single_flight.get_coalescing_stats()['namespaces'])
+        print("  ✅ 装饰器测试通过")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自适应数据源路由测试
+验证滑动窗口统计、按健康度排序、熔断与半开试探、对冲请求以及数据源管理器的路由接入
+"""
+
+import os
+import sys
+import time
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows.source_router import SourceRouter, SUCCESS, EMPTY, ERROR
+
+
+def classify(result):
+    return SUCCESS if result and not result.startswith('❌') else ERROR
+
+
+class TestSourceRouter(unittest.TestCase):
+    """数据源路由测试类"""
+
+    def test_stats_and_health_ranking(self):
+        """测试p50/p95、错误率、空结果率统计，以及按健康度排序"""
+        print("\n🧪 测试健康统计与排序...")
+        router = SourceRouter(failure_threshold=100)
+        for latency in [0.1, 0.2, 0.3, 0.4, 2.0]:
+            router.record('akshare', latency, SUCCESS)
+        for outcome in [ERROR, ERROR, EMPTY, SUCCESS]:
+            router.record('tushare', 0.05, outcome)
+
+        stats = router.get_stats()['sources']
+        self.assertEqual(stats['akshare']['p50_latency'], 0.3)
+        self.assertEqual(stats['akshare']['p95_latency'], 2.0)
+        self.assertEqual(stats['akshare']['error_rate'], 0.0)
+        self.assertEqual(stats['tushare']['error_rate'], 0.5)
+        self.assertEqual(stats['tushare']['empty_rate'], 0.25)
+
+        # 快但经常失败的数据源排在慢但稳定的数据源之后；无样本的数据源按先验延迟排序，保持传入顺序
+        self.assertEqual(router.rank(['tushare', 'baostock', 'akshare', 'tdx']),
+                         ['akshare', 'baostock', 'tdx', 'tushare'])
+        print("  ✅ 健康统计与排序测试通过")
+
+    def test_circuit_breaker_and_half_open_trial(self):
+        """测试连续失败打开熔断、熔断中跳过、冷却后只放行一次试探"""
+        print("\n🧪 测试熔断器...")
+        router = SourceRouter(failure_threshold=2, cooldown_seconds=0.2)
+        calls = []
+
+        def fetch(source):
+            calls.append(source)
+            if source == 'tushare':
+                raise ConnectionError("timeout")
+            return f"{source} ok"
+
+        for _ in range(2):
+            self.assertEqual(router.execute(['tushare', 'akshare'], fetch, classify), ('akshare', 'akshare ok'))
+        self.assertEqual(router.get_stats()['sources']['tushare']['circuit'], 'open')
+        self.assertEqual(router.rank(['tushare', 'akshare']), ['akshare', 'tushare'])
+
+        calls.clear()
+        router.execute(['tushare', 'akshare'], fetch, classify)
+        self.assertEqual(calls, ['akshare'])
+
+        time.sleep(0.25)
+        self.assertTrue(router.allow('tushare'))
+        self.assertFalse(router.allow('tushare'))
+        router.record('tushare', 0.1, SUCCESS)
+        self.assertEqual(router.get_stats()['sources']['tushare']['circuit'], 'closed')
+        self.assertTrue(router.allow('tushare'))
+        print("  ✅ 熔断器测试通过")
+
+    def test_empty_results_do_not_open_circuit(self):
+        """测试空结果（停牌、无交易日）只计入空结果率，不打开熔断"""
+        print("\n🧪 测试空结果不触发熔断...")
+        router = SourceRouter(failure_threshold=3, cooldown_seconds=60)
+        for _ in range(5):
+            router.record('tushare', 0.1, EMPTY)
+
+        stats = router.get_stats()['sources']['tushare']
+        self.assertTrue(router.allow('tushare'))
+        self.assertEqual(stats['circuit'], 'closed')
+        self.assertEqual(stats['consecutive_failures'], 0)
+        self.assertEqual(stats['empty_rate'], 1.0)
+
+        # 空结果不打断连续失败计数，也不重置它
+        router.record('tushare', 0.1, ERROR)
+        router.record('tushare', 0.1, EMPTY)
+        router.record('tushare', 0.1, ERROR)
+        self.assertEqual(router.get_stats()['sources']['tushare']['consecutive_failures'], 2)
+        self.assertTrue(router.allow('tushare'))
+        print("  ✅ 空结果不触发熔断测试通过")
+
+    def test_hedged_request_to_second_best(self):
+        """测试首选数据源超过阈值时对冲请求次优数据源，并采用先返回的结果"""
+        print("\n🧪 测试对冲请求...")
+        router = SourceRouter(hedge_after_seconds=0.05)
+
+        def fetch(source):
+            time.sleep(0.5 if source == 'akshare' else 0.01)
+            return f"{source} ok"
+
+        started = time.time()
+        self.assertEqual(router.execute(['akshare', 'tushare', 'baostock'], fetch, classify),
+                         ('tushare', 'tushare ok'))
+        self.assertLess(time.time() - started, 0.4)
+        hedging = router.get_stats()['hedging']
+        self.assertEqual((hedging['hedged'], hedging['hedge_wins']), (1, 1))
+
+        # 首选数据源在阈值内返回时不对冲
+        self.assertEqual(router.execute(['tushare', 'akshare'], fetch, classify), ('tushare', 'tushare ok'))
+        self.assertEqual(router.get_stats()['hedging']['hedged'], 1)
+
+        # 慢的一方在后台完成后仍计入统计
+        time.sleep(0.6)
+        self.assertEqual(router.get_stats()['sources']['akshare']['window'], 1)
+        print("  ✅ 对冲请求测试通过")
+
+    def test_data_source_manager_routes_by_health(self):
+        """测试数据源管理器记录结果并按健康度选择备用数据源"""
+        print("\n🧪 测试数据源管理器路由接入...")
+        from tradingagents.dataflows.data_source_manager import DataSourceManager, ChinaDataSource
+        from tradingagents.dataflows.stock_data import StockBars
+
+        router = SourceRouter(failure_threshold=2, cooldown_seconds=60)
+        manager = DataSourceManager.__new__(DataSourceManager)
+        manager.current_source = ChinaDataSource.TUSHARE
+        manager.available_sources = [ChinaDataSource.TUSHARE, ChinaDataSource.AKSHARE, ChinaDataSource.BAOSTOCK]
+        responses = {
+            ChinaDataSource.TUSHARE: StockBars.failed('000001', "❌ Tushare获取000001数据失败: timeout"),
+            ChinaDataSource.AKSHARE: StockBars('000001', source='akshare'),
+            ChinaDataSource.BAOSTOCK: StockBars('000001', source='baostock',
+                                                bars=pd.DataFrame({'date': ['2025-01-02'], 'close': [10.0]})),
+        }
+        calls = []
+
+        def get_data(source, symbol, start_date, end_date):
+            calls.append(source)
+            return responses[source]
+
+        with mock.patch('tradingagents.dataflows.data_source_manager.get_source_router', return_value=router), \
+                mock.patch.object(manager, '_load_bars_from_source', side_effect=get_data):
+            self.assertIn("最新价格: ¥10.00", manager.get_stock_data('000001', '2025-01-01', '2025-01-31'))
+            self.assertEqual(calls, [ChinaDataSource.TUSHARE, ChinaDataSource.AKSHARE, ChinaDataSource.BAOSTOCK])
+
+            calls.clear()
+            manager.get_stock_data('000001', '2025-01-01', '2025-01-31')
+            # AKShare返回空结果后排在BaoStock之后
+            self.assertEqual(calls, [ChinaDataSource.TUSHARE, ChinaDataSource.BAOSTOCK])
+
+            calls.clear()
+            manager.get_stock_data('000001', '2025-01-01', '2025-01-31')
+            # Tushare已熔断，直接使用最健康的备用数据源
+            self.assertEqual(calls, [ChinaDataSource.BAOSTOCK])
+
+        stats = router.get_stats()['sources']
+        self.assertEqual(stats['tushare']['circuit'], 'open')
+        self.assertEqual(stats['akshare']['empty_rate'], 1.0)
+        self.assertEqual(stats['baostock']['window'], 3)
+        print("  ✅ 数据源管理器路由接入测试通过")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
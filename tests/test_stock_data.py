@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结构化行情数据测试
+验证StockBars兼容各数据源列名计算最新行情、只在工具边界渲染文本，
+以及基本面报告和过期缓存直接使用结构化数据
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows.stock_data import StockBars, StockInfo
+
+
+def tushare_bars() -> pd.DataFrame:
+    """Tushare格式的日线"""
+    return pd.DataFrame({
+        'trade_date': ['2025-01-06', '2025-01-07', '2025-01-08'],
+        'open': [13.8, 14.0, 14.1],
+        'high': [14.2, 14.3, 14.6],
+        'low': [13.7, 13.9, 14.0],
+        'close': [14.0, 14.0, 14.5],
+        'vol': [1000.0, 1200.0, 1500.0],
+    })
+
+
+class TestStockData(unittest.TestCase):
+    """结构化行情数据测试类"""
+
+    def test_quote_across_sources(self):
+        """测试Tushare和AKShare列名都能计算最新行情"""
+        print("\n🧪 测试最新行情计算...")
+        quote = StockBars('000001', source='tushare', bars=tushare_bars(), name='平安银行').quote()
+        self.assertEqual((quote.price, quote.prev_close, quote.volume), (14.5, 14.0, 1500.0))
+        self.assertAlmostEqual(quote.change_pct, 3.5714, places=3)
+        self.assertEqual(quote.trade_date, '2025-01-08')
+        self.assertEqual(quote.name, '平安银行')
+
+        akshare = pd.DataFrame({'日期': ['2025-01-07', '2025-01-08'], '收盘': ['10.0', '9.5'],
+                                '最高': [10.2, 10.1], '最低': [9.8, 9.4], '成交量': [300, 200]})
+        quote = StockBars('000002', source='akshare', bars=akshare).quote()
+        self.assertEqual((quote.price, quote.volume), (9.5, 200.0))
+        self.assertAlmostEqual(quote.change_pct, -5.0)
+
+        self.assertIsNone(StockBars('000003').quote())
+        print("  ✅ 最新行情计算测试通过")
+
+    def test_render_and_status(self):
+        """测试成功、空结果、错误和文本结果的状态与渲染"""
+        print("\n🧪 测试状态与渲染...")
+        result = StockBars('000001', '2025-01-06', '2025-01-08', 'tushare', tushare_bars(), name='平安银行')
+        self.assertTrue(result.ok)
+        text = result.render()
+        for expected in ("平安银行(000001) - Tushare数据", "股票名称: 平安银行", "数据条数: 3条",
+                         "最新价格: ¥14.50", "+0.50 (+3.57%)", "成交量: 3,700股", "最新3天数据:"):
+            self.assertIn(expected, text)
+
+        empty = StockBars('000001', source='akshare')
+        self.assertTrue(empty.empty)
+        self.assertFalse(empty.ok)
+        self.assertEqual(empty.render(), "❌ 未能获取000001的股票数据")
+
+        failed = StockBars.failed('000001', "❌ AKShare获取000001数据失败: timeout")
+        self.assertFalse(failed.ok or failed.empty)
+        self.assertEqual(failed.render(), "❌ AKShare获取000001数据失败: timeout")
+
+        self.assertTrue(StockBars('000001', source='tdx', text="000001 日线数据").ok)
+        self.assertFalse(StockBars('000001', source='tdx', text="❌ 通达信连接失败").ok)
+
+        info = StockInfo.from_dict('000001', {'name': '平安银行', 'industry': '银行', 'area': None})
+        self.assertTrue(info.has_name)
+        self.assertIn("所属行业: 银行", info.render())
+        self.assertIn("所属地区: 未知", info.render())
+        self.assertFalse(StockInfo.from_dict('000001', {'name': '股票000001'}).has_name)
+        print("  ✅ 状态与渲染测试通过")
+
+    def test_fundamentals_report_reads_quote(self):
+        """测试基本面报告直接读取结构化行情和股票信息，不解析文本"""
+        print("\n🧪 测试基本面报告...")
+        from tradingagents.dataflows.optimized_china_data import OptimizedChinaDataProvider
+
+        provider = OptimizedChinaDataProvider.__new__(OptimizedChinaDataProvider)
+        bars = StockBars('000001', source='tushare', bars=tushare_bars())
+        info = StockInfo(symbol='000001', name='平安银行', industry='银行')
+
+        with mock.patch('tradingagents.dataflows.interface.get_china_stock_info_record', return_value=info), \
+                mock.patch.object(provider, '_get_real_financial_metrics', return_value=None) as metrics:
+            report = provider._generate_fundamentals_report('000001', bars)
+
+        self.assertIn("**股票名称**: 平安银行", report)
+        self.assertIn("**当前股价**: ¥14.50", report)
+        self.assertIn("**涨跌幅**: +3.57%", report)
+        self.assertIn("**成交量**: 1,500", report)
+        metrics.assert_called_once_with('000001', 14.5)
+        print("  ✅ 基本面报告测试通过")
+
+    def test_stale_cache_keeps_bars(self):
+        """测试K线以DataFrame缓存，数据源失败时以过期结构化数据返回"""
+        print("\n🧪 测试过期缓存...")
+        from tradingagents.dataflows.cache_manager import StockDataCache
+        from tradingagents.dataflows.optimized_china_data import OptimizedChinaDataProvider
+
+        cache_dir = tempfile.mkdtemp(prefix="ta_stock_data_")
+        self.addCleanup(shutil.rmtree, cache_dir, True)
+        cache = StockDataCache(cache_dir)
+        self.addCleanup(cache.metadata_index.close)
+        provider = OptimizedChinaDataProvider.__new__(OptimizedChinaDataProvider)
+        provider.cache = cache
+
+        fresh = StockBars('000001', '2025-01-06', '2025-01-08', 'tushare', tushare_bars(), name='平安银行')
+        failed = StockBars.failed('000001', "❌ 所有数据源都无法获取000001的数据")
+        with mock.patch('tradingagents.dataflows.data_source_manager.get_china_stock_bars_unified',
+                        side_effect=[fresh, failed]):
+            self.assertIs(provider.get_stock_bars('000001', '2025-01-06', '2025-01-08'), fresh)
+            stale = provider.get_stock_bars('000001', '2025-01-06', '2025-01-09')
+
+        self.assertTrue(stale.stale)
+        self.assertEqual(stale.quote().price, 14.5)
+        self.assertIn("⚠️ 注意: 使用的是过期缓存数据", stale.render())
+        print("  ✅ 过期缓存测试通过")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
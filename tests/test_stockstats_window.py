@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+技术指标窗口计算测试
+验证一次性计算的指标窗口与逐日计算结果一致，以及多指标批量接口
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows import interface
+from tradingagents.dataflows.stockstats_utils import StockstatsUtils
+
+SYMBOL = "TEST"
+
+
+def _write_price_csv(data_dir: str):
+    """生成YFin格式的离线价格文件"""
+    dates = pd.bdate_range("2023-01-02", "2024-03-29")
+    rng = np.random.default_rng(42)
+    close = 100 + np.cumsum(rng.normal(0, 1, len(dates)))
+    data = pd.DataFrame({
+        'Date': dates.strftime("%Y-%m-%d"),
+        'Open': close + rng.normal(0, 0.5, len(dates)),
+        'High': close + 1.5,
+        'Low': close - 1.5,
+        'Close': close,
+        'Adj Close': close,
+        'Volume': rng.integers(1_000_000, 2_000_000, len(dates)),
+    })
+    data.to_csv(
+        os.path.join(data_dir, f"{SYMBOL}-YFin-data-2015-01-01-2025-03-25.csv"),
+        index=False,
+    )
+
+
+class TestStockstatsWindow(unittest.TestCase):
+    """技术指标窗口计算测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.root_dir = tempfile.mkdtemp(prefix="ta_stockstats_")
+        self.price_dir = os.path.join(self.root_dir, "market_data", "price_data")
+        os.makedirs(self.price_dir)
+        _write_price_csv(self.price_dir)
+        self.data_dir_patch = mock.patch.object(interface, "DATA_DIR", self.root_dir)
+        self.data_dir_patch.start()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.data_dir_patch.stop()
+        shutil.rmtree(self.root_dir, ignore_errors=True)
+
+    def test_window_matches_per_day_values(self):
+        """测试窗口结果与逐日计算一致"""
+        print("\n🧪 测试窗口与逐日结果一致...")
+        indicators = ["close_50_sma", "close_200_sma", "macd", "rsi", "boll_ub", "atr", "vwma", "mfi"]
+        window = StockstatsUtils.get_stock_stats_window(
+            SYMBOL, indicators, "2024-03-01", "2024-03-29", self.price_dir)
+
+        self.assertEqual(len(window), len(pd.bdate_range("2024-03-01", "2024-03-29")))
+        for _, row in window.iloc[::5].iterrows():
+            for indicator in indicators:
+                expected = StockstatsUtils.get_stock_stats(
+                    SYMBOL, indicator, row["Date"], self.price_dir)
+                self.assertAlmostEqual(row[indicator], expected, places=8)
+        print("  ✅ 窗口与逐日结果一致测试通过")
+
+    def test_report_format_offline(self):
+        """测试离线报告只列出交易日"""
+        print("\n🧪 测试离线报告格式...")
+        report = interface.get_stock_stats_indicators_window(SYMBOL, "rsi", "2024-03-11", 7, False)
+        lines = report.split("\n")
+
+        self.assertEqual(lines[0], "## rsi values from 2024-03-04 to 2024-03-11:")
+        day_lines = [line for line in lines if line.startswith("2024-03-")]
+        self.assertEqual([line[:10] for line in day_lines],
+                         ["2024-03-11", "2024-03-08", "2024-03-07", "2024-03-06", "2024-03-05", "2024-03-04"])
+        expected = interface.get_stockstats_indicator(SYMBOL, "rsi", "2024-03-08", False)
+        self.assertIn(f"2024-03-08: {expected}", day_lines)
+        self.assertTrue(report.endswith(interface.BEST_IND_PARAMS["rsi"]))
+        print("  ✅ 离线报告格式测试通过")
+
+    def test_batch_report(self):
+        """测试多指标批量报告"""
+        print("\n🧪 测试多指标批量报告...")
+        indicators = ["close_10_ema", "macds", "boll"]
+        batch = interface.get_stock_stats_indicators_window_batch(SYMBOL, indicators, "2024-03-11", 10, False)
+
+        for indicator in indicators:
+            single = interface.get_stock_stats_indicators_window(SYMBOL, indicator, "2024-03-11", 10, False)
+            self.assertIn(single, batch)
+
+        with self.assertRaises(ValueError):
+            interface.get_stock_stats_indicators_window_batch(SYMBOL, ["rsi", "unknown"], "2024-03-11", 10, False)
+        print("  ✅ 多指标批量报告测试通过")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+股票代码索引测试
+验证代码精确查找、前缀/子串/拼音首字母搜索、索引文件持久化以及名称解析接入
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows import symbol_index
+from tradingagents.dataflows.symbol_index import (
+    SymbolIndex, SymbolEntry, MARKET_CHINA, MARKET_HK, MARKET_US,
+)
+
+
+ENTRIES = [
+    SymbolEntry('000001', '平安银行', MARKET_CHINA, '000001.SZ'),
+    SymbolEntry('601318', '中国平安', MARKET_CHINA, '601318.SH'),
+    SymbolEntry('600036', '招商银行', MARKET_CHINA, '600036.SH'),
+    SymbolEntry('300750', '宁德时代', MARKET_CHINA, '300750.SZ'),
+    SymbolEntry('00700', '腾讯控股', MARKET_HK),
+    SymbolEntry('02318', '中国平安', MARKET_HK),
+    SymbolEntry('09999', '网易-S', MARKET_HK),
+    SymbolEntry('AAPL', 'Apple Inc', MARKET_US),
+    SymbolEntry('BRK.B', 'Berkshire Hathaway Class B', MARKET_US),
+]
+
+
+class TestSymbolIndex(unittest.TestCase):
+    """股票代码索引测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="ta_symbol_index_"))
+        self.index = SymbolIndex(self.temp_dir / "symbol_universe.idx")
+        self.index.build(ENTRIES)
+
+    def tearDown(self):
+        """测试后清理"""
+        self.index.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_exact_lookup(self):
+        """测试各种代码格式的精确查找"""
+        print("\n🧪 测试代码精确查找...")
+        self.assertEqual(self.index.get_name('000001'), '平安银行')
+        self.assertEqual(self.index.get_name('601318.SH'), '中国平安')
+        self.assertEqual(self.index.get_name('0700.HK'), '腾讯控股')
+        self.assertEqual(self.index.get_name('00700'), '腾讯控股')
+        self.assertEqual(self.index.get_name('aapl'), 'Apple Inc')
+        self.assertEqual(self.index.get('2318.HK').display_code, '2318.HK')
+        self.assertIsNone(self.index.get_name('999999'))
+        print("  ✅ 代码精确查找测试通过")
+
+    def test_prefix_and_substring_search(self):
+        """测试前缀优先于子串，且可按市场过滤"""
+        print("\n🧪 测试股票搜索...")
+        names = [e.name for e in self.index.search('平安')]
+        self.assertEqual(names[0], '平安银行')
+        self.assertEqual(sorted(names), ['中国平安', '中国平安', '平安银行'])
+        self.assertEqual([e.code for e in self.index.search('平安', market=MARKET_HK)], ['02318'])
+        self.assertEqual([e.code for e in self.index.search('银行')], ['000001', '600036'])
+        self.assertEqual([e.code for e in self.index.search('1318')], ['601318'])
+        self.assertEqual([e.code for e in self.index.search('60')], ['600036', '601318'])
+        self.assertEqual([e.code for e in self.index.search('hathaway')], ['BRK.B'])
+        self.assertEqual(self.index.search('000001.SZ')[0].name, '平安银行')
+        self.assertEqual(len(self.index.search('0', limit=2)), 2)
+        self.assertEqual(self.index.search('不存在的公司'), [])
+        print("  ✅ 股票搜索测试通过")
+
+    def test_persistence_and_refresh(self):
+        """测试索引文件重新打开以及通过数据源批量刷新"""
+        print("\n🧪 测试持久化与刷新...")
+        reopened = SymbolIndex(self.temp_dir / "symbol_universe.idx")
+        self.assertEqual(reopened.count, len(ENTRIES))
+        self.assertEqual(reopened.get_name('300750'), '宁德时代')
+        reopened.close()
+
+        def failing_loader():
+            raise ConnectionError("offline")
+
+        def china_loader():
+            return [SymbolEntry('000002', '万科A', MARKET_CHINA, '000002.SZ')]
+
+        self.assertEqual(self.index.refresh([failing_loader, china_loader]), 1)
+        self.assertEqual(self.index.get_name('000002'), '万科A')
+        self.assertIsNone(self.index.get_name('000001'))
+        self.assertEqual(self.index.refresh([failing_loader]), 0)
+        self.assertEqual(self.index.count, 1)
+        print("  ✅ 持久化与刷新测试通过")
+
+    def test_pinyin_initials(self):
+        """测试拼音首字母搜索（需要pypinyin）"""
+        print("\n🧪 测试拼音首字母搜索...")
+        if not symbol_index.PYPINYIN_AVAILABLE:
+            self.skipTest("pypinyin未安装")
+        self.assertEqual(self.index.search('payh')[0].name, '平安银行')
+        self.assertEqual(self.index.search('ndsd')[0].code, '300750')
+        print("  ✅ 拼音首字母搜索测试通过")
+
+    def test_company_name_call_sites(self):
+        """测试名称解析调用方使用全局索引"""
+        print("\n🧪 测试名称解析接入...")
+        from tradingagents.utils.news_filter import get_company_name
+        from tradingagents.dataflows.improved_hk_utils import ImprovedHKStockProvider
+
+        with mock.patch.object(symbol_index, '_symbol_index', self.index), \
+             mock.patch.dict(os.environ, {'SYMBOL_INDEX_AUTO_REFRESH': 'false'}):
+            self.assertEqual(get_company_name('300750'), '宁德时代')
+            self.assertEqual(get_company_name('999999'), '股票999999')
+            provider = ImprovedHKStockProvider()
+            provider.cache_file = str(self.temp_dir / "hk_stock_cache.json")
+            provider.cache = {}
+            self.assertEqual(provider.get_company_name('9999.HK'), '网易-S')
+        print("  ✅ 名称解析接入测试通过")
+
+    def test_tushare_search_returns_stock_details(self):
+        """测试Tushare搜索命中索引后补全行业、地区等字段，返回条数由调用方决定"""
+        print("\n🧪 测试Tushare股票搜索...")
+        import pandas as pd
+        from tradingagents.dataflows.tushare_utils import TushareProvider
+
+        stock_list = pd.DataFrame({
+            'ts_code': ['000001.SZ', '600036.SH', '601318.SH'],
+            'symbol': ['000001', '600036', '601318'],
+            'name': ['平安银行', '招商银行', '中国平安'],
+            'area': ['深圳', '深圳', '深圳'],
+            'industry': ['银行', '银行', '保险'],
+            'market': ['主板', '主板', '主板'],
+            'list_date': ['19910403', '20020409', '20070301'],
+        })
+        provider = TushareProvider(token='', enable_cache=False)
+        with mock.patch.object(symbol_index, '_symbol_index', self.index), \
+             mock.patch.dict(os.environ, {'SYMBOL_INDEX_AUTO_REFRESH': 'false'}), \
+             mock.patch.object(provider, 'get_stock_list', return_value=stock_list):
+            results = provider.search_stocks('银行')
+            self.assertEqual(list(results['ts_code']), ['000001.SZ', '600036.SH'])
+            self.assertEqual(list(results['industry']), ['银行', '银行'])
+            self.assertEqual(results.iloc[0]['list_date'], '19910403')
+            self.assertEqual(len(provider.search_stocks('0', limit=1)), 1)
+            self.assertEqual(len(provider.search_stocks('0')), 4)
+        print("  ✅ Tushare股票搜索测试通过")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
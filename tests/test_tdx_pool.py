@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+通达信连接池测试
+验证服务器按延迟排序、K线分页并行拼接、失效连接替换以及后台心跳检测
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows.tdx_pool import TdxClientPool
+
+
+class _FakeTdxApi:
+    """模拟 TdxHq_API：最近的K线在偏移量0，每页按时间升序返回"""
+
+    latency = {'10.0.0.1': 0.05, '10.0.0.2': 0.01, '10.0.0.3': 0.03}
+    unreachable = {'10.0.0.4'}
+    total_bars = 2000
+    lock = threading.Lock()
+    active = 0
+    max_active = 0
+    calls = []
+
+    def __init__(self):
+        self.server = None
+        self.broken = False
+
+    def connect(self, ip, port, time_out=None):
+        if ip in self.unreachable:
+            raise ConnectionError("unreachable")
+        time.sleep(self.latency[ip])
+        self.server = ip
+        return self
+
+    def disconnect(self):
+        self.server = None
+
+    def get_security_count(self, market):
+        if self.broken:
+            raise ConnectionError("socket closed")
+        return 100
+
+    def get_security_bars(self, category, market, code, start, count):
+        if self.broken:
+            raise ConnectionError("socket closed")
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+            cls.calls.append((start, count))
+        time.sleep(0.02)
+        with cls.lock:
+            cls.active -= 1
+        newest = cls.total_bars - 1 - start
+        oldest = max(newest - count + 1, 0)
+        return [{'datetime': i, 'close': float(i)} for i in range(oldest, newest + 1)]
+
+
+SERVERS = [{'ip': ip, 'port': 7709} for ip in ('10.0.0.1', '10.0.0.2', '10.0.0.3', '10.0.0.4')]
+
+
+class TestTdxClientPool(unittest.TestCase):
+    """通达信连接池测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        _FakeTdxApi.calls = []
+        _FakeTdxApi.active = _FakeTdxApi.max_active = 0
+        self.pool = TdxClientPool(SERVERS, size=3, api_factory=_FakeTdxApi, health_check_interval=0)
+
+    def tearDown(self):
+        """测试后清理"""
+        self.pool.close()
+
+    def test_servers_ranked_by_latency(self):
+        """测试启动时按延迟排序服务器并保持多条连接"""
+        print("\n🧪 测试服务器延迟排序...")
+        self.assertTrue(self.pool.start())
+        self.assertEqual([s['ip'] for s in self.pool.ranked_servers], ['10.0.0.2', '10.0.0.3', '10.0.0.1'])
+        self.assertEqual(self.pool.live_connections, 3)
+        self.assertTrue(self.pool.is_available())
+        print("  ✅ 服务器延迟排序测试通过")
+
+    def test_paginated_parallel_fetch(self):
+        """测试超过800条时分页并行获取并按时间拼接"""
+        print("\n🧪 测试分页获取K线...")
+        bars = self.pool.fetch_bars(9, 0, '000001', 1900)
+        self.assertEqual(len(bars), 1900)
+        self.assertEqual([bar['datetime'] for bar in bars], list(range(100, 2000)))
+        self.assertEqual(sorted(_FakeTdxApi.calls), [(0, 800), (800, 800), (1600, 300)])
+        self.assertGreater(_FakeTdxApi.max_active, 1)
+
+        # 历史数据不足时返回全部可用数据
+        self.assertEqual(len(self.pool.fetch_bars(9, 0, '000001', 5000)), 2000)
+        print("  ✅ 分页获取K线测试通过")
+
+    def test_broken_connections_are_replaced(self):
+        """测试失效连接在请求失败或心跳检测时被替换"""
+        print("\n🧪 测试失效连接替换...")
+        self.pool.start()
+        with self.pool.client() as api:
+            api.broken = True
+        self.assertEqual(self.pool.live_connections, 3)
+
+        # 心跳检测发现失效连接并重连
+        self.pool.check_health()
+        self.assertEqual(self.pool.live_connections, 3)
+        self.assertEqual(self.pool.api.get_security_count(0), 100)
+
+        # 请求中抛出异常的连接被替换，重试后成功
+        single = TdxClientPool(SERVERS, size=1, api_factory=_FakeTdxApi, health_check_interval=0)
+        with single.client() as api:
+            api.broken = True
+        bars = single.fetch_bars(9, 0, '000001', 10)
+        self.assertEqual(len(bars), 10)
+        self.assertEqual(single.live_connections, 1)
+        single.close()
+        print("  ✅ 失效连接替换测试通过")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+使用记录账本测试
+验证追加写入、后台刷盘、按 max_usage_records 压缩、索引统计以及旧版 usage.json 迁移
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from tradingagents.config.usage_ledger import UsageLedger, get_usage_ledger
+from tradingagents.config.config_manager import ConfigManager, TokenTracker
+
+
+def _record(provider="dashscope", cost=0.01, session_id="s1", days_ago=0, **extra):
+    record = {
+        "timestamp": (datetime.now() - timedelta(days=days_ago)).isoformat(),
+        "provider": provider,
+        "model_name": "qwen-turbo",
+        "input_tokens": 100,
+        "output_tokens": 50,
+        "cost": cost,
+        "session_id": session_id,
+        "analysis_type": "stock_analysis",
+    }
+    record.update(extra)
+    return record
+
+
+class TestUsageLedger(unittest.TestCase):
+    """使用记录账本测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="ta_usage_ledger_"))
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_background_flush_and_compaction(self):
+        """测试后台批量写入与记录数上限"""
+        print("\n🧪 测试后台写入与压缩...")
+        ledger = UsageLedger(self.temp_dir / "usage.db", max_records=150, flush_interval=0.05)
+        for i in range(40):
+            ledger.append(_record(cost=0.001 * i))
+
+        deadline = time.time() + 5
+        while ledger._pending and time.time() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(ledger._pending, [])
+
+        for i in range(400):
+            ledger.append(_record(session_id=f"s{i}"))
+        ledger.compact()
+        records = ledger.load_records()
+        self.assertEqual(len(records), 150)
+        self.assertEqual(records[-1]["session_id"], "s399")
+        self.assertEqual(len(ledger.load_records(limit=10)), 10)
+        ledger.close()
+        print("  ✅ 后台写入与压缩测试通过")
+
+    def test_indexed_statistics(self):
+        """测试按时间范围和会话的聚合查询"""
+        print("\n🧪 测试索引统计...")
+        ledger = UsageLedger(self.temp_dir / "usage.db")
+        ledger.append(_record("dashscope", 0.5, "a"))
+        ledger.append(_record("dashscope", 0.25, "b"))
+        ledger.append(_record("deepseek", 1.0, "a"))
+        ledger.append(_record("deepseek", 9.0, "a", days_ago=10))
+
+        stats = ledger.get_statistics(days=1)
+        self.assertEqual(stats["total_requests"], 3)
+        self.assertEqual(stats["records_count"], 3)
+        self.assertAlmostEqual(stats["total_cost"], 1.75)
+        self.assertEqual(stats["total_input_tokens"], 300)
+        self.assertEqual(stats["provider_stats"]["dashscope"]["requests"], 2)
+        self.assertEqual(ledger.get_statistics(days=30)["total_requests"], 4)
+        self.assertAlmostEqual(ledger.get_session_cost("a"), 10.5)
+        self.assertEqual(ledger.get_session_cost("missing"), 0.0)
+        self.assertEqual(len(ledger.load_records(days=1)), 3)
+        ledger.close()
+        print("  ✅ 索引统计测试通过")
+
+    def test_config_manager_migrates_legacy_json(self):
+        """测试ConfigManager迁移旧版usage.json并保持接口不变"""
+        print("\n🧪 测试旧版记录迁移...")
+        config_dir = self.temp_dir / "config"
+        config_dir.mkdir()
+        with open(config_dir / "usage.json", "w", encoding="utf-8") as f:
+            json.dump([_record(cost=0.2, session_id="old")], f)
+
+        manager = ConfigManager(str(config_dir))
+        self.assertFalse((config_dir / "usage.json").exists())
+        self.assertTrue((config_dir / "usage.json.migrated").exists())
+
+        if not (manager.mongodb_storage and manager.mongodb_storage.is_connected()):
+            manager.add_usage_record("dashscope", "qwen-turbo", 1000, 500, "old")
+            tracker = TokenTracker(manager)
+            records = manager.load_usage_records(days=7)
+            self.assertEqual([r.session_id for r in records], ["old", "old"])
+            self.assertAlmostEqual(tracker.get_session_cost("old"), 0.2 + records[1].cost)
+            self.assertEqual(manager.get_usage_statistics(1)["total_requests"], 2)
+
+        manager.save_usage_records([])
+        self.assertEqual(manager.load_usage_records(), [])
+        manager.usage_ledger.close()
+        print("  ✅ 旧版记录迁移测试通过")
+
+    def test_ledger_shared_per_path(self):
+        """测试同一路径的配置管理器共享一个账本和后台写入线程"""
+        print("\n🧪 测试账本共享...")
+        config_dir = self.temp_dir / "config"
+        first = ConfigManager(str(config_dir))
+        second = ConfigManager(str(config_dir))
+        self.assertIs(first.usage_ledger, second.usage_ledger)
+        self.assertIsNot(get_usage_ledger(self.temp_dir / "other.db"), first.usage_ledger)
+
+        # 关闭后再获取会重新创建
+        first.usage_ledger.close()
+        third = ConfigManager(str(config_dir))
+        self.assertIsNot(third.usage_ledger, first.usage_ledger)
+        third.usage_ledger.close()
+        get_usage_ledger(self.temp_dir / "other.db").close()
+        print("  ✅ 账本共享测试通过")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
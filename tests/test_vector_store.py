@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地向量索引测试
+验证余弦top-k与暴力计算一致、重启后持久化、未完成写入的恢复、近似查询召回率以及记忆库接入
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from tradingagents.agents.utils.vector_store import NumpyVectorCollection
+
+
+def _random_vectors(count: int, dimension: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((count, dimension)).astype(np.float32)
+
+
+class TestNumpyVectorCollection(unittest.TestCase):
+    """本地向量索引测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.root_dir = Path(tempfile.mkdtemp(prefix="ta_vector_store_"))
+        self.directory = self.root_dir / "bull_memory"
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.root_dir, ignore_errors=True)
+
+    def _fill(self, collection, vectors, batch=500):
+        for start in range(0, len(vectors), batch):
+            chunk = vectors[start:start + batch]
+            collection.add(
+                documents=[f"situation {start + i}" for i in range(len(chunk))],
+                metadatas=[{"recommendation": f"advice {start + i}"} for i in range(len(chunk))],
+                embeddings=chunk.tolist(),
+                ids=[f"id-{start + i}" for i in range(len(chunk))],
+            )
+
+    def test_exact_top_k_and_persistence(self):
+        """测试精确top-k与暴力计算一致，并在重新打开后保持"""
+        print("\n🧪 测试精确查询与持久化...")
+        vectors = _random_vectors(3000, 32)
+        collection = NumpyVectorCollection(self.directory)
+        self._fill(collection, vectors)
+        self.assertEqual(collection.count(), 3000)
+
+        query = _random_vectors(1, 32, seed=1)[0]
+        normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:5]
+
+        result = collection.query(query_embeddings=[query.tolist()], n_results=5)
+        self.assertEqual(result['ids'][0], [f"id-{i}" for i in expected])
+        self.assertEqual(result['metadatas'][0][0], {"recommendation": f"advice {expected[0]}"})
+        self.assertTrue(all(a <= b for a, b in zip(result['distances'][0], result['distances'][0][1:])))
+
+        reopened = NumpyVectorCollection(self.directory)
+        self.assertEqual(reopened.count(), 3000)
+        self.assertEqual(reopened.query([query.tolist()], n_results=5)['documents'][0],
+                         result['documents'][0])
+        print("  ✅ 精确查询与持久化测试通过")
+
+    def test_uncommitted_tail_is_discarded(self):
+        """测试header之后的未完成写入在重新打开时被丢弃"""
+        print("\n🧪 测试未完成写入恢复...")
+        collection = NumpyVectorCollection(self.directory)
+        self._fill(collection, _random_vectors(10, 8))
+        with open(self.directory / "records.jsonl", "ab") as f:
+            f.write(b'{"id": "partial", "docu')
+        with open(self.directory / "offsets.i64", "ab") as f:
+            np.asarray([999], dtype=np.int64).tofile(f)
+
+        reopened = NumpyVectorCollection(self.directory)
+        self._fill(reopened, _random_vectors(1, 8, seed=2))
+        self.assertEqual(reopened.count(), 11)
+        last = reopened.query([_random_vectors(1, 8, seed=2)[0].tolist()], n_results=1)
+        self.assertEqual(last['documents'][0], ["situation 0"])
+        self.assertAlmostEqual(last['distances'][0][0], 0.0, places=5)
+        with open(self.directory / "records.jsonl", encoding="utf-8") as f:
+            self.assertEqual(len([json.loads(line) for line in f]), 11)
+        print("  ✅ 未完成写入恢复测试通过")
+
+    def test_approximate_recall(self):
+        """测试近似查询的召回率"""
+        print("\n🧪 测试近似查询...")
+        centers = _random_vectors(50, 64, seed=3)
+        labels = np.random.default_rng(4).integers(0, 50, 5000)
+        vectors = centers[labels] + 0.3 * _random_vectors(5000, 64, seed=5)
+        exact = NumpyVectorCollection(self.directory)
+        self._fill(exact, vectors)
+        approximate = NumpyVectorCollection(self.directory, approximate=True, approximate_min_rows=0)
+
+        recalls = []
+        for query in _random_vectors(20, 64, seed=6) * 0.3 + centers[:20]:
+            truth = set(exact.query([query.tolist()], n_results=10)['ids'][0])
+            found = set(approximate.query([query.tolist()], n_results=10)['ids'][0])
+            recalls.append(len(truth & found) / 10)
+        self.assertGreaterEqual(np.mean(recalls), 0.9)
+        print(f"  ✅ 近似查询测试通过 (召回率 {np.mean(recalls):.2f})")
+
+    def test_financial_memory_backend(self):
+        """测试记忆库使用本地向量索引时接口不变"""
+        print("\n🧪 测试记忆库接入...")
+        from tradingagents.agents.utils.memory import FinancialSituationMemory
+
+        config = {"llm_provider": "openai", "backend_url": "https://api.openai.com/v1",
+                  "memory_backend": "numpy"}
+        env = {"OPENAI_API_KEY": "test", "MEMORY_VECTOR_DIR": str(self.root_dir),
+               "TRADINGAGENTS_EMBEDDING_CACHE_ENABLED": "false"}
+        vocabulary = ["inflation", "tech", "dollar", "yields"]
+
+        def embed(text):
+            return [float(text.count(word)) + 0.01 for word in vocabulary]
+
+        with mock.patch.dict(os.environ, env):
+            memory = FinancialSituationMemory("test_numpy_memory", config)
+        with mock.patch.object(memory, "_request_embedding", side_effect=embed), \
+             mock.patch.object(memory, "_request_embeddings_batch",
+                               side_effect=lambda texts: [embed(t) for t in texts]):
+            memory.add_situations([
+                ("high inflation inflation", "buy staples"),
+                ("tech tech selling", "reduce tech"),
+                ("strong dollar dollar", "hedge currency"),
+            ])
+            memories = memory.get_memories("tech volatility in tech stocks", n_matches=2)
+
+        self.assertEqual(memory.situation_collection.count(), 3)
+        self.assertEqual(memories[0]["recommendation"], "reduce tech")
+        self.assertEqual(len(memories), 2)
+        self.assertGreater(memories[0]["similarity"], memories[1]["similarity"])
+        print("  ✅ 记忆库接入测试通过")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -24,16 +24,15 @@ def _get_company_name_for_china_market(ticker: str, market_info: dict) -> str:
     try:
         if market_info['is_china']:
             # 中国A股：使用统一接口获取股票信息
-            from tradingagents.dataflows.interface import get_china_stock_info_unified
-            stock_info = get_china_stock_info_unified(ticker)
+            from tradingagents.dataflows.interface import get_china_stock_info_record
+            stock_info = get_china_stock_info_record(ticker)
 
-            # 解析股票名称
-            if "股票名称:" in stock_info:
-                company_name = stock_info.split("股票名称:")[1].split("\n")[0].strip()
+            if stock_info is not None:
+                company_name = stock_info.name
                 logger.debug(f"📊 [中国市场分析师] 从统一接口获取中国股票名称: {ticker} -> {company_name}")
                 return company_name
             else:
-                logger.warning(f"⚠️ [中国市场分析师] 无法从统一接口解析股票名称: {ticker}")
+                logger.warning(f"⚠️ [中国市场分析师] 统一接口未返回股票名称: {ticker}")
                 return f"股票代码{ticker}"
 
         elif market_info['is_hk']:
@@ -35,18 +35,24 @@ def create_news_analyst(llm, toolkit):
         def _get_company_name(ticker: str, market_info: dict) -> str:
             """根据股票代码获取公司名称"""
             try:
+                # 优先从本地股票代码索引解析（无网络请求）
+                from tradingagents.dataflows.symbol_index import lookup_company_name
+                company_name = lookup_company_name(ticker)
+                if company_name:
+                    logger.debug(f"📊 [DEBUG] 从股票代码索引获取名称: {ticker} -> {company_name}")
+                    return company_name
+
                 if market_info['is_china']:
                     # 中国A股：使用统一接口获取股票信息
-                    from tradingagents.dataflows.interface import get_china_stock_info_unified
-                    stock_info = get_china_stock_info_unified(ticker)
-                    
-                    # 解析股票名称
-                    if "股票名称:" in stock_info:
-                        company_name = stock_info.split("股票名称:")[1].split("\n")[0].strip()
+                    from tradingagents.dataflows.interface import get_china_stock_info_record
+                    stock_info = get_china_stock_info_record(ticker)
+
+                    if stock_info is not None:
+                        company_name = stock_info.name
                         logger.debug(f"📊 [DEBUG] 从统一接口获取中国股票名称: {ticker} -> {company_name}")
                         return company_name
                     else:
-                        logger.warning(f"⚠️ [DEBUG] 无法从统一接口解析股票名称: {ticker}")
+                        logger.warning(f"⚠️ [DEBUG] 统一接口未返回股票名称: {ticker}")
                         return f"股票代码{ticker}"
                         
                 elif market_info['is_hk']:
@@ -1,6 +1,10 @@
 import time
 import json
 
+from tradingagents.agents.utils.prompt_budget import (
+    fit_prompt_sections, history_section, memory_section, report_sections,
+)
+
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
 logger = get_logger("default")
@@ -29,6 +33,12 @@ def create_research_manager(llm, memory):
         for i, rec in enumerate(past_memories, 1):
             past_memory_str += rec["recommendation"] + "\n\n"
 
+        # 按token预算压缩分析报告、辩论历史和历史记忆，避免提示词超出模型上下文
+        prompt_inputs = fit_prompt_sections(llm, report_sections(state) + [
+            history_section(history),
+            memory_section(past_memory_str),
+        ])
+
         prompt = f"""作为投资组合经理和辩论主持人，您的职责是批判性地评估这轮辩论并做出明确决策：支持看跌分析师、看涨分析师，或者仅在基于所提出论点有强有力理由时选择持有。
 
 简洁地总结双方的关键观点，重点关注最有说服力的证据或推理。您的建议——买入、卖出或持有——必须明确且可操作。避免仅仅因为双方都有有效观点就默认选择持有；要基于辩论中最强有力的论点做出承诺。
@@ -50,20 +60,20 @@ def create_research_manager(llm, memory):
 考虑您在类似情况下的过去错误。利用这些见解来完善您的决策制定，确保您在学习和改进。以对话方式呈现您的分析，就像自然说话一样，不使用特殊格式。
 
 以下是您对错误的过去反思：
-\"{past_memory_str}\"
+\"{prompt_inputs['memories']}\"
 
 以下是综合分析报告：
-市场研究：{market_research_report}
+市场研究：{prompt_inputs['market_report']}
 
-情绪分析：{sentiment_report}
+情绪分析：{prompt_inputs['sentiment_report']}
 
-新闻分析：{news_report}
+新闻分析：{prompt_inputs['news_report']}
 
-基本面分析：{fundamentals_report}
+基本面分析：{prompt_inputs['fundamentals_report']}
 
 以下是辩论：
 辩论历史：
-{history}
+{prompt_inputs['history']}
 
 请用中文撰写所有分析内容和建议。"""
         response = llm.invoke(prompt)
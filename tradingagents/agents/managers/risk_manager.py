@@ -1,6 +1,10 @@
 import time
 import json
 
+from tradingagents.agents.utils.prompt_budget import (
+    fit_prompt_sections, history_section, memory_section, pinned_section,
+)
+
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
 logger = get_logger("default")
@@ -32,13 +36,20 @@ def create_risk_manager(llm, memory):
         for i, rec in enumerate(past_memories, 1):
             past_memory_str += rec["recommendation"] + "\n\n"
 
+        # 按token预算压缩辩论历史和历史记忆，避免提示词超出模型上下文
+        prompt_inputs = fit_prompt_sections(llm, [
+            history_section(history),
+            memory_section(past_memory_str),
+            pinned_section("trader_plan", trader_plan),
+        ])
+
         prompt = f"""作为风险管理委员会主席和辩论主持人，您的目标是评估三位风险分析师——激进、中性和安全/保守——之间的辩论，并确定交易员的最佳行动方案。您的决策必须产生明确的建议：买入、卖出或持有。只有在有具体论据强烈支持时才选择持有，而不是在所有方面都似乎有效时作为后备选择。力求清晰和果断。
 
 决策指导原则：
 1. **总结关键论点**：提取每位分析师的最强观点，重点关注与背景的相关性。
 2. **提供理由**：用辩论中的直接引用和反驳论点支持您的建议。
 3. **完善交易员计划**：从交易员的原始计划**{trader_plan}**开始，根据分析师的见解进行调整。
-4. **从过去的错误中学习**：使用**{past_memory_str}**中的经验教训来解决先前的误判，改进您现在做出的决策，确保您不会做出错误的买入/卖出/持有决定而亏损。
+4. **从过去的错误中学习**：使用**{prompt_inputs['memories']}**中的经验教训来解决先前的误判，改进您现在做出的决策，确保您不会做出错误的买入/卖出/持有决定而亏损。
 
 交付成果：
 - 明确且可操作的建议：买入、卖出或持有。
@@ -47,7 +58,7 @@ def create_risk_manager(llm, memory):
 ---
 
 **分析师辩论历史：**
-{history}
+{prompt_inputs['history']}
 
 ---
 
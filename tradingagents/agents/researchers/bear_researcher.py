@@ -2,6 +2,10 @@ from langchain_core.messages import AIMessage
 import time
 import json
 
+from tradingagents.agents.utils.prompt_budget import (
+    fit_prompt_sections, history_section, memory_section, pinned_section, report_sections,
+)
+
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
 logger = get_logger("default")
@@ -43,6 +47,13 @@ def create_bear_researcher(llm, memory):
         for i, rec in enumerate(past_memories, 1):
             past_memory_str += rec["recommendation"] + "\n\n"
 
+        # 按token预算压缩分析报告、辩论历史和历史记忆，避免提示词超出模型上下文
+        prompt_inputs = fit_prompt_sections(llm, report_sections(state) + [
+            history_section(history),
+            memory_section(past_memory_str),
+            pinned_section("current_response", current_response),
+        ])
+
         prompt = f"""你是一位看跌分析师，负责论证不投资股票 {company_name} 的理由。
 
 ⚠️ 重要提醒：当前分析的是 {market_info['market_name']}，所有价格和估值请使用 {currency}（{currency_symbol}）作为单位。
@@ -59,13 +70,13 @@ def create_bear_researcher(llm, memory):
 
 可用资源：
 
-市场研究报告：{market_research_report}
-社交媒体情绪报告：{sentiment_report}
-最新世界事务新闻：{news_report}
-公司基本面报告：{fundamentals_report}
-辩论对话历史：{history}
+市场研究报告：{prompt_inputs['market_report']}
+社交媒体情绪报告：{prompt_inputs['sentiment_report']}
+最新世界事务新闻：{prompt_inputs['news_report']}
+公司基本面报告：{prompt_inputs['fundamentals_report']}
+辩论对话历史：{prompt_inputs['history']}
 最后的看涨论点：{current_response}
-类似情况的反思和经验教训：{past_memory_str}
+类似情况的反思和经验教训：{prompt_inputs['memories']}
 
 请使用这些信息提供令人信服的看跌论点，反驳看涨声明，并参与动态辩论，展示投资该股票的风险和弱点。你还必须处理反思并从过去的经验教训和错误中学习。
 
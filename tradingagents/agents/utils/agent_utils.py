@@ -340,6 +340,68 @@ class Toolkit:
 
         return result_stockstats
 
+    @staticmethod
+    @tool
+    def get_stockstats_indicators_batch_report(
+        symbol: Annotated[str, "ticker symbol of the company"],
+        indicators: Annotated[
+            List[str], "technical indicators to get the analysis and report of"
+        ],
+        curr_date: Annotated[
+            str, "The current trading date you are trading on, YYYY-mm-dd"
+        ],
+        look_back_days: Annotated[int, "how many days to look back"] = 30,
+    ) -> str:
+        """
+        Retrieve several stock stats indicators for a given ticker symbol in one call.
+        The price history is loaded once and all indicators are computed on the same frame,
+        so prefer this tool over repeated single-indicator calls.
+        Args:
+            symbol (str): Ticker symbol of the company, e.g. AAPL, TSM
+            indicators (List[str]): Technical indicators to get the analysis and report of, e.g. ["close_50_sma", "macd", "rsi", "boll", "atr"]
+            curr_date (str): The current trading date you are trading on, YYYY-mm-dd
+            look_back_days (int): How many days to look back, default is 30
+        Returns:
+            str: One formatted report section per requested indicator.
+        """
+
+        result_stockstats = interface.get_stock_stats_indicators_window_batch(
+            symbol, indicators, curr_date, look_back_days, False
+        )
+
+        return result_stockstats
+
+    @staticmethod
+    @tool
+    def get_stockstats_indicators_batch_report_online(
+        symbol: Annotated[str, "ticker symbol of the company"],
+        indicators: Annotated[
+            List[str], "technical indicators to get the analysis and report of"
+        ],
+        curr_date: Annotated[
+            str, "The current trading date you are trading on, YYYY-mm-dd"
+        ],
+        look_back_days: Annotated[int, "how many days to look back"] = 30,
+    ) -> str:
+        """
+        Retrieve several stock stats indicators for a given ticker symbol in one call.
+        The price history is loaded once and all indicators are computed on the same frame,
+        so prefer this tool over repeated single-indicator calls.
+        Args:
+            symbol (str): Ticker symbol of the company, e.g. AAPL, TSM
+            indicators (List[str]): Technical indicators to get the analysis and report of, e.g. ["close_50_sma", "macd", "rsi", "boll", "atr"]
+            curr_date (str): The current trading date you are trading on, YYYY-mm-dd
+            look_back_days (int): How many days to look back, default is 30
+        Returns:
+            str: One formatted report section per requested indicator.
+        """
+
+        result_stockstats = interface.get_stock_stats_indicators_window_batch(
+            symbol, indicators, curr_date, look_back_days, True
+        )
+
+        return result_stockstats
+
     @staticmethod
     @tool
     def get_finnhub_company_insider_sentiment(
@@ -561,12 +623,11 @@ class Toolkit:
             logger.debug(f"📊 [DEBUG] 检测到中国A股代码: {ticker}")
             # 使用统一接口获取中国股票名称
             try:
-                from tradingagents.dataflows.interface import get_china_stock_info_unified
-                stock_info = get_china_stock_info_unified(ticker)
+                from tradingagents.dataflows.interface import get_china_stock_info_record
+                stock_info = get_china_stock_info_record(ticker)
 
-                # 解析股票名称
-                if "股票名称:" in stock_info:
-                    company_name = stock_info.split("股票名称:")[1].split("\n")[0].strip()
+                if stock_info is not None:
+                    company_name = stock_info.name
                 else:
                     company_name = f"股票代码{ticker}"
 
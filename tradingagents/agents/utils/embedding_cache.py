@@ -0,0 +1,237 @@
+"""
+向量嵌入缓存
+按 (嵌入模型, 文本内容) 的哈希缓存embedding：
+- 进程内LRU层，相同文本在一个进程内只向嵌入服务请求一次
+- SQLite持久层，重启后继续复用，超过条目上限时按最近访问时间淘汰
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+# 导入统一日志系统
+from tradingagents.utils.logging_init import get_logger
+logger = get_logger("agents.utils.memory")
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    content_hash TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    dimension INTEGER NOT NULL,
+    vector BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_embeddings_last_access
+    ON embeddings (last_access);
+"""
+
+
+def content_hash(model: str, text: str) -> str:
+    """计算缓存键：同一文本在不同嵌入模型下的向量互不复用"""
+    return hashlib.sha256(f"{model}\x00{text}".encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """内存LRU + SQLite持久化的embedding缓存"""
+
+    def __init__(self, db_path: Optional[Path] = None, max_memory_entries: int = 2048,
+                 max_disk_entries: int = 50000):
+        """
+        初始化embedding缓存
+
+        Args:
+            db_path: SQLite文件路径，None表示只使用内存层
+            max_memory_entries: 内存层条目上限
+            max_disk_entries: 持久层条目上限，超过后淘汰最久未访问的10%
+        """
+        self.max_memory_entries = max(1, int(max_memory_entries))
+        self.max_disk_entries = max(1, int(max_disk_entries))
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._conn = None
+
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        if db_path is not None:
+            try:
+                db_path = Path(db_path)
+                db_path.parent.mkdir(parents=True, exist_ok=True)
+                self._conn = sqlite3.connect(str(db_path), timeout=30, check_same_thread=False)
+                try:
+                    self._conn.execute("PRAGMA journal_mode=WAL")
+                except sqlite3.DatabaseError as e:
+                    logger.debug(f"SQLite WAL模式不可用，使用默认日志模式: {e}")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+                self._conn.executescript(_SCHEMA)
+                self._conn.commit()
+            except Exception as e:
+                logger.warning(f"⚠️ embedding持久缓存不可用，仅使用内存缓存: {e}")
+                self._conn = None
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """读取单条embedding，未命中返回None"""
+        return self.get_many(model, [text])[0]
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """批量读取embedding，结果与 texts 一一对应，未命中的位置为None"""
+        keys = [content_hash(model, text) for text in texts]
+        found: Dict[str, List[float]] = {}
+
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+
+            missing = [key for key in dict.fromkeys(keys) if key not in found]
+            if missing and self._conn is not None:
+                for key, vector in self._load_from_disk(missing).items():
+                    found[key] = vector
+                    self._disk_hits += 1
+                    self._remember(key, vector)
+
+            results = []
+            for key in keys:
+                vector = found.get(key)
+                if vector is None:
+                    self._misses += 1
+                else:
+                    self._hits += 1
+                results.append(list(vector) if vector is not None else None)
+            return results
+
+    def put(self, model: str, text: str, embedding: Sequence[float]):
+        """写入单条embedding"""
+        self.put_many(model, [text], [embedding])
+
+    def put_many(self, model: str, texts: Sequence[str], embeddings: Sequence[Sequence[float]]):
+        """批量写入embedding"""
+        rows = []
+        now = time.time()
+        with self._lock:
+            for text, embedding in zip(texts, embeddings):
+                key = content_hash(model, text)
+                vector = [float(x) for x in embedding]
+                self._remember(key, vector)
+                rows.append((key, model, len(vector), array('f', vector).tobytes(), now, now))
+
+            if rows and self._conn is not None:
+                try:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO embeddings "
+                        "(content_hash, model, dimension, vector, created_at, last_access) "
+                        "VALUES (?, ?, ?, ?, ?, ?)", rows)
+                    self._evict_disk()
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"⚠️ embedding持久缓存写入失败: {e}")
+
+    def clear(self):
+        """清空内存层和持久层"""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM embeddings")
+                self._conn.commit()
+
+    def get_stats(self) -> Dict[str, object]:
+        """获取缓存统计"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            disk_entries = None
+            if self._conn is not None:
+                disk_entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return {
+                'memory_entries': len(self._memory),
+                'disk_entries': disk_entries,
+                'hits': self._hits,
+                'disk_hits': self._disk_hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions,
+            }
+
+    def close(self):
+        """关闭持久层连接"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # ------------------------------------------------------------------
+    # 内部方法（调用方需持有锁）
+    # ------------------------------------------------------------------
+
+    def _remember(self, key: str, vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _load_from_disk(self, keys: List[str]) -> Dict[str, List[float]]:
+        loaded = {}
+        try:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ', '.join('?' for _ in chunk)
+                rows = self._conn.execute(
+                    f"SELECT content_hash, vector FROM embeddings WHERE content_hash IN ({placeholders})",
+                    chunk).fetchall()
+                for key, blob in rows:
+                    vector = array('f')
+                    vector.frombytes(blob)
+                    loaded[key] = vector.tolist()
+            if loaded:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE content_hash = ?",
+                    [(time.time(), key) for key in loaded])
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ embedding持久缓存读取失败: {e}")
+        return loaded
+
+    def _evict_disk(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count <= self.max_disk_entries:
+            return
+        # 一次多淘汰一部分，避免每次写入都触发淘汰
+        remove = count - int(self.max_disk_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE content_hash IN ("
+            "SELECT content_hash FROM embeddings ORDER BY last_access ASC, rowid ASC LIMIT ?)",
+            (remove,))
+        self._evictions += remove
+        logger.debug(f"🗑️ embedding持久缓存淘汰 {remove} 条")
+
+
+# 全局embedding缓存实例
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """获取全局embedding缓存实例，禁用时返回None"""
+    global _embedding_cache
+    if os.getenv('TRADINGAGENTS_EMBEDDING_CACHE_ENABLED', 'true').lower() != 'true':
+        return None
+    if _embedding_cache is None:
+        with _embedding_cache_lock:
+            if _embedding_cache is None:
+                from tradingagents.default_config import DEFAULT_CONFIG
+                db_path = os.getenv('TRADINGAGENTS_EMBEDDING_CACHE_PATH') or os.path.join(
+                    DEFAULT_CONFIG["data_cache_dir"], "embedding_cache.db")
+                max_entries = int(os.getenv('TRADINGAGENTS_EMBEDDING_CACHE_MAX_ENTRIES', '50000'))
+                _embedding_cache = EmbeddingCache(db_path, max_disk_entries=max_entries)
+                logger.info(f"📚 embedding缓存初始化: {db_path}, 上限 {max_entries} 条")
+    return _embedding_cache
@@ -1,17 +1,22 @@
-import chromadb
-from chromadb.config import Settings
 from openai import OpenAI
 import dashscope
 from dashscope import TextEmbedding
 import os
 import threading
 import hashlib
+import uuid
 from typing import Dict, Optional
 
+from .embedding_cache import get_embedding_cache
+
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
 logger = get_logger("agents.utils.memory")
 
+# 单次请求的最大文本条数（DashScope text-embedding-v3 每次最多10条）
+DASHSCOPE_EMBEDDING_BATCH_SIZE = 10
+OPENAI_EMBEDDING_BATCH_SIZE = 256
+
 
 class ChromaDBManager:
     """单例ChromaDB管理器，避免并发创建集合的冲突"""
@@ -31,6 +36,10 @@ class ChromaDBManager:
 
     def __init__(self):
         if not self._initialized:
+            # ChromaDB导入较重，仅在使用该后端时导入
+            import chromadb
+            from chromadb.config import Settings
+
             try:
                 # 自动检测操作系统版本并使用最优配置
                 import platform
@@ -317,9 +326,19 @@ class FinancialSituationMemory:
                 self.client = "DISABLED"
                 logger.warning(f"⚠️ 未找到OPENAI_API_KEY，记忆功能已禁用")
 
-        # 使用单例ChromaDB管理器
-        self.chroma_manager = ChromaDBManager()
-        self.situation_collection = self.chroma_manager.get_or_create_collection(name)
+        # 进程内+持久化的embedding缓存（按文本内容哈希，所有记忆库共享）
+        self.embedding_cache = get_embedding_cache()
+
+        # 向量存储后端：chromadb（默认）或 numpy（本地内存映射索引，冷启动快、无额外依赖）
+        self.memory_backend = (config.get("memory_backend") or os.getenv('MEMORY_BACKEND', 'chromadb')).lower()
+        if self.memory_backend == "numpy":
+            from .vector_store import get_vector_collection
+            self.situation_collection = get_vector_collection(name)
+            logger.info(f"📚 [记忆库] {name} 使用本地向量索引")
+        else:
+            # 使用单例ChromaDB管理器
+            self.chroma_manager = ChromaDBManager()
+            self.situation_collection = self.chroma_manager.get_or_create_collection(name)
 
     def _smart_text_truncation(self, text, max_length=8192):
         """智能文本截断，保持语义完整性和缓存兼容性"""
@@ -407,12 +426,30 @@ class FinancialSituationMemory:
             'strategy': 'no_truncation_with_fallback'  # 标记策略
         }
 
-        if (self.llm_provider == "dashscope" or
-            self.llm_provider == "alibaba" or
-            self.llm_provider == "qianfan" or
-            (self.llm_provider == "google" and self.client is None) or
-            (self.llm_provider == "deepseek" and self.client is None) or
-            (self.llm_provider == "openrouter" and self.client is None)):
+        # 相同文本（含其他记忆库已请求过的文本）直接复用缓存向量
+        if self.embedding_cache is not None:
+            cached = self.embedding_cache.get(self.embedding, text)
+            if cached is not None:
+                logger.debug(f"📚 embedding缓存命中，维度: {len(cached)}")
+                return cached
+
+        embedding = self._request_embedding(text)
+        if self.embedding_cache is not None and any(embedding):
+            self.embedding_cache.put(self.embedding, text, embedding)
+        return embedding
+
+    def _uses_dashscope(self):
+        """是否使用阿里百炼嵌入服务"""
+        return (self.llm_provider == "dashscope" or
+                self.llm_provider == "alibaba" or
+                self.llm_provider == "qianfan" or
+                (self.llm_provider == "google" and self.client is None) or
+                (self.llm_provider == "deepseek" and self.client is None) or
+                (self.llm_provider == "openrouter" and self.client is None))
+
+    def _request_embedding(self, text):
+        """向嵌入服务请求单条文本的embedding，失败时返回空向量"""
+        if self._uses_dashscope():
             # 使用阿里百炼的嵌入模型
             try:
                 # 导入DashScope模块
@@ -553,6 +590,86 @@ class FinancialSituationMemory:
                 logger.warning(f"⚠️ 记忆功能降级，返回空向量")
                 return [0.0] * 1024
 
+    def get_embeddings(self, texts):
+        """批量获取embedding，结果与 texts 一一对应
+
+        缓存未命中的文本按批次合并为一次请求（DashScope与OpenAI兼容接口都支持列表输入），
+        批量请求失败时逐条请求，沿用 get_embedding 的降级处理。
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        if self.client == "DISABLED":
+            logger.debug("⚠️ 记忆功能已禁用，返回空向量")
+            return [[0.0] * 1024 for _ in texts]
+
+        results = [None] * len(texts)
+        pending = {}  # 文本 -> 在 texts 中的位置
+        for i, text in enumerate(texts):
+            if (not text or not isinstance(text, str) or
+                    (self.enable_embedding_length_check and len(text) > self.max_embedding_length)):
+                # 空文本/超长文本交给单条接口处理（记录跳过信息并返回空向量）
+                results[i] = self.get_embedding(text)
+            else:
+                pending.setdefault(text, []).append(i)
+
+        unique_texts = list(pending)
+        if self.embedding_cache is not None and unique_texts:
+            cached = self.embedding_cache.get_many(self.embedding, unique_texts)
+            for text, embedding in zip(unique_texts, cached):
+                if embedding is not None:
+                    for i in pending.pop(text):
+                        results[i] = embedding
+
+        missing = list(pending)
+        batch_size = (DASHSCOPE_EMBEDDING_BATCH_SIZE if self._uses_dashscope()
+                      else OPENAI_EMBEDDING_BATCH_SIZE)
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            embeddings = self._request_embeddings_batch(batch)
+            if self.embedding_cache is not None:
+                valid = [(text, emb) for text, emb in zip(batch, embeddings) if any(emb)]
+                if valid:
+                    self.embedding_cache.put_many(self.embedding, *zip(*valid))
+            for text, embedding in zip(batch, embeddings):
+                for i in pending[text]:
+                    results[i] = embedding
+
+        if missing:
+            logger.debug(f"📚 批量embedding: {len(texts)}条文本，请求{len(missing)}条，"
+                         f"缓存命中{len(unique_texts) - len(missing)}条")
+        return results
+
+    def _request_embeddings_batch(self, texts):
+        """一次请求多条文本的embedding，失败时逐条请求"""
+        if len(texts) == 1:
+            return [self._request_embedding(texts[0])]
+        try:
+            if self._uses_dashscope():
+                if not hasattr(dashscope, 'api_key') or not dashscope.api_key:
+                    logger.warning("⚠️ DashScope API密钥未设置，记忆功能降级")
+                    return [[0.0] * 1024 for _ in texts]
+
+                response = TextEmbedding.call(model=self.embedding, input=texts)
+                if response.status_code != 200:
+                    raise RuntimeError(f"{response.code} - {response.message}")
+                items = sorted(response.output['embeddings'], key=lambda item: item['text_index'])
+                embeddings = [item['embedding'] for item in items]
+            else:
+                if self.client is None:
+                    logger.warning("⚠️ 嵌入客户端未初始化，返回空向量")
+                    return [[0.0] * 1024 for _ in texts]
+                response = self.client.embeddings.create(model=self.embedding, input=texts)
+                embeddings = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+            if len(embeddings) != len(texts):
+                raise ValueError(f"返回{len(embeddings)}条向量，请求{len(texts)}条")
+            logger.debug(f"✅ {self.llm_provider} 批量embedding成功: {len(texts)}条")
+            return embeddings
+        except Exception as e:
+            logger.warning(f"⚠️ {self.llm_provider} 批量embedding失败，改为逐条请求: {str(e)}")
+            return [self._request_embedding(text) for text in texts]
+
     def get_embedding_config_status(self):
         """获取向量缓存配置状态"""
         return {
@@ -573,15 +690,14 @@ class FinancialSituationMemory:
         situations = []
         advice = []
         ids = []
-        embeddings = []
 
-        offset = self.situation_collection.count()
-
-        for i, (situation, recommendation) in enumerate(situations_and_advice):
+        for situation, recommendation in situations_and_advice:
             situations.append(situation)
             advice.append(recommendation)
-            ids.append(str(offset + i))
-            embeddings.append(self.get_embedding(situation))
+            # 使用随机id，并发写入同一记忆库时不会因 count() 偏移而冲突
+            ids.append(uuid.uuid4().hex)
+
+        embeddings = self.get_embeddings(situations)
 
         self.situation_collection.add(
             documents=situations,
@@ -0,0 +1,148 @@
+"""
+提示词token预算
+研究员、经理和风险辩论智能体的提示词拼接了全部分析报告、不断增长的辩论历史和历史记忆。
+按模型实际使用的分词器计算各部分的token数，总量超出预算时按优先级从低到高压缩：
+- 每个部分按预算比例预留最低保留量，先把低优先级部分压缩到预留量，仍超出时再继续压缩
+- 同一优先级的多个部分（如四份分析报告）按超出预留量的大小等比例压缩
+- 辩论历史保留最近的发言，分析报告保留开头和结尾，当前论点、交易计划等不压缩
+
+预算通过环境变量 TRADINGAGENTS_PROMPT_TOKEN_BUDGET 设置（只计可变部分，不含提示词模板），0 表示不限制。
+"""
+
+import os
+from dataclasses import dataclass
+from itertools import groupby
+from typing import Any, Dict, List, Optional
+
+from tradingagents.llm_adapters.token_counter import TokenCounter, get_token_counter, llm_provider_and_model
+
+# 导入统一日志系统
+from tradingagents.utils.logging_init import get_logger
+logger = get_logger("agents")
+
+
+DEFAULT_PROMPT_TOKEN_BUDGET = 24000
+
+# 压缩顺序：数值越小越先压缩；None 表示不压缩
+PRIORITY_HISTORY = 10
+PRIORITY_MEMORIES = 20
+PRIORITY_REPORTS = 30
+
+# 分析报告在状态中的字段
+REPORT_FIELDS = ("market_report", "sentiment_report", "news_report", "fundamentals_report")
+
+KEEP_HEAD = 'head'
+KEEP_TAIL = 'tail'
+KEEP_MIDDLE = 'middle'
+
+_OMITTED_MARKER = "\n...(内容过长，已省略部分)...\n"
+
+
+@dataclass
+class PromptSection:
+    """提示词中的一个可变部分"""
+
+    name: str
+    text: str
+    priority: Optional[int] = None
+    # 压缩时至少保留的预算比例
+    reserve: float = 0.0
+    keep: str = KEEP_HEAD
+
+
+def report_sections(state: Dict[str, Any], fields=REPORT_FIELDS) -> List[PromptSection]:
+    """分析报告：每份预留15%的预算，压缩时保留开头和结尾（结论通常在末尾）"""
+    return [PromptSection(field, state.get(field) or "", PRIORITY_REPORTS, reserve=0.15, keep=KEEP_MIDDLE)
+            for field in fields]
+
+
+def history_section(history: str, name: str = "history") -> PromptSection:
+    """辩论历史：最先压缩，保留最近的发言"""
+    return PromptSection(name, history or "", PRIORITY_HISTORY, reserve=0.25, keep=KEEP_TAIL)
+
+
+def memory_section(memories: str, name: str = "memories") -> PromptSection:
+    """历史记忆中的经验教训"""
+    return PromptSection(name, memories or "", PRIORITY_MEMORIES, reserve=0.1, keep=KEEP_HEAD)
+
+
+def pinned_section(name: str, text: str) -> PromptSection:
+    """不压缩的部分（当前论点、交易计划等），计入总量"""
+    return PromptSection(name, text or "")
+
+
+def get_prompt_token_budget() -> int:
+    """读取提示词可变部分的token预算，0表示不限制"""
+    try:
+        return max(0, int(os.getenv('TRADINGAGENTS_PROMPT_TOKEN_BUDGET', DEFAULT_PROMPT_TOKEN_BUDGET)))
+    except ValueError:
+        return DEFAULT_PROMPT_TOKEN_BUDGET
+
+
+class PromptBudget:
+    """按token预算压缩提示词各部分"""
+
+    def __init__(self, max_tokens: int, counter: TokenCounter):
+        self.max_tokens = max_tokens
+        self.counter = counter
+
+    @classmethod
+    def for_llm(cls, llm: Any, max_tokens: Optional[int] = None) -> 'PromptBudget':
+        """使用LLM对应的分词器"""
+        provider, model = llm_provider_and_model(llm)
+        if max_tokens is None:
+            max_tokens = get_prompt_token_budget()
+        return cls(max_tokens, get_token_counter(provider, model))
+
+    def fit(self, sections: List[PromptSection]) -> Dict[str, str]:
+        """返回 {部分名称: 文本}，总token数不超过预算（不压缩的部分本身超出时除外）"""
+        texts = {section.name: section.text for section in sections}
+        if self.max_tokens <= 0:
+            return texts
+
+        counts = {section.name: self.counter.count(section.text) for section in sections}
+        total = sum(counts.values())
+        overflow = total - self.max_tokens
+        if overflow <= 0:
+            return texts
+
+        targets = dict(counts)
+        compactable = sorted((s for s in sections if s.priority is not None), key=lambda s: s.priority)
+        # 第一轮压缩到预留量，第二轮不再保留
+        for use_reserve in (True, False):
+            for _, group in groupby(compactable, key=lambda s: s.priority):
+                if overflow <= 0:
+                    break
+                overflow -= self._shrink(list(group), targets, overflow, use_reserve)
+
+        for section in sections:
+            if targets[section.name] < counts[section.name]:
+                texts[section.name] = self.counter.truncate(section.text, targets[section.name],
+                                                            keep=section.keep, marker=_OMITTED_MARKER)
+
+        compacted = {name: f"{counts[name]}->{targets[name]}" for name in texts if targets[name] < counts[name]}
+        logger.info(f"✂️ [提示词预算] {total} tokens 超出预算 {self.max_tokens}，已压缩: {compacted}")
+        if overflow > 0:
+            logger.warning(f"⚠️ [提示词预算] 不可压缩部分仍超出预算 {overflow} tokens")
+        return texts
+
+    def _shrink(self, group: List[PromptSection], targets: Dict[str, int], overflow: int, use_reserve: bool) -> int:
+        """按各部分超出保留量的大小等比例压缩同一优先级的部分，返回减少的token数"""
+        floors = {s.name: int(self.max_tokens * s.reserve) if use_reserve else 0 for s in group}
+        excess = {s.name: max(0, targets[s.name] - floors[s.name]) for s in group}
+        available = sum(excess.values())
+        if available <= 0:
+            return 0
+
+        cut_total = min(overflow, available)
+        removed = 0
+        for name, amount in excess.items():
+            cut = min(amount, -(-cut_total * amount // available))
+            targets[name] -= cut
+            removed += cut
+        return removed
+
+
+def fit_prompt_sections(llm: Any, sections: List[PromptSection]) -> Dict[str, str]:
+    """按LLM的分词器和全局预算压缩提示词各部分"""
+    return PromptBudget.for_llm(llm).fit(sections)
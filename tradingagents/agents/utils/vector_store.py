@@ -0,0 +1,293 @@
+"""
+本地向量索引
+基于NumPy内存映射文件的记忆库存储，作为ChromaDB的轻量替代：
+- vectors.f32: 归一化后的float32向量矩阵（内存映射，按需扩容）
+- records.jsonl / offsets.i64: 文档、元数据和id的旁路文件及其行偏移
+- header.json: 维度、条目数和容量，最后写入，保证崩溃后只看到完整写入的条目
+
+查询使用精确余弦相似度top-k；条目很多时可启用近似模式：
+先用随机投影后的低维矩阵粗筛候选，再对候选做精确重排。
+接口与ChromaDB集合中记忆库用到的部分保持一致（count/add/query）。
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# 导入统一日志系统
+from tradingagents.utils.logging_init import get_logger
+logger = get_logger("agents.utils.memory")
+
+
+_HEADER_FILE = "header.json"
+_VECTORS_FILE = "vectors.f32"
+_PROJECTED_FILE = "projected.f32"
+_RECORDS_FILE = "records.jsonl"
+_OFFSETS_FILE = "offsets.i64"
+
+# 精确查询时每次参与矩阵乘法的行数，限制临时内存占用
+_QUERY_CHUNK_ROWS = 65536
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    """按行L2归一化，零向量保持为零"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+class NumpyVectorCollection:
+    """单个记忆库的内存映射向量集合"""
+
+    def __init__(self, directory: Path, approximate: bool = False, projection_dim: int = 64,
+                 candidate_factor: int = 20, approximate_min_rows: int = 20000):
+        """
+        初始化向量集合（目录不存在时创建空集合）
+
+        Args:
+            directory: 集合文件目录
+            approximate: 是否启用近似查询
+            projection_dim: 近似查询的随机投影维度
+            candidate_factor: 近似查询粗筛候选数为 n_results 的倍数
+            approximate_min_rows: 条目数达到该值后才使用近似查询
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.approximate = approximate
+        self.candidate_factor = max(1, int(candidate_factor))
+        self.approximate_min_rows = int(approximate_min_rows)
+
+        self._lock = threading.RLock()
+        self._dimension: Optional[int] = None
+        self._count = 0
+        self._capacity = 0
+        self._projection_dim = int(projection_dim)
+        self._projection: Optional[np.ndarray] = None
+        self._vectors: Optional[np.memmap] = None
+        self._projected: Optional[np.memmap] = None
+        self._offsets: List[int] = [0]
+
+        self._load()
+
+    # ------------------------------------------------------------------
+    # ChromaDB兼容接口
+    # ------------------------------------------------------------------
+
+    def count(self) -> int:
+        """返回已存储的条目数"""
+        return self._count
+
+    def add(self, documents: Sequence[str], metadatas: Sequence[Dict[str, Any]] = None,
+            embeddings: Sequence[Sequence[float]] = None, ids: Sequence[str] = None):
+        """追加一批条目"""
+        documents = list(documents)
+        if not documents:
+            return
+        if embeddings is None or len(embeddings) != len(documents):
+            raise ValueError("embeddings数量必须与documents一致")
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in documents]
+        ids = list(ids) if ids is not None else [None] * len(documents)
+
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2:
+            raise ValueError("embeddings必须是二维数组")
+
+        with self._lock:
+            if self._dimension is None:
+                self._initialize(vectors.shape[1])
+            if vectors.shape[1] != self._dimension:
+                raise ValueError(f"向量维度不匹配: {vectors.shape[1]} != {self._dimension}")
+
+            start, end = self._count, self._count + len(documents)
+            self._ensure_capacity(end)
+            normalized = _normalize(vectors)
+            self._vectors[start:end] = normalized
+            self._vectors.flush()
+            if self._projected is not None:
+                self._projected[start:end] = normalized @ self._projection
+                self._projected.flush()
+
+            position = self._offsets[-1]
+            lines, new_offsets = [], []
+            for row, (document, metadata, record_id) in enumerate(zip(documents, metadatas, ids), start):
+                line = json.dumps({'id': record_id if record_id is not None else str(row),
+                                   'document': document, 'metadata': metadata or {}},
+                                  ensure_ascii=False).encode('utf-8') + b'\n'
+                lines.append(line)
+                position += len(line)
+                new_offsets.append(position)
+            with open(self.directory / _RECORDS_FILE, 'ab') as f:
+                f.write(b''.join(lines))
+            with open(self.directory / _OFFSETS_FILE, 'ab') as f:
+                np.asarray(new_offsets, dtype=np.int64).tofile(f)
+            self._offsets.extend(new_offsets)
+
+            self._count = end
+            self._write_header()
+
+    def query(self, query_embeddings: Sequence[Sequence[float]], n_results: int = 10) -> Dict[str, List]:
+        """
+        余弦相似度top-k查询
+
+        Returns:
+            与ChromaDB一致的结果格式：ids/documents/metadatas/distances 均为每个查询一个列表，
+            distance 为 1 - 余弦相似度
+        """
+        queries = _normalize(np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32)))
+        result = {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+
+        with self._lock:
+            count = self._count
+            if count == 0 or n_results <= 0:
+                for key in result:
+                    result[key] = [[] for _ in queries]
+                return result
+            if queries.shape[1] != self._dimension:
+                raise ValueError(f"查询向量维度不匹配: {queries.shape[1]} != {self._dimension}")
+
+            k = min(int(n_results), count)
+            use_approximate = (self.approximate and self._projected is not None
+                               and count >= self.approximate_min_rows)
+            for query in queries:
+                if use_approximate:
+                    rows, scores = self._approximate_top_k(query, k, count)
+                else:
+                    rows, scores = self._exact_top_k(query, k, count)
+                records = [self._read_record(row) for row in rows]
+                result['ids'].append([record['id'] for record in records])
+                result['documents'].append([record['document'] for record in records])
+                result['metadatas'].append([record['metadata'] for record in records])
+                result['distances'].append([float(1.0 - score) for score in scores])
+        return result
+
+    # ------------------------------------------------------------------
+    # 内部方法
+    # ------------------------------------------------------------------
+
+    def _exact_top_k(self, query: np.ndarray, k: int, count: int):
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, count, _QUERY_CHUNK_ROWS):
+            end = min(start + _QUERY_CHUNK_ROWS, count)
+            scores = self._vectors[start:end] @ query
+            rows = np.arange(start, end, dtype=np.int64)
+            best_rows = np.concatenate([best_rows, rows])
+            best_scores = np.concatenate([best_scores, scores])
+            if len(best_scores) > k:
+                keep = np.argpartition(-best_scores, k - 1)[:k]
+                best_rows, best_scores = best_rows[keep], best_scores[keep]
+        order = np.argsort(-best_scores, kind='stable')
+        return best_rows[order], best_scores[order]
+
+    def _approximate_top_k(self, query: np.ndarray, k: int, count: int):
+        candidates = min(count, k * self.candidate_factor)
+        approx_scores = self._projected[:count] @ (query @ self._projection)
+        rows = np.argpartition(-approx_scores, candidates - 1)[:candidates]
+        rows.sort()
+        scores = self._vectors[rows] @ query
+        keep = np.argsort(-scores, kind='stable')[:k]
+        return rows[keep], scores[keep]
+
+    def _read_record(self, row: int) -> Dict[str, Any]:
+        start, end = self._offsets[row], self._offsets[row + 1]
+        with open(self.directory / _RECORDS_FILE, 'rb') as f:
+            f.seek(start)
+            return json.loads(f.read(end - start).decode('utf-8'))
+
+    def _initialize(self, dimension: int):
+        self._dimension = int(dimension)
+        self._projection_dim = min(self._projection_dim, self._dimension)
+        self._projection = self._make_projection()
+        self._capacity = 0
+        self._ensure_capacity(1024)
+
+    def _make_projection(self) -> np.ndarray:
+        # 固定种子，重启后重新生成同一个投影矩阵
+        rng = np.random.default_rng(self._dimension)
+        projection = rng.standard_normal((self._dimension, self._projection_dim)).astype(np.float32)
+        return projection / np.sqrt(self._projection_dim)
+
+    def _ensure_capacity(self, rows: int):
+        if rows <= self._capacity:
+            return
+        capacity = max(rows, self._capacity * 2, 1024)
+        # 扩容前释放旧的内存映射，再扩展文件并重新映射
+        for matrix in (self._vectors, self._projected):
+            if matrix is not None:
+                matrix.flush()
+        self._vectors = self._projected = None
+        self._vectors = self._resize_matrix(_VECTORS_FILE, capacity, self._dimension)
+        self._projected = self._resize_matrix(_PROJECTED_FILE, capacity, self._projection_dim)
+        self._capacity = capacity
+
+    def _resize_matrix(self, file_name: str, capacity: int, width: int) -> np.memmap:
+        path = self.directory / file_name
+        with open(path, 'ab') as f:
+            f.truncate(capacity * width * 4)
+        return np.memmap(path, dtype=np.float32, mode='r+', shape=(capacity, width))
+
+    def _write_header(self):
+        header = {
+            'version': 1,
+            'dimension': self._dimension,
+            'count': self._count,
+            'capacity': self._capacity,
+            'projection_dim': self._projection_dim,
+        }
+        tmp_path = self.directory / (_HEADER_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(header, f)
+        os.replace(tmp_path, self.directory / _HEADER_FILE)
+
+    def _load(self):
+        header_path = self.directory / _HEADER_FILE
+        if not header_path.exists():
+            return
+        with open(header_path, 'r', encoding='utf-8') as f:
+            header = json.load(f)
+
+        self._dimension = header['dimension']
+        self._count = header['count']
+        self._capacity = header['capacity']
+        self._projection_dim = header['projection_dim']
+        self._projection = self._make_projection()
+        self._vectors = np.memmap(self.directory / _VECTORS_FILE, dtype=np.float32, mode='r+',
+                                  shape=(self._capacity, self._dimension))
+        self._projected = np.memmap(self.directory / _PROJECTED_FILE, dtype=np.float32, mode='r+',
+                                    shape=(self._capacity, self._projection_dim))
+
+        # 丢弃header之后（未完成写入）的旁路数据
+        offsets_path = self.directory / _OFFSETS_FILE
+        offsets = np.fromfile(offsets_path, dtype=np.int64, count=self._count) if self._count else []
+        self._offsets = [0] + [int(x) for x in offsets]
+        with open(offsets_path, 'ab') as f:
+            f.truncate(self._count * 8)
+        with open(self.directory / _RECORDS_FILE, 'ab') as f:
+            f.truncate(self._offsets[-1])
+        logger.info(f"📚 [向量索引] 加载 {self.directory.name}: {self._count} 条, 维度 {self._dimension}")
+
+
+# 已打开的集合（同一目录在进程内只打开一次）
+_collections: Dict[str, NumpyVectorCollection] = {}
+_collections_lock = threading.Lock()
+
+def get_vector_collection(name: str, base_dir: str = None, approximate: bool = None) -> NumpyVectorCollection:
+    """获取（必要时创建）指定名称的本地向量集合"""
+    if base_dir is None:
+        from tradingagents.default_config import DEFAULT_CONFIG
+        base_dir = os.getenv('MEMORY_VECTOR_DIR') or os.path.join(
+            DEFAULT_CONFIG["data_cache_dir"], "vector_memory")
+    if approximate is None:
+        approximate = os.getenv('MEMORY_VECTOR_APPROXIMATE', 'false').lower() == 'true'
+
+    directory = os.path.abspath(os.path.join(base_dir, name))
+    with _collections_lock:
+        collection = _collections.get(directory)
+        if collection is None:
+            collection = NumpyVectorCollection(Path(directory), approximate=approximate)
+            _collections[directory] = collection
+        return collection
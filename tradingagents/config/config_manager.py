@@ -13,6 +13,8 @@ from dataclasses import dataclass, asdict
 from pathlib import Path
 from dotenv import load_dotenv
 
+from .usage_ledger import get_usage_ledger
+
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
 
@@ -73,6 +75,7 @@ class ConfigManager:
         self.models_file = self.config_dir / "models.json"
         self.pricing_file = self.config_dir / "pricing.json"
         self.usage_file = self.config_dir / "usage.json"
+        self.usage_db_file = self.config_dir / "usage.db"
         self.settings_file = self.config_dir / "settings.json"
 
         # 加载.env文件（保持向后兼容）
@@ -84,6 +87,12 @@ class ConfigManager:
 
         self._init_default_configs()
 
+        # 本地使用记录账本（MongoDB不可用时的存储，同一路径的配置管理器共享），首次启动时迁移旧版 usage.json
+        self.usage_ledger = get_usage_ledger(
+            self.usage_db_file,
+            max_records=self.load_settings().get("max_usage_records", 10000))
+        self.usage_ledger.import_legacy_json(self.usage_file)
+
     def _load_env_file(self):
         """加载.env文件（保持向后兼容）"""
         # 尝试从项目根目录加载.env文件
@@ -353,24 +362,18 @@ class ConfigManager:
         except Exception as e:
             logger.error(f"保存定价配置失败: {e}")
     
-    def load_usage_records(self) -> List[UsageRecord]:
-        """加载使用记录"""
+    def load_usage_records(self, days: int = None) -> List[UsageRecord]:
+        """加载使用记录（days 指定时只返回最近N天的记录）"""
         try:
-            if not self.usage_file.exists():
-                return []
-            with open(self.usage_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return [UsageRecord(**item) for item in data]
+            return [UsageRecord(**item) for item in self.usage_ledger.load_records(days=days)]
         except Exception as e:
             logger.error(f"加载使用记录失败: {e}")
             return []
     
     def save_usage_records(self, records: List[UsageRecord]):
-        """保存使用记录"""
+        """保存使用记录（替换全部本地记录）"""
         try:
-            data = [asdict(record) for record in records]
-            with open(self.usage_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            self.usage_ledger.replace_all(asdict(record) for record in records)
         except Exception as e:
             logger.error(f"保存使用记录失败: {e}")
     
@@ -397,19 +400,10 @@ class ConfigManager:
             if success:
                 return record
             else:
-                logger.error(f"⚠️ MongoDB保存失败，回退到JSON文件存储")
-        
-        # 回退到JSON文件存储
-        records = self.load_usage_records()
-        records.append(record)
+                logger.error(f"⚠️ MongoDB保存失败，回退到本地账本存储")
         
-        # 限制记录数量
-        settings = self.load_settings()
-        max_records = settings.get("max_usage_records", 10000)
-        if len(records) > max_records:
-            records = records[-max_records:]
-        
-        self.save_usage_records(records)
+        # 回退到本地账本（追加写入，由后台线程批量落盘并按 max_usage_records 压缩）
+        self.usage_ledger.append(asdict(record))
         return record
     
     def calculate_cost(self, provider: str, model_name: str, input_tokens: int, output_tokens: int) -> float:
@@ -509,6 +503,8 @@ class ConfigManager:
         try:
             with open(self.settings_file, 'w', encoding='utf-8') as f:
                 json.dump(settings, f, ensure_ascii=False, indent=2)
+            if hasattr(self, "usage_ledger"):
+                self.usage_ledger.max_records = int(settings.get("max_usage_records", 10000))
         except Exception as e:
             logger.error(f"保存设置失败: {e}")
     
@@ -540,54 +536,10 @@ class ConfigManager:
                     stats["records_count"] = stats.get("total_requests", 0)
                     return stats
             except Exception as e:
-                logger.error(f"⚠️ MongoDB统计获取失败，回退到JSON文件: {e}")
+                logger.error(f"⚠️ MongoDB统计获取失败，回退到本地账本: {e}")
         
-        # 回退到JSON文件统计
-        records = self.load_usage_records()
-        
-        # 过滤最近N天的记录
-        from datetime import datetime, timedelta
-
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
-        recent_records = []
-        for record in records:
-            try:
-                record_date = datetime.fromisoformat(record.timestamp)
-                if record_date >= cutoff_date:
-                    recent_records.append(record)
-            except:
-                continue
-        
-        # 统计数据
-        total_cost = sum(record.cost for record in recent_records)
-        total_input_tokens = sum(record.input_tokens for record in recent_records)
-        total_output_tokens = sum(record.output_tokens for record in recent_records)
-        
-        # 按供应商统计
-        provider_stats = {}
-        for record in recent_records:
-            if record.provider not in provider_stats:
-                provider_stats[record.provider] = {
-                    "cost": 0,
-                    "input_tokens": 0,
-                    "output_tokens": 0,
-                    "requests": 0
-                }
-            provider_stats[record.provider]["cost"] += record.cost
-            provider_stats[record.provider]["input_tokens"] += record.input_tokens
-            provider_stats[record.provider]["output_tokens"] += record.output_tokens
-            provider_stats[record.provider]["requests"] += 1
-        
-        return {
-            "period_days": days,
-            "total_cost": round(total_cost, 4),
-            "total_input_tokens": total_input_tokens,
-            "total_output_tokens": total_output_tokens,
-            "total_requests": len(recent_records),
-            "provider_stats": provider_stats,
-            "records_count": len(recent_records)
-        }
+        # 回退到本地账本统计（按时间索引聚合）
+        return self.usage_ledger.get_statistics(days)
     
     def get_data_dir(self) -> str:
         """获取数据目录路径"""
@@ -708,9 +660,7 @@ class TokenTracker:
 
     def get_session_cost(self, session_id: str) -> float:
         """获取会话成本"""
-        records = self.config_manager.load_usage_records()
-        session_cost = sum(record.cost for record in records if record.session_id == session_id)
-        return session_cost
+        return self.config_manager.usage_ledger.get_session_cost(session_id)
 
     def estimate_cost(self, provider: str, model_name: str, estimated_input_tokens: int,
                      estimated_output_tokens: int) -> float:
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Token使用记录账本
+MongoDB不可用时的本地存储：SQLite追加写入 + 后台批量刷盘 + 定期压缩，
+统计和会话成本通过索引查询计算，不再每次读写整个 usage.json
+"""
+
+import atexit
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+_FIELDS = ('timestamp', 'provider', 'model_name', 'input_tokens', 'output_tokens',
+           'cost', 'session_id', 'analysis_type')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage_records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    ts REAL NOT NULL,
+    provider TEXT,
+    model_name TEXT,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    cost REAL NOT NULL DEFAULT 0,
+    session_id TEXT,
+    analysis_type TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_usage_ts ON usage_records (ts);
+CREATE INDEX IF NOT EXISTS idx_usage_session ON usage_records (session_id);
+"""
+
+
+def _to_row(record: Dict[str, Any]) -> tuple:
+    timestamp = record.get('timestamp') or datetime.now().isoformat()
+    try:
+        ts = datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError):
+        ts = datetime.now().timestamp()
+    return (timestamp, ts, record.get('provider'), record.get('model_name'),
+            int(record.get('input_tokens') or 0), int(record.get('output_tokens') or 0),
+            float(record.get('cost') or 0.0), record.get('session_id'), record.get('analysis_type'))
+
+
+class UsageLedger:
+    """基于SQLite的追加写入使用记录账本"""
+
+    def __init__(self, db_path: Path, max_records: int = 10000, flush_interval: float = 1.0,
+                 batch_size: int = 200):
+        """
+        初始化账本
+
+        Args:
+            db_path: SQLite文件路径
+            max_records: 保留的最大记录数，压缩时删除最旧的记录
+            flush_interval: 后台刷盘间隔（秒）
+            batch_size: 待写入记录达到该数量时立即刷盘
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_records = int(max_records)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        self._pending: List[tuple] = []
+        self._pending_lock = threading.Lock()
+        # 连接由锁串行化，多进程通过SQLite文件锁协调
+        self._conn_lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn_lock:
+            try:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            except sqlite3.DatabaseError as e:
+                logger.debug(f"SQLite WAL模式不可用，使用默认日志模式: {e}")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+        self._inserted_since_compact = 0
+        self._wake = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        self._closed = False
+        atexit.register(self.close)
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def append(self, record: Dict[str, Any]):
+        """追加一条记录（由后台线程批量写入）"""
+        with self._pending_lock:
+            self._pending.append(_to_row(record))
+            pending = len(self._pending)
+        self._ensure_writer()
+        if pending >= self.batch_size:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """立即写入所有待写入记录，返回写入条数"""
+        with self._conn_lock:
+            with self._pending_lock:
+                rows, self._pending = self._pending, []
+            if not rows:
+                return 0
+            self._conn.executemany(
+                "INSERT INTO usage_records (timestamp, ts, provider, model_name, input_tokens, "
+                "output_tokens, cost, session_id, analysis_type) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows)
+            self._inserted_since_compact += len(rows)
+            # 超出上限10%（至少100条）时压缩一次，避免每次写入都执行删除
+            if self._inserted_since_compact >= max(100, self.max_records // 10):
+                self._compact_locked()
+            self._conn.commit()
+            return len(rows)
+
+    def compact(self) -> int:
+        """删除超出 max_records 的最旧记录，返回删除条数"""
+        self.flush()
+        with self._conn_lock:
+            removed = self._compact_locked()
+            self._conn.commit()
+            return removed
+
+    def replace_all(self, records: Iterable[Dict[str, Any]]):
+        """用给定记录替换账本内容（如清空记录）"""
+        with self._conn_lock:
+            with self._pending_lock:
+                self._pending = []
+            self._conn.execute("DELETE FROM usage_records")
+            rows = [_to_row(record) for record in records]
+            if rows:
+                self._conn.executemany(
+                    "INSERT INTO usage_records (timestamp, ts, provider, model_name, input_tokens, "
+                    "output_tokens, cost, session_id, analysis_type) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows)
+            self._compact_locked()
+            self._conn.commit()
+
+    def import_legacy_json(self, json_path: Path) -> int:
+        """导入旧版 usage.json，导入后重命名为 usage.json.migrated"""
+        json_path = Path(json_path)
+        if not json_path.exists():
+            return 0
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            rows = [_to_row(item) for item in data]
+            with self._conn_lock:
+                self._conn.executemany(
+                    "INSERT INTO usage_records (timestamp, ts, provider, model_name, input_tokens, "
+                    "output_tokens, cost, session_id, analysis_type) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows)
+                self._compact_locked()
+                self._conn.commit()
+            json_path.replace(json_path.with_name(json_path.name + '.migrated'))
+            logger.info(f"✅ 已将 {len(rows)} 条使用记录从 {json_path.name} 迁移到 {self.db_path.name}")
+            return len(rows)
+        except Exception as e:
+            logger.error(f"迁移使用记录失败: {e}")
+            return 0
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def load_records(self, days: int = None, session_id: str = None,
+                     limit: int = None) -> List[Dict[str, Any]]:
+        """按时间顺序读取记录"""
+        where, params = self._filters(days, session_id)
+        sql = f"SELECT {', '.join(_FIELDS)} FROM usage_records{where} ORDER BY id"
+        if limit is not None:
+            sql = (f"SELECT * FROM (SELECT {', '.join(_FIELDS)}, id FROM usage_records{where} "
+                   f"ORDER BY id DESC LIMIT ?) ORDER BY id")
+            params.append(int(limit))
+        self.flush()
+        with self._conn_lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [{field: row[field] for field in _FIELDS} for row in rows]
+
+    def get_statistics(self, days: int = 30) -> Dict[str, Any]:
+        """按索引汇总最近N天的成本和token用量"""
+        where, params = self._filters(days, None)
+        self.flush()
+        with self._conn_lock:
+            rows = self._conn.execute(
+                f"SELECT provider, SUM(cost) AS cost, SUM(input_tokens) AS input_tokens, "
+                f"SUM(output_tokens) AS output_tokens, COUNT(*) AS requests "
+                f"FROM usage_records{where} GROUP BY provider", params).fetchall()
+
+        provider_stats = {
+            row['provider']: {
+                "cost": row['cost'] or 0,
+                "input_tokens": row['input_tokens'] or 0,
+                "output_tokens": row['output_tokens'] or 0,
+                "requests": row['requests'],
+            }
+            for row in rows
+        }
+        total_requests = sum(stats["requests"] for stats in provider_stats.values())
+        return {
+            "period_days": days,
+            "total_cost": round(sum(stats["cost"] for stats in provider_stats.values()), 4),
+            "total_input_tokens": sum(stats["input_tokens"] for stats in provider_stats.values()),
+            "total_output_tokens": sum(stats["output_tokens"] for stats in provider_stats.values()),
+            "total_requests": total_requests,
+            "provider_stats": provider_stats,
+            "records_count": total_requests,
+        }
+
+    def get_session_cost(self, session_id: str) -> float:
+        """获取会话总成本"""
+        self.flush()
+        with self._conn_lock:
+            row = self._conn.execute(
+                "SELECT SUM(cost) FROM usage_records WHERE session_id = ?", (session_id,)).fetchone()
+        return row[0] or 0.0
+
+    def count(self) -> int:
+        """记录总数（含待写入记录）"""
+        self.flush()
+        with self._conn_lock:
+            return self._conn.execute("SELECT COUNT(*) FROM usage_records").fetchone()[0]
+
+    def close(self):
+        """写入剩余记录并停止后台线程"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"写入使用记录失败: {e}")
+
+    # ------------------------------------------------------------------
+    # 内部方法
+    # ------------------------------------------------------------------
+
+    def _filters(self, days: Optional[int], session_id: Optional[str]):
+        conditions, params = [], []
+        if days is not None:
+            conditions.append("ts >= ?")
+            params.append((datetime.now() - timedelta(days=days)).timestamp())
+        if session_id is not None:
+            conditions.append("session_id = ?")
+            params.append(session_id)
+        where = (" WHERE " + " AND ".join(conditions)) if conditions else ""
+        return where, params
+
+    def _compact_locked(self) -> int:
+        self._inserted_since_compact = 0
+        cursor = self._conn.execute(
+            "DELETE FROM usage_records WHERE id <= (SELECT MAX(id) FROM usage_records) - ?",
+            (self.max_records,))
+        if cursor.rowcount:
+            logger.debug(f"🗑️ 使用记录压缩: 删除 {cursor.rowcount} 条旧记录")
+        return cursor.rowcount
+
+    def _ensure_writer(self):
+        if self._writer is not None or self._closed:
+            return
+        with self._pending_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name="usage-ledger-writer", daemon=True)
+                self._writer.start()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"写入使用记录失败: {e}")
+
+
+# 按数据库路径共享的账本（每个账本持有一个SQLite连接和一个后台写入线程）
+_ledgers: Dict[str, UsageLedger] = {}
+_ledgers_lock = threading.Lock()
+
+
+def get_usage_ledger(db_path: Path, max_records: int = 10000) -> UsageLedger:
+    """获取指定路径的共享账本，同一路径只创建一个实例"""
+    key = str(Path(db_path).resolve())
+    with _ledgers_lock:
+        ledger = _ledgers.get(key)
+        if ledger is None or ledger._closed:
+            ledger = UsageLedger(db_path, max_records=max_records)
+            _ledgers[key] = ledger
+        else:
+            ledger.max_records = int(max_records)
+    return ledger
@@ -39,6 +39,7 @@ from .interface import (
     get_simfin_income_statements,
     # Technical analysis functions
     get_stock_stats_indicators_window,
+    get_stock_stats_indicators_window_batch,
     get_stockstats_indicator,
     # Market data functions
     get_YFin_data_window,
@@ -51,6 +52,7 @@ from .interface import (
     # Unified China data functions (recommended)
     get_china_stock_data_unified,
     get_china_stock_info_unified,
+    get_china_stock_info_record,
     switch_china_data_source,
     get_current_china_data_source,
     # Hong Kong stock functions
@@ -73,6 +75,7 @@ __all__ = [
     "get_simfin_income_statements",
     # Technical analysis functions
     "get_stock_stats_indicators_window",
+    "get_stock_stats_indicators_window_batch",
     "get_stockstats_indicator",
     # Market data functions
     "get_YFin_data_window",
@@ -85,6 +88,7 @@ __all__ = [
     # Unified China data functions
     "get_china_stock_data_unified",
     "get_china_stock_info_unified",
+    "get_china_stock_info_record",
     "switch_china_data_source",
     "get_current_china_data_source",
     # Hong Kong stock functions
@@ -15,6 +15,12 @@ from typing import Any, Dict, Optional, Union
 import pandas as pd
 
 from ..config.database_manager import get_database_manager
+from . import cache_codec
+from .memory_cache import get_memory_cache, detach
+
+# 文件缓存后缀（cache_codec 编码），旧版 .pkl 缓存仍可读取
+CACHE_FILE_SUFFIX = ".tac"
+LEGACY_FILE_SUFFIX = ".pkl"
 
 class AdaptiveCacheSystem:
     """自适应缓存系统"""
@@ -37,6 +43,9 @@ class AdaptiveCacheSystem:
         self.primary_backend = self.cache_config["primary_backend"]
         self.fallback_enabled = self.cache_config["fallback_enabled"]
         
+        # 进程内L1缓存
+        self.memory_cache = get_memory_cache()
+        
         self.logger.info(f"自适应缓存系统初始化 - 主要后端: {self.primary_backend}")
     
     def _get_cache_key(self, symbol: str, start_date: str = "", end_date: str = "", 
@@ -66,19 +75,56 @@ class AdaptiveCacheSystem:
         expiry_time = cache_time + timedelta(seconds=ttl_seconds)
         return datetime.now() < expiry_time
     
-    def _save_to_file(self, cache_key: str, data: Any, metadata: Dict) -> bool:
-        """保存到文件缓存"""
+    @staticmethod
+    def _encode_entry(data: Any, metadata: Dict, backend: str) -> bytes:
+        """编码缓存条目：数据按类型选择编解码器，元数据保存在头部"""
+        timestamp = datetime.now()
         try:
-            cache_file = self.cache_dir / f"{cache_key}.pkl"
-            cache_data = {
+            return cache_codec.dumps(data, {
+                'metadata': metadata,
+                'timestamp': timestamp.isoformat(),
+                'backend': backend
+            })
+        except cache_codec.CacheCodecError:
+            # 编解码器不支持的Python对象仍使用pickle
+            return pickle.dumps({
                 'data': data,
                 'metadata': metadata,
-                'timestamp': datetime.now(),
-                'backend': 'file'
-            }
-            
-            with open(cache_file, 'wb') as f:
-                pickle.dump(cache_data, f)
+                'timestamp': timestamp,
+                'backend': backend
+            })
+
+    @staticmethod
+    def _decode_entry(blob: bytes) -> Dict:
+        """解码缓存条目，未编码的数据按旧版pickle格式读取"""
+        if not cache_codec.is_encoded(blob):
+            return pickle.loads(blob)
+        data, header = cache_codec.loads(blob)
+        return {
+            'data': data,
+            'metadata': header.get('metadata', {}),
+            'timestamp': datetime.fromisoformat(header['timestamp']),
+            'backend': header.get('backend')
+        }
+
+    def _read_file_entry(self, cache_file: Path) -> Dict:
+        """读取缓存文件（新格式或旧版pickle）"""
+        with open(cache_file, 'rb') as f:
+            return self._decode_entry(f.read())
+
+    def _save_to_file(self, cache_key: str, data: Any, metadata: Dict) -> bool:
+        """保存到文件缓存"""
+        try:
+            cache_file = self.cache_dir / f"{cache_key}{CACHE_FILE_SUFFIX}"
+            tmp_file = cache_file.with_suffix(CACHE_FILE_SUFFIX + ".tmp")
+            with open(tmp_file, 'wb') as f:
+                f.write(self._encode_entry(data, metadata, 'file'))
+            tmp_file.replace(cache_file)
+
+            # 新格式写入后移除同键的旧版缓存
+            legacy_file = self.cache_dir / f"{cache_key}{LEGACY_FILE_SUFFIX}"
+            if legacy_file.exists():
+                legacy_file.unlink()
             
             self.logger.debug(f"文件缓存保存成功: {cache_key}")
             return True
@@ -90,15 +136,13 @@ class AdaptiveCacheSystem:
     def _load_from_file(self, cache_key: str) -> Optional[Dict]:
         """从文件缓存加载"""
         try:
-            cache_file = self.cache_dir / f"{cache_key}.pkl"
-            if not cache_file.exists():
-                return None
-            
-            with open(cache_file, 'rb') as f:
-                cache_data = pickle.load(f)
-            
-            self.logger.debug(f"文件缓存加载成功: {cache_key}")
-            return cache_data
+            for suffix in (CACHE_FILE_SUFFIX, LEGACY_FILE_SUFFIX):
+                cache_file = self.cache_dir / f"{cache_key}{suffix}"
+                if cache_file.exists():
+                    cache_data = self._read_file_entry(cache_file)
+                    self.logger.debug(f"文件缓存加载成功: {cache_key}")
+                    return cache_data
+            return None
             
         except Exception as e:
             self.logger.error(f"文件缓存加载失败: {e}")
@@ -111,14 +155,7 @@ class AdaptiveCacheSystem:
             return False
         
         try:
-            cache_data = {
-                'data': data,
-                'metadata': metadata,
-                'timestamp': datetime.now().isoformat(),
-                'backend': 'redis'
-            }
-            
-            serialized_data = pickle.dumps(cache_data)
+            serialized_data = self._encode_entry(data, metadata, 'redis')
             redis_client.setex(cache_key, ttl_seconds, serialized_data)
             
             self.logger.debug(f"Redis缓存保存成功: {cache_key}")
@@ -139,7 +176,7 @@ class AdaptiveCacheSystem:
             if not serialized_data:
                 return None
             
-            cache_data = pickle.loads(serialized_data)
+            cache_data = self._decode_entry(serialized_data)
             
             # 转换时间戳
             if isinstance(cache_data['timestamp'], str):
@@ -162,11 +199,11 @@ class AdaptiveCacheSystem:
             db = mongodb_client.tradingagents
             collection = db.cache
             
-            # 序列化数据
-            if isinstance(data, pd.DataFrame):
-                serialized_data = data.to_json()
-                data_type = 'dataframe'
-            else:
+            # 序列化数据（二进制字段），编解码器不支持的对象仍使用pickle
+            try:
+                serialized_data = cache_codec.dumps(data)
+                data_type = 'codec'
+            except cache_codec.CacheCodecError:
                 serialized_data = pickle.dumps(data).hex()
                 data_type = 'pickle'
             
@@ -208,8 +245,10 @@ class AdaptiveCacheSystem:
                 collection.delete_one({'_id': cache_key})
                 return None
             
-            # 反序列化数据
-            if doc['data_type'] == 'dataframe':
+            # 反序列化数据（兼容旧版 dataframe/pickle 文档）
+            if doc['data_type'] == 'codec':
+                data, _ = cache_codec.loads(doc['data'])
+            elif doc['data_type'] == 'dataframe':
                 data = pd.read_json(doc['data'])
             else:
                 data = pickle.loads(bytes.fromhex(doc['data']))
@@ -261,6 +300,8 @@ class AdaptiveCacheSystem:
             self.logger.warning(f"主要后端({self.primary_backend})保存失败，使用文件缓存降级")
             success = self._save_to_file(cache_key, data, metadata)
         
+        self.memory_cache.invalidate(('adaptive', cache_key))
+        
         if success:
             self.logger.info(f"数据缓存成功: {symbol} -> {cache_key} (后端: {self.primary_backend})")
         else:
@@ -268,8 +309,18 @@ class AdaptiveCacheSystem:
         
         return cache_key
     
-    def load_data(self, cache_key: str) -> Optional[Any]:
-        """从缓存加载数据"""
+    def _memory_ttl(self, cache_data: Dict) -> float:
+        """L1条目的剩余TTL：与后端条目的有效期对齐"""
+        symbol = cache_data['metadata'].get('symbol', '')
+        data_type = cache_data['metadata'].get('data_type', 'stock_data')
+        ttl_seconds = self._get_ttl_seconds(symbol, data_type)
+        timestamp = cache_data.get('timestamp')
+        if not isinstance(timestamp, datetime):
+            return ttl_seconds
+        return ttl_seconds - (datetime.now() - timestamp).total_seconds()
+    
+    def _load_entry(self, cache_key: str) -> Optional[Dict]:
+        """从后端加载有效的缓存条目"""
         cache_data = None
         
         # 根据主要后端加载
@@ -298,15 +349,31 @@ class AdaptiveCacheSystem:
                 self.logger.debug(f"文件缓存已过期: {cache_key}")
                 return None
         
-        return cache_data['data']
+        return cache_data
+    
+    def load_data(self, cache_key: str) -> Optional[Any]:
+        """从缓存加载数据（优先读取进程内L1缓存）"""
+        cache_data = self.memory_cache.get_or_load(
+            ('adaptive', cache_key),
+            lambda: self._load_entry(cache_key),
+            ttl_seconds=self._memory_ttl)
+        
+        if not cache_data:
+            return None
+        
+        return detach(cache_data['data'])
     
     def find_cached_data(self, symbol: str, start_date: str = "", end_date: str = "", 
                         data_source: str = "default", data_type: str = "stock_data") -> Optional[str]:
         """查找缓存的数据"""
         cache_key = self._get_cache_key(symbol, start_date, end_date, data_source, data_type)
         
-        # 检查缓存是否存在且有效
-        if self.load_data(cache_key) is not None:
+        # 检查缓存是否存在且有效（同时预热L1缓存，不复制数据）
+        cache_data = self.memory_cache.get_or_load(
+            ('adaptive', cache_key),
+            lambda: self._load_entry(cache_key),
+            ttl_seconds=self._memory_ttl)
+        if cache_data and cache_data['data'] is not None:
             return cache_key
         
         return None
@@ -320,7 +387,10 @@ class AdaptiveCacheSystem:
             'mongodb_available': self.db_manager.is_mongodb_available(),
             'redis_available': self.db_manager.is_redis_available(),
             'file_cache_directory': str(self.cache_dir),
-            'file_cache_count': len(list(self.cache_dir.glob("*.pkl"))),
+            'file_cache_count': sum(len(list(self.cache_dir.glob(f"*{suffix}")))
+                                    for suffix in (CACHE_FILE_SUFFIX, LEGACY_FILE_SUFFIX)),
+            'codec': cache_codec.get_codec_info(),
+            'memory_cache': self.memory_cache.get_stats(),
         }
         
         # Redis统计
@@ -350,10 +420,11 @@ class AdaptiveCacheSystem:
         
         # 清理文件缓存
         cleared_files = 0
-        for cache_file in self.cache_dir.glob("*.pkl"):
+        cache_files = [f for suffix in (CACHE_FILE_SUFFIX, LEGACY_FILE_SUFFIX)
+                       for f in self.cache_dir.glob(f"*{suffix}")]
+        for cache_file in cache_files:
             try:
-                with open(cache_file, 'rb') as f:
-                    cache_data = pickle.load(f)
+                cache_data = self._read_file_entry(cache_file)
                 
                 symbol = cache_data['metadata'].get('symbol', '')
                 data_type = cache_data['metadata'].get('data_type', 'stock_data')
@@ -361,6 +432,7 @@ class AdaptiveCacheSystem:
                 
                 if not self._is_cache_valid(cache_data['timestamp'], ttl_seconds):
                     cache_file.unlink()
+                    self.memory_cache.invalidate(('adaptive', cache_file.stem))
                     cleared_files += 1
                     
             except Exception as e:
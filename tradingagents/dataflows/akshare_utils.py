@@ -9,6 +9,8 @@ from typing import Optional, Dict, Any
 import warnings
 from datetime import datetime
 
+from .memory_cache import get_memory_cache, detach
+
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
@@ -338,7 +340,17 @@ class AKShareProvider:
         if not self.connected:
             logger.error(f"❌ AKShare未连接，无法获取{symbol}财务数据")
             return {}
-        
+
+        # 财务报表在进程内复用，空结果不缓存
+        financial_data = get_memory_cache().get_or_load(
+            ('akshare_financial', symbol),
+            lambda: self._fetch_financial_data(symbol) or None,
+            cache_type='china_fundamentals',
+        )
+        return {key: detach(value) for key, value in (financial_data or {}).items()}
+
+    def _fetch_financial_data(self, symbol: str) -> Dict[str, Any]:
+        """从AKShare获取财务报表"""
         try:
             logger.info(f"🔍 开始获取{symbol}的AKShare财务数据")
             
@@ -552,6 +564,17 @@ def get_stock_news_em(symbol: str, max_news: int = 10) -> pd.DataFrame:
     Returns:
         pd.DataFrame: 包含新闻标题、内容、日期和链接的DataFrame
     """
+    # 同一股票的新闻在进程内复用（批量预取与分析师工具调用共享结果），空结果不缓存
+    news_df = get_memory_cache().get_or_load(
+        ('stock_news_em', symbol, max_news),
+        lambda: _fetch_stock_news_em(symbol, max_news),
+        cache_type='china_news',
+    )
+    return detach(news_df) if news_df is not None else pd.DataFrame()
+
+
+def _fetch_stock_news_em(symbol: str, max_news: int) -> Optional[pd.DataFrame]:
+    """调用AKShare获取东方财富个股新闻，失败或无数据时返回None"""
     start_time = datetime.now()
     logger.info(f"[东方财富新闻] 开始获取股票 {symbol} 的东方财富新闻数据")
     
@@ -559,7 +582,7 @@ def get_stock_news_em(symbol: str, max_news: int = 10) -> pd.DataFrame:
         provider = get_akshare_provider()
         if not provider.connected:
             logger.error(f"[东方财富新闻] ❌ AKShare未连接，无法获取东方财富新闻")
-            return pd.DataFrame()
+            return None
 
         logger.info(f"[东方财富新闻] 📰 准备调用AKShare API获取个股新闻: {symbol}")
 
@@ -623,9 +646,9 @@ def get_stock_news_em(symbol: str, max_news: int = 10) -> pd.DataFrame:
         else:
             elapsed_time = (datetime.now() - start_time).total_seconds()
             logger.warning(f"[东方财富新闻] ⚠️ 数据为空: {symbol}，API返回成功但无数据，耗时: {elapsed_time:.2f}秒")
-            return pd.DataFrame()
+            return None
 
     except Exception as e:
         elapsed_time = (datetime.now() - start_time).total_seconds()
         logger.error(f"[东方财富新闻] ❌ 获取失败: {symbol}, 错误: {e}, 耗时: {elapsed_time:.2f}秒")
-        return pd.DataFrame()
+        return None
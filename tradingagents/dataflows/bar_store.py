@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+日期区间感知的K线缓存
+按 数据源/股票代码/年份 分区的列式存储（Parquet），
+任意子区间直接从本地数据返回，只向数据源补齐缺失的首尾区间
+"""
+
+import json
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+from . import cache_codec
+
+# Parquet 依赖 pyarrow，不可用时退化为 cache_codec 压缩文件
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+    logger.warning("⚠️ pyarrow 未安装，K线缓存将使用npz压缩格式存储")
+
+# 旧版 pickle 分区后缀，仍可读取，合并写入时迁移为当前格式
+_LEGACY_SUFFIX = ".pkl"
+
+
+# 内部日期键列名
+_DATE_KEY = "__bar_date__"
+
+# 可识别的日期列名（按优先级）
+_DATE_COLUMNS = ('date', 'trade_date', '日期', 'Date', 'datetime')
+
+# 无交易日历时，空结果仍视为已覆盖的最大区间长度（天），用于跳过工作日节假日
+_EMPTY_GAP_MAX_DAYS = 4
+
+# 数据获取函数：fetcher(symbol, start_date, end_date) -> DataFrame，日期为闭区间 YYYY-MM-DD
+BarFetcher = Callable[[str, str, str], Optional[pd.DataFrame]]
+
+# 交易日历：trading_days(start_date, end_date) -> 闭区间内的交易日列表，无法获取时返回None
+TradingCalendar = Callable[[str, str], Optional[List[str]]]
+
+
+def _to_date(value) -> date:
+    """将字符串/日期转换为 date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return pd.to_datetime(str(value)).date()
+
+
+def _merge_intervals(intervals: List[Tuple[date, date]]) -> List[Tuple[date, date]]:
+    """合并重叠或相邻的日期区间"""
+    merged: List[Tuple[date, date]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _subtract_intervals(start: date, end: date,
+                        covered: List[Tuple[date, date]]) -> List[Tuple[date, date]]:
+    """计算 [start, end] 中未被 covered 覆盖的区间"""
+    gaps = []
+    cursor = start
+    for cov_start, cov_end in covered:
+        if cov_end < cursor:
+            continue
+        if cov_start > end:
+            break
+        if cov_start > cursor:
+            gaps.append((cursor, min(end, cov_start - timedelta(days=1))))
+        cursor = max(cursor, cov_end + timedelta(days=1))
+        if cursor > end:
+            break
+    if cursor <= end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+class OHLCVBarStore:
+    """按股票分区的K线列式存储，支持子区间命中和缺口补齐"""
+
+    def __init__(self, store_dir: str = None):
+        """
+        初始化K线存储
+
+        Args:
+            store_dir: 存储目录，默认为 tradingagents/dataflows/data_cache/bars
+        """
+        if store_dir is None:
+            store_dir = Path(__file__).parent / "data_cache" / "bars"
+
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.file_format = "parquet" if PARQUET_AVAILABLE else "tac"
+
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+        logger.info(f"📁 K线缓存初始化完成，存储目录: {self.store_dir} (格式: {self.file_format})")
+
+    # ------------------------------------------------------------------
+    # 路径与元数据
+    # ------------------------------------------------------------------
+
+    def _get_lock(self, source: str, symbol: str) -> threading.Lock:
+        """获取 (数据源, 股票) 级别的锁"""
+        with self._locks_guard:
+            return self._locks.setdefault((source, symbol), threading.Lock())
+
+    def _symbol_dir(self, source: str, symbol: str) -> Path:
+        """股票分区目录"""
+        safe_symbol = str(symbol).replace('/', '_').replace('\\', '_')
+        return self.store_dir / source / safe_symbol
+
+    def _partition_path(self, source: str, symbol: str, year: int) -> Path:
+        """年份分区文件路径"""
+        return self._symbol_dir(source, symbol) / f"{year}.{self.file_format}"
+
+    def _load_meta(self, source: str, symbol: str) -> Dict:
+        """加载股票分区的覆盖区间元数据"""
+        meta_path = self._symbol_dir(source, symbol) / "_coverage.json"
+        if not meta_path.exists():
+            return {'intervals': [], 'live_until': None, 'date_column': None, 'date_index': False}
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ 加载K线覆盖元数据失败 {source}/{symbol}: {e}")
+            return {'intervals': [], 'live_until': None, 'date_column': None, 'date_index': False}
+
+    def _save_meta(self, source: str, symbol: str, meta: Dict):
+        """保存股票分区的覆盖区间元数据"""
+        symbol_dir = self._symbol_dir(source, symbol)
+        symbol_dir.mkdir(parents=True, exist_ok=True)
+        meta['updated_at'] = datetime.now().isoformat()
+        tmp_path = symbol_dir / "_coverage.json.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        tmp_path.replace(symbol_dir / "_coverage.json")
+
+    def _covered_intervals(self, meta: Dict) -> List[Tuple[date, date]]:
+        """
+        返回当前有效的覆盖区间
+
+        包含今天的区间只在 live_until 之前有效，过期后截断到昨天，
+        以便重新获取盘中尚未收盘的最新K线。
+        """
+        today = date.today()
+        live_until = meta.get('live_until')
+        live_valid = bool(live_until) and datetime.now() < datetime.fromisoformat(live_until)
+
+        intervals = []
+        for start_str, end_str in meta.get('intervals', []):
+            start, end = _to_date(start_str), _to_date(end_str)
+            if end >= today and not live_valid:
+                end = today - timedelta(days=1)
+            if start <= end:
+                intervals.append((start, end))
+        return _merge_intervals(intervals)
+
+    # ------------------------------------------------------------------
+    # 分区读写
+    # ------------------------------------------------------------------
+
+    def _existing_partition(self, source: str, symbol: str, year: int) -> Optional[Path]:
+        """已存在的年份分区文件（当前格式优先，其次旧版pickle）"""
+        path = self._partition_path(source, symbol, year)
+        if path.exists():
+            return path
+        legacy_path = path.with_suffix(_LEGACY_SUFFIX)
+        return legacy_path if legacy_path.exists() else None
+
+    def _read_partition(self, path: Path) -> pd.DataFrame:
+        """读取单个年份分区"""
+        if path.suffix == ".parquet":
+            return pd.read_parquet(path)
+        if path.suffix == _LEGACY_SUFFIX:
+            return pd.read_pickle(path)
+        return cache_codec.read_file(path)[0]
+
+    def _write_partition(self, path: Path, data: pd.DataFrame):
+        """原子写入单个年份分区"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        if self.file_format == "parquet":
+            data.to_parquet(tmp_path, index=False)
+        else:
+            with open(tmp_path, 'wb') as f:
+                f.write(cache_codec.dumps(data))
+        tmp_path.replace(path)
+
+    @staticmethod
+    def _normalize_frame(data: pd.DataFrame, meta: Dict) -> pd.DataFrame:
+        """为数据添加内部日期键列，记录原始日期列/索引形态"""
+        frame = data.copy()
+        date_column = meta.get('date_column')
+
+        if isinstance(frame.index, pd.DatetimeIndex):
+            if frame.index.tz is not None:
+                frame.index = frame.index.tz_localize(None)
+            date_column = frame.index.name or 'Date'
+            frame.index.name = date_column
+            frame = frame.reset_index()
+            meta['date_index'] = True
+        else:
+            if date_column not in frame.columns:
+                date_column = next((col for col in _DATE_COLUMNS if col in frame.columns), None)
+            if date_column is None:
+                raise ValueError(f"无法识别K线数据的日期列: {list(frame.columns)}")
+            frame = frame.reset_index(drop=True)
+
+        meta['date_column'] = date_column
+        frame[_DATE_KEY] = pd.to_datetime(frame[date_column].astype(str)).dt.normalize()
+        return frame
+
+    def _write_bars(self, source: str, symbol: str, frame: pd.DataFrame):
+        """按年份合并写入K线（调用方持有锁）"""
+        for year, year_frame in frame.groupby(frame[_DATE_KEY].dt.year):
+            path = self._partition_path(source, symbol, int(year))
+            existing_path = self._existing_partition(source, symbol, int(year))
+            if existing_path is not None:
+                existing = self._read_partition(existing_path)
+                year_frame = pd.concat([existing, year_frame], ignore_index=True)
+            year_frame = (year_frame.drop_duplicates(subset=[_DATE_KEY], keep='last')
+                          .sort_values(_DATE_KEY)
+                          .reset_index(drop=True))
+            self._write_partition(path, year_frame)
+            if existing_path is not None and existing_path != path:
+                existing_path.unlink()
+
+    def _read_bars(self, source: str, symbol: str, start: date, end: date, meta: Dict) -> pd.DataFrame:
+        """读取 [start, end] 范围内的K线（调用方持有锁）"""
+        frames = []
+        for year in range(start.year, end.year + 1):
+            path = self._existing_partition(source, symbol, year)
+            if path is not None:
+                frames.append(self._read_partition(path))
+        if not frames:
+            return pd.DataFrame()
+
+        data = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        mask = (data[_DATE_KEY] >= pd.Timestamp(start)) & (data[_DATE_KEY] <= pd.Timestamp(end))
+        data = data.loc[mask].sort_values(_DATE_KEY).drop(columns=[_DATE_KEY])
+
+        if meta.get('date_index') and meta.get('date_column') in data.columns:
+            data = data.set_index(meta['date_column'])
+        else:
+            data = data.reset_index(drop=True)
+        return data
+
+    # ------------------------------------------------------------------
+    # 公共接口
+    # ------------------------------------------------------------------
+
+    def missing_ranges(self, source: str, symbol: str,
+                       start_date: str, end_date: str) -> List[Tuple[str, str]]:
+        """返回 [start_date, end_date] 中本地尚未覆盖的区间"""
+        meta = self._load_meta(source, symbol)
+        gaps = _subtract_intervals(_to_date(start_date), _to_date(end_date),
+                                   self._covered_intervals(meta))
+        return [(a.isoformat(), b.isoformat()) for a, b in gaps]
+
+    def put_bars(self, source: str, symbol: str, data: pd.DataFrame,
+                 start_date: str = None, end_date: str = None, ttl_hours: float = 1):
+        """
+        写入K线并登记覆盖区间
+
+        Args:
+            source: 数据源标识（不同数据源的列结构不同，分别存储）
+            symbol: 股票代码
+            data: K线数据，需包含日期列或日期索引
+            start_date: 覆盖区间起点，默认取数据最早日期
+            end_date: 覆盖区间终点，默认取数据最晚日期
+            ttl_hours: 包含今天的区间的有效时长（小时）
+        """
+        if data is None or data.empty:
+            return
+        with self._get_lock(source, symbol):
+            meta = self._load_meta(source, symbol)
+            frame = self._normalize_frame(data, meta)
+            self._write_bars(source, symbol, frame)
+            start = _to_date(start_date) if start_date else frame[_DATE_KEY].min().date()
+            end = _to_date(end_date) if end_date else frame[_DATE_KEY].max().date()
+            self._add_coverage(meta, start, end, ttl_hours)
+            self._save_meta(source, symbol, meta)
+
+    def mark_covered(self, source: str, symbol: str, start_date: str, end_date: str, ttl_hours: float = 1):
+        """只登记覆盖区间，不写入K线（用于记录区间内确实没有数据）"""
+        with self._get_lock(source, symbol):
+            meta = self._load_meta(source, symbol)
+            self._add_coverage(meta, _to_date(start_date), _to_date(end_date), ttl_hours)
+            self._save_meta(source, symbol, meta)
+
+    def _add_coverage(self, meta: Dict, start: date, end: date, ttl_hours: float):
+        """登记覆盖区间，包含今天时刷新 live_until"""
+        intervals = [(_to_date(a), _to_date(b)) for a, b in meta.get('intervals', [])]
+        intervals.append((start, end))
+        meta['intervals'] = [[a.isoformat(), b.isoformat()] for a, b in _merge_intervals(intervals)]
+        if end >= date.today():
+            meta['live_until'] = (datetime.now() + timedelta(hours=ttl_hours)).isoformat()
+
+    @staticmethod
+    def _no_trading_days(start: date, end: date, trading_days: Optional[TradingCalendar]) -> bool:
+        """
+        判断 [start, end] 内是否没有交易日（数据源返回空结果时可登记为已覆盖）
+
+        优先使用交易日历；日历不可用时按工作日估算，不含工作日的区间（周末）
+        或今天之前的短区间（节假日）视为无交易日。
+        """
+        if start > end:
+            return True
+        if trading_days is not None:
+            try:
+                days = trading_days(start.isoformat(), end.isoformat())
+            except Exception as e:
+                logger.debug(f"🔍 交易日历获取失败 {start}~{end}: {e}")
+                days = None
+            if days is not None:
+                return len(days) == 0
+        if len(pd.bdate_range(start, end)) == 0:
+            return True
+        return (end - start).days < _EMPTY_GAP_MAX_DAYS and end < date.today()
+
+    def get_bars(self, source: str, symbol: str, start_date: str, end_date: str,
+                 fetcher: BarFetcher, ttl_hours: float = 1,
+                 trading_days: Optional[TradingCalendar] = None) -> pd.DataFrame:
+        """
+        获取K线数据：本地覆盖部分直接读取，只对缺失区间调用 fetcher
+
+        Args:
+            source: 数据源标识
+            symbol: 股票代码
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+            fetcher: 缺口数据获取函数 fetcher(symbol, gap_start, gap_end)
+            ttl_hours: 包含今天的区间的有效时长（小时）
+            trading_days: 交易日历，用于判断无数据的区间是否为休市日
+
+        Returns:
+            DataFrame: [start_date, end_date] 范围内的K线，获取失败时为空
+        """
+        start, end = _to_date(start_date), _to_date(end_date)
+        if start > end:
+            return pd.DataFrame()
+
+        with self._get_lock(source, symbol):
+            meta = self._load_meta(source, symbol)
+            gaps = _subtract_intervals(start, end, self._covered_intervals(meta))
+
+            if not gaps:
+                logger.info(f"⚡ K线缓存完全命中: {source}/{symbol} ({start_date} 到 {end_date})")
+            else:
+                logger.info(f"🌐 K线缓存缺口: {source}/{symbol} -> {[(a.isoformat(), b.isoformat()) for a, b in gaps]}")
+
+            for gap_start, gap_end in gaps:
+                try:
+                    fetched = fetcher(symbol, gap_start.isoformat(), gap_end.isoformat())
+                except Exception as e:
+                    logger.warning(f"⚠️ K线缺口获取失败 {source}/{symbol} {gap_start}~{gap_end}: {e}")
+                    continue
+
+                if fetched is None or not isinstance(fetched, pd.DataFrame):
+                    continue
+
+                if fetched.empty:
+                    # 区间内没有交易日（周末/长假）时登记为已覆盖，避免重复请求
+                    if self._no_trading_days(gap_start, gap_end, trading_days):
+                        self._add_coverage(meta, gap_start, gap_end, ttl_hours)
+                    continue
+
+                frame = self._normalize_frame(fetched, meta)
+                in_gap = ((frame[_DATE_KEY] >= pd.Timestamp(gap_start)) &
+                          (frame[_DATE_KEY] <= pd.Timestamp(gap_end)))
+                frame = frame.loc[in_gap]
+                if frame.empty:
+                    logger.warning(f"⚠️ 数据源返回的K线不在请求区间内: {source}/{symbol} {gap_start}~{gap_end}")
+                    continue
+
+                self._write_bars(source, symbol, frame)
+
+                # 只登记实际返回的日期范围；首尾无数据的部分没有交易日时才一并登记，
+                # 今天尚未发布的K线由 live_until 有效期控制重新获取
+                covered_start = frame[_DATE_KEY].min().date()
+                covered_end = frame[_DATE_KEY].max().date()
+                if self._no_trading_days(gap_start, covered_start - timedelta(days=1), trading_days):
+                    covered_start = gap_start
+                yesterday = date.today() - timedelta(days=1)
+                if self._no_trading_days(covered_end + timedelta(days=1), min(gap_end, yesterday), trading_days):
+                    covered_end = gap_end
+                self._add_coverage(meta, covered_start, covered_end, ttl_hours)
+
+            if gaps:
+                self._save_meta(source, symbol, meta)
+
+            return self._read_bars(source, symbol, start, end, meta)
+
+    def clear(self, source: str = None, symbol: str = None):
+        """清除指定数据源/股票（或全部）的K线缓存"""
+        import shutil
+
+        if symbol:
+            sources = [source] if source else [p.name for p in self.store_dir.iterdir() if p.is_dir()]
+            targets = [self._symbol_dir(src, symbol) for src in sources]
+        elif source:
+            targets = [self.store_dir / source]
+        else:
+            targets = [self.store_dir]
+
+        for target in targets:
+            if target.exists():
+                shutil.rmtree(target, ignore_errors=True)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+
+
+# 全局K线存储实例
+_bar_store = None
+
+def get_bar_store() -> OHLCVBarStore:
+    """获取全局K线存储实例"""
+    global _bar_store
+    if _bar_store is None:
+        _bar_store = OHLCVBarStore()
+    return _bar_store
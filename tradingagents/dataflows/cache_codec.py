@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+缓存序列化编解码
+所有缓存管理器（文件缓存、自适应缓存、MongoDB/Redis缓存、K线缓存）统一使用的二进制格式：
+- DataFrame：Arrow IPC（zstd压缩，需要pyarrow），不可用时使用压缩的NumPy数组（npz），均保留列类型和索引
+- 文本报告/JSON：zstd > lz4 > zlib 压缩
+- 编码结果自描述（魔数 + JSON头 + 数据），读取时按头部选择编解码器，未带魔数的数据由调用方按旧格式读取
+
+可通过 register_frame_codec / register_compressor 注册新的编解码器，
+环境变量 TRADINGAGENTS_CACHE_FRAME_CODEC / TRADINGAGENTS_CACHE_TEXT_CODEC 指定首选编解码器。
+"""
+
+import io
+import json
+import os
+import struct
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc  # noqa: F401
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    import lz4.frame
+    LZ4_AVAILABLE = True
+except ImportError:
+    LZ4_AVAILABLE = False
+
+
+_MAGIC = b"TACODEC1"
+_HEADER_LEN = struct.Struct('>I')
+
+KIND_FRAME = 'frame'
+KIND_TEXT = 'text'
+KIND_JSON = 'json'
+KIND_BYTES = 'bytes'
+
+
+class CacheCodecError(ValueError):
+    """数据无法编码或解码"""
+
+
+# ----------------------------------------------------------------------
+# DataFrame 编解码器
+# ----------------------------------------------------------------------
+
+class ArrowFrameCodec:
+    """Arrow IPC 文件格式（zstd压缩），读取时零拷贝反序列化"""
+
+    name = 'arrow'
+    available = ARROW_AVAILABLE
+
+    def encode(self, frame: pd.DataFrame) -> bytes:
+        if not all(isinstance(col, str) for col in frame.columns):
+            # Arrow 会把非字符串列名转成字符串，无法还原
+            raise TypeError("Arrow 编码要求列名为字符串")
+        table = pa.Table.from_pandas(frame, preserve_index=True)
+        sink = pa.BufferOutputStream()
+        options = pa.ipc.IpcWriteOptions(compression='zstd')
+        with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    def decode(self, payload: bytes) -> pd.DataFrame:
+        return pa.ipc.open_file(pa.py_buffer(payload)).read_all().to_pandas()
+
+
+class NumpyFrameCodec:
+    """压缩的NumPy数组（npz），数值/布尔/日期列按原类型保存，其余列以JSON保存；读取时不启用pickle"""
+
+    name = 'npz'
+    available = True
+
+    def encode(self, frame: pd.DataFrame) -> bytes:
+        if isinstance(frame.index, pd.MultiIndex) or isinstance(frame.columns, pd.MultiIndex):
+            raise CacheCodecError("npz 编码不支持多级索引")
+
+        arrays, specs = {}, []
+        index = frame.index
+        if isinstance(index, pd.RangeIndex):
+            index_spec = {'range': [index.start, index.stop, index.step], 'label': index.name}
+        else:
+            index_spec = self._encode_column('index', index.to_series(), arrays)
+            index_spec['label'] = index.name
+        for i, label in enumerate(frame.columns):
+            spec = self._encode_column(f'c{i}', frame.iloc[:, i], arrays)
+            spec['label'] = label
+            specs.append(spec)
+
+        schema = json.dumps({'index': index_spec, 'columns': specs}, ensure_ascii=False, default=str)
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, __schema__=np.frombuffer(schema.encode('utf-8'), dtype=np.uint8), **arrays)
+        return buffer.getvalue()
+
+    @staticmethod
+    def _encode_column(key: str, series: pd.Series, arrays: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        spec = {'key': key, 'dtype': str(series.dtype)}
+        if isinstance(series.dtype, pd.DatetimeTZDtype):
+            arrays[key] = series.dt.tz_convert('UTC').dt.tz_localize(None).to_numpy('datetime64[ns]')
+            spec['tz'] = str(series.dt.tz)
+        elif isinstance(series.dtype, np.dtype) and series.dtype.kind in 'biufcmM':
+            arrays[key] = series.to_numpy()
+        else:
+            values = series.astype(object).where(series.notna(), None).tolist()
+            spec['values'] = json.loads(json.dumps(values, ensure_ascii=False, default=str))
+        return spec
+
+    @staticmethod
+    def _decode_column(spec: Dict[str, Any], npz):
+        if 'values' in spec:
+            values = pd.Series(spec['values'], dtype=object)
+            return values.to_numpy() if spec['dtype'] == 'object' else values.astype(spec['dtype']).array
+        values = npz[spec['key']]
+        if 'tz' in spec:
+            return pd.DatetimeIndex(values).tz_localize('UTC').tz_convert(spec['tz']).array
+        return values
+
+    def decode(self, payload: bytes) -> pd.DataFrame:
+        with np.load(io.BytesIO(payload), allow_pickle=False) as npz:
+            schema = json.loads(npz['__schema__'].tobytes().decode('utf-8'))
+            index_spec = schema['index']
+            if 'range' in index_spec:
+                index = pd.RangeIndex(*index_spec['range'], name=index_spec['label'])
+            else:
+                index = pd.Index(self._decode_column(index_spec, npz), name=index_spec['label'])
+            columns = [self._decode_column(spec, npz) for spec in schema['columns']]
+
+        frame = pd.DataFrame(dict(enumerate(columns)), index=index)
+        frame.columns = [spec['label'] for spec in schema['columns']]
+        return frame
+
+
+# ----------------------------------------------------------------------
+# 字节压缩器（文本报告、JSON）
+# ----------------------------------------------------------------------
+
+class ZstdCompressor:
+    name = 'zstd'
+    available = ZSTD_AVAILABLE
+
+    def compress(self, data: bytes) -> bytes:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zstandard.ZstdDecompressor().decompress(data)
+
+
+class Lz4Compressor:
+    name = 'lz4'
+    available = LZ4_AVAILABLE
+
+    def compress(self, data: bytes) -> bytes:
+        return lz4.frame.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return lz4.frame.decompress(data)
+
+
+class ZlibCompressor:
+    name = 'zlib'
+    available = True
+
+    def compress(self, data: bytes) -> bytes:
+        return zlib.compress(data, 6)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompress(data)
+
+
+_FRAME_CODECS: Dict[str, Any] = {}
+_COMPRESSORS: Dict[str, Any] = {}
+
+
+def register_frame_codec(codec):
+    """注册DataFrame编解码器（需要 name/available/encode/decode）"""
+    _FRAME_CODECS[codec.name] = codec
+
+
+def register_compressor(compressor):
+    """注册字节压缩器（需要 name/available/compress/decompress）"""
+    _COMPRESSORS[compressor.name] = compressor
+
+
+for _codec in (ArrowFrameCodec(), NumpyFrameCodec()):
+    register_frame_codec(_codec)
+for _compressor in (ZstdCompressor(), Lz4Compressor(), ZlibCompressor()):
+    register_compressor(_compressor)
+
+
+def _preferred(registry: Dict[str, Any], env_name: str):
+    """按环境变量指定的名称或注册顺序选择第一个可用的编解码器"""
+    preferred = os.getenv(env_name, '').lower()
+    if preferred and preferred in registry and registry[preferred].available:
+        return registry[preferred]
+    return next(codec for codec in registry.values() if codec.available)
+
+
+def get_frame_codec():
+    """当前使用的DataFrame编解码器"""
+    return _preferred(_FRAME_CODECS, 'TRADINGAGENTS_CACHE_FRAME_CODEC')
+
+
+def get_compressor():
+    """当前使用的文本压缩器"""
+    return _preferred(_COMPRESSORS, 'TRADINGAGENTS_CACHE_TEXT_CODEC')
+
+
+# ----------------------------------------------------------------------
+# 公共接口
+# ----------------------------------------------------------------------
+
+def is_encoded(blob) -> bool:
+    """是否为本模块编码的数据（否则按旧格式读取）"""
+    return isinstance(blob, (bytes, bytearray, memoryview)) and bytes(blob[:len(_MAGIC)]) == _MAGIC
+
+
+def dumps(value: Any, meta: Optional[Dict[str, Any]] = None) -> bytes:
+    """
+    序列化缓存值
+
+    Args:
+        value: DataFrame、字符串、bytes 或可JSON序列化的对象
+        meta: 随数据保存的JSON元数据（如缓存时间、数据源）
+
+    Returns:
+        bytes: 自描述的二进制数据
+    """
+    if isinstance(value, pd.DataFrame):
+        codec = get_frame_codec()
+        kind = KIND_FRAME
+        try:
+            payload = codec.encode(value)
+        except Exception as e:
+            if codec.name == 'npz':
+                raise CacheCodecError(f"DataFrame编码失败: {e}") from e
+            # Arrow 无法处理的数据（如混合类型对象列、非字符串列名）改用 npz
+            logger.debug(f"{codec.name} 编码失败，改用npz: {e}")
+            codec = _FRAME_CODECS['npz']
+            try:
+                payload = codec.encode(value)
+            except Exception as npz_error:
+                raise CacheCodecError(f"DataFrame编码失败: {npz_error}") from npz_error
+    else:
+        codec = get_compressor()
+        if isinstance(value, str):
+            kind, raw = KIND_TEXT, value.encode('utf-8')
+        elif isinstance(value, (bytes, bytearray)):
+            kind, raw = KIND_BYTES, bytes(value)
+        else:
+            try:
+                kind, raw = KIND_JSON, json.dumps(value, ensure_ascii=False).encode('utf-8')
+            except (TypeError, ValueError) as e:
+                raise CacheCodecError(f"不支持缓存的数据类型: {type(value).__name__}") from e
+        payload = codec.compress(raw)
+
+    header = json.dumps({'kind': kind, 'codec': codec.name, 'meta': meta or {}},
+                        ensure_ascii=False, default=str).encode('utf-8')
+    return _MAGIC + _HEADER_LEN.pack(len(header)) + header + payload
+
+
+def loads(blob: bytes) -> Tuple[Any, Dict[str, Any]]:
+    """
+    反序列化缓存值
+
+    Returns:
+        (值, 元数据)
+
+    Raises:
+        CacheCodecError: 不是本模块编码的数据，或编解码器不可用
+    """
+    if not is_encoded(blob):
+        raise CacheCodecError("不是缓存编码数据")
+    blob = bytes(blob)
+    offset = len(_MAGIC)
+    (header_len,) = _HEADER_LEN.unpack_from(blob, offset)
+    offset += _HEADER_LEN.size
+    header = json.loads(blob[offset:offset + header_len].decode('utf-8'))
+    payload = blob[offset + header_len:]
+
+    kind, name = header['kind'], header['codec']
+    if kind == KIND_FRAME:
+        codec = _FRAME_CODECS.get(name)
+        if codec is None or not codec.available:
+            raise CacheCodecError(f"DataFrame编解码器不可用: {name}")
+        return codec.decode(payload), header.get('meta', {})
+
+    compressor = _COMPRESSORS.get(name)
+    if compressor is None or not compressor.available:
+        raise CacheCodecError(f"压缩器不可用: {name}")
+    raw = compressor.decompress(payload)
+    if kind == KIND_TEXT:
+        value = raw.decode('utf-8')
+    elif kind == KIND_JSON:
+        value = json.loads(raw.decode('utf-8'))
+    else:
+        value = raw
+    return value, header.get('meta', {})
+
+
+def write_file(path, value: Any, meta: Optional[Dict[str, Any]] = None):
+    """原子写入编码后的缓存文件"""
+    from pathlib import Path
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(dumps(value, meta))
+    tmp_path.replace(path)
+
+
+def read_file(path) -> Tuple[Any, Dict[str, Any]]:
+    """读取编码后的缓存文件"""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def get_codec_info() -> Dict[str, Any]:
+    """当前编解码器配置"""
+    return {
+        'frame_codec': get_frame_codec().name,
+        'text_codec': get_compressor().name,
+        'available_frame_codecs': [name for name, codec in _FRAME_CODECS.items() if codec.available],
+        'available_text_codecs': [name for name, codec in _COMPRESSORS.items() if codec.available],
+    }
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+缓存元数据索引
+使用SQLite单文件索引替代每个缓存键一个 *_meta.json 的元数据存储，
+查找、TTL校验、统计和过期清理均通过索引查询完成
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+# 索引中独立成列的元数据字段，其余字段保存在 metadata JSON 中
+_INDEXED_FIELDS = ('symbol', 'data_type', 'market_type', 'data_source',
+                   'start_date', 'end_date', 'file_path', 'file_format',
+                   'content_length')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    cache_key TEXT PRIMARY KEY,
+    symbol TEXT,
+    data_type TEXT,
+    market_type TEXT,
+    data_source TEXT,
+    start_date TEXT,
+    end_date TEXT,
+    cached_at REAL NOT NULL,
+    file_path TEXT,
+    file_format TEXT,
+    content_length INTEGER,
+    file_size INTEGER,
+    metadata TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cache_lookup
+    ON cache_entries (symbol, data_type, market_type, data_source, cached_at);
+CREATE INDEX IF NOT EXISTS idx_cache_cached_at
+    ON cache_entries (cached_at);
+CREATE TABLE IF NOT EXISTS index_info (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _to_timestamp(cached_at: Any) -> float:
+    """将 cached_at（ISO字符串或datetime）转换为时间戳"""
+    if isinstance(cached_at, datetime):
+        return cached_at.timestamp()
+    if isinstance(cached_at, str) and cached_at:
+        return datetime.fromisoformat(cached_at).timestamp()
+    return datetime.now().timestamp()
+
+
+class CacheMetadataIndex:
+    """基于SQLite的缓存元数据索引"""
+
+    def __init__(self, db_path: Path):
+        """
+        初始化元数据索引
+
+        Args:
+            db_path: SQLite索引文件路径
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+
+        # 多线程共享一个连接（由锁串行化），多进程通过SQLite文件锁协调
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30,
+                                     check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            try:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            except sqlite3.DatabaseError as e:
+                logger.debug(f"SQLite WAL模式不可用，使用默认日志模式: {e}")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # 基本读写
+    # ------------------------------------------------------------------
+
+    def upsert(self, cache_key: str, metadata: Dict[str, Any]):
+        """写入或覆盖一条元数据"""
+        metadata = dict(metadata)
+        metadata.setdefault('cached_at', datetime.now().isoformat())
+
+        file_size = None
+        file_path = metadata.get('file_path')
+        if file_path:
+            try:
+                file_size = Path(file_path).stat().st_size
+            except OSError:
+                file_size = None
+
+        row = {field: metadata.get(field) for field in _INDEXED_FIELDS}
+        row.update({
+            'cache_key': cache_key,
+            'cached_at': _to_timestamp(metadata['cached_at']),
+            'file_size': file_size,
+            'metadata': json.dumps(metadata, ensure_ascii=False, default=str),
+        })
+
+        columns = ', '.join(row.keys())
+        placeholders = ', '.join(f":{name}" for name in row.keys())
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO cache_entries ({columns}) VALUES ({placeholders})",
+                row)
+            self._conn.commit()
+
+    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """按缓存键读取元数据"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT metadata FROM cache_entries WHERE cache_key = ?",
+                (cache_key,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row['metadata'])
+
+    def delete(self, cache_keys: List[str]) -> int:
+        """删除一组缓存键的元数据"""
+        if not cache_keys:
+            return 0
+        with self._lock:
+            cursor = self._conn.executemany(
+                "DELETE FROM cache_entries WHERE cache_key = ?",
+                [(key,) for key in cache_keys])
+            self._conn.commit()
+            return cursor.rowcount
+
+    # ------------------------------------------------------------------
+    # 索引查询
+    # ------------------------------------------------------------------
+
+    def find_latest(self, symbol: str, data_type: str, market_type: str = None,
+                    data_source: str = None, min_cached_at: datetime = None,
+                    start_date: str = None, end_date: str = None) -> Optional[str]:
+        """
+        查找满足条件且最新的缓存键
+
+        Args:
+            symbol: 股票代码
+            data_type: 数据类型（stock_data/news/fundamentals）
+            market_type: 市场类型，None表示不限制
+            data_source: 数据源，None表示不限制
+            min_cached_at: 最早缓存时间（用于TTL过滤），None表示不限制
+            start_date: 开始日期，None表示不限制
+            end_date: 结束日期，None表示不限制
+
+        Returns:
+            缓存键或None
+        """
+        conditions = ["symbol = ?", "data_type = ?"]
+        params: List[Any] = [symbol, data_type]
+        for column, value in (('market_type', market_type),
+                              ('data_source', data_source),
+                              ('start_date', start_date),
+                              ('end_date', end_date)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if min_cached_at is not None:
+            conditions.append("cached_at >= ?")
+            params.append(min_cached_at.timestamp())
+
+        sql = ("SELECT cache_key FROM cache_entries WHERE "
+               + " AND ".join(conditions)
+               + " ORDER BY cached_at DESC LIMIT 1")
+        with self._lock:
+            row = self._conn.execute(sql, params).fetchone()
+        return row['cache_key'] if row else None
+
+    def list_entries(self, data_type: str = None, limit: int = None) -> List[Dict[str, Any]]:
+        """按缓存时间倒序列出元数据"""
+        sql = "SELECT metadata FROM cache_entries"
+        params: List[Any] = []
+        if data_type is not None:
+            sql += " WHERE data_type = ?"
+            params.append(data_type)
+        sql += " ORDER BY cached_at DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(row['metadata']) for row in rows]
+
+    def find_expired(self, cutoff: datetime) -> List[Tuple[str, Optional[str]]]:
+        """返回缓存时间早于 cutoff 的 (cache_key, file_path) 列表"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT cache_key, file_path FROM cache_entries WHERE cached_at < ?",
+                (cutoff.timestamp(),)).fetchall()
+        return [(row['cache_key'], row['file_path']) for row in rows]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """按数据类型聚合条目数量和文件大小"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data_type, COUNT(*) AS entry_count, "
+                "COALESCE(SUM(file_size), 0) AS total_size, "
+                "SUM(CASE WHEN file_size IS NULL THEN 1 ELSE 0 END) AS missing_count "
+                "FROM cache_entries GROUP BY data_type").fetchall()
+        return {
+            row['data_type'] or 'unknown': {
+                'count': row['entry_count'],
+                'total_size': row['total_size'],
+                'missing_count': row['missing_count'],
+            }
+            for row in rows
+        }
+
+    # ------------------------------------------------------------------
+    # 旧格式迁移
+    # ------------------------------------------------------------------
+
+    def import_legacy_file(self, metadata_file: Path) -> bool:
+        """导入单个旧版 *_meta.json 文件，成功后删除该文件"""
+        try:
+            with open(metadata_file, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+            cache_key = metadata_file.stem[:-len('_meta')] if metadata_file.stem.endswith('_meta') \
+                else metadata_file.stem
+            self.upsert(cache_key, metadata)
+            metadata_file.unlink()
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ 迁移元数据文件失败 {metadata_file.name}: {e}")
+            return False
+
+    def migrate_legacy_metadata(self, metadata_dir: Path) -> int:
+        """将旧版元数据目录中的 *_meta.json 全部导入索引"""
+        migrated = 0
+        for metadata_file in Path(metadata_dir).glob("*_meta.json"):
+            if self.import_legacy_file(metadata_file):
+                migrated += 1
+
+        if migrated:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO index_info (key, value) VALUES ('legacy_migrated_at', ?)",
+                    (datetime.now().isoformat(),))
+                self._conn.commit()
+            logger.info(f"📦 已将 {migrated} 个旧版元数据文件迁移到索引: {self.db_path}")
+        return migrated
+
+    def close(self):
+        """关闭索引连接"""
+        with self._lock:
+            self._conn.close()
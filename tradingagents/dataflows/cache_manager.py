@@ -5,7 +5,6 @@
 """
 
 import os
-import json
 import pickle
 import pandas as pd
 from datetime import datetime, timedelta
@@ -13,6 +12,10 @@ from pathlib import Path
 from typing import Optional, Dict, Any, Union, List
 import hashlib
 
+from . import cache_codec
+from .cache_index import CacheMetadataIndex
+from .memory_cache import get_memory_cache, detach
+
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
@@ -21,6 +24,9 @@ logger = get_logger('agents')
 class StockDataCache:
     """股票数据缓存管理器 - 支持美股和A股数据缓存优化"""
 
+    # 缓存文件格式（cache_codec 编码），旧版 csv/txt 缓存仍可读取
+    CODEC_SUFFIX = "tac"
+
     def __init__(self, cache_dir: str = None):
         """
         初始化缓存管理器
@@ -51,6 +57,10 @@ class StockDataCache:
                         self.china_fundamentals_dir, self.metadata_dir]:
             dir_path.mkdir(exist_ok=True)
 
+        # 元数据索引（SQLite），替代逐个扫描 *_meta.json
+        self.metadata_index = CacheMetadataIndex(self.metadata_dir / "cache_index.sqlite3")
+        self.metadata_index.migrate_legacy_metadata(self.metadata_dir)
+
         # 缓存配置 - 针对不同市场设置不同的TTL
         self.cache_config = {
             'us_stock_data': {
@@ -85,6 +95,10 @@ class StockDataCache:
             }
         }
 
+        # 进程内L1缓存，TTL与上面的配置保持一致
+        self.memory_cache = get_memory_cache()
+        self.memory_cache.configure_ttl(self.cache_config)
+
         # 内容长度限制配置（文件缓存默认不限制）
         self.content_length_config = {
             'max_content_length': int(os.getenv('MAX_CACHE_CONTENT_LENGTH', '50000')),  # 50K字符
@@ -205,27 +219,24 @@ class StockDataCache:
         return base_dir / f"{cache_key}.{file_format}"
     
     def _get_metadata_path(self, cache_key: str) -> Path:
-        """获取元数据文件路径"""
+        """获取旧版元数据文件路径（仅用于迁移）"""
         return self.metadata_dir / f"{cache_key}_meta.json"
     
     def _save_metadata(self, cache_key: str, metadata: Dict[str, Any]):
-        """保存元数据"""
-        metadata_path = self._get_metadata_path(cache_key)
-        metadata_path.parent.mkdir(parents=True, exist_ok=True)  # 确保目录存在
+        """保存元数据到索引"""
         metadata['cached_at'] = datetime.now().isoformat()
-        
-        with open(metadata_path, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        self.metadata_index.upsert(cache_key, metadata)
     
     def _load_metadata(self, cache_key: str) -> Optional[Dict[str, Any]]:
-        """加载元数据"""
-        metadata_path = self._get_metadata_path(cache_key)
-        if not metadata_path.exists():
-            return None
-        
+        """从索引加载元数据"""
         try:
-            with open(metadata_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            metadata = self.metadata_index.get(cache_key)
+            if metadata is None:
+                # 兼容旧版进程刚写入的 *_meta.json
+                legacy_path = self._get_metadata_path(cache_key)
+                if legacy_path.exists() and self.metadata_index.import_legacy_file(legacy_path):
+                    metadata = self.metadata_index.get(cache_key)
+            return metadata
         except Exception as e:
             logger.error(f"⚠️ 加载元数据失败: {e}")
             return None
@@ -300,16 +311,11 @@ class StockDataCache:
                                            source=data_source,
                                            market=market_type)
 
-        # 保存数据
-        if isinstance(data, pd.DataFrame):
-            cache_path = self._get_cache_path("stock_data", cache_key, "csv", symbol)
-            cache_path.parent.mkdir(parents=True, exist_ok=True)  # 确保目录存在
-            data.to_csv(cache_path, index=True)
-        else:
-            cache_path = self._get_cache_path("stock_data", cache_key, "txt", symbol)
-            cache_path.parent.mkdir(parents=True, exist_ok=True)  # 确保目录存在
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                f.write(str(data))
+        # 保存数据（DataFrame 保留列类型和索引，文本压缩存储）
+        if not isinstance(data, pd.DataFrame):
+            data = str(data)
+        cache_path = self._get_cache_path("stock_data", cache_key, self.CODEC_SUFFIX, symbol)
+        cache_codec.write_file(cache_path, data)
 
         # 保存元数据
         metadata = {
@@ -320,10 +326,11 @@ class StockDataCache:
             'end_date': end_date,
             'data_source': data_source,
             'file_path': str(cache_path),
-            'file_format': 'csv' if isinstance(data, pd.DataFrame) else 'txt',
+            'file_format': self.CODEC_SUFFIX,
             'content_length': len(content_to_check)
         }
         self._save_metadata(cache_key, metadata)
+        self.memory_cache.invalidate(self._memory_key(cache_key))
 
         # 获取描述信息
         cache_type = f"{market_type}_stock_data"
@@ -331,8 +338,30 @@ class StockDataCache:
         logger.info(f"💾 {desc}已缓存: {symbol} ({data_source}) -> {cache_key}")
         return cache_key
     
-    def load_stock_data(self, cache_key: str) -> Optional[Union[pd.DataFrame, str]]:
-        """从缓存加载股票数据"""
+    def _memory_key(self, cache_key: str) -> tuple:
+        """L1缓存键（按缓存目录区分不同实例）"""
+        return ('file', str(self.cache_dir), cache_key)
+
+    def _memory_ttl(self, entry: tuple) -> float:
+        """L1条目的剩余TTL：不超过文件缓存按数据类型配置的有效期"""
+        metadata = entry[0]
+        market_type = metadata.get('market_type') or self._determine_market_type(metadata.get('symbol', ''))
+        ttl_seconds = self.memory_cache.ttl_for(f"{market_type}_{metadata.get('data_type', 'stock_data')}")
+        try:
+            age = (datetime.now() - datetime.fromisoformat(metadata['cached_at'])).total_seconds()
+        except (KeyError, TypeError, ValueError):
+            return ttl_seconds
+        return ttl_seconds - age
+
+    def _load_cached_entry(self, cache_key: str) -> Optional[tuple]:
+        """从L1缓存或磁盘加载 (metadata, data)"""
+        return self.memory_cache.get_or_load(
+            self._memory_key(cache_key),
+            lambda: self._read_cached_entry(cache_key),
+            ttl_seconds=self._memory_ttl)
+
+    def _read_cached_entry(self, cache_key: str) -> Optional[tuple]:
+        """从磁盘读取 (metadata, data)"""
         metadata = self._load_metadata(cache_key)
         if not metadata:
             return None
@@ -342,14 +371,25 @@ class StockDataCache:
             return None
         
         try:
-            if metadata['file_format'] == 'csv':
-                return pd.read_csv(cache_path, index_col=0)
+            if metadata['file_format'] == self.CODEC_SUFFIX:
+                data, _ = cache_codec.read_file(cache_path)
+            elif metadata['file_format'] == 'csv':
+                # 旧版CSV缓存
+                data = pd.read_csv(cache_path, index_col=0)
             else:
                 with open(cache_path, 'r', encoding='utf-8') as f:
-                    return f.read()
+                    data = f.read()
+            return metadata, data
         except Exception as e:
             logger.error(f"⚠️ 加载缓存数据失败: {e}")
             return None
+
+    def load_stock_data(self, cache_key: str) -> Optional[Union[pd.DataFrame, str]]:
+        """从缓存加载股票数据"""
+        entry = self._load_cached_entry(cache_key)
+        if entry is None:
+            return None
+        return detach(entry[1])
     
     def find_cached_stock_data(self, symbol: str, start_date: str = None,
                               end_date: str = None, data_source: str = None,
@@ -387,24 +427,19 @@ class StockDataCache:
             logger.info(f"🎯 找到精确匹配的{desc}: {symbol} -> {search_key}")
             return search_key
 
-        # 如果没有精确匹配，查找部分匹配（相同股票代码的其他缓存）
-        for metadata_file in self.metadata_dir.glob(f"*_meta.json"):
-            try:
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-
-                if (metadata.get('symbol') == symbol and
-                    metadata.get('data_type') == 'stock_data' and
-                    metadata.get('market_type') == market_type and
-                    (data_source is None or metadata.get('data_source') == data_source)):
-
-                    cache_key = metadata_file.stem.replace('_meta', '')
-                    if self.is_cache_valid(cache_key, max_age_hours, symbol, 'stock_data'):
-                        desc = self.cache_config.get(f"{market_type}_stock_data", {}).get('description', '数据')
-                        logger.info(f"📋 找到部分匹配的{desc}: {symbol} -> {cache_key}")
-                        return cache_key
-            except Exception:
-                continue
+        # 如果没有精确匹配，通过索引查找部分匹配（相同股票代码的其他缓存）
+        try:
+            cache_key = self.metadata_index.find_latest(
+                symbol, 'stock_data', market_type=market_type, data_source=data_source,
+                min_cached_at=datetime.now() - timedelta(hours=max_age_hours))
+        except Exception as e:
+            logger.warning(f"⚠️ 查询缓存索引失败: {e}")
+            cache_key = None
+
+        if cache_key:
+            desc = self.cache_config.get(f"{market_type}_stock_data", {}).get('description', '数据')
+            logger.info(f"📋 找到部分匹配的{desc}: {symbol} -> {cache_key}")
+            return cache_key
 
         desc = self.cache_config.get(f"{market_type}_stock_data", {}).get('description', '数据')
         logger.error(f"❌ 未找到有效的{desc}缓存: {symbol}")
@@ -430,10 +465,8 @@ class StockDataCache:
                                            end_date=end_date,
                                            source=data_source)
         
-        cache_path = self._get_cache_path("news", cache_key, "txt")
-        cache_path.parent.mkdir(parents=True, exist_ok=True)  # 确保目录存在
-        with open(cache_path, 'w', encoding='utf-8') as f:
-            f.write(news_data)
+        cache_path = self._get_cache_path("news", cache_key, self.CODEC_SUFFIX)
+        cache_codec.write_file(cache_path, news_data)
         
         metadata = {
             'symbol': symbol,
@@ -442,10 +475,11 @@ class StockDataCache:
             'end_date': end_date,
             'data_source': data_source,
             'file_path': str(cache_path),
-            'file_format': 'txt',
+            'file_format': self.CODEC_SUFFIX,
             'content_length': len(news_data)
         }
         self._save_metadata(cache_key, metadata)
+        self.memory_cache.invalidate(self._memory_key(cache_key))
         
         logger.info(f"📰 新闻数据已缓存: {symbol} ({data_source}) -> {cache_key}")
         return cache_key
@@ -471,10 +505,8 @@ class StockDataCache:
                                            market=market_type,
                                            date=datetime.now().strftime("%Y-%m-%d"))
         
-        cache_path = self._get_cache_path("fundamentals", cache_key, "txt", symbol)
-        cache_path.parent.mkdir(parents=True, exist_ok=True)  # 确保目录存在
-        with open(cache_path, 'w', encoding='utf-8') as f:
-            f.write(fundamentals_data)
+        cache_path = self._get_cache_path("fundamentals", cache_key, self.CODEC_SUFFIX, symbol)
+        cache_codec.write_file(cache_path, fundamentals_data)
         
         metadata = {
             'symbol': symbol,
@@ -482,10 +514,11 @@ class StockDataCache:
             'data_source': data_source,
             'market_type': market_type,
             'file_path': str(cache_path),
-            'file_format': 'txt',
+            'file_format': self.CODEC_SUFFIX,
             'content_length': len(fundamentals_data)
         }
         self._save_metadata(cache_key, metadata)
+        self.memory_cache.invalidate(self._memory_key(cache_key))
         
         desc = self.cache_config.get(f"{market_type}_fundamentals", {}).get('description', '基本面数据')
         logger.info(f"💼 {desc}已缓存: {symbol} ({data_source}) -> {cache_key}")
@@ -493,20 +526,10 @@ class StockDataCache:
     
     def load_fundamentals_data(self, cache_key: str) -> Optional[str]:
         """从缓存加载基本面数据"""
-        metadata = self._load_metadata(cache_key)
-        if not metadata:
-            return None
-        
-        cache_path = Path(metadata['file_path'])
-        if not cache_path.exists():
-            return None
-        
-        try:
-            with open(cache_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        except Exception as e:
-            logger.error(f"⚠️ 加载基本面缓存数据失败: {e}")
+        entry = self._load_cached_entry(cache_key)
+        if entry is None:
             return None
+        return entry[1]
     
     def find_cached_fundamentals_data(self, symbol: str, data_source: str = None,
                                     max_age_hours: int = None) -> Optional[str]:
@@ -528,24 +551,19 @@ class StockDataCache:
             cache_type = f"{market_type}_fundamentals"
             max_age_hours = self.cache_config.get(cache_type, {}).get('ttl_hours', 24)
         
-        # 查找匹配的缓存
-        for metadata_file in self.metadata_dir.glob(f"*_meta.json"):
-            try:
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                
-                if (metadata.get('symbol') == symbol and
-                    metadata.get('data_type') == 'fundamentals' and
-                    metadata.get('market_type') == market_type and
-                    (data_source is None or metadata.get('data_source') == data_source)):
-                    
-                    cache_key = metadata_file.stem.replace('_meta', '')
-                    if self.is_cache_valid(cache_key, max_age_hours, symbol, 'fundamentals'):
-                        desc = self.cache_config.get(f"{market_type}_fundamentals", {}).get('description', '基本面数据')
-                        logger.info(f"🎯 找到匹配的{desc}缓存: {symbol} ({data_source}) -> {cache_key}")
-                        return cache_key
-            except Exception:
-                continue
+        # 通过索引查找匹配的缓存
+        try:
+            cache_key = self.metadata_index.find_latest(
+                symbol, 'fundamentals', market_type=market_type, data_source=data_source,
+                min_cached_at=datetime.now() - timedelta(hours=max_age_hours))
+        except Exception as e:
+            logger.warning(f"⚠️ 查询缓存索引失败: {e}")
+            cache_key = None
+
+        if cache_key:
+            desc = self.cache_config.get(f"{market_type}_fundamentals", {}).get('description', '基本面数据')
+            logger.info(f"🎯 找到匹配的{desc}缓存: {symbol} ({data_source}) -> {cache_key}")
+            return cache_key
         
         desc = self.cache_config.get(f"{market_type}_fundamentals", {}).get('description', '基本面数据')
         logger.error(f"❌ 未找到有效的{desc}缓存: {symbol} ({data_source})")
@@ -554,27 +572,25 @@ class StockDataCache:
     def clear_old_cache(self, max_age_days: int = 7):
         """清理过期缓存"""
         cutoff_time = datetime.now() - timedelta(days=max_age_days)
-        cleared_count = 0
+        cleared_keys = []
         
-        for metadata_file in self.metadata_dir.glob("*_meta.json"):
+        for cache_key, file_path in self.metadata_index.find_expired(cutoff_time):
             try:
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                
-                cached_at = datetime.fromisoformat(metadata['cached_at'])
-                if cached_at < cutoff_time:
-                    # 删除数据文件
-                    data_file = Path(metadata['file_path'])
+                # 删除数据文件
+                if file_path:
+                    data_file = Path(file_path)
                     if data_file.exists():
                         data_file.unlink()
-                    
-                    # 删除元数据文件
-                    metadata_file.unlink()
-                    cleared_count += 1
-                    
+                cleared_keys.append(cache_key)
             except Exception as e:
                 logger.warning(f"⚠️ 清理缓存时出错: {e}")
         
+        # 批量删除元数据
+        self.metadata_index.delete(cleared_keys)
+        for cache_key in cleared_keys:
+            self.memory_cache.invalidate(self._memory_key(cache_key))
+        cleared_count = len(cleared_keys)
+        
         logger.info(f"🧹 已清理 {cleared_count} 个过期缓存文件")
     
     def get_cache_stats(self) -> Dict[str, Any]:
@@ -588,31 +604,24 @@ class StockDataCache:
             'skipped_count': 0  # 新增：跳过的缓存数量
         }
         
-        for metadata_file in self.metadata_dir.glob("*_meta.json"):
-            try:
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                
-                data_type = metadata.get('data_type', 'unknown')
-                if data_type == 'stock_data':
-                    stats['stock_data_count'] += 1
-                elif data_type == 'news':
-                    stats['news_count'] += 1
-                elif data_type == 'fundamentals':
-                    stats['fundamentals_count'] += 1
-                
-                # 检查是否为跳过的缓存（没有实际文件）
-                data_file = Path(metadata.get('file_path', ''))
-                if not data_file.exists():
-                    stats['skipped_count'] += 1
-                else:
-                    # 计算文件大小
-                    stats['total_size_mb'] += data_file.stat().st_size / (1024 * 1024)
-                
-                stats['total_files'] += 1
-                
-            except Exception:
-                continue
+        try:
+            type_stats = self.metadata_index.get_stats()
+        except Exception as e:
+            logger.warning(f"⚠️ 查询缓存索引统计失败: {e}")
+            type_stats = {}
+        
+        for data_type, type_stat in type_stats.items():
+            if data_type == 'stock_data':
+                stats['stock_data_count'] += type_stat['count']
+            elif data_type == 'news':
+                stats['news_count'] += type_stat['count']
+            elif data_type == 'fundamentals':
+                stats['fundamentals_count'] += type_stat['count']
+            
+            # 没有实际文件的条目计为跳过的缓存
+            stats['skipped_count'] += type_stat['missing_count']
+            stats['total_size_mb'] += type_stat['total_size'] / (1024 * 1024)
+            stats['total_files'] += type_stat['count']
         
         stats['total_size_mb'] = round(stats['total_size_mb'], 2)
         return stats
@@ -11,6 +11,11 @@ from enum import Enum
 import warnings
 import pandas as pd
 
+from .rate_limiter import RateLimitExceeded, get_rate_limiter
+from .single_flight import coalesce
+from .source_router import get_source_router, SUCCESS, EMPTY, ERROR
+from .stock_data import StockBars
+
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
@@ -294,9 +299,72 @@ class DataSourceManager:
             logger.error(f"❌ TDX适配器导入失败: {e}")
             return None
     
+    def _get_cached_bars(self, source: ChinaDataSource, symbol: str, start_date: str,
+                         end_date: str, fetcher, local_fetcher=None) -> Optional[pd.DataFrame]:
+        """
+        通过K线缓存获取数据，只向数据源请求本地缺失的区间
+
+        Args:
+            source: 数据源
+            symbol: 股票代码
+            start_date: 开始日期
+            end_date: 结束日期
+            fetcher: 缺口数据获取函数 fetcher(symbol, start_date, end_date)
+            local_fetcher: 本地数据获取函数（如全市场快照），返回None时才请求数据源
+
+        Returns:
+            DataFrame: K线数据
+
+        Raises:
+            RateLimitExceeded: 需要请求数据源但令牌不足（调用方可切换到其他数据源）
+        """
+        limiter = get_rate_limiter()
+
+        def limited_fetcher(s, a, b):
+            if local_fetcher is not None:
+                local = local_fetcher(s, a, b)
+                if local is not None:
+                    return local
+            # 只有真正请求数据源时才消耗令牌，缓存命中不受限流影响
+            limiter.check(source.value)
+            return fetcher(s, a, b)
+
+        # 未指定完整区间时无法判断覆盖范围，直接请求数据源
+        if not start_date or not end_date:
+            return limited_fetcher(symbol, start_date, end_date)
+
+        try:
+            from .bar_store import get_bar_store
+            from .cache_manager import get_cache
+            ttl_hours = get_cache().cache_config.get('china_stock_data', {}).get('ttl_hours', 1)
+            return get_bar_store().get_bars(source.value, symbol, start_date, end_date,
+                                            limited_fetcher, ttl_hours=ttl_hours,
+                                            trading_days=self._china_trade_dates)
+        except RateLimitExceeded:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ K线缓存不可用，直接请求{source.value}: {e}")
+            return limited_fetcher(symbol, start_date, end_date)
+
+    def _china_trade_dates(self, start_date: str, end_date: str) -> Optional[List[str]]:
+        """
+        A股交易日历（Tushare上交所交易日历），供K线缓存判断无数据区间是否休市
+
+        Returns:
+            List[str]: 区间内的交易日；Tushare不可用时返回None（K线缓存按工作日估算）
+        """
+        if ChinaDataSource.TUSHARE not in self.available_sources:
+            return None
+        from .tushare_utils import get_tushare_provider
+        provider = get_tushare_provider()
+        if not provider.connected:
+            return None
+        get_rate_limiter().check(ChinaDataSource.TUSHARE.value)
+        return provider.get_trade_dates(start_date, end_date)
+
     def get_stock_data(self, symbol: str, start_date: str = None, end_date: str = None) -> str:
         """
-        获取股票数据的统一接口
+        获取股票数据的统一接口（渲染为文本，供工具返回给LLM）
 
         Args:
             symbol: 股票代码
@@ -306,6 +374,23 @@ class DataSourceManager:
         Returns:
             str: 格式化的股票数据
         """
+        return self.get_stock_bars(symbol, start_date, end_date).render()
+
+    @coalesce('unified_stock_data',
+              key_func=lambda self, symbol, start_date=None, end_date=None:
+              (self.current_source.value, symbol, start_date, end_date))
+    def get_stock_bars(self, symbol: str, start_date: str = None, end_date: str = None) -> StockBars:
+        """
+        获取结构化的股票K线数据
+
+        Args:
+            symbol: 股票代码
+            start_date: 开始日期
+            end_date: 结束日期
+
+        Returns:
+            StockBars: K线数据及数据源；所有数据源都失败时 error 不为空
+        """
         # 记录详细的输入参数
         logger.info(f"📊 [数据获取] 开始获取股票数据",
                    extra={
@@ -317,67 +402,44 @@ class DataSourceManager:
                    })
 
         # 添加详细的股票代码追踪日志
-        logger.info(f"🔍 [股票代码追踪] DataSourceManager.get_stock_data 接收到的股票代码: '{symbol}' (类型: {type(symbol)})")
-        logger.info(f"🔍 [股票代码追踪] 股票代码长度: {len(str(symbol))}")
-        logger.info(f"🔍 [股票代码追踪] 股票代码字符: {list(str(symbol))}")
+        logger.info(f"🔍 [股票代码追踪] DataSourceManager.get_stock_bars 接收到的股票代码: '{symbol}' (类型: {type(symbol)})")
         logger.info(f"🔍 [股票代码追踪] 当前数据源: {self.current_source.value}")
 
         start_time = time.time()
 
         try:
-            # 根据数据源调用相应的获取方法
-            if self.current_source == ChinaDataSource.TUSHARE:
-                logger.info(f"🔍 [股票代码追踪] 调用 Tushare 数据源，传入参数: symbol='{symbol}'")
-                result = self._get_tushare_data(symbol, start_date, end_date)
-            elif self.current_source == ChinaDataSource.AKSHARE:
-                result = self._get_akshare_data(symbol, start_date, end_date)
-            elif self.current_source == ChinaDataSource.BAOSTOCK:
-                result = self._get_baostock_data(symbol, start_date, end_date)
-            elif self.current_source == ChinaDataSource.TDX:
-                result = self._get_tdx_data(symbol, start_date, end_date)
-            else:
-                result = f"❌ 不支持的数据源: {self.current_source.value}"
+            # 当前数据源优先（熔断中则跳过），失败或超过对冲阈值时按健康度切换备用数据源
+            result = self._try_fallback_sources(symbol, start_date, end_date, include_current=True)
 
             # 记录详细的输出结果
             duration = time.time() - start_time
-            result_length = len(result) if result else 0
-            is_success = result and "❌" not in result and "错误" not in result
-
-            if is_success:
+            extra = {
+                'symbol': symbol,
+                'start_date': start_date,
+                'end_date': end_date,
+                'data_source': result.source,
+                'duration': duration,
+                'rows': len(result.bars) if result.bars is not None else 0,
+            }
+
+            if result.ok:
                 logger.info(f"✅ [数据获取] 成功获取股票数据",
-                           extra={
-                               'symbol': symbol,
-                               'start_date': start_date,
-                               'end_date': end_date,
-                               'data_source': self.current_source.value,
-                               'duration': duration,
-                               'result_length': result_length,
-                               'result_preview': result[:200] + '...' if result_length > 200 else result,
-                               'event_type': 'data_fetch_success'
-                           })
-                return result
+                           extra={**extra, 'event_type': 'data_fetch_success'})
             else:
-                logger.warning(f"⚠️ [数据获取] 数据质量异常，尝试降级到其他数据源",
-                              extra={
-                                  'symbol': symbol,
-                                  'start_date': start_date,
-                                  'end_date': end_date,
-                                  'data_source': self.current_source.value,
-                                  'duration': duration,
-                                  'result_length': result_length,
-                                  'result_preview': result[:200] + '...' if result_length > 200 else result,
-                                  'event_type': 'data_fetch_warning'
-                              })
-
-                # 数据质量异常时也尝试降级到其他数据源
-                fallback_result = self._try_fallback_sources(symbol, start_date, end_date)
-                if fallback_result and "❌" not in fallback_result and "错误" not in fallback_result:
-                    logger.info(f"✅ [数据获取] 降级成功获取数据")
-                    return fallback_result
-                else:
-                    logger.error(f"❌ [数据获取] 所有数据源都无法获取有效数据")
-                    return result  # 返回原始结果（包含错误信息）
-
+                logger.error(f"❌ [数据获取] 所有数据源都无法获取有效数据",
+                            extra={**extra, 'error': result.error, 'event_type': 'data_fetch_warning'})
+            return result  # 失败时返回包含错误信息的结果
+
+        except RateLimitExceeded as e:
+            # 其他数据源都不可用时，等待令牌后重试受限的数据源
+            logger.info(f"⏳ [数据获取] {e}，备用数据源均不可用，等待令牌后重试")
+            time.sleep(e.retry_after)
+            try:
+                return self._load_bars_from_source(ChinaDataSource(e.api), symbol, start_date, end_date)
+            except Exception as retry_error:
+                logger.error(f"❌ [数据获取] 重试{e.api}失败: {retry_error}")
+                return StockBars.failed(symbol, f"❌ 所有数据源都无法获取{symbol}的数据",
+                                        start_date=start_date, end_date=end_date)
         except Exception as e:
             duration = time.time() - start_time
             logger.error(f"❌ [数据获取] 异常失败: {e}",
@@ -390,192 +452,133 @@ class DataSourceManager:
                             'error': str(e),
                             'event_type': 'data_fetch_exception'
                         }, exc_info=True)
-            return self._try_fallback_sources(symbol, start_date, end_date)
-    
+            return StockBars.failed(symbol, f"❌ 所有数据源都无法获取{symbol}的数据",
+                                    start_date=start_date, end_date=end_date)
+
     def _get_tushare_data(self, symbol: str, start_date: str, end_date: str) -> str:
-        """使用Tushare获取数据 - 直接调用适配器，避免循环调用"""
-        logger.debug(f"📊 [Tushare] 调用参数: symbol={symbol}, start_date={start_date}, end_date={end_date}")
+        """使用Tushare获取数据并渲染为文本"""
+        return self._load_tushare_bars(symbol, start_date, end_date).render()
 
-        # 添加详细的股票代码追踪日志
-        logger.info(f"🔍 [股票代码追踪] _get_tushare_data 接收到的股票代码: '{symbol}' (类型: {type(symbol)})")
-        logger.info(f"🔍 [股票代码追踪] 股票代码长度: {len(str(symbol))}")
-        logger.info(f"🔍 [股票代码追踪] 股票代码字符: {list(str(symbol))}")
-        logger.info(f"🔍 [DataSourceManager详细日志] _get_tushare_data 开始执行")
-        logger.info(f"🔍 [DataSourceManager详细日志] 当前数据源: {self.current_source.value}")
+    def _load_tushare_bars(self, symbol: str, start_date: str, end_date: str) -> StockBars:
+        """使用Tushare获取K线 - 直接调用适配器，避免循环调用"""
+        logger.debug(f"📊 [Tushare] 调用参数: symbol={symbol}, start_date={start_date}, end_date={end_date}")
 
         start_time = time.time()
         try:
             # 直接调用适配器，避免循环调用interface
             from .tushare_adapter import get_tushare_adapter
-            logger.info(f"🔍 [股票代码追踪] 调用 tushare_adapter，传入参数: symbol='{symbol}'")
-            logger.info(f"🔍 [DataSourceManager详细日志] 开始调用tushare_adapter...")
 
             adapter = get_tushare_adapter()
-            data = adapter.get_stock_data(symbol, start_date, end_date)
-
-            if data is not None and not data.empty:
+            data = self._get_cached_bars(
+                ChinaDataSource.TUSHARE, symbol, start_date, end_date,
+                lambda s, a, b: adapter.get_stock_data(s, a, b, use_cache=False, adjust_mode=None),
+                local_fetcher=adapter.get_snapshot_data)
+            # 缓存中是未复权K线，拼接出完整区间后统一复权，避免各段基准不同
+            data = adapter.adjust_bars(data)
+
+            result = StockBars(symbol=symbol, start_date=start_date, end_date=end_date,
+                               source=ChinaDataSource.TUSHARE.value,
+                               bars=data if data is not None else pd.DataFrame())
+            if not result.empty:
                 # 获取股票基本信息
                 stock_info = adapter.get_stock_info(symbol)
-                stock_name = stock_info.get('name', f'股票{symbol}') if stock_info else f'股票{symbol}'
-
-                # 计算最新价格和涨跌幅
-                latest_data = data.iloc[-1]
-                latest_price = latest_data.get('close', 0)
-                prev_close = data.iloc[-2].get('close', latest_price) if len(data) > 1 else latest_price
-                change = latest_price - prev_close
-                change_pct = (change / prev_close * 100) if prev_close != 0 else 0
-
-                # 格式化数据报告
-                result = f"📊 {stock_name}({symbol}) - Tushare数据\n"
-                result += f"数据期间: {start_date} 至 {end_date}\n"
-                result += f"数据条数: {len(data)}条\n\n"
-
-                result += f"💰 最新价格: ¥{latest_price:.2f}\n"
-                result += f"📈 涨跌额: {change:+.2f} ({change_pct:+.2f}%)\n\n"
-
-                # 添加统计信息
-                result += f"📊 价格统计:\n"
-                result += f"   最高价: ¥{data['high'].max():.2f}\n"
-                result += f"   最低价: ¥{data['low'].min():.2f}\n"
-                result += f"   平均价: ¥{data['close'].mean():.2f}\n"
-                # 防御性获取成交量数据
-                volume_value = self._get_volume_safely(data)
-                result += f"   成交量: {volume_value:,.0f}股\n"
-
-                return result
-            else:
-                result = f"❌ 未获取到{symbol}的有效数据"
+                result.name = stock_info.get('name', f'股票{symbol}') if stock_info else f'股票{symbol}'
 
             duration = time.time() - start_time
-            logger.info(f"🔍 [DataSourceManager详细日志] interface调用完成，耗时: {duration:.3f}秒")
-            logger.info(f"🔍 [股票代码追踪] get_china_stock_data_tushare 返回结果前200字符: {result[:200] if result else 'None'}")
-            logger.info(f"🔍 [DataSourceManager详细日志] 返回结果类型: {type(result)}")
-            logger.info(f"🔍 [DataSourceManager详细日志] 返回结果长度: {len(result) if result else 0}")
-
-            logger.debug(f"📊 [Tushare] 调用完成: 耗时={duration:.2f}s, 结果长度={len(result) if result else 0}")
-
+            logger.debug(f"📊 [Tushare] 调用完成: 耗时={duration:.2f}s, 数据条数={len(result.bars)}")
             return result
+        except RateLimitExceeded:
+            raise
         except Exception as e:
             duration = time.time() - start_time
             logger.error(f"❌ [Tushare] 调用失败: {e}, 耗时={duration:.2f}s", exc_info=True)
-            logger.error(f"❌ [DataSourceManager详细日志] 异常类型: {type(e).__name__}")
-            logger.error(f"❌ [DataSourceManager详细日志] 异常信息: {str(e)}")
-            import traceback
-            logger.error(f"❌ [DataSourceManager详细日志] 异常堆栈: {traceback.format_exc()}")
             raise
     
-    def _get_akshare_data(self, symbol: str, start_date: str, end_date: str) -> str:
-        """使用AKShare获取数据"""
+    def _load_akshare_bars(self, symbol: str, start_date: str, end_date: str) -> StockBars:
+        """使用AKShare获取K线"""
         logger.debug(f"📊 [AKShare] 调用参数: symbol={symbol}, start_date={start_date}, end_date={end_date}")
 
         start_time = time.time()
         try:
-            # 这里需要实现AKShare的统一接口
             from .akshare_utils import get_akshare_provider
             provider = get_akshare_provider()
-            data = provider.get_stock_data(symbol, start_date, end_date)
+            data = self._get_cached_bars(ChinaDataSource.AKSHARE, symbol, start_date, end_date,
+                                         provider.get_stock_data)
 
             duration = time.time() - start_time
-
-            if data is not None and not data.empty:
-                result = f"股票代码: {symbol}\n"
-                result += f"数据期间: {start_date} 至 {end_date}\n"
-                result += f"数据条数: {len(data)}条\n\n"
-
-                # 显示最新3天数据，确保在各种显示环境下都能完整显示
-                display_rows = min(3, len(data))
-                result += f"最新{display_rows}天数据:\n"
-
-                # 使用pandas选项确保显示完整数据
-                with pd.option_context('display.max_rows', None,
-                                     'display.max_columns', None,
-                                     'display.width', None,
-                                     'display.max_colwidth', None):
-                    result += data.tail(display_rows).to_string(index=False)
-
-                # 如果数据超过3天，也显示一些统计信息
-                if len(data) > 3:
-                    latest_price = data.iloc[-1]['收盘'] if '收盘' in data.columns else data.iloc[-1].get('close', 'N/A')
-                    first_price = data.iloc[0]['收盘'] if '收盘' in data.columns else data.iloc[0].get('close', 'N/A')
-                    if latest_price != 'N/A' and first_price != 'N/A':
-                        try:
-                            change = float(latest_price) - float(first_price)
-                            change_pct = (change / float(first_price)) * 100
-                            result += f"\n\n📊 期间统计:\n"
-                            result += f"期间涨跌: {change:+.2f} ({change_pct:+.2f}%)\n"
-                            result += f"最高价: {data['最高'].max() if '最高' in data.columns else data.get('high', pd.Series()).max():.2f}\n"
-                            result += f"最低价: {data['最低'].min() if '最低' in data.columns else data.get('low', pd.Series()).min():.2f}"
-                        except (ValueError, TypeError):
-                            pass
-
-                logger.debug(f"📊 [AKShare] 调用成功: 耗时={duration:.2f}s, 数据条数={len(data)}, 结果长度={len(result)}")
-                return result
-            else:
-                result = f"❌ 未能获取{symbol}的股票数据"
+            result = StockBars(symbol=symbol, start_date=start_date, end_date=end_date,
+                               source=ChinaDataSource.AKSHARE.value,
+                               bars=data if data is not None else pd.DataFrame())
+            if result.empty:
                 logger.warning(f"⚠️ [AKShare] 数据为空: 耗时={duration:.2f}s")
-                return result
+            else:
+                logger.debug(f"📊 [AKShare] 调用成功: 耗时={duration:.2f}s, 数据条数={len(result.bars)}")
+            return result
 
+        except RateLimitExceeded:
+            raise
         except Exception as e:
             duration = time.time() - start_time
             logger.error(f"❌ [AKShare] 调用失败: {e}, 耗时={duration:.2f}s", exc_info=True)
-            return f"❌ AKShare获取{symbol}数据失败: {e}"
+            return StockBars.failed(symbol, f"❌ AKShare获取{symbol}数据失败: {e}",
+                                    source=ChinaDataSource.AKSHARE.value,
+                                    start_date=start_date, end_date=end_date)
     
-    def _get_baostock_data(self, symbol: str, start_date: str, end_date: str) -> str:
-        """使用BaoStock获取数据"""
-        # 这里需要实现BaoStock的统一接口
+    def _load_baostock_bars(self, symbol: str, start_date: str, end_date: str) -> StockBars:
+        """使用BaoStock获取K线"""
         from .baostock_utils import get_baostock_provider
         provider = get_baostock_provider()
-        data = provider.get_stock_data(symbol, start_date, end_date)
-        
-        if data is not None and not data.empty:
-            result = f"股票代码: {symbol}\n"
-            result += f"数据期间: {start_date} 至 {end_date}\n"
-            result += f"数据条数: {len(data)}条\n\n"
-
-            # 显示最新3天数据，确保在各种显示环境下都能完整显示
-            display_rows = min(3, len(data))
-            result += f"最新{display_rows}天数据:\n"
-
-            # 使用pandas选项确保显示完整数据
-            with pd.option_context('display.max_rows', None,
-                                 'display.max_columns', None,
-                                 'display.width', None,
-                                 'display.max_colwidth', None):
-                result += data.tail(display_rows).to_string(index=False)
-            return result
-        else:
-            return f"❌ 未能获取{symbol}的股票数据"
+        data = self._get_cached_bars(ChinaDataSource.BAOSTOCK, symbol, start_date, end_date,
+                                     provider.get_stock_data)
+        return StockBars(symbol=symbol, start_date=start_date, end_date=end_date,
+                         source=ChinaDataSource.BAOSTOCK.value,
+                         bars=data if data is not None else pd.DataFrame())
     
-    def _get_tdx_data(self, symbol: str, start_date: str, end_date: str) -> str:
-        """使用TDX获取数据 (已弃用)"""
+    def _load_tdx_bars(self, symbol: str, start_date: str, end_date: str) -> StockBars:
+        """使用TDX获取数据 (已弃用，只提供文本结果)"""
         logger.warning(f"⚠️ 警告: 正在使用已弃用的TDX数据源")
         from .tdx_utils import get_china_stock_data
-        return get_china_stock_data(symbol, start_date, end_date)
-    
-    def _get_volume_safely(self, data) -> float:
-        """安全地获取成交量数据，支持多种列名"""
-        try:
-            # 支持多种可能的成交量列名
-            volume_columns = ['volume', 'vol', 'turnover', 'trade_volume']
-
-            for col in volume_columns:
-                if col in data.columns:
-                    logger.info(f"✅ 找到成交量列: {col}")
-                    return data[col].sum()
-
-            # 如果都没找到，记录警告并返回0
-            logger.warning(f"⚠️ 未找到成交量列，可用列: {list(data.columns)}")
-            return 0
+        return StockBars(symbol=symbol, start_date=start_date, end_date=end_date,
+                         source=ChinaDataSource.TDX.value,
+                         text=get_china_stock_data(symbol, start_date, end_date))
+
+    def _load_bars_from_source(self, source: ChinaDataSource, symbol: str,
+                               start_date: str, end_date: str) -> StockBars:
+        """从指定数据源获取K线"""
+        if source == ChinaDataSource.TUSHARE:
+            return self._load_tushare_bars(symbol, start_date, end_date)
+        elif source == ChinaDataSource.AKSHARE:
+            return self._load_akshare_bars(symbol, start_date, end_date)
+        elif source == ChinaDataSource.BAOSTOCK:
+            return self._load_baostock_bars(symbol, start_date, end_date)
+        elif source == ChinaDataSource.TDX:
+            return self._load_tdx_bars(symbol, start_date, end_date)
+        return StockBars.failed(symbol, f"❌ 不支持的数据源: {source.value}", source=source.value)
+
+    @staticmethod
+    def _classify_stock_data(result: StockBars) -> str:
+        """把数据源返回的结果分类为 成功 / 空结果 / 错误，用于健康统计"""
+        if result is None or result.empty:
+            return EMPTY
+        if not result.ok:
+            return ERROR
+        return SUCCESS
+
+    def _try_fallback_sources(self, symbol: str, start_date: str, end_date: str,
+                              include_current: bool = False) -> StockBars:
+        """
+        按实时健康度尝试备用数据源 - 避免递归调用
 
-        except Exception as e:
-            logger.error(f"❌ 获取成交量失败: {e}")
-            return 0
+        Args:
+            include_current: 把当前数据源作为首选一起路由（首选超过对冲阈值时同时请求次优数据源）
 
-    def _try_fallback_sources(self, symbol: str, start_date: str, end_date: str) -> str:
-        """尝试备用数据源 - 避免递归调用"""
-        logger.error(f"🔄 {self.current_source.value}失败，尝试备用数据源...")
+        Raises:
+            RateLimitExceeded: 没有数据源成功且至少一个数据源因限流被跳过
+        """
+        if not include_current:
+            logger.error(f"🔄 {self.current_source.value}失败，尝试备用数据源...")
 
-        # 备用数据源优先级: AKShare > Tushare > BaoStock > TDX
+        # 备用数据源默认优先级（无健康统计时）: AKShare > Tushare > BaoStock > TDX
         fallback_order = [
             ChinaDataSource.AKSHARE,
             ChinaDataSource.TUSHARE,
@@ -583,35 +586,36 @@ class DataSourceManager:
             ChinaDataSource.TDX
         ]
 
-        for source in fallback_order:
-            if source != self.current_source and source in self.available_sources:
-                try:
-                    logger.info(f"🔄 尝试备用数据源: {source.value}")
-
-                    # 直接调用具体的数据源方法，避免递归
-                    if source == ChinaDataSource.TUSHARE:
-                        result = self._get_tushare_data(symbol, start_date, end_date)
-                    elif source == ChinaDataSource.AKSHARE:
-                        result = self._get_akshare_data(symbol, start_date, end_date)
-                    elif source == ChinaDataSource.BAOSTOCK:
-                        result = self._get_baostock_data(symbol, start_date, end_date)
-                    elif source == ChinaDataSource.TDX:
-                        result = self._get_tdx_data(symbol, start_date, end_date)
-                    else:
-                        logger.warning(f"⚠️ 未知数据源: {source.value}")
-                        continue
-
-                    if "❌" not in result:
-                        logger.info(f"✅ 备用数据源{source.value}获取成功")
-                        return result
-                    else:
-                        logger.warning(f"⚠️ 备用数据源{source.value}返回错误结果")
+        router = get_source_router()
+        candidates = router.rank(source for source in fallback_order
+                                 if source != self.current_source and source in self.available_sources)
+        if include_current:
+            candidates.insert(0, self.current_source)
+        rate_limited = []
 
-                except Exception as e:
-                    logger.error(f"❌ 备用数据源{source.value}也失败: {e}")
-                    continue
-        
-        return f"❌ 所有数据源都无法获取{symbol}的数据"
+        def fetch(source: ChinaDataSource) -> StockBars:
+            if source != self.current_source:
+                logger.info(f"🔄 尝试备用数据源: {source.value}")
+            try:
+                # 直接调用具体的数据源方法，避免递归
+                return self._load_bars_from_source(source, symbol, start_date, end_date)
+            except RateLimitExceeded as e:
+                rate_limited.append(e)
+                raise
+
+        source, result = router.execute(candidates, fetch, self._classify_stock_data,
+                                        passthrough=(RateLimitExceeded,),
+                                        hedge_after=None if include_current else 0)
+        if source is not None:
+            if source != self.current_source:
+                logger.info(f"✅ 备用数据源{source.value}获取成功")
+            return result
+        if rate_limited:
+            raise min(rate_limited, key=lambda e: e.retry_after)
+        if result is None:
+            return StockBars.failed(symbol, f"❌ 所有数据源都无法获取{symbol}的数据",
+                                    start_date=start_date, end_date=end_date)
+        return result  # 最后一个数据源的空结果或错误
     
     def get_stock_info(self, symbol: str) -> Dict:
         """获取股票基本信息，支持降级机制"""
@@ -620,9 +624,7 @@ class DataSourceManager:
         # 首先尝试当前数据源
         try:
             if self.current_source == ChinaDataSource.TUSHARE:
-                from .interface import get_china_stock_info_tushare
-                info_str = get_china_stock_info_tushare(symbol)
-                result = self._parse_stock_info_string(info_str, symbol)
+                result = self._get_tushare_stock_info(symbol)
 
                 # 检查是否获取到有效信息
                 if result.get('name') and result['name'] != f'股票{symbol}':
@@ -668,9 +670,7 @@ class DataSourceManager:
 
                 # 根据数据源类型获取股票信息
                 if source == ChinaDataSource.TUSHARE:
-                    from .interface import get_china_stock_info_tushare
-                    info_str = get_china_stock_info_tushare(symbol)
-                    result = self._parse_stock_info_string(info_str, symbol)
+                    result = self._get_tushare_stock_info(symbol)
                 elif source == ChinaDataSource.AKSHARE:
                     result = self._get_akshare_stock_info(symbol)
                 elif source == ChinaDataSource.BAOSTOCK:
@@ -785,34 +785,15 @@ class DataSourceManager:
             logger.error(f"❌ [股票信息] BaoStock获取失败: {e}")
             return {'symbol': symbol, 'name': f'股票{symbol}', 'source': 'baostock', 'error': str(e)}
 
-    def _parse_stock_info_string(self, info_str: str, symbol: str) -> Dict:
-        """解析股票信息字符串为字典"""
-        try:
-            info = {'symbol': symbol, 'source': self.current_source.value}
-            lines = info_str.split('\n')
-            
-            for line in lines:
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    key = key.strip()
-                    value = value.strip()
-                    
-                    if '股票名称' in key:
-                        info['name'] = value
-                    elif '所属行业' in key:
-                        info['industry'] = value
-                    elif '所属地区' in key:
-                        info['area'] = value
-                    elif '上市市场' in key:
-                        info['market'] = value
-                    elif '上市日期' in key:
-                        info['list_date'] = value
-            
-            return info
-            
-        except Exception as e:
-            logger.error(f"⚠️ 解析股票信息失败: {e}")
-            return {'symbol': symbol, 'name': f'股票{symbol}', 'source': self.current_source.value}
+    def _get_tushare_stock_info(self, symbol: str) -> Dict:
+        """使用Tushare获取股票基本信息"""
+        from .tushare_adapter import get_tushare_adapter
+
+        info = get_tushare_adapter().get_stock_info(symbol) or {}
+        result = {'symbol': symbol, 'source': ChinaDataSource.TUSHARE.value}
+        result.update({key: info[key] for key in ('name', 'industry', 'area', 'market', 'list_date')
+                       if info.get(key)})
+        return result
 
 
 # 全局数据源管理器实例
@@ -839,27 +820,27 @@ def get_china_stock_data_unified(symbol: str, start_date: str, end_date: str) ->
     Returns:
         str: 格式化的股票数据
     """
-    from tradingagents.utils.logging_init import get_logger
+    return get_china_stock_bars_unified(symbol, start_date, end_date).render()
+
 
+def get_china_stock_bars_unified(symbol: str, start_date: str, end_date: str) -> StockBars:
+    """
+    统一的中国股票K线获取接口（结构化结果）
 
-    # 添加详细的股票代码追踪日志
-    logger.info(f"🔍 [股票代码追踪] data_source_manager.get_china_stock_data_unified 接收到的股票代码: '{symbol}' (类型: {type(symbol)})")
-    logger.info(f"🔍 [股票代码追踪] 股票代码长度: {len(str(symbol))}")
-    logger.info(f"🔍 [股票代码追踪] 股票代码字符: {list(str(symbol))}")
+    Args:
+        symbol: 股票代码
+        start_date: 开始日期
+        end_date: 结束日期
+
+    Returns:
+        StockBars: K线数据及数据源
+    """
+    logger.info(f"🔍 [股票代码追踪] data_source_manager.get_china_stock_bars_unified 接收到的股票代码: '{symbol}'")
 
     manager = get_data_source_manager()
-    logger.info(f"🔍 [股票代码追踪] 调用 manager.get_stock_data，传入参数: symbol='{symbol}', start_date='{start_date}', end_date='{end_date}'")
-    result = manager.get_stock_data(symbol, start_date, end_date)
-    # 分析返回结果的详细信息
-    if result:
-        lines = result.split('\n')
-        data_lines = [line for line in lines if '2025-' in line and symbol in line]
-        logger.info(f"🔍 [股票代码追踪] 返回结果统计: 总行数={len(lines)}, 数据行数={len(data_lines)}, 结果长度={len(result)}字符")
-        logger.info(f"🔍 [股票代码追踪] 返回结果前500字符: {result[:500]}")
-        if len(data_lines) > 0:
-            logger.info(f"🔍 [股票代码追踪] 数据行示例: 第1行='{data_lines[0][:100]}', 最后1行='{data_lines[-1][:100]}'")
-    else:
-        logger.info(f"🔍 [股票代码追踪] 返回结果: None")
+    result = manager.get_stock_bars(symbol, start_date, end_date)
+    logger.info(f"🔍 [股票代码追踪] 返回结果: 数据源={result.source}, "
+                f"数据条数={len(result.bars) if result.bars is not None else 0}, 成功={result.ok}")
     return result
 
 
@@ -4,11 +4,13 @@ MongoDB + Redis 数据库缓存管理器
 提供高性能的股票数据缓存和持久化存储
 """
 
+import io
 import os
+import re
 import json
 import pickle
 import hashlib
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any, List, Union
 import pandas as pd
 
@@ -16,6 +18,9 @@ import pandas as pd
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
 
+from . import cache_codec
+from .memory_cache import get_memory_cache, detach
+
 # MongoDB
 try:
     from pymongo import MongoClient
@@ -71,6 +76,9 @@ class DatabaseCacheManager:
         self._init_mongodb()
         self._init_redis()
         
+        # 进程内L1缓存
+        self.memory_cache = get_memory_cache()
+        
         logger.info(f"🗄️ 数据库缓存管理器初始化完成")
         logger.error(f"   MongoDB: {'✅ 已连接' if self.mongodb_client else '❌ 未连接'}")
         logger.error(f"   Redis: {'✅ 已连接' if self.redis_client else '❌ 未连接'}")
@@ -111,7 +119,7 @@ class DatabaseCacheManager:
                 db=self.redis_db,
                 socket_timeout=5,
                 socket_connect_timeout=5,
-                decode_responses=True
+                decode_responses=False  # 缓存值为 cache_codec 编码的二进制
             )
             # 测试连接
             self.redis_client.ping()
@@ -195,8 +203,6 @@ class DatabaseCacheManager:
         # 自动推断市场类型
         if market_type is None:
             # 根据股票代码格式推断市场类型
-            import re
-
             if re.match(r'^\d{6}$', symbol):  # 6位数字为A股
                 market_type = "china"
             else:  # 其他格式为美股
@@ -215,13 +221,11 @@ class DatabaseCacheManager:
             "updated_at": datetime.utcnow()
         }
         
-        # 处理数据格式
-        if isinstance(data, pd.DataFrame):
-            doc["data"] = data.to_json(orient='records', date_format='iso')
-            doc["data_format"] = "dataframe_json"
-        else:
-            doc["data"] = str(data)
-            doc["data_format"] = "text"
+        # 处理数据格式（压缩二进制，DataFrame保留列类型和索引）
+        if not isinstance(data, pd.DataFrame):
+            data = str(data)
+        doc["data"] = cache_codec.dumps(data)
+        doc["data_format"] = "codec"
         
         # 保存到MongoDB（持久化）
         if self.mongodb_db is not None:
@@ -235,39 +239,61 @@ class DatabaseCacheManager:
         # 保存到Redis（快速缓存，6小时过期）
         if self.redis_client:
             try:
-                redis_data = {
-                    "data": doc["data"],
-                    "data_format": doc["data_format"],
-                    "symbol": symbol,
-                    "data_source": data_source,
-                    "created_at": doc["created_at"].isoformat()
-                }
                 self.redis_client.setex(
                     cache_key,
                     6 * 3600,  # 6小时过期
-                    json.dumps(redis_data, ensure_ascii=False)
+                    doc["data"]
                 )
                 logger.info(f"⚡ 股票数据已缓存到Redis: {symbol} -> {cache_key}")
             except Exception as e:
                 logger.error(f"⚠️ Redis缓存失败: {e}")
         
+        self.memory_cache.invalidate(('db', cache_key))
         return cache_key
     
     def load_stock_data(self, cache_key: str) -> Optional[Union[pd.DataFrame, str]]:
-        """从Redis或MongoDB加载股票数据"""
+        """从L1缓存、Redis或MongoDB加载股票数据"""
+        # 缓存键格式: stock:{symbol}:{hash}
+        parts = cache_key.split(':')
+        symbol = parts[1] if len(parts) >= 3 else ''
+        market_type = "china" if re.match(r'^\d{6}$', symbol) else "us"
+        cache_type = f"{market_type}_stock_data"
+        
+        entry = self.memory_cache.get_or_load(
+            ('db', cache_key),
+            lambda: self._load_stock_data_from_db(cache_key),
+            ttl_seconds=lambda entry: self._memory_ttl(entry, cache_type))
+        return detach(entry[0]) if entry else None
+    
+    def _memory_ttl(self, entry: tuple, cache_type: str) -> float:
+        """L1条目的剩余TTL：从数据写入数据库时算起，不随重新加载而重置，也不超过Redis副本的剩余有效期"""
+        _, updated_at, backend_ttl = entry
+        ttl_seconds = self.memory_cache.ttl_for(cache_type)
+        if isinstance(updated_at, datetime):
+            now = datetime.now(timezone.utc) if updated_at.tzinfo else datetime.utcnow()
+            ttl_seconds -= (now - updated_at).total_seconds()
+        if backend_ttl is not None:
+            ttl_seconds = min(ttl_seconds, backend_ttl)
+        return ttl_seconds
+    
+    def _load_stock_data_from_db(self, cache_key: str) -> Optional[tuple]:
+        """从Redis或MongoDB加载股票数据，返回 (数据, MongoDB更新时间, Redis剩余TTL秒数)"""
         
         # 首先尝试从Redis加载（更快）
         if self.redis_client:
             try:
                 redis_data = self.redis_client.get(cache_key)
                 if redis_data:
-                    data_dict = json.loads(redis_data)
                     logger.info(f"⚡ 从Redis加载数据: {cache_key}")
+                    # Redis副本不记录写入时间，L1条目不超过它的剩余有效期
+                    redis_ttl = self.redis_client.ttl(cache_key)
+                    redis_ttl = redis_ttl if redis_ttl is not None and redis_ttl >= 0 else None
                     
-                    if data_dict["data_format"] == "dataframe_json":
-                        return pd.read_json(data_dict["data"], orient='records')
-                    else:
-                        return data_dict["data"]
+                    if cache_codec.is_encoded(redis_data):
+                        return cache_codec.loads(redis_data)[0], None, redis_ttl
+                    # 旧版JSON格式
+                    data_dict = json.loads(redis_data)
+                    return self._decode_legacy_stock_data(data_dict["data"], data_dict["data_format"]), None, redis_ttl
             except Exception as e:
                 logger.error(f"⚠️ Redis加载失败: {e}")
         
@@ -280,35 +306,39 @@ class DatabaseCacheManager:
                 if doc:
                     logger.info(f"💾 从MongoDB加载数据: {cache_key}")
                     
+                    if doc["data_format"] == "codec":
+                        data = cache_codec.loads(doc["data"])[0]
+                    else:
+                        data = self._decode_legacy_stock_data(doc["data"], doc["data_format"])
+                    
                     # 同时更新到Redis缓存
                     if self.redis_client:
                         try:
-                            redis_data = {
-                                "data": doc["data"],
-                                "data_format": doc["data_format"],
-                                "symbol": doc["symbol"],
-                                "data_source": doc["data_source"],
-                                "created_at": doc["created_at"].isoformat()
-                            }
+                            if not isinstance(data, pd.DataFrame):
+                                data = str(data)
                             self.redis_client.setex(
                                 cache_key,
                                 6 * 3600,
-                                json.dumps(redis_data, ensure_ascii=False)
+                                cache_codec.dumps(data)
                             )
                             logger.info(f"⚡ 数据已同步到Redis缓存")
                         except Exception as e:
                             logger.error(f"⚠️ Redis同步失败: {e}")
                     
-                    if doc["data_format"] == "dataframe_json":
-                        return pd.read_json(doc["data"], orient='records')
-                    else:
-                        return doc["data"]
+                    return data, doc.get("updated_at"), None
                         
             except Exception as e:
                 logger.error(f"⚠️ MongoDB加载失败: {e}")
         
         return None
     
+    @staticmethod
+    def _decode_legacy_stock_data(data: str, data_format: str) -> Union[pd.DataFrame, str]:
+        """解析旧版JSON格式的股票数据"""
+        if data_format == "dataframe_json":
+            return pd.read_json(io.StringIO(data), orient='records')
+        return data
+    
     def find_cached_stock_data(self, symbol: str, start_date: str = None,
                               end_date: str = None, data_source: str = None,
                               max_age_hours: int = 6) -> Optional[str]:
@@ -390,8 +420,7 @@ class DatabaseCacheManager:
         # 保存到Redis（24小时过期）
         if self.redis_client:
             try:
-                redis_data = {
-                    "data": news_data,
+                redis_meta = {
                     "symbol": symbol,
                     "data_source": data_source,
                     "created_at": doc["created_at"].isoformat()
@@ -399,7 +428,7 @@ class DatabaseCacheManager:
                 self.redis_client.setex(
                     cache_key,
                     24 * 3600,  # 24小时过期
-                    json.dumps(redis_data, ensure_ascii=False)
+                    cache_codec.dumps(str(news_data), redis_meta)
                 )
                 logger.info(f"⚡ 新闻数据已缓存到Redis: {symbol} -> {cache_key}")
             except Exception as e:
@@ -441,8 +470,7 @@ class DatabaseCacheManager:
         # 保存到Redis（24小时过期）
         if self.redis_client:
             try:
-                redis_data = {
-                    "data": fundamentals_data,
+                redis_meta = {
                     "symbol": symbol,
                     "data_source": data_source,
                     "analysis_date": analysis_date,
@@ -451,7 +479,7 @@ class DatabaseCacheManager:
                 self.redis_client.setex(
                     cache_key,
                     24 * 3600,  # 24小时过期
-                    json.dumps(redis_data, ensure_ascii=False)
+                    cache_codec.dumps(str(fundamentals_data), redis_meta)
                 )
                 logger.info(f"⚡ 基本面数据已缓存到Redis: {symbol} -> {cache_key}")
             except Exception as e:
@@ -10,6 +10,8 @@ from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
 import os
 
+from .rate_limiter import get_rate_limiter
+
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
@@ -21,8 +23,8 @@ class HKStockProvider:
 
     def __init__(self):
         """初始化港股数据提供器"""
-        self.last_request_time = 0
-        self.min_request_interval = 2.0  # 增加请求间隔到2秒
+        # 与其他提供器共享Yahoo Finance的令牌桶（跨实例、线程和进程）
+        self.rate_limiter = get_rate_limiter()
         self.timeout = 60  # 请求超时时间（增加到60秒）
         self.max_retries = 3  # 增加重试次数
         self.rate_limit_wait = 60  # 遇到限制时等待时间
@@ -31,14 +33,7 @@ class HKStockProvider:
     
     def _wait_for_rate_limit(self):
         """等待速率限制"""
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        
-        if time_since_last_request < self.min_request_interval:
-            sleep_time = self.min_request_interval - time_since_last_request
-            time.sleep(sleep_time)
-        
-        self.last_request_time = time.time()
+        self.rate_limiter.acquire('yfinance')
     
     def get_stock_data(self, symbol: str, start_date: str = None, end_date: str = None) -> Optional[pd.DataFrame]:
         """
@@ -10,6 +10,8 @@ import os
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
 
+from tradingagents.dataflows.rate_limiter import get_rate_limiter
+
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
 logger = get_logger("default")
@@ -21,8 +23,8 @@ class ImprovedHKStockProvider:
     def __init__(self):
         self.cache_file = "hk_stock_cache.json"
         self.cache_ttl = 3600 * 24  # 24小时缓存
-        self.rate_limit_wait = 5  # 速率限制等待时间
-        self.last_request_time = 0
+        # 港股名称API使用共享令牌桶限流（跨实例、线程和进程）
+        self.rate_limiter = get_rate_limiter()
         
         # 内置港股名称映射（避免API调用）
         self.hk_stock_names = {
@@ -167,16 +169,19 @@ class ImprovedHKStockProvider:
                     logger.debug(f"📊 [港股映射] 获取公司名称: {symbol} -> {company_name}")
                     return company_name
             
+            # 本地股票代码索引（批量刷新的港股列表，无网络请求）
+            from tradingagents.dataflows.symbol_index import lookup_company_name
+            company_name = lookup_company_name(f"{normalized_symbol}.HK")
+            if company_name:
+                logger.debug(f"📊 [港股索引] 获取公司名称: {symbol} -> {company_name}")
+                return company_name
+
             # 方案2：优先尝试AKShare API获取（有速率限制保护）
             try:
-                # 速率限制保护
-                current_time = time.time()
-                if current_time - self.last_request_time < self.rate_limit_wait:
-                    wait_time = self.rate_limit_wait - (current_time - self.last_request_time)
-                    logger.debug(f"📊 [港股API] 速率限制保护，等待 {wait_time:.1f} 秒")
-                    time.sleep(wait_time)
-
-                self.last_request_time = time.time()
+                # 速率限制保护：令牌不足时不等待，返回默认名称（不缓存，下次再尝试API）
+                if not self.rate_limiter.try_acquire('akshare_hk'):
+                    logger.debug(f"📊 [港股API] 调用频率受限，暂用默认名称: {symbol}")
+                    return f"港股{self._normalize_hk_symbol(symbol)}"
 
                 # 优先尝试AKShare获取
                 try:
@@ -16,6 +16,7 @@ from tradingagents.utils.logging_init import setup_dataflow_logging
 
 # 导入原有缓存系统
 from .cache_manager import StockDataCache
+from .single_flight import get_coalescing_stats
 
 # 导入自适应缓存系统
 try:
@@ -203,6 +204,8 @@ class IntegratedCacheManager:
                 "cache_system": "adaptive",
                 "adaptive_cache": adaptive_stats,
                 "legacy_cache": legacy_stats,
+                "memory_cache": self.legacy_cache.memory_cache.get_stats(),
+                "request_coalescing": get_coalescing_stats(),
                 "database_available": self.db_manager.is_database_available(),
                 "mongodb_available": self.db_manager.is_mongodb_available(),
                 "redis_available": self.db_manager.is_redis_available()
@@ -213,6 +216,8 @@ class IntegratedCacheManager:
             return {
                 "cache_system": "legacy",
                 "legacy_cache": legacy_stats,
+                "memory_cache": self.legacy_cache.memory_cache.get_stats(),
+                "request_coalescing": get_coalescing_stats(),
                 "database_available": False,
                 "mongodb_available": False,
                 "redis_available": False
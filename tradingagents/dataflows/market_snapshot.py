@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+A股全市场日线快照
+按交易日调用 Tushare daily(trade_date=...) 一次获取全市场所有股票的日线，拆分后写入K线缓存：
+- 批量筛选数百只股票时，API调用次数从 股票数×天数 降为 天数
+- 快照按股票存入K线缓存的 tushare_daily 分区（未复权原始数据），覆盖区间按交易日登记
+- 单只股票的Tushare行情请求先读取快照，快照覆盖请求区间时不再调用API
+"""
+
+from datetime import date, timedelta
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from .bar_store import OHLCVBarStore, get_bar_store
+from .rate_limiter import get_rate_limiter
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+# K线缓存中快照数据的数据源标识
+SNAPSHOT_SOURCE = "tushare_daily"
+
+# 记录已入库交易日区间的虚拟股票代码
+_MARKET_KEY = "_market"
+
+
+def _symbol_of(ts_code: str) -> str:
+    """000001.SZ -> 000001"""
+    return str(ts_code).split('.')[0]
+
+
+def _to_iso(value: str) -> str:
+    """YYYYMMDD / YYYY-MM-DD -> YYYY-MM-DD"""
+    return pd.Timestamp(str(value)).date().isoformat()
+
+
+def ingest_china_daily_snapshots(start_date: str, end_date: str, provider=None,
+                                 store: OHLCVBarStore = None, ttl_hours: float = 1) -> Dict[str, Any]:
+    """
+    按交易日批量获取全市场日线并写入K线缓存，已入库的交易日自动跳过
+
+    Args:
+        start_date: 开始日期 (YYYY-MM-DD)
+        end_date: 结束日期 (YYYY-MM-DD)
+        provider: Tushare提供器，默认全局实例
+        store: K线缓存，默认全局实例
+        ttl_hours: 包含今天的区间的有效时长（小时）
+
+    Returns:
+        Dict: 入库统计（交易日数、API调用次数、股票数、K线条数）
+    """
+    if provider is None:
+        from .tushare_utils import get_tushare_provider
+        provider = get_tushare_provider()
+    store = store or get_bar_store()
+    limiter = get_rate_limiter()
+    stats = {'trade_dates': 0, 'api_calls': 0, 'symbols': 0, 'rows': 0}
+
+    if not provider.connected:
+        logger.error("❌ [全市场快照] Tushare未连接，无法批量获取日线")
+        stats['error'] = 'tushare not connected'
+        return stats
+
+    gaps = store.missing_ranges(SNAPSHOT_SOURCE, _MARKET_KEY, start_date, end_date)
+    if not gaps:
+        logger.info(f"⚡ [全市场快照] {start_date} 到 {end_date} 已全部入库")
+        return stats
+
+    symbols = set()
+    for gap_start, gap_end in gaps:
+        try:
+            limiter.acquire('tushare')
+            stats['api_calls'] += 1
+            trade_dates = provider.get_trade_dates(gap_start, gap_end)
+        except Exception as e:
+            logger.warning(f"⚠️ [全市场快照] 获取交易日历失败 {gap_start}~{gap_end}: {e}")
+            continue
+
+        frames = []
+        covered_end = gap_end
+        for trade_date in trade_dates:
+            limiter.acquire('tushare')
+            stats['api_calls'] += 1
+            try:
+                snapshot = provider.get_daily_snapshot(trade_date)
+            except Exception as e:
+                logger.warning(f"⚠️ [全市场快照] 获取{trade_date}全市场日线失败: {e}")
+                snapshot = None
+            if snapshot is None or snapshot.empty:
+                # 获取失败或当日数据尚未发布：只登记到前一天，下次从该交易日继续
+                covered_end = (pd.Timestamp(trade_date).date() - timedelta(days=1)).isoformat()
+                break
+            frames.append(snapshot)
+            stats['trade_dates'] += 1
+
+        if covered_end < gap_start:
+            continue
+
+        if frames:
+            data = pd.concat(frames, ignore_index=True)
+            # 快照包含当日所有交易的股票，区间内缺失的日期即为停牌，整段登记为已覆盖
+            for ts_code, rows in data.groupby('ts_code'):
+                store.put_bars(SNAPSHOT_SOURCE, _symbol_of(ts_code), rows,
+                               start_date=gap_start, end_date=covered_end, ttl_hours=ttl_hours)
+                symbols.add(ts_code)
+            stats['rows'] += len(data)
+        store.mark_covered(SNAPSHOT_SOURCE, _MARKET_KEY, gap_start, covered_end, ttl_hours=ttl_hours)
+        logger.info(f"✅ [全市场快照] {gap_start} 到 {covered_end} 入库完成: {len(frames)}个交易日")
+
+    stats['symbols'] = len(symbols)
+    return stats
+
+
+def get_snapshot_bars(symbol: str, start_date: str, end_date: str,
+                      store: OHLCVBarStore = None) -> Optional[pd.DataFrame]:
+    """
+    从全市场快照读取单只股票的原始日线
+
+    Returns:
+        DataFrame: 快照完全覆盖请求区间时返回（区间内停牌时为空）；未覆盖时返回None
+    """
+    if not start_date or not end_date:
+        return None
+    store = store or get_bar_store()
+    symbol = _symbol_of(symbol)
+    if store.missing_ranges(SNAPSHOT_SOURCE, symbol, _to_iso(start_date), _to_iso(end_date)):
+        return None
+    return store.get_bars(SNAPSHOT_SOURCE, symbol, _to_iso(start_date), _to_iso(end_date),
+                          fetcher=lambda *args: None)
+
+
+def get_snapshot_coverage(store: OHLCVBarStore = None, days: int = 30) -> Dict[str, Any]:
+    """最近 days 天内尚未入库的区间"""
+    store = store or get_bar_store()
+    end = date.today()
+    start = end - timedelta(days=days)
+    return {
+        'start_date': start.isoformat(),
+        'end_date': end.isoformat(),
+        'missing_ranges': store.missing_ranges(SNAPSHOT_SOURCE, _MARKET_KEY, start.isoformat(), end.isoformat()),
+    }
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+进程内L1内存缓存
+位于文件/Redis/MongoDB缓存之前的共享内存层：
+- 按估算的字节大小做LRU淘汰
+- 按数据类型使用 cache_config 中的TTL
+- 统计命中/未命中/淘汰次数
+- 同一个键的并发加载只触发一次后端读取（single-flight）
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Union
+
+import pandas as pd
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+# 未配置TTL的数据类型使用的默认TTL
+DEFAULT_TTL_SECONDS = 3600
+
+
+def estimate_size(value: Any) -> int:
+    """估算缓存值占用的字节数"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        try:
+            usage = value.memory_usage(deep=True)
+            return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+        except Exception:
+            return sys.getsizeof(value)
+    if isinstance(value, (str, bytes, bytearray)):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def detach(value: Any) -> Any:
+    """返回可安全交给调用方修改的值（DataFrame返回副本，字符串等不可变值原样返回）"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    return value
+
+
+class _CacheEntry:
+    """L1缓存条目"""
+
+    __slots__ = ('value', 'size', 'expires_at')
+
+    def __init__(self, value: Any, size: int, expires_at: float):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+
+
+class _InFlight:
+    """正在进行中的后端加载"""
+
+    __slots__ = ('event', 'value', 'error', 'invalidated')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+        # 加载期间键被失效（如后端刚写入新数据），加载结果不再写入L1
+        self.invalidated = False
+
+
+class MemoryCacheTier:
+    """进程内共享的L1缓存层"""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, enabled: bool = True,
+                 ttl_config: Dict[str, Dict[str, Any]] = None):
+        """
+        初始化L1缓存
+
+        Args:
+            max_bytes: 缓存总字节上限，超过后按LRU淘汰
+            enabled: 是否启用；禁用时 get_or_load 直接调用加载函数
+            ttl_config: 数据类型TTL配置，格式同 StockDataCache.cache_config
+        """
+        self.max_bytes = int(max_bytes)
+        self.enabled = enabled
+        self._ttl_hours: Dict[str, float] = {}
+
+        self._entries: "OrderedDict[Hashable, _CacheEntry]" = OrderedDict()
+        self._in_flight: Dict[Hashable, _InFlight] = {}
+        self._lock = threading.Lock()
+        self._current_bytes = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._loads = 0
+        self._coalesced = 0
+
+        if ttl_config:
+            self.configure_ttl(ttl_config)
+
+    # ------------------------------------------------------------------
+    # TTL配置
+    # ------------------------------------------------------------------
+
+    def configure_ttl(self, ttl_config: Dict[str, Dict[str, Any]]):
+        """合并数据类型TTL配置（如 {'china_stock_data': {'ttl_hours': 1}}）"""
+        with self._lock:
+            for cache_type, config in ttl_config.items():
+                if isinstance(config, dict) and 'ttl_hours' in config:
+                    self._ttl_hours[cache_type] = float(config['ttl_hours'])
+
+    def ttl_for(self, cache_type: Optional[str]) -> float:
+        """获取数据类型对应的TTL秒数"""
+        hours = self._ttl_hours.get(cache_type) if cache_type else None
+        if hours is None:
+            return DEFAULT_TTL_SECONDS
+        return hours * 3600
+
+    # ------------------------------------------------------------------
+    # 读写
+    # ------------------------------------------------------------------
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """读取缓存值，不存在或已过期返回None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            return self._get_locked(key)
+
+    def put(self, key: Hashable, value: Any, cache_type: str = None,
+            ttl_seconds: float = None) -> bool:
+        """
+        写入缓存值
+
+        Args:
+            key: 缓存键
+            value: 缓存值（None不缓存）
+            cache_type: 数据类型，用于确定TTL
+            ttl_seconds: 显式TTL秒数，优先于 cache_type
+
+        Returns:
+            是否写入成功
+        """
+        if not self.enabled or value is None:
+            return False
+        if ttl_seconds is None:
+            ttl_seconds = self.ttl_for(cache_type)
+        if ttl_seconds <= 0:
+            return False
+
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            logger.debug(f"🧠 L1缓存跳过过大条目: {key} ({size} bytes)")
+            return False
+
+        entry = _CacheEntry(value, size, time.monotonic() + ttl_seconds)
+        with self._lock:
+            self._remove_locked(key)
+            self._entries[key] = entry
+            self._current_bytes += size
+            self._evict_locked()
+        return True
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], cache_type: str = None,
+                    ttl_seconds: Union[float, Callable[[Any], Optional[float]]] = None) -> Optional[Any]:
+        """
+        读取缓存值，未命中时调用加载函数；并发请求同一个键时只有一个线程执行加载
+
+        Args:
+            key: 缓存键
+            loader: 无参加载函数，返回None表示后端没有数据（不缓存）
+            cache_type: 数据类型，用于确定TTL
+            ttl_seconds: 显式TTL秒数，或根据加载结果计算剩余TTL的函数
+
+        Returns:
+            缓存值或加载结果
+        """
+        if not self.enabled:
+            return loader()
+
+        with self._lock:
+            value = self._get_locked(key)
+            if value is not None:
+                return value
+
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _InFlight()
+                self._in_flight[key] = flight
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value = loader()
+            flight.value = value
+            with self._lock:
+                self._loads += 1
+            if value is not None and not flight.invalidated:
+                ttl = ttl_seconds(value) if callable(ttl_seconds) else ttl_seconds
+                self.put(key, value, cache_type=cache_type, ttl_seconds=ttl)
+            return value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            flight.event.set()
+
+    def invalidate(self, key: Hashable) -> bool:
+        """删除指定键"""
+        with self._lock:
+            flight = self._in_flight.get(key)
+            if flight is not None:
+                flight.invalidated = True
+            return self._remove_locked(key)
+
+    def clear(self):
+        """清空缓存（统计计数保留）"""
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取命中率、淘汰次数和占用情况"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'current_bytes': self._current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'loads': self._loads,
+                'coalesced': self._coalesced,
+            }
+
+    # ------------------------------------------------------------------
+    # 内部方法（调用方需持有锁）
+    # ------------------------------------------------------------------
+
+    def _get_locked(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove_locked(key)
+            self._expirations += 1
+            self._misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return entry.value
+
+    def _remove_locked(self, key: Hashable) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._current_bytes -= entry.size
+        return True
+
+    def _evict_locked(self):
+        while self._current_bytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self._current_bytes -= entry.size
+            self._evictions += 1
+
+
+# 全局L1缓存实例
+_memory_cache = None
+_memory_cache_lock = threading.Lock()
+
+def get_memory_cache() -> MemoryCacheTier:
+    """获取全局L1内存缓存实例"""
+    global _memory_cache
+    if _memory_cache is None:
+        with _memory_cache_lock:
+            if _memory_cache is None:
+                max_mb = float(os.getenv('TRADINGAGENTS_MEMORY_CACHE_MAX_MB', '256'))
+                enabled = os.getenv('TRADINGAGENTS_MEMORY_CACHE_ENABLED', 'true').lower() == 'true'
+                _memory_cache = MemoryCacheTier(max_bytes=int(max_mb * 1024 * 1024), enabled=enabled)
+                logger.info(f"🧠 L1内存缓存初始化: {'启用' if enabled else '禁用'}, 上限 {max_mb:g}MB")
+    return _memory_cache
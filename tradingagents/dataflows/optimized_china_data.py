@@ -5,12 +5,16 @@
 """
 
 import os
-import time
 import random
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
+
+import pandas as pd
+
 from .cache_manager import get_cache
 from .config import get_config
+from .single_flight import coalesce
+from .stock_data import StockBars
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
@@ -23,22 +27,9 @@ class OptimizedChinaDataProvider:
     def __init__(self):
         self.cache = get_cache()
         self.config = get_config()
-        self.last_api_call = 0
-        self.min_api_interval = 0.5  # Tushare数据接口调用间隔较短
         
         logger.info(f"📊 优化A股数据提供器初始化完成")
     
-    def _wait_for_rate_limit(self):
-        """等待API限制"""
-        current_time = time.time()
-        time_since_last_call = current_time - self.last_api_call
-        
-        if time_since_last_call < self.min_api_interval:
-            wait_time = self.min_api_interval - time_since_last_call
-            time.sleep(wait_time)
-        
-        self.last_api_call = time.time()
-    
     def get_stock_data(self, symbol: str, start_date: str, end_date: str, 
                       force_refresh: bool = False) -> str:
         """
@@ -53,75 +44,74 @@ class OptimizedChinaDataProvider:
         Returns:
             格式化的股票数据字符串
         """
+        result = self.get_stock_bars(symbol, start_date, end_date, force_refresh)
+        if result is None:
+            # 生成备用数据
+            return self._generate_fallback_data(symbol, start_date, end_date, "数据源API调用失败")
+        return result.render()
+    
+    def get_stock_bars(self, symbol: str, start_date: str, end_date: str,
+                       force_refresh: bool = False) -> Optional[StockBars]:
+        """
+        获取结构化的A股K线，数据源失败时使用过期缓存
+        
+        Args:
+            symbol: 股票代码（6位数字）
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+            force_refresh: 是否强制刷新缓存
+        
+        Returns:
+            StockBars: K线数据；数据源和过期缓存都不可用时返回None
+        """
         logger.info(f"📈 获取A股数据: {symbol} ({start_date} 到 {end_date})")
         
-        # 检查缓存（除非强制刷新）
-        if not force_refresh:
-            cache_key = self.cache.find_cached_stock_data(
-                symbol=symbol,
-                start_date=start_date,
-                end_date=end_date,
-                data_source="tdx"
-            )
-            
-            if cache_key:
-                cached_data = self.cache.load_stock_data(cache_key)
-                if cached_data:
-                    logger.info(f"⚡ 从缓存加载A股数据: {symbol}")
-                    return cached_data
+        # K线由统一数据源接口经K线缓存按日期区间提供：子区间直接从本地读取，
+        # 只向数据源补齐缺失区间，因此这里不再按精确日期查找缓存
+        if force_refresh:
+            from .bar_store import get_bar_store
+            get_bar_store().clear(symbol=symbol)
         
-        # 缓存未命中，从Tushare数据接口获取
-        logger.info(f"🌐 从Tushare数据接口获取数据: {symbol}")
+        logger.info(f"🌐 从统一数据源接口获取数据: {symbol}")
         
         try:
-            # API限制处理
-            self._wait_for_rate_limit()
-            
-            # 调用统一数据源接口（默认Tushare，支持备用数据源）
-            from .data_source_manager import get_china_stock_data_unified
+            # 调用统一数据源接口（默认Tushare，支持备用数据源；按数据源限流，受限时切换备用数据源）
+            from .data_source_manager import get_china_stock_bars_unified
 
-            formatted_data = get_china_stock_data_unified(
-                symbol=symbol,
-                start_date=start_date,
-                end_date=end_date
-            )
+            result = get_china_stock_bars_unified(symbol, start_date, end_date)
 
             # 检查是否获取成功
-            if "❌" in formatted_data or "错误" in formatted_data:
+            if not result.ok:
                 logger.error(f"❌ 数据源API调用失败: {symbol}")
                 # 尝试从旧缓存获取数据
                 old_cache = self._try_get_old_cache(symbol, start_date, end_date)
                 if old_cache:
                     logger.info(f"📁 使用过期缓存数据: {symbol}")
                     return old_cache
-
-                # 生成备用数据
-                return self._generate_fallback_data(symbol, start_date, end_date, "数据源API调用失败")
+                return None
             
-            # 保存到缓存
-            self.cache.save_stock_data(
-                symbol=symbol,
-                data=formatted_data,
-                start_date=start_date,
-                end_date=end_date,
-                data_source="unified"  # 使用统一数据源标识
-            )
+            # 保存K线到缓存（数据源失败时作为过期备用数据）
+            if result.text is None:
+                self.cache.save_stock_data(
+                    symbol=symbol,
+                    data=result.bars,
+                    start_date=start_date,
+                    end_date=end_date,
+                    data_source="unified"  # 使用统一数据源标识
+                )
             
             logger.info(f"✅ A股数据获取成功: {symbol}")
-            return formatted_data
+            return result
             
         except Exception as e:
-            error_msg = f"Tushare数据接口调用异常: {str(e)}"
-            logger.error(f"❌ {error_msg}")
+            logger.error(f"❌ 统一数据源接口调用异常: {e}")
             
             # 尝试从旧缓存获取数据
             old_cache = self._try_get_old_cache(symbol, start_date, end_date)
             if old_cache:
                 logger.info(f"📁 使用过期缓存数据: {symbol}")
                 return old_cache
-            
-            # 生成备用数据
-            return self._generate_fallback_data(symbol, start_date, end_date, error_msg)
+            return None
     
     def get_fundamentals_data(self, symbol: str, force_refresh: bool = False) -> str:
         """
@@ -139,24 +129,12 @@ class OptimizedChinaDataProvider:
         # 检查缓存（除非强制刷新）
         if not force_refresh:
             # 查找基本面数据缓存
-            for metadata_file in self.cache.metadata_dir.glob(f"*_meta.json"):
-                try:
-                    import json
-                    with open(metadata_file, 'r', encoding='utf-8') as f:
-                        metadata = json.load(f)
-                    
-                    if (metadata.get('symbol') == symbol and 
-                        metadata.get('data_type') == 'fundamentals' and
-                        metadata.get('market_type') == 'china'):
-                        
-                        cache_key = metadata_file.stem.replace('_meta', '')
-                        if self.cache.is_cache_valid(cache_key, symbol=symbol, data_type='fundamentals'):
-                            cached_data = self.cache.load_stock_data(cache_key)
-                            if cached_data:
-                                logger.info(f"⚡ 从缓存加载A股基本面数据: {symbol}")
-                                return cached_data
-                except Exception:
-                    continue
+            cache_key = self.cache.find_cached_fundamentals_data(symbol)
+            if cache_key:
+                cached_data = self.cache.load_fundamentals_data(cache_key)
+                if cached_data:
+                    logger.info(f"⚡ 从缓存加载A股基本面数据: {symbol}")
+                    return cached_data
         
         # 缓存未命中，生成基本面分析
         logger.debug(f"🔍 生成A股基本面分析: {symbol}")
@@ -166,7 +144,7 @@ class OptimizedChinaDataProvider:
             current_date = datetime.now().strftime('%Y-%m-%d')
             start_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
             
-            stock_data = self.get_stock_data(symbol, start_date, current_date)
+            stock_data = self.get_stock_bars(symbol, start_date, current_date)
             
             # 生成基本面分析报告
             fundamentals_data = self._generate_fundamentals_report(symbol, stock_data)
@@ -186,74 +164,48 @@ class OptimizedChinaDataProvider:
             logger.error(f"❌ {error_msg}")
             return self._generate_fallback_fundamentals(symbol, error_msg)
     
-    def _generate_fundamentals_report(self, symbol: str, stock_data: str) -> str:
-        """基于股票数据生成真实的基本面分析报告"""
+    def _generate_fundamentals_report(self, symbol: str, stock_data: Optional[StockBars] = None) -> str:
+        """
+        基于股票数据生成真实的基本面分析报告
 
-        # 添加详细的股票代码追踪日志
-        logger.debug(f"🔍 [股票代码追踪] _generate_fundamentals_report 接收到的股票代码: '{symbol}' (类型: {type(symbol)})")
-        logger.debug(f"🔍 [股票代码追踪] 股票代码长度: {len(str(symbol))}")
-        logger.debug(f"🔍 [股票代码追踪] 股票代码字符: {list(str(symbol))}")
-        logger.debug(f"🔍 [股票代码追踪] 接收到的股票数据前200字符: {stock_data[:200] if stock_data else 'None'}")
+        Args:
+            symbol: 股票代码
+            stock_data: 最近的K线（StockBars）；传入格式化文本（旧调用方式）时重新获取最近30天K线
+        """
+        logger.debug(f"🔍 [股票代码追踪] _generate_fundamentals_report 接收到的股票代码: '{symbol}'")
+
+        if isinstance(stock_data, str):
+            current_date = datetime.now().strftime('%Y-%m-%d')
+            start_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+            stock_data = self.get_stock_bars(symbol, start_date, current_date)
 
-        # 从股票数据中提取信息
+        # 从结构化数据中读取信息
         company_name = "未知公司"
         current_price = "N/A"
         volume = "N/A"
         change_pct = "N/A"
+        price_value = None
 
-        # 首先尝试从统一接口获取股票基本信息
+        # 首先从统一接口获取股票基本信息
         try:
-            logger.debug(f"🔍 [股票代码追踪] 尝试获取{symbol}的基本信息...")
-            from .interface import get_china_stock_info_unified
-            stock_info = get_china_stock_info_unified(symbol)
-            logger.debug(f"🔍 [股票代码追踪] 获取到的股票信息: {stock_info}")
-
-            if "股票名称:" in stock_info:
-                lines = stock_info.split('\n')
-                for line in lines:
-                    if "股票名称:" in line:
-                        company_name = line.split(':')[1].strip()
-                        logger.debug(f"🔍 [股票代码追踪] 从统一接口获取到股票名称: {company_name}")
-                        break
+            from .interface import get_china_stock_info_record
+            stock_info = get_china_stock_info_record(symbol)
+            if stock_info is not None and stock_info.has_name:
+                company_name = stock_info.name
+                logger.debug(f"🔍 [股票代码追踪] 从统一接口获取到股票名称: {company_name}")
         except Exception as e:
             logger.warning(f"⚠️ 获取股票基本信息失败: {e}")
 
-        # 然后从股票数据中提取价格信息
-        if "股票名称:" in stock_data:
-            lines = stock_data.split('\n')
-            for line in lines:
-                if "股票名称:" in line and company_name == "未知公司":
-                    company_name = line.split(':')[1].strip()
-                elif "当前价格:" in line:
-                    current_price = line.split(':')[1].strip()
-                elif "涨跌幅:" in line:
-                    change_pct = line.split(':')[1].strip()
-                elif "成交量:" in line:
-                    volume = line.split(':')[1].strip()
-
-        # 尝试从股票数据表格中提取最新价格信息
-        if current_price == "N/A" and stock_data:
-            try:
-                lines = stock_data.split('\n')
-                for i, line in enumerate(lines):
-                    if "最新数据:" in line and i + 1 < len(lines):
-                        # 查找数据行
-                        for j in range(i + 1, min(i + 5, len(lines))):
-                            data_line = lines[j].strip()
-                            if data_line and not data_line.startswith('日期') and not data_line.startswith('-'):
-                                # 尝试解析数据行
-                                parts = data_line.split()
-                                if len(parts) >= 4:
-                                    try:
-                                        # 假设格式: 日期 股票代码 开盘 收盘 最高 最低 成交量 成交额...
-                                        current_price = parts[3]  # 收盘价
-                                        logger.debug(f"🔍 [股票代码追踪] 从数据表格提取到收盘价: {current_price}")
-                                        break
-                                    except (IndexError, ValueError):
-                                        continue
-                        break
-            except Exception as e:
-                logger.debug(f"🔍 [股票代码追踪] 解析股票数据表格失败: {e}")
+        # 然后从K线中读取最新行情
+        quote = stock_data.quote() if stock_data is not None else None
+        if quote is not None:
+            if company_name == "未知公司" and quote.name and quote.name != f'股票{symbol}':
+                company_name = quote.name
+            price_value = quote.price
+            current_price = f"¥{quote.price:.2f}"
+            change_pct = f"{quote.change_pct:+.2f}%"
+            if quote.volume is not None:
+                volume = f"{quote.volume:,.0f}"
 
         # 根据股票代码判断行业和基本信息
         logger.debug(f"🔍 [股票代码追踪] 调用 _get_industry_info，传入参数: '{symbol}'")
@@ -261,7 +213,7 @@ class OptimizedChinaDataProvider:
         logger.debug(f"🔍 [股票代码追踪] _get_industry_info 返回结果: {industry_info}")
 
         logger.debug(f"🔍 [股票代码追踪] 调用 _estimate_financial_metrics，传入参数: '{symbol}'")
-        financial_estimates = self._estimate_financial_metrics(symbol, current_price)
+        financial_estimates = self._estimate_financial_metrics(symbol, price_value)
         logger.debug(f"🔍 [股票代码追踪] _estimate_financial_metrics 返回结果: {financial_estimates}")
 
         logger.debug(f"🔍 [股票代码追踪] 开始生成报告，使用股票代码: '{symbol}'")
@@ -455,13 +407,10 @@ class OptimizedChinaDataProvider:
 
         return info
 
-    def _estimate_financial_metrics(self, symbol: str, current_price: str) -> dict:
+    def _estimate_financial_metrics(self, symbol: str, price_value: Optional[float]) -> dict:
         """获取真实财务指标（优先使用Tushare真实数据，失败时使用估算）"""
 
-        # 提取价格数值
-        try:
-            price_value = float(current_price.replace('¥', '').replace(',', ''))
-        except:
+        if not price_value:
             price_value = 10.0  # 默认值
 
         # 尝试获取真实财务数据
@@ -1060,27 +1009,23 @@ class OptimizedChinaDataProvider:
 - 建议等待基本面改善或估值回落
 - 风险承受能力较低的投资者应避免"""
     
-    def _try_get_old_cache(self, symbol: str, start_date: str, end_date: str) -> Optional[str]:
+    def _try_get_old_cache(self, symbol: str, start_date: str, end_date: str) -> Optional[StockBars]:
         """尝试获取过期的缓存数据作为备用"""
         try:
             # 查找任何相关的缓存，不考虑TTL
-            for metadata_file in self.cache.metadata_dir.glob(f"*_meta.json"):
-                try:
-                    import json
-
-                    with open(metadata_file, 'r', encoding='utf-8') as f:
-                        metadata = json.load(f)
-                    
-                    if (metadata.get('symbol') == symbol and 
-                        metadata.get('data_type') == 'stock_data' and
-                        metadata.get('market_type') == 'china'):
-                        
-                        cache_key = metadata_file.stem.replace('_meta', '')
-                        cached_data = self.cache.load_stock_data(cache_key)
-                        if cached_data:
-                            return cached_data + "\n\n⚠️ 注意: 使用的是过期缓存数据"
-                except Exception:
-                    continue
+            cache_key = self.cache.metadata_index.find_latest(symbol, 'stock_data', market_type='china')
+            if cache_key:
+                cached_data = self.cache.load_stock_data(cache_key)
+                metadata = self.cache.metadata_index.get(cache_key) or {}
+                result = StockBars(symbol=symbol, start_date=metadata.get('start_date'),
+                                   end_date=metadata.get('end_date'), source='cache', stale=True)
+                if isinstance(cached_data, pd.DataFrame) and not cached_data.empty:
+                    result.bars = cached_data
+                    return result
+                if isinstance(cached_data, str) and cached_data:
+                    # 旧版缓存保存的是格式化文本
+                    result.text = cached_data + "\n\n⚠️ 注意: 使用的是过期缓存数据"
+                    return result
         except Exception:
             pass
         
@@ -1134,6 +1079,7 @@ def get_optimized_china_data_provider() -> OptimizedChinaDataProvider:
     return _china_data_provider
 
 
+@coalesce('china_stock_data')
 def get_china_stock_data_cached(symbol: str, start_date: str, end_date: str, 
                                force_refresh: bool = False) -> str:
     """
@@ -1152,6 +1098,7 @@ def get_china_stock_data_cached(symbol: str, start_date: str, end_date: str,
     return provider.get_stock_data(symbol, start_date, end_date, force_refresh)
 
 
+@coalesce('china_fundamentals')
 def get_china_fundamentals_cached(symbol: str, force_refresh: bool = False) -> str:
     """
     获取A股基本面数据的便捷函数
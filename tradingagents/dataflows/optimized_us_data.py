@@ -5,14 +5,16 @@
 """
 
 import os
-import time
 import random
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 import yfinance as yf
 import pandas as pd
 from .cache_manager import get_cache
+from .bar_store import get_bar_store
 from .config import get_config
+from .rate_limiter import get_rate_limiter
+from .single_flight import coalesce
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
@@ -24,23 +26,26 @@ class OptimizedUSDataProvider:
     
     def __init__(self):
         self.cache = get_cache()
+        self.bar_store = get_bar_store()
         self.config = get_config()
-        self.last_api_call = 0
-        self.min_api_interval = 1.0  # 最小API调用间隔（秒）
+        # 按上游API共享的令牌桶限流器（跨实例、线程和进程）
+        self.rate_limiter = get_rate_limiter()
         
         logger.info(f"📊 优化美股数据提供器初始化完成")
     
-    def _wait_for_rate_limit(self):
-        """等待API限制"""
-        current_time = time.time()
-        time_since_last_call = current_time - self.last_api_call
-        
-        if time_since_last_call < self.min_api_interval:
-            wait_time = self.min_api_interval - time_since_last_call
-            logger.info(f"⏳ API限制等待 {wait_time:.1f}s...")
-            time.sleep(wait_time)
-        
-        self.last_api_call = time.time()
+    def _fetch_yfinance_bars(self, symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+        """从Yahoo Finance获取 [start_date, end_date] 闭区间的K线"""
+        # Yahoo Finance是最后的数据源，等待令牌
+        self.rate_limiter.acquire('yfinance')
+        # yfinance 的 end 参数不包含当天，向后顺延一天
+        end_exclusive = (datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+        return yf.Ticker(symbol).history(start=start_date, end=end_exclusive)
+    
+    def _get_yfinance_bars(self, symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+        """通过K线缓存获取Yahoo Finance数据，只请求本地缺失的区间"""
+        ttl_hours = self.cache.cache_config.get('us_stock_data', {}).get('ttl_hours', 2)
+        return self.bar_store.get_bars("yfinance", symbol, start_date, end_date,
+                                       self._fetch_yfinance_bars, ttl_hours=ttl_hours)
     
     def get_stock_data(self, symbol: str, start_date: str, end_date: str, 
                       force_refresh: bool = False) -> str:
@@ -59,8 +64,11 @@ class OptimizedUSDataProvider:
         logger.info(f"📈 获取美股数据: {symbol} ({start_date} 到 {end_date})")
         
         # 检查缓存（除非强制刷新）
-        if not force_refresh:
-            # 优先查找FINNHUB缓存
+        # Yahoo Finance的K线由K线缓存按日期区间提供，这里只查找FINNHUB实时行情缓存
+        if force_refresh:
+            self.bar_store.clear(symbol=symbol)
+            self.bar_store.clear(symbol=symbol.upper())
+        else:
             cache_key = self.cache.find_cached_stock_data(
                 symbol=symbol,
                 start_date=start_date,
@@ -68,15 +76,6 @@ class OptimizedUSDataProvider:
                 data_source="finnhub"
             )
 
-            # 如果没有FINNHUB缓存，查找Yahoo Finance缓存
-            if not cache_key:
-                cache_key = self.cache.find_cached_stock_data(
-                    symbol=symbol,
-                    start_date=start_date,
-                    end_date=end_date,
-                    data_source="yfinance"
-                )
-
             if cache_key:
                 cached_data = self.cache.load_stock_data(cache_key)
                 if cached_data:
@@ -87,22 +86,24 @@ class OptimizedUSDataProvider:
         formatted_data = None
         data_source = None
 
-        # 尝试FINNHUB API（优先）
-        try:
-            logger.info(f"🌐 从FINNHUB API获取数据: {symbol}")
-            self._wait_for_rate_limit()
-
-            formatted_data = self._get_data_from_finnhub(symbol, start_date, end_date)
-            if formatted_data and "❌" not in formatted_data:
-                data_source = "finnhub"
-                logger.info(f"✅ FINNHUB数据获取成功: {symbol}")
-            else:
-                logger.error(f"⚠️ FINNHUB数据获取失败，尝试备用方案")
-                formatted_data = None
+        # 尝试FINNHUB API（优先）；令牌不足时不等待，直接使用备用方案
+        if not self.rate_limiter.try_acquire('finnhub'):
+            logger.info(f"⏳ FINNHUB调用频率受限，使用备用方案: {symbol}")
+        else:
+            try:
+                logger.info(f"🌐 从FINNHUB API获取数据: {symbol}")
 
-        except Exception as e:
-            logger.error(f"❌ FINNHUB API调用失败: {e}")
-            formatted_data = None
+                formatted_data = self._get_data_from_finnhub(symbol, start_date, end_date)
+                if formatted_data and "❌" not in formatted_data:
+                    data_source = "finnhub"
+                    logger.info(f"✅ FINNHUB数据获取成功: {symbol}")
+                else:
+                    logger.error(f"⚠️ FINNHUB数据获取失败，尝试备用方案")
+                    formatted_data = None
+
+            except Exception as e:
+                logger.error(f"❌ FINNHUB API调用失败: {e}")
+                formatted_data = None
 
         # 备用方案：根据股票类型选择合适的数据源
         if not formatted_data:
@@ -130,9 +131,7 @@ class OptimizedUSDataProvider:
                         # 备用方案：Yahoo Finance
                         logger.info(f"🔄 使用Yahoo Finance备用方案获取港股数据: {symbol}")
 
-                        self._wait_for_rate_limit()
-                        ticker = yf.Ticker(symbol)  # 港股代码保持原格式
-                        data = ticker.history(start=start_date, end=end_date)
+                        data = self._get_yfinance_bars(symbol, start_date, end_date)  # 港股代码保持原格式
 
                         if not data.empty:
                             formatted_data = self._format_stock_data(symbol, data, start_date, end_date)
@@ -143,11 +142,8 @@ class OptimizedUSDataProvider:
                 else:
                     # 美股使用Yahoo Finance
                     logger.info(f"🇺🇸 从Yahoo Finance API获取美股数据: {symbol}")
-                    self._wait_for_rate_limit()
-
-                    # 获取数据
-                    ticker = yf.Ticker(symbol.upper())
-                    data = ticker.history(start=start_date, end=end_date)
+                    # 获取数据（本地已覆盖的区间直接从K线缓存读取）
+                    data = self._get_yfinance_bars(symbol.upper(), start_date, end_date)
 
                     if data.empty:
                         error_msg = f"未找到股票 '{symbol}' 在 {start_date} 到 {end_date} 期间的数据"
@@ -244,22 +240,11 @@ class OptimizedUSDataProvider:
         """尝试获取过期的缓存数据作为备用"""
         try:
             # 查找任何相关的缓存，不考虑TTL
-            for metadata_file in self.cache.metadata_dir.glob(f"*_meta.json"):
-                try:
-                    import json
-                    with open(metadata_file, 'r', encoding='utf-8') as f:
-                        metadata = json.load(f)
-                    
-                    if (metadata.get('symbol') == symbol and 
-                        metadata.get('data_type') == 'stock_data' and
-                        metadata.get('market_type') == 'us'):
-                        
-                        cache_key = metadata_file.stem.replace('_meta', '')
-                        cached_data = self.cache.load_stock_data(cache_key)
-                        if cached_data:
-                            return cached_data + "\n\n⚠️ 注意: 使用的是过期缓存数据"
-                except Exception:
-                    continue
+            cache_key = self.cache.metadata_index.find_latest(symbol, 'stock_data', market_type='us')
+            if cache_key:
+                cached_data = self.cache.load_stock_data(cache_key)
+                if isinstance(cached_data, str) and cached_data:
+                    return cached_data + "\n\n⚠️ 注意: 使用的是过期缓存数据"
         except Exception:
             pass
         
@@ -354,6 +339,7 @@ def get_optimized_us_data_provider() -> OptimizedUSDataProvider:
     return _us_data_provider
 
 
+@coalesce('us_stock_data')
 def get_us_stock_data_cached(symbol: str, start_date: str, end_date: str, 
                            force_refresh: bool = False) -> str:
     """
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+批量数据预取
+在批量分析开始前并发拉取每只股票的行情、基本面和新闻，写入K线存储/文件缓存/L1内存缓存，
+分析师随后的工具调用直接命中缓存，不再逐只串行访问数据源
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+# 行情预取的回看天数，覆盖长周期指标（如200日均线）所需的历史数据
+DEFAULT_PRICE_LOOKBACK_DAYS = 365
+# 新闻回看天数，与统一新闻工具一致
+NEWS_LOOKBACK_DAYS = 7
+
+
+def _clean_ticker(ticker: str) -> str:
+    """去掉交易所后缀，与统一新闻工具的处理方式一致"""
+    for suffix in ('.SH', '.SZ', '.SS', '.HK', '.XSHE', '.XSHG'):
+        ticker = ticker.replace(suffix, '')
+    return ticker
+
+
+def _price_task(ticker: str, market_info: Dict, start_date: str, end_date: str) -> Callable[[], object]:
+    if market_info['is_china']:
+        from .interface import get_china_stock_data_unified
+        return lambda: get_china_stock_data_unified(ticker, start_date, end_date)
+    if market_info['is_hk']:
+        from .interface import get_hk_stock_data_unified
+        return lambda: get_hk_stock_data_unified(ticker, start_date, end_date)
+    from .optimized_us_data import get_us_stock_data_cached
+    return lambda: get_us_stock_data_cached(ticker, start_date, end_date)
+
+
+def _fundamentals_task(ticker: str, market_info: Dict, trade_date: str) -> Optional[Callable[[], object]]:
+    if market_info['is_china']:
+        def load():
+            from .interface import get_china_stock_info_unified
+            from .akshare_utils import get_akshare_provider
+            get_china_stock_info_unified(ticker)
+            return get_akshare_provider().get_financial_data(ticker)
+        return load
+    if market_info['is_us']:
+        from .interface import get_fundamentals_openai
+        return lambda: get_fundamentals_openai(ticker, trade_date)
+    # 港股基本面工具只使用行情数据和基础信息，无需单独预取
+    return None
+
+
+def _news_task(ticker: str, market_info: Dict, trade_date: str) -> Optional[Callable[[], object]]:
+    if not (market_info['is_china'] or market_info['is_hk']):
+        # 美股新闻工具读取本地Finnhub数据，无需预取
+        return None
+
+    def load():
+        from .akshare_utils import get_stock_news_em
+        from .interface import get_google_news
+        clean_ticker = _clean_ticker(ticker)
+        get_stock_news_em(clean_ticker)
+        if market_info['is_china']:
+            query = f"{clean_ticker} 股票 公司 财报 新闻"
+        else:
+            query = f"{ticker} 港股"
+        return get_google_news(query, trade_date, NEWS_LOOKBACK_DAYS)
+    return load
+
+
+def build_prefetch_tasks(ticker: str, trade_date: str,
+                         price_lookback_days: int = DEFAULT_PRICE_LOOKBACK_DAYS) -> Dict[str, Callable[[], object]]:
+    """
+    生成单只股票的预取任务
+
+    Args:
+        ticker: 股票代码
+        trade_date: 分析日期 (YYYY-MM-DD)
+        price_lookback_days: 行情回看天数
+
+    Returns:
+        Dict: 数据类别（price/fundamentals/news）到无参加载函数的映射
+    """
+    from tradingagents.utils.stock_utils import StockUtils
+
+    market_info = StockUtils.get_market_info(ticker)
+    start_date = (datetime.strptime(trade_date, '%Y-%m-%d')
+                  - timedelta(days=price_lookback_days)).strftime('%Y-%m-%d')
+
+    tasks = {
+        'price': _price_task(ticker, market_info, start_date, trade_date),
+        'fundamentals': _fundamentals_task(ticker, market_info, trade_date),
+        'news': _news_task(ticker, market_info, trade_date),
+    }
+    return {kind: task for kind, task in tasks.items() if task is not None}
+
+
+def prefetch_stock_data(requests: Iterable[Tuple[str, str]], max_workers: int = 8,
+                        price_lookback_days: int = DEFAULT_PRICE_LOOKBACK_DAYS) -> Dict[Tuple[str, str], Dict[str, str]]:
+    """
+    并发预取一批股票的行情、基本面和新闻数据
+
+    单个任务失败只记录日志，不影响其他股票和后续分析（分析师工具会再次尝试获取）。
+
+    Args:
+        requests: (股票代码, 分析日期) 列表
+        max_workers: 并发线程数
+        price_lookback_days: 行情回看天数
+
+    Returns:
+        Dict: (股票代码, 分析日期) -> {数据类别: 'ok' 或错误信息}
+    """
+    pairs = list(dict.fromkeys((str(ticker), str(trade_date)) for ticker, trade_date in requests))
+    report: Dict[Tuple[str, str], Dict[str, str]] = {pair: {} for pair in pairs}
+    if not pairs:
+        return report
+
+    start = time.time()
+    logger.info(f"📦 [批量预取] 开始预取 {len(pairs)} 只股票的数据，并发数: {max_workers}")
+
+    jobs: List[Tuple[Tuple[str, str], str, Callable[[], object]]] = []
+    for pair in pairs:
+        try:
+            tasks = build_prefetch_tasks(pair[0], pair[1], price_lookback_days)
+        except Exception as e:
+            logger.warning(f"⚠️ [批量预取] {pair[0]} 预取任务创建失败: {e}")
+            report[pair]['error'] = str(e)
+            continue
+        jobs.extend((pair, kind, task) for kind, task in tasks.items())
+
+    def run(job):
+        pair, kind, task = job
+        try:
+            task()
+            return pair, kind, 'ok'
+        except Exception as e:
+            logger.warning(f"⚠️ [批量预取] {pair[0]} {kind} 预取失败: {e}")
+            return pair, kind, str(e)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="prefetch") as executor:
+        for pair, kind, status in executor.map(run, jobs):
+            report[pair][kind] = status
+
+    succeeded = sum(1 for statuses in report.values() for status in statuses.values() if status == 'ok')
+    logger.info(f"✅ [批量预取] 完成: {succeeded}/{len(jobs)} 个任务成功，耗时 {time.time() - start:.2f}秒")
+    return report
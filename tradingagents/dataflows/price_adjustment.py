@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+复权计算引擎
+基于日涨跌幅（pct_chg）构造连续的累计收益指数，一次向量化累乘得到复权因子，
+再同时作用于开高低收四列：
+- 前复权（forward）：以最新收盘价为基准，复权价 = 指数 × 最新收盘价 / 最新指数
+- 后复权（backward）：以区间首日收盘价为基准，复权价 = 指数 × 首日收盘价 / 首日指数
+
+每个股票缓存已计算的累计指数；后续追加新交易日时只需从缓存的最后一个指数值继续累乘。
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+PRICE_COLUMNS = ('open', 'high', 'low', 'close')
+ADJUST_MODES = ('forward', 'backward')
+
+
+@dataclass
+class _IndexState:
+    """单个股票已计算的累计收益指数"""
+    dates: np.ndarray  # datetime64[ns]，升序
+    index: np.ndarray  # float64，与 dates 一一对应
+
+
+class PriceAdjustmentEngine:
+    """基于pct_chg的复权计算引擎"""
+
+    def __init__(self, max_symbols: int = 512):
+        """
+        Args:
+            max_symbols: 缓存累计指数的股票数量上限（LRU淘汰）
+        """
+        self.max_symbols = max_symbols
+        self._states: "OrderedDict[str, _IndexState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.full_builds = 0
+        self.incremental_builds = 0
+
+    def adjust(self, data: pd.DataFrame, mode: str = 'forward', symbol: Optional[str] = None,
+               date_column: str = 'trade_date', pct_column: str = 'pct_chg') -> pd.DataFrame:
+        """
+        计算复权价格
+
+        Args:
+            data: 包含日期、涨跌幅和开高低收的未复权日线数据
+            mode: 'forward'（前复权）或 'backward'（后复权）
+            symbol: 股票代码，用于缓存累计指数；为空时从 ts_code 列推断，仍为空则不缓存
+            date_column: 日期列名
+            pct_column: 涨跌幅列名
+
+        Returns:
+            DataFrame: 按日期升序，原始价格保存在 *_raw 列，price_type 标记复权方式
+        """
+        if mode not in ADJUST_MODES:
+            raise ValueError(f"不支持的复权方式: {mode}")
+
+        adjusted = data.sort_values(date_column).reset_index(drop=True)
+        if symbol is None and 'ts_code' in adjusted.columns:
+            symbol = str(adjusted['ts_code'].iloc[0])
+
+        dates = pd.to_datetime(adjusted[date_column]).to_numpy(dtype='datetime64[ns]')
+        growth = 1.0 + pd.to_numeric(adjusted[pct_column], errors='coerce').fillna(0.0).to_numpy(np.float64) / 100.0
+        index = self._cumulative_index(symbol, dates, growth)
+
+        columns = [col for col in PRICE_COLUMNS if col in adjusted.columns]
+        raw = adjusted[columns].to_numpy(np.float64)
+        for col in columns:
+            adjusted[f'{col}_raw'] = adjusted[col]
+
+        close_raw = adjusted['close_raw'].to_numpy(np.float64)
+        if mode == 'forward':
+            adjusted_close = index * (close_raw[-1] / index[-1])
+        else:
+            adjusted_close = index * (close_raw[0] / index[0])
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            factor = np.where(close_raw != 0, adjusted_close / close_raw, 1.0)
+        adjusted[columns] = raw * factor[:, None]
+        adjusted['close'] = adjusted_close
+        adjusted['adj_factor'] = factor
+        adjusted['price_type'] = f'{mode}_adjusted'
+        return adjusted
+
+    def clear(self, symbol: Optional[str] = None):
+        """清除缓存的累计指数"""
+        with self._lock:
+            if symbol is None:
+                self._states.clear()
+            else:
+                self._states.pop(symbol, None)
+
+    # ------------------------------------------------------------------
+    # 内部方法
+    # ------------------------------------------------------------------
+
+    def _cumulative_index(self, symbol: Optional[str], dates: np.ndarray, growth: np.ndarray) -> np.ndarray:
+        """
+        返回与 dates 对应的累计收益指数（首日涨跌幅不计入，只有相对比值有意义）
+        """
+        if symbol is None:
+            self.full_builds += 1
+            return self._build(growth)
+
+        with self._lock:
+            state = self._states.get(symbol)
+            if state is not None:
+                self._states.move_to_end(symbol)
+
+        index = self._extend(state, dates, growth) if state is not None else None
+        if index is None:
+            index = self._build(growth)
+            self.full_builds += 1
+            state = _IndexState(dates=dates, index=index)
+        else:
+            self.incremental_builds += 1
+            if dates[-1] > state.dates[-1]:
+                new = dates > state.dates[-1]
+                state = _IndexState(dates=np.concatenate([state.dates, dates[new]]),
+                                    index=np.concatenate([state.index, index[new]]))
+
+        with self._lock:
+            self._states[symbol] = state
+            self._states.move_to_end(symbol)
+            while len(self._states) > self.max_symbols:
+                self._states.popitem(last=False)
+        return index
+
+    @staticmethod
+    def _build(growth: np.ndarray) -> np.ndarray:
+        growth = growth.copy()
+        growth[0] = 1.0
+        return np.cumprod(growth)
+
+    @staticmethod
+    def _extend(state: _IndexState, dates: np.ndarray, growth: np.ndarray) -> Optional[np.ndarray]:
+        """用缓存的指数计算 dates 的指数；数据与缓存不连续时返回None（需全量计算）"""
+        if dates[0] < state.dates[0] or dates[0] > state.dates[-1]:
+            return None
+        start = int(np.searchsorted(state.dates, dates[0]))
+        cached_count = int(np.searchsorted(dates, state.dates[-1], side='right'))
+        if not np.array_equal(state.dates[start:start + cached_count], dates[:cached_count]):
+            return None
+
+        cached = state.index[start:start + cached_count]
+        if cached_count == len(dates):
+            return cached.copy()
+        # 只对缓存之后的新交易日累乘
+        appended = cached[-1] * np.cumprod(growth[cached_count:])
+        return np.concatenate([cached, appended])
+
+
+def restore_raw_prices(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    还原未复权价格：有 *_raw 列的行用原始价格覆盖复权价格，并去掉复权附加列
+
+    复权价格锚定在所在区间的最后（或第一个）交易日，分段获取的复权数据不能直接拼接，
+    需要还原后对完整区间重新计算。
+    """
+    raw = data.copy()
+    for col in PRICE_COLUMNS:
+        raw_col = f'{col}_raw'
+        if raw_col in raw.columns:
+            if col in raw.columns:
+                raw[col] = raw[raw_col].where(raw[raw_col].notna(), raw[col])
+            else:
+                raw[col] = raw[raw_col]
+    extra = [col for col in raw.columns if col.endswith('_raw') and col[:-4] in PRICE_COLUMNS]
+    extra += [col for col in ('adj_factor', 'price_type') if col in raw.columns]
+    return raw.drop(columns=extra)
+
+
+# 全局复权引擎实例
+_adjustment_engine = None
+_adjustment_engine_lock = threading.Lock()
+
+def get_adjustment_engine() -> PriceAdjustmentEngine:
+    """获取全局复权引擎实例"""
+    global _adjustment_engine
+    if _adjustment_engine is None:
+        with _adjustment_engine_lock:
+            if _adjustment_engine is None:
+                _adjustment_engine = PriceAdjustmentEngine()
+    return _adjustment_engine
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+上游API令牌桶限流
+按上游API（tushare、finnhub、yfinance……）维护令牌桶，所有数据提供器共享同一个限流器：
+- 每个桶有突发容量（burst）和每秒补充速率（rate），通过环境变量 RATE_LIMIT_<API>=rate:burst 覆盖
+- 进程内后端：内存中的令牌桶，线程间共享
+- 跨进程后端：SQLite文件中的令牌桶，BEGIN IMMEDIATE 加写锁保证多个Web工作进程原子地扣减令牌
+- try_acquire 不阻塞，拿不到令牌时调用方可以直接切换到其他数据源；acquire 等待令牌（可设超时）
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """令牌桶参数"""
+    rate: float   # 每秒补充的令牌数
+    burst: float  # 桶容量（允许的突发请求数）
+
+    def __post_init__(self):
+        if self.rate < 0 or self.burst < 1:
+            raise ValueError(f"无效的限流规则 rate={self.rate}, burst={self.burst}：rate不能为负，burst至少为1")
+
+
+# 默认限流规则（与各提供器原来的最小调用间隔一致），未配置的API不限流
+DEFAULT_RATE_LIMITS: Dict[str, RateLimitRule] = {
+    'tushare': RateLimitRule(rate=2.0, burst=2),
+    'finnhub': RateLimitRule(rate=1.0, burst=1),
+    'yfinance': RateLimitRule(rate=1.0, burst=2),
+    'akshare_hk': RateLimitRule(rate=0.2, burst=1),
+}
+
+
+class RateLimitExceeded(Exception):
+    """上游API令牌不足"""
+
+    def __init__(self, api: str, retry_after: float):
+        if math.isinf(retry_after):
+            super().__init__(f"{api} 调用频率受限，令牌不再补充")
+        else:
+            super().__init__(f"{api} 调用频率受限，{retry_after:.1f}秒后可用")
+        self.api = api
+        self.retry_after = retry_after
+
+
+def load_rate_limit_rules() -> Dict[str, RateLimitRule]:
+    """默认规则叠加环境变量 RATE_LIMIT_<API>=rate:burst（如 RATE_LIMIT_TUSHARE=3:5）"""
+    rules = dict(DEFAULT_RATE_LIMITS)
+    for name, value in os.environ.items():
+        if not name.startswith('RATE_LIMIT_') or name in ('RATE_LIMIT_BACKEND', 'RATE_LIMIT_DB_PATH'):
+            continue
+        api = name[len('RATE_LIMIT_'):].lower()
+        try:
+            rate, _, burst = value.partition(':')
+            rate = float(rate)
+            rules[api] = RateLimitRule(rate=rate, burst=float(burst) if burst else max(1.0, rate))
+        except ValueError:
+            logger.warning(f"⚠️ 无效的限流配置 {name}={value}，应为 rate:burst")
+    return rules
+
+
+def _refill(tokens: float, updated: float, now: float, rule: RateLimitRule) -> float:
+    return min(rule.burst, tokens + max(0.0, now - updated) * rule.rate)
+
+
+def _take(tokens: float, cost: float, rule: RateLimitRule) -> Tuple[bool, float, float]:
+    """尝试扣减令牌，返回 (是否成功, 剩余令牌, 还需等待的秒数)"""
+    if tokens >= cost:
+        return True, tokens - cost, 0.0
+    return False, tokens, (cost - tokens) / rule.rate if rule.rate > 0 else float('inf')
+
+
+class LocalTokenBucketBackend:
+    """进程内令牌桶"""
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def try_take(self, api: str, rule: RateLimitRule, cost: float = 1.0) -> Tuple[bool, float]:
+        now = time.time()
+        with self._lock:
+            tokens, updated = self._buckets.get(api, (rule.burst, now))
+            tokens = _refill(tokens, updated, now, rule)
+            ok, tokens, wait = _take(tokens, cost, rule)
+            self._buckets[api] = (tokens, now)
+        return ok, wait
+
+    def reset(self, api: str = None):
+        with self._lock:
+            if api is None:
+                self._buckets.clear()
+            else:
+                self._buckets.pop(api, None)
+
+
+class SQLiteTokenBucketBackend:
+    """基于SQLite文件的跨进程令牌桶"""
+
+    _SCHEMA = """
+    CREATE TABLE IF NOT EXISTS token_buckets (
+        api TEXT PRIMARY KEY,
+        tokens REAL NOT NULL,
+        updated REAL NOT NULL
+    );
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        # 手动控制事务，扣减令牌时用 BEGIN IMMEDIATE 取得跨进程写锁
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False,
+                                     isolation_level=None)
+        with self._lock:
+            try:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            except sqlite3.DatabaseError as e:
+                logger.debug(f"SQLite WAL模式不可用，使用默认日志模式: {e}")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(self._SCHEMA)
+
+    def try_take(self, api: str, rule: RateLimitRule, cost: float = 1.0) -> Tuple[bool, float]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._conn.execute(
+                    "SELECT tokens, updated FROM token_buckets WHERE api = ?", (api,)).fetchone()
+                tokens, updated = row if row else (rule.burst, now)
+                tokens = _refill(tokens, updated, now, rule)
+                ok, tokens, wait = _take(tokens, cost, rule)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO token_buckets (api, tokens, updated) VALUES (?, ?, ?)",
+                    (api, tokens, now))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return ok, wait
+
+    def reset(self, api: str = None):
+        with self._lock:
+            if api is None:
+                self._conn.execute("DELETE FROM token_buckets")
+            else:
+                self._conn.execute("DELETE FROM token_buckets WHERE api = ?", (api,))
+
+
+class RateLimiter:
+    """按上游API限流"""
+
+    def __init__(self, backend=None, rules: Dict[str, RateLimitRule] = None):
+        """
+        Args:
+            backend: 令牌桶后端，默认进程内后端
+            rules: API -> 限流规则，默认 load_rate_limit_rules()
+        """
+        self.backend = backend or LocalTokenBucketBackend()
+        self.rules = rules if rules is not None else load_rate_limit_rules()
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._stats_lock = threading.Lock()
+
+    def try_acquire(self, api: str, cost: float = 1.0) -> bool:
+        """不阻塞地获取令牌，成功返回True；未配置规则的API总是成功"""
+        return self._try(api, cost)[0]
+
+    def acquire(self, api: str, cost: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """
+        等待并获取令牌，超时返回False
+
+        Raises:
+            ValueError: cost 超过桶容量，永远无法获取
+            RateLimitExceeded: 补充速率为0且令牌不足，等待不会有结果
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        waited = 0.0
+        while True:
+            ok, wait = self._try(api, cost)
+            if ok:
+                if waited:
+                    logger.debug(f"⏳ [限流] {api} 等待 {waited:.2f}s 后获得令牌")
+                return True
+            if math.isinf(wait):
+                raise RateLimitExceeded(api, wait)
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            with self._stats_lock:
+                self._stats[api]['waited_seconds'] += wait
+            time.sleep(wait)
+            waited += wait
+
+    def check(self, api: str, cost: float = 1.0):
+        """获取令牌，失败时抛出 RateLimitExceeded"""
+        ok, wait = self._try(api, cost)
+        if not ok:
+            raise RateLimitExceeded(api, wait)
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """按API返回获取成功、被拒绝次数和累计等待时间"""
+        with self._stats_lock:
+            return {api: dict(stats) for api, stats in self._stats.items()}
+
+    def _try(self, api: str, cost: float) -> Tuple[bool, float]:
+        rule = self.rules.get(api)
+        if rule is None:
+            return True, 0.0
+        if cost > rule.burst:
+            raise ValueError(f"{api} 单次请求的令牌数 {cost} 超过桶容量 {rule.burst}")
+        try:
+            ok, wait = self.backend.try_take(api, rule, cost)
+        except Exception as e:
+            # 共享后端异常时不阻断数据获取
+            logger.warning(f"⚠️ [限流] {api} 令牌桶不可用，放行请求: {e}")
+            ok, wait = True, 0.0
+        with self._stats_lock:
+            stats = self._stats.setdefault(api, {'acquired': 0, 'rejected': 0, 'waited_seconds': 0.0})
+            stats['acquired' if ok else 'rejected'] += 1
+        return ok, wait
+
+
+# 全局限流器实例
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+def get_rate_limiter() -> RateLimiter:
+    """获取全局限流器（默认使用SQLite后端在多个进程间共享令牌桶）"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                backend = None
+                if os.getenv('RATE_LIMIT_BACKEND', 'sqlite').lower() == 'sqlite':
+                    db_path = os.getenv('RATE_LIMIT_DB_PATH') or \
+                        Path(__file__).parent / "data_cache" / "rate_limits.sqlite3"
+                    try:
+                        backend = SQLiteTokenBucketBackend(db_path)
+                    except Exception as e:
+                        logger.warning(f"⚠️ [限流] SQLite令牌桶初始化失败，使用进程内限流: {e}")
+                _rate_limiter = RateLimiter(backend)
+    return _rate_limiter
@@ -7,11 +7,15 @@
 import requests
 import json
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Tuple
 import time
 import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dataclasses import dataclass
 
+from .single_flight import coalesce
+
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
@@ -30,18 +34,261 @@ class NewsItem:
     relevance_score: float
 
 
+# 新闻源默认单源超时（秒）
+DEFAULT_SOURCE_TIMEOUTS = {
+    'FinnHub': 8.0,
+    'Alpha Vantage': 10.0,
+    'NewsAPI': 8.0,
+    '中文财经': 12.0,
+}
+
+# 并发模式下的全局截止时间（秒）
+DEFAULT_FETCH_DEADLINE = 15.0
+
+
+class NewsSourceHealth:
+    """
+    新闻源健康统计
+    记录每个新闻源的延迟与成功率，连续失败/超时或持续过慢的新闻源会被暂时降级（跳过），
+    冷却期结束后重新尝试
+    """
+
+    def __init__(self, failure_threshold: int = 3, cooldown_seconds: float = 300.0,
+                 latency_alpha: float = 0.3):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.latency_alpha = latency_alpha
+        self._stats: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, source: str) -> Dict:
+        if source not in self._stats:
+            self._stats[source] = {
+                'attempts': 0,
+                'successes': 0,
+                'failures': 0,
+                'timeouts': 0,
+                'consecutive_failures': 0,
+                'avg_latency': None,
+                'last_latency': None,
+                'demoted_until': 0.0,
+            }
+        return self._stats[source]
+
+    def record(self, source: str, latency: float, success: bool, timed_out: bool = False,
+               slow_threshold: float = None):
+        """记录一次新闻源调用结果"""
+        with self._lock:
+            stats = self._get(source)
+            stats['attempts'] += 1
+            stats['last_latency'] = round(latency, 3)
+            if stats['avg_latency'] is None:
+                stats['avg_latency'] = latency
+            else:
+                stats['avg_latency'] = (self.latency_alpha * latency
+                                        + (1 - self.latency_alpha) * stats['avg_latency'])
+
+            if success:
+                stats['successes'] += 1
+                stats['consecutive_failures'] = 0
+            else:
+                stats['failures'] += 1
+                stats['consecutive_failures'] += 1
+                if timed_out:
+                    stats['timeouts'] += 1
+
+            too_slow = slow_threshold is not None and stats['avg_latency'] > slow_threshold
+            if stats['consecutive_failures'] >= self.failure_threshold or too_slow:
+                stats['demoted_until'] = time.time() + self.cooldown_seconds
+                reason = "持续过慢" if too_slow else f"连续失败{stats['consecutive_failures']}次"
+                logger.warning(f"[新闻聚合器] ⚠️ 新闻源 {source} {reason}，"
+                               f"降级 {self.cooldown_seconds:.0f} 秒")
+
+    def is_demoted(self, source: str) -> bool:
+        """新闻源当前是否处于降级状态"""
+        with self._lock:
+            stats = self._stats.get(source)
+            return stats is not None and time.time() < stats['demoted_until']
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """获取所有新闻源的统计信息"""
+        with self._lock:
+            result = {}
+            for source, stats in self._stats.items():
+                item = dict(stats)
+                item['success_rate'] = round(stats['successes'] / stats['attempts'], 4) if stats['attempts'] else 0.0
+                item['avg_latency'] = round(stats['avg_latency'], 3) if stats['avg_latency'] is not None else None
+                item['demoted'] = time.time() < stats['demoted_until']
+                result[source] = item
+            return result
+
+    def reset(self):
+        """清空统计"""
+        with self._lock:
+            self._stats.clear()
+
+
+# 进程内共享的新闻源统计、线程池和HTTP会话（聚合器每次调用都会新建实例）
+_source_health = NewsSourceHealth()
+_news_executor = None
+_news_session = None
+_shared_lock = threading.Lock()
+
+
+def get_news_source_health() -> NewsSourceHealth:
+    """获取全局新闻源健康统计"""
+    return _source_health
+
+
+def _get_news_executor() -> ThreadPoolExecutor:
+    global _news_executor
+    with _shared_lock:
+        if _news_executor is None:
+            _news_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="news-fetch")
+        return _news_executor
+
+
+def _get_news_session() -> requests.Session:
+    global _news_session
+    with _shared_lock:
+        if _news_session is None:
+            _news_session = requests.Session()
+            _news_session.headers.update({'User-Agent': 'TradingAgents-CN/1.0'})
+        return _news_session
+
+
 class RealtimeNewsAggregator:
     """实时新闻聚合器"""
     
-    def __init__(self):
+    def __init__(self, concurrent: bool = True, deadline_seconds: float = DEFAULT_FETCH_DEADLINE,
+                 source_timeouts: Dict[str, float] = None):
+        """
+        Args:
+            concurrent: 是否并发获取各新闻源，False时按优先级依次获取
+            deadline_seconds: 并发模式的全局截止时间，到期后返回已完成新闻源的结果
+            source_timeouts: 单个新闻源的超时时间，未指定的使用默认值
+        """
         self.headers = {
             'User-Agent': 'TradingAgents-CN/1.0'
         }
+        self.session = _get_news_session()
+        self.health = _source_health
+        
+        # 并发与超时配置
+        self.concurrent = concurrent
+        self.deadline_seconds = deadline_seconds
+        self.source_timeouts = dict(DEFAULT_SOURCE_TIMEOUTS)
+        if source_timeouts:
+            self.source_timeouts.update(source_timeouts)
         
         # API密钥配置
         self.finnhub_key = os.getenv('FINNHUB_API_KEY')
         self.alpha_vantage_key = os.getenv('ALPHA_VANTAGE_API_KEY')
         self.newsapi_key = os.getenv('NEWSAPI_KEY')
+    
+    def _source_timeout(self, source: str) -> float:
+        """获取单个新闻源的超时时间"""
+        return self.source_timeouts.get(source, self.deadline_seconds)
+    
+    def _get_news_sources(self) -> List[Tuple[str, Callable[[str, int], List[NewsItem]]]]:
+        """按优先级返回已配置且未被降级的新闻源：专业API > 新闻API > 中文财经"""
+        sources = []
+        for name, fetcher, configured in (
+            ('FinnHub', self._get_finnhub_realtime_news, bool(self.finnhub_key)),
+            ('Alpha Vantage', self._get_alpha_vantage_news, bool(self.alpha_vantage_key)),
+            ('NewsAPI', self._get_newsapi_news, bool(self.newsapi_key)),
+            ('中文财经', self._get_chinese_finance_news, True),
+        ):
+            if configured:
+                sources.append((name, fetcher))
+            else:
+                logger.info(f"[新闻聚合器] {name} 密钥未配置，跳过此新闻源")
+        
+        active = [(name, fetcher) for name, fetcher in sources if not self.health.is_demoted(name)]
+        if not active:
+            # 全部被降级时仍然尝试，避免没有任何新闻
+            return sources
+        for name, _ in sources:
+            if not self.health.is_demoted(name):
+                continue
+            logger.info(f"[新闻聚合器] 新闻源 {name} 处于降级状态，本次跳过")
+        return active
+    
+    def _call_source(self, name: str, fetcher: Callable[[str, int], List[NewsItem]],
+                     ticker: str, hours_back: int) -> Tuple[List[NewsItem], float, Optional[Exception]]:
+        """调用单个新闻源，返回 (新闻列表, 耗时秒数, 异常)"""
+        logger.info(f"[新闻聚合器] 尝试从 {name} 获取 {ticker} 的新闻")
+        source_start = time.monotonic()
+        try:
+            news = fetcher(ticker, hours_back)
+            return news or [], time.monotonic() - source_start, None
+        except Exception as e:
+            return [], time.monotonic() - source_start, e
+    
+    def _finish_source(self, name: str, news: List[NewsItem], elapsed: float,
+                       error: Optional[Exception]) -> List[NewsItem]:
+        """记录新闻源的延迟与成功情况"""
+        if error is not None:
+            timed_out = isinstance(error, requests.exceptions.Timeout)
+            self.health.record(name, elapsed, success=False, timed_out=timed_out)
+            logger.error(f"{name}新闻获取失败: {error}")
+            return []
+        
+        self.health.record(name, elapsed, success=True, slow_threshold=self._source_timeout(name))
+        if news:
+            logger.info(f"[新闻聚合器] 成功从 {name} 获取 {len(news)} 条新闻，耗时: {elapsed:.2f}秒")
+        else:
+            logger.info(f"[新闻聚合器] {name} 未返回新闻，耗时: {elapsed:.2f}秒")
+        return news
+    
+    def _fetch_sequential(self, sources, ticker: str, hours_back: int) -> List[NewsItem]:
+        """按优先级依次获取"""
+        all_news = []
+        for name, fetcher in sources:
+            news, elapsed, error = self._call_source(name, fetcher, ticker, hours_back)
+            all_news.extend(self._finish_source(name, news, elapsed, error))
+        return all_news
+    
+    def _fetch_concurrent(self, sources, ticker: str, hours_back: int) -> List[NewsItem]:
+        """
+        并发获取所有新闻源，每个新闻源在自身超时或全局截止时间（取较早者）前未完成即放弃，
+        返回截止前已完成新闻源的结果（保持优先级顺序）
+        """
+        executor = _get_news_executor()
+        start = time.monotonic()
+        global_deadline = start + self.deadline_seconds
+        
+        pending = {}
+        for index, (name, fetcher) in enumerate(sources):
+            future = executor.submit(self._call_source, name, fetcher, ticker, hours_back)
+            cutoff = min(start + self._source_timeout(name), global_deadline)
+            pending[future] = (index, name, cutoff)
+        
+        results = {}
+        while pending:
+            now = time.monotonic()
+            expired = [future for future, (_, _, cutoff) in pending.items()
+                       if cutoff <= now and not future.done()]
+            for future in expired:
+                _, name, _ = pending.pop(future)
+                self.health.record(name, now - start, success=False, timed_out=True)
+                logger.warning(f"[新闻聚合器] ⏰ {name} 超时未返回，已放弃，耗时: {now - start:.2f}秒")
+            if not pending:
+                break
+            
+            next_cutoff = min(cutoff for _, _, cutoff in pending.values())
+            done, _ = wait(list(pending), timeout=max(0.0, next_cutoff - now),
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                index, name, _ = pending.pop(future)
+                results[index] = self._finish_source(name, *future.result())
+        
+        all_news = []
+        for index in sorted(results):
+            all_news.extend(results[index])
+        logger.info(f"[新闻聚合器] 并发获取完成: {len(results)}/{len(sources)} 个新闻源按时返回，"
+                    f"耗时: {time.monotonic() - start:.2f}秒")
+        return all_news
         
     def get_realtime_stock_news(self, ticker: str, hours_back: int = 6, max_news: int = 10) -> List[NewsItem]:
         """
@@ -55,62 +302,12 @@ class RealtimeNewsAggregator:
         """
         logger.info(f"[新闻聚合器] 开始获取 {ticker} 的实时新闻，回溯时间: {hours_back}小时")
         start_time = datetime.now()
-        all_news = []
         
-        # 1. FinnHub实时新闻 (最高优先级)
-        logger.info(f"[新闻聚合器] 尝试从 FinnHub 获取 {ticker} 的新闻")
-        finnhub_start = datetime.now()
-        finnhub_news = self._get_finnhub_realtime_news(ticker, hours_back)
-        finnhub_time = (datetime.now() - finnhub_start).total_seconds()
-        
-        if finnhub_news:
-            logger.info(f"[新闻聚合器] 成功从 FinnHub 获取 {len(finnhub_news)} 条新闻，耗时: {finnhub_time:.2f}秒")
+        sources = self._get_news_sources()
+        if self.concurrent and len(sources) > 1:
+            all_news = self._fetch_concurrent(sources, ticker, hours_back)
         else:
-            logger.info(f"[新闻聚合器] FinnHub 未返回新闻，耗时: {finnhub_time:.2f}秒")
-            
-        all_news.extend(finnhub_news)
-        
-        # 2. Alpha Vantage新闻
-        logger.info(f"[新闻聚合器] 尝试从 Alpha Vantage 获取 {ticker} 的新闻")
-        av_start = datetime.now()
-        av_news = self._get_alpha_vantage_news(ticker, hours_back)
-        av_time = (datetime.now() - av_start).total_seconds()
-        
-        if av_news:
-            logger.info(f"[新闻聚合器] 成功从 Alpha Vantage 获取 {len(av_news)} 条新闻，耗时: {av_time:.2f}秒")
-        else:
-            logger.info(f"[新闻聚合器] Alpha Vantage 未返回新闻，耗时: {av_time:.2f}秒")
-            
-        all_news.extend(av_news)
-        
-        # 3. NewsAPI (如果配置了)
-        if self.newsapi_key:
-            logger.info(f"[新闻聚合器] 尝试从 NewsAPI 获取 {ticker} 的新闻")
-            newsapi_start = datetime.now()
-            newsapi_news = self._get_newsapi_news(ticker, hours_back)
-            newsapi_time = (datetime.now() - newsapi_start).total_seconds()
-            
-            if newsapi_news:
-                logger.info(f"[新闻聚合器] 成功从 NewsAPI 获取 {len(newsapi_news)} 条新闻，耗时: {newsapi_time:.2f}秒")
-            else:
-                logger.info(f"[新闻聚合器] NewsAPI 未返回新闻，耗时: {newsapi_time:.2f}秒")
-                
-            all_news.extend(newsapi_news)
-        else:
-            logger.info(f"[新闻聚合器] NewsAPI 密钥未配置，跳过此新闻源")
-        
-        # 4. 中文财经新闻源
-        logger.info(f"[新闻聚合器] 尝试获取 {ticker} 的中文财经新闻")
-        chinese_start = datetime.now()
-        chinese_news = self._get_chinese_finance_news(ticker, hours_back)
-        chinese_time = (datetime.now() - chinese_start).total_seconds()
-        
-        if chinese_news:
-            logger.info(f"[新闻聚合器] 成功获取 {len(chinese_news)} 条中文财经新闻，耗时: {chinese_time:.2f}秒")
-        else:
-            logger.info(f"[新闻聚合器] 未获取到中文财经新闻，耗时: {chinese_time:.2f}秒")
-            
-        all_news.extend(chinese_news)
+            all_news = self._fetch_sequential(sources, ticker, hours_back)
         
         # 去重和排序
         logger.info(f"[新闻聚合器] 开始对 {len(all_news)} 条新闻进行去重和排序")
@@ -145,156 +342,144 @@ class RealtimeNewsAggregator:
         if not self.finnhub_key:
             return []
         
-        try:
-            # 计算时间范围
-            end_time = datetime.now()
-            start_time = end_time - timedelta(hours=hours_back)
-            
-            # FinnHub API调用
-            url = "https://finnhub.io/api/v1/company-news"
-            params = {
-                'symbol': ticker,
-                'from': start_time.strftime('%Y-%m-%d'),
-                'to': end_time.strftime('%Y-%m-%d'),
-                'token': self.finnhub_key
-            }
-            
-            response = requests.get(url, params=params, headers=self.headers)
-            response.raise_for_status()
-            
-            news_data = response.json()
-            news_items = []
-            
-            for item in news_data:
-                # 检查新闻时效性
-                publish_time = datetime.fromtimestamp(item.get('datetime', 0))
-                if publish_time < start_time:
-                    continue
-                
-                # 评估紧急程度
-                urgency = self._assess_news_urgency(item.get('headline', ''), item.get('summary', ''))
-                
-                news_items.append(NewsItem(
-                    title=item.get('headline', ''),
-                    content=item.get('summary', ''),
-                    source=item.get('source', 'FinnHub'),
-                    publish_time=publish_time,
-                    url=item.get('url', ''),
-                    urgency=urgency,
-                    relevance_score=self._calculate_relevance(item.get('headline', ''), ticker)
-                ))
+        # 计算时间范围
+        end_time = datetime.now()
+        start_time = end_time - timedelta(hours=hours_back)
+        
+        # FinnHub API调用
+        url = "https://finnhub.io/api/v1/company-news"
+        params = {
+            'symbol': ticker,
+            'from': start_time.strftime('%Y-%m-%d'),
+            'to': end_time.strftime('%Y-%m-%d'),
+            'token': self.finnhub_key
+        }
+        
+        response = self.session.get(url, params=params, headers=self.headers,
+                                    timeout=self._source_timeout('FinnHub'))
+        response.raise_for_status()
+        
+        news_data = response.json()
+        news_items = []
+        
+        for item in news_data:
+            # 检查新闻时效性
+            publish_time = datetime.fromtimestamp(item.get('datetime', 0))
+            if publish_time < start_time:
+                continue
             
-            return news_items
+            # 评估紧急程度
+            urgency = self._assess_news_urgency(item.get('headline', ''), item.get('summary', ''))
             
-        except Exception as e:
-            logger.error(f"FinnHub新闻获取失败: {e}")
-            return []
+            news_items.append(NewsItem(
+                title=item.get('headline', ''),
+                content=item.get('summary', ''),
+                source=item.get('source', 'FinnHub'),
+                publish_time=publish_time,
+                url=item.get('url', ''),
+                urgency=urgency,
+                relevance_score=self._calculate_relevance(item.get('headline', ''), ticker)
+            ))
+        
+        return news_items
     
     def _get_alpha_vantage_news(self, ticker: str, hours_back: int) -> List[NewsItem]:
         """获取Alpha Vantage新闻"""
         if not self.alpha_vantage_key:
             return []
         
-        try:
-            url = "https://www.alphavantage.co/query"
-            params = {
-                'function': 'NEWS_SENTIMENT',
-                'tickers': ticker,
-                'apikey': self.alpha_vantage_key,
-                'limit': 50
-            }
-            
-            response = requests.get(url, params=params, headers=self.headers)
-            response.raise_for_status()
-            
-            data = response.json()
-            news_items = []
-            
-            if 'feed' in data:
-                for item in data['feed']:
-                    # 解析时间
-                    time_str = item.get('time_published', '')
-                    try:
-                        publish_time = datetime.strptime(time_str, '%Y%m%dT%H%M%S')
-                    except:
-                        continue
-                    
-                    # 检查时效性
-                    if publish_time < datetime.now() - timedelta(hours=hours_back):
-                        continue
-                    
-                    urgency = self._assess_news_urgency(item.get('title', ''), item.get('summary', ''))
-                    
-                    news_items.append(NewsItem(
-                        title=item.get('title', ''),
-                        content=item.get('summary', ''),
-                        source=item.get('source', 'Alpha Vantage'),
-                        publish_time=publish_time,
-                        url=item.get('url', ''),
-                        urgency=urgency,
-                        relevance_score=self._calculate_relevance(item.get('title', ''), ticker)
-                    ))
-            
-            return news_items
-            
-        except Exception as e:
-            logger.error(f"Alpha Vantage新闻获取失败: {e}")
-            return []
-    
-    def _get_newsapi_news(self, ticker: str, hours_back: int) -> List[NewsItem]:
-        """获取NewsAPI新闻"""
-        try:
-            # 构建搜索查询
-            company_names = {
-                'AAPL': 'Apple',
-                'TSLA': 'Tesla', 
-                'NVDA': 'NVIDIA',
-                'MSFT': 'Microsoft',
-                'GOOGL': 'Google'
-            }
-            
-            query = f"{ticker} OR {company_names.get(ticker, ticker)}"
-            
-            url = "https://newsapi.org/v2/everything"
-            params = {
-                'q': query,
-                'language': 'en',
-                'sortBy': 'publishedAt',
-                'from': (datetime.now() - timedelta(hours=hours_back)).isoformat(),
-                'apiKey': self.newsapi_key
-            }
-            
-            response = requests.get(url, params=params, headers=self.headers)
-            response.raise_for_status()
-            
-            data = response.json()
-            news_items = []
-            
-            for item in data.get('articles', []):
+        url = "https://www.alphavantage.co/query"
+        params = {
+            'function': 'NEWS_SENTIMENT',
+            'tickers': ticker,
+            'apikey': self.alpha_vantage_key,
+            'limit': 50
+        }
+        
+        response = self.session.get(url, params=params, headers=self.headers,
+                                    timeout=self._source_timeout('Alpha Vantage'))
+        response.raise_for_status()
+        
+        data = response.json()
+        news_items = []
+        
+        if 'feed' in data:
+            for item in data['feed']:
                 # 解析时间
-                time_str = item.get('publishedAt', '')
+                time_str = item.get('time_published', '')
                 try:
-                    publish_time = datetime.fromisoformat(time_str.replace('Z', '+00:00'))
+                    publish_time = datetime.strptime(time_str, '%Y%m%dT%H%M%S')
                 except:
                     continue
                 
-                urgency = self._assess_news_urgency(item.get('title', ''), item.get('description', ''))
+                # 检查时效性
+                if publish_time < datetime.now() - timedelta(hours=hours_back):
+                    continue
+                
+                urgency = self._assess_news_urgency(item.get('title', ''), item.get('summary', ''))
                 
                 news_items.append(NewsItem(
                     title=item.get('title', ''),
-                    content=item.get('description', ''),
-                    source=item.get('source', {}).get('name', 'NewsAPI'),
+                    content=item.get('summary', ''),
+                    source=item.get('source', 'Alpha Vantage'),
                     publish_time=publish_time,
                     url=item.get('url', ''),
                     urgency=urgency,
                     relevance_score=self._calculate_relevance(item.get('title', ''), ticker)
                 ))
+        
+        return news_items
+    
+    def _get_newsapi_news(self, ticker: str, hours_back: int) -> List[NewsItem]:
+        """获取NewsAPI新闻"""
+        # 构建搜索查询
+        company_names = {
+            'AAPL': 'Apple',
+            'TSLA': 'Tesla', 
+            'NVDA': 'NVIDIA',
+            'MSFT': 'Microsoft',
+            'GOOGL': 'Google'
+        }
+        
+        query = f"{ticker} OR {company_names.get(ticker, ticker)}"
+        
+        url = "https://newsapi.org/v2/everything"
+        params = {
+            'q': query,
+            'language': 'en',
+            'sortBy': 'publishedAt',
+            'from': (datetime.now() - timedelta(hours=hours_back)).isoformat(),
+            'apiKey': self.newsapi_key
+        }
+        
+        response = self.session.get(url, params=params, headers=self.headers,
+                                    timeout=self._source_timeout('NewsAPI'))
+        response.raise_for_status()
+        
+        data = response.json()
+        news_items = []
+        
+        for item in data.get('articles', []):
+            # 解析时间
+            time_str = item.get('publishedAt', '')
+            try:
+                publish_time = datetime.fromisoformat(time_str.replace('Z', '+00:00'))
+            except:
+                continue
             
-            return news_items
+            urgency = self._assess_news_urgency(item.get('title', ''), item.get('description', ''))
             
-        except Exception as e:
-            logger.error(f"NewsAPI新闻获取失败: {e}")
-            return []
+            news_items.append(NewsItem(
+                title=item.get('title', ''),
+                content=item.get('description', ''),
+                source=item.get('source', {}).get('name', 'NewsAPI'),
+                publish_time=publish_time,
+                url=item.get('url', ''),
+                urgency=urgency,
+                relevance_score=self._calculate_relevance(item.get('title', ''), ticker)
+            ))
+        
+        return news_items
     
     def _get_chinese_finance_news(self, ticker: str, hours_back: int) -> List[NewsItem]:
         """获取中文财经新闻"""
@@ -674,6 +859,7 @@ class RealtimeNewsAggregator:
         return report
 
 
+@coalesce('realtime_news')
 def get_realtime_stock_news(ticker: str, curr_date: str, hours_back: int = 6) -> str:
     """
     获取实时股票新闻的主要接口函数
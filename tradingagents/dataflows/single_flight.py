@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+数据获取请求合并（single-flight）
+多个分析师或多个Web会话同时请求相同的 (股票, 日期区间, 数据源) 时，只有第一个请求真正调用上游接口，
+其余请求等待并共享同一个结果（包括异常），避免重复消耗数据源的调用配额。
+同一线程内重入相同请求时直接执行，不会死锁。
+"""
+
+import functools
+import inspect
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+class _Call:
+    """一次进行中的上游调用"""
+
+    __slots__ = ('done', 'result', 'error', 'owner', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.owner = threading.get_ident()
+        self.waiters = 0
+
+
+class SingleFlight:
+    """按键合并并发的相同请求"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        # 按命名空间统计：请求数、实际执行数、共享结果数
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def do(self, namespace: str, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        """
+        执行 fn(*args, **kwargs)；如果相同 (namespace, key) 的调用正在进行，则等待并返回它的结果
+        """
+        full_key = (namespace, key)
+        thread_id = threading.get_ident()
+        with self._lock:
+            stats = self._stats.setdefault(namespace, {'requests': 0, 'executions': 0, 'shared': 0})
+            stats['requests'] += 1
+            call = self._calls.get(full_key)
+            if call is None:
+                leader = True
+                call = _Call()
+                self._calls[full_key] = call
+                stats['executions'] += 1
+            elif call.owner == thread_id:
+                leader = False
+                stats['executions'] += 1
+            else:
+                leader = False
+                call.waiters += 1
+                stats['shared'] += 1
+
+        if not leader and call.owner == thread_id:
+            # 同一线程重入相同请求，直接执行
+            return fn(*args, **kwargs)
+
+        if not leader:
+            logger.debug(f"🔗 [请求合并] {namespace} 等待进行中的相同请求: {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(full_key, None)
+            call.done.set()
+            if call.waiters:
+                logger.info(f"🔗 [请求合并] {namespace} {key} 的结果共享给 {call.waiters} 个并发请求")
+
+    def in_flight(self) -> int:
+        """当前进行中的上游调用数"""
+        with self._lock:
+            return len(self._calls)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """按命名空间返回请求数、实际执行数、共享数和合并比例"""
+        with self._lock:
+            namespaces = {name: dict(stats) for name, stats in self._stats.items()}
+        total = {'requests': 0, 'executions': 0, 'shared': 0}
+        for stats in namespaces.values():
+            for field in total:
+                total[field] += stats[field]
+            stats['coalescing_ratio'] = round(stats['shared'] / stats['requests'], 4) if stats['requests'] else 0.0
+        total['coalescing_ratio'] = round(total['shared'] / total['requests'], 4) if total['requests'] else 0.0
+        return {'total': total, 'namespaces': namespaces}
+
+    def reset_stats(self):
+        """清空统计"""
+        with self._lock:
+            self._stats.clear()
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """获取全局请求合并器"""
+    return _single_flight
+
+
+def get_coalescing_stats() -> Dict[str, Any]:
+    """获取全局请求合并统计"""
+    return _single_flight.get_stats()
+
+
+def _make_key(signature: inspect.Signature, args: tuple, kwargs: Dict[str, Any]) -> Hashable:
+    """按函数签名绑定参数（位置参数和关键字参数写法得到相同的键）"""
+    try:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = tuple(bound.arguments.items())
+    except TypeError:
+        key = (args, tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+        return key
+    except TypeError:
+        return repr(key)
+
+
+def coalesce(namespace: str, key_func: Callable[..., Hashable] = None):
+    """
+    装饰器：合并并发的相同调用
+
+    Args:
+        namespace: 统计和区分请求用的命名空间
+        key_func: 根据调用参数生成请求键，默认使用全部位置参数和关键字参数；
+                  装饰方法时可以通过 key_func 排除 self 或加入实例状态（如当前数据源）
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = key_func(*args, **kwargs) if key_func else _make_key(signature, args, kwargs)
+            return _single_flight.do(namespace, key, fn, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+自适应数据源路由
+按数据源维护最近请求的滑动窗口统计（p50/p95延迟、错误率、空结果率），用于：
+- 按健康度排序备用数据源，替代固定的降级顺序（无样本的数据源保持配置顺序）
+- 熔断：连续失败达到阈值后打开熔断器，冷却期内跳过该数据源，冷却结束后放行一次试探请求（半开）
+- 对冲请求：首选数据源超过延迟阈值仍未返回时，同时请求次优数据源，采用先返回的有效结果
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+SUCCESS = 'success'
+EMPTY = 'empty'
+ERROR = 'error'
+
+CIRCUIT_CLOSED = 'closed'
+CIRCUIT_OPEN = 'open'
+CIRCUIT_HALF_OPEN = 'half_open'
+
+
+def _percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """最近秩法计算分位数"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+class SourceHealth:
+    """单个数据源的滑动窗口健康统计和熔断状态"""
+
+    def __init__(self, name: str, window_size: int = 50, failure_threshold: int = 3,
+                 cooldown_seconds: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.samples = deque(maxlen=window_size)  # (延迟秒数, 结果类型)
+        self.attempts = 0
+        self.consecutive_failures = 0
+        self.state = CIRCUIT_CLOSED
+        self.opened_until = 0.0
+        self.trial_in_flight = False
+        self.last_error = None
+
+    def allow_request(self, now: float = None) -> bool:
+        """熔断器是否放行请求；冷却结束后只放行一个试探请求"""
+        now = now or time.time()
+        if self.state == CIRCUIT_CLOSED:
+            return True
+        if self.state == CIRCUIT_OPEN and now >= self.opened_until:
+            self.state = CIRCUIT_HALF_OPEN
+            self.trial_in_flight = False
+        if self.state == CIRCUIT_HALF_OPEN and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record(self, latency: float, outcome: str, error: str = None, now: float = None):
+        """记录一次请求结果"""
+        now = now or time.time()
+        self.attempts += 1
+        self.samples.append((latency, outcome))
+        if outcome == EMPTY:
+            # 空结果（停牌、区间内无交易日）说明数据源可用，只计入空结果率和健康分，不计入熔断
+            if self.state == CIRCUIT_HALF_OPEN:
+                self.consecutive_failures = 0
+                self.state = CIRCUIT_CLOSED
+                self.trial_in_flight = False
+            return
+        if outcome == SUCCESS:
+            if self.state != CIRCUIT_CLOSED:
+                logger.info(f"✅ [数据源路由] {self.name} 恢复正常，关闭熔断")
+            self.consecutive_failures = 0
+            self.state = CIRCUIT_CLOSED
+            self.trial_in_flight = False
+            return
+
+        self.consecutive_failures += 1
+        if error:
+            self.last_error = error
+        if self.state == CIRCUIT_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != CIRCUIT_OPEN:
+                logger.warning(f"⚡ [数据源路由] {self.name} 连续失败{self.consecutive_failures}次，"
+                               f"熔断{self.cooldown_seconds:.0f}秒")
+            self.state = CIRCUIT_OPEN
+            self.opened_until = now + self.cooldown_seconds
+            self.trial_in_flight = False
+
+    def score(self, failure_penalty: float, prior_latency: float) -> float:
+        """健康分（越小越好）：p50延迟 + 失败率 × 失败惩罚秒数；无样本时按先验延迟计"""
+        if not self.samples:
+            return prior_latency
+        latencies = sorted(latency for latency, _ in self.samples)
+        failures = sum(1 for _, outcome in self.samples if outcome == ERROR)
+        empties = sum(1 for _, outcome in self.samples if outcome == EMPTY)
+        failure_rate = (failures + 0.5 * empties) / len(self.samples)
+        return _percentile(latencies, 0.5) + failure_rate * failure_penalty
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        samples = list(self.samples)
+        latencies = sorted(latency for latency, _ in samples)
+        count = len(samples)
+        stats = {
+            'attempts': self.attempts,
+            'window': count,
+            'p50_latency': round(_percentile(latencies, 0.5), 4) if latencies else None,
+            'p95_latency': round(_percentile(latencies, 0.95), 4) if latencies else None,
+            'error_rate': round(sum(1 for _, o in samples if o == ERROR) / count, 4) if count else 0.0,
+            'empty_rate': round(sum(1 for _, o in samples if o == EMPTY) / count, 4) if count else 0.0,
+            'consecutive_failures': self.consecutive_failures,
+            'circuit': self.state,
+            'last_error': self.last_error,
+        }
+        if self.state == CIRCUIT_OPEN:
+            stats['retry_in'] = round(max(0.0, self.opened_until - time.time()), 1)
+        return stats
+
+
+class SourceRouter:
+    """按实时健康度路由数据源请求"""
+
+    def __init__(self, window_size: int = 50, failure_threshold: int = 3, cooldown_seconds: float = 60.0,
+                 hedge_after_seconds: float = 0.0, failure_penalty: float = 10.0, prior_latency: float = 2.0):
+        """
+        Args:
+            window_size: 每个数据源保留的最近样本数
+            failure_threshold: 连续失败多少次打开熔断
+            cooldown_seconds: 熔断冷却时间
+            hedge_after_seconds: 首选数据源超过该时间未返回时对冲请求次优数据源，0表示不对冲
+            failure_penalty: 排序时每单位失败率折算的延迟秒数
+            prior_latency: 无样本数据源的先验延迟
+        """
+        self.window_size = window_size
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.hedge_after_seconds = hedge_after_seconds
+        self.failure_penalty = failure_penalty
+        self.prior_latency = prior_latency
+        self._health: Dict[str, SourceHealth] = {}
+        self._lock = threading.Lock()
+        self._hedge_stats = {'hedged': 0, 'hedge_wins': 0}
+        self._executor = None
+
+    def _get(self, source) -> SourceHealth:
+        name = getattr(source, 'value', source)
+        health = self._health.get(name)
+        if health is None:
+            health = self._health[name] = SourceHealth(
+                name, self.window_size, self.failure_threshold, self.cooldown_seconds)
+        return health
+
+    def allow(self, source) -> bool:
+        """熔断器是否放行该数据源"""
+        with self._lock:
+            return self._get(source).allow_request()
+
+    def record(self, source, latency: float, outcome: str, error: str = None):
+        """记录数据源的一次请求结果（SUCCESS / EMPTY / ERROR）"""
+        with self._lock:
+            self._get(source).record(latency, outcome, error)
+
+    def rank(self, sources: Iterable[Hashable]) -> List[Hashable]:
+        """按健康分排序，熔断中的数据源排在最后；分数相同时保持传入顺序"""
+        sources = list(sources)
+        now = time.time()
+        with self._lock:
+            def key(source):
+                health = self._get(source)
+                is_open = health.state == CIRCUIT_OPEN and now < health.opened_until
+                return (is_open, health.score(self.failure_penalty, self.prior_latency))
+            return sorted(sources, key=key)
+
+    def execute(self, sources: Iterable[Hashable], fetch: Callable[[Any], Any],
+                classify: Callable[[Any], str], passthrough: Tuple[type, ...] = (),
+                hedge_after: Optional[float] = None) -> Tuple[Optional[Hashable], Any]:
+        """
+        依次尝试数据源直到获得有效结果
+
+        Args:
+            sources: 已排好优先级的数据源
+            fetch: fetch(source) 获取数据
+            classify: 把结果分类为 SUCCESS / EMPTY / ERROR
+            passthrough: 不计入健康统计的异常类型（如限流），视为本次未成功并继续尝试下一个
+            hedge_after: 对冲延迟阈值，默认使用路由器配置
+
+        Returns:
+            (成功的数据源, 结果)；全部失败时返回 (None, 最后一个非空结果)
+        """
+        hedge_after = self.hedge_after_seconds if hedge_after is None else hedge_after
+        pending = list(sources)
+        last_result = None
+
+        while True:
+            source = self._next_allowed(pending)
+            if source is None:
+                break
+            if hedge_after and hedge_after > 0 and pending:
+                winner, result = self._hedged(source, pending, fetch, classify, passthrough, hedge_after)
+            else:
+                winner, result = source, self._attempt(source, fetch, classify, passthrough)
+            if winner is not None and result is not None and classify(result) == SUCCESS:
+                return winner, result
+            if result is not None:
+                last_result = result
+        return None, last_result
+
+    def _next_allowed(self, pending: List[Hashable]) -> Optional[Hashable]:
+        """取出下一个熔断器放行的数据源（在真正请求前判断，避免占用半开试探名额）"""
+        while pending:
+            source = pending.pop(0)
+            if self.allow(source):
+                return source
+            logger.debug(f"⚡ [数据源路由] {getattr(source, 'value', source)} 熔断中，跳过")
+        return None
+
+    def _attempt(self, source, fetch, classify, passthrough):
+        """请求一个数据源并记录结果，异常返回None"""
+        started = time.time()
+        try:
+            result = fetch(source)
+        except passthrough as e:
+            logger.debug(f"⏳ [数据源路由] {getattr(source, 'value', source)} 跳过: {e}")
+            with self._lock:
+                self._get(source).trial_in_flight = False
+            return None
+        except Exception as e:
+            logger.error(f"❌ [数据源路由] {getattr(source, 'value', source)} 请求失败: {e}")
+            self.record(source, time.time() - started, ERROR, str(e))
+            return None
+        outcome = classify(result)
+        self.record(source, time.time() - started, outcome)
+        return result
+
+    def _hedged(self, primary, pending, fetch, classify, passthrough, hedge_after):
+        """首选数据源超过阈值未返回时，对冲请求次优数据源，返回先得到的有效结果"""
+        executor = self._get_executor()
+        futures = {executor.submit(self._attempt, primary, fetch, classify, passthrough): primary}
+        done, _ = wait(futures, timeout=hedge_after)
+        backup = None if done else self._next_allowed(pending)
+        if backup is not None:
+            logger.info(f"🔀 [数据源路由] {getattr(primary, 'value', primary)} 超过{hedge_after}秒未返回，"
+                        f"对冲请求 {getattr(backup, 'value', backup)}")
+            with self._lock:
+                self._hedge_stats['hedged'] += 1
+            futures[executor.submit(self._attempt, backup, fetch, classify, passthrough)] = backup
+
+        last_result = None
+        remaining = set(futures)
+        while remaining:
+            done, remaining = wait(remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if result is not None and classify(result) == SUCCESS:
+                    if futures[future] is not primary:
+                        with self._lock:
+                            self._hedge_stats['hedge_wins'] += 1
+                    # 慢的一方在后台完成，结果仍计入健康统计
+                    return futures[future], result
+                if result is not None:
+                    last_result = result
+        return None, last_result
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="source-hedge")
+            return self._executor
+
+    def get_stats(self) -> Dict[str, Any]:
+        """按数据源返回健康统计，以及对冲请求次数"""
+        with self._lock:
+            return {
+                'sources': {name: health.get_stats() for name, health in self._health.items()},
+                'hedging': dict(self._hedge_stats, hedge_after_seconds=self.hedge_after_seconds),
+            }
+
+    def reset(self):
+        """清空统计和熔断状态"""
+        with self._lock:
+            self._health.clear()
+            self._hedge_stats = {'hedged': 0, 'hedge_wins': 0}
+
+
+# 全局路由器实例
+_source_router = None
+_source_router_lock = threading.Lock()
+
+def get_source_router() -> SourceRouter:
+    """获取全局数据源路由器（参数可通过 SOURCE_ROUTER_* 环境变量配置）"""
+    global _source_router
+    if _source_router is None:
+        with _source_router_lock:
+            if _source_router is None:
+                _source_router = SourceRouter(
+                    window_size=int(os.getenv('SOURCE_ROUTER_WINDOW', '50')),
+                    failure_threshold=int(os.getenv('SOURCE_ROUTER_FAILURE_THRESHOLD', '3')),
+                    cooldown_seconds=float(os.getenv('SOURCE_ROUTER_COOLDOWN_SECONDS', '60')),
+                    hedge_after_seconds=float(os.getenv('SOURCE_ROUTER_HEDGE_AFTER_SECONDS', '0')),
+                )
+    return _source_router
+
+
+def get_source_health_stats() -> Dict[str, Any]:
+    """获取数据源健康统计"""
+    return get_source_router().get_stats()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+结构化行情数据对象
+数据源、缓存与数据流之间传递结构化结果，只在工具边界（返回给LLM时）渲染为文本：
+- StockBars: 一次获取的K线数据（DataFrame）及数据源、股票名称、错误信息
+- StockQuote: 由K线计算的最新行情（价格、涨跌、成交量）
+- StockInfo: 股票基本信息
+下游直接读取字段，不再从格式化字符串中解析价格和名称。
+"""
+
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+
+
+# 各数据源的列名（按优先级）：Tushare/BaoStock 英文小写，AKShare 中文，Yahoo Finance 首字母大写
+_COLUMN_ALIASES: Dict[str, Tuple[str, ...]] = {
+    'date': ('trade_date', 'date', '日期', 'Date', 'datetime'),
+    'open': ('open', '开盘', 'Open'),
+    'high': ('high', '最高', 'High'),
+    'low': ('low', '最低', 'Low'),
+    'close': ('close', '收盘', 'Close'),
+    'volume': ('volume', 'vol', 'turnover', 'trade_volume', '成交量', 'Volume'),
+}
+
+# 数据源显示名称
+_SOURCE_LABELS = {
+    'tushare': 'Tushare',
+    'akshare': 'AKShare',
+    'baostock': 'BaoStock',
+    'tdx': '通达信',
+    'cache': '缓存',
+}
+
+# 渲染时展示的最新K线条数
+RECENT_ROWS = 3
+
+
+@dataclass
+class StockInfo:
+    """股票基本信息"""
+    symbol: str
+    name: str = ''
+    area: str = '未知'
+    industry: str = '未知'
+    market: str = '未知'
+    list_date: str = '未知'
+    source: str = 'unknown'
+
+    @classmethod
+    def from_dict(cls, symbol: str, info: Optional[Dict[str, Any]]) -> 'StockInfo':
+        """由数据源返回的信息字典构造，缺失字段使用默认值"""
+        info = info or {}
+        defaults = cls(symbol=symbol)
+        return cls(
+            symbol=str(info.get('symbol') or symbol),
+            name=str(info.get('name') or ''),
+            area=str(info.get('area') or defaults.area),
+            industry=str(info.get('industry') or defaults.industry),
+            market=str(info.get('market') or defaults.market),
+            list_date=str(info.get('list_date') or defaults.list_date),
+            source=str(info.get('source') or defaults.source),
+        )
+
+    @property
+    def has_name(self) -> bool:
+        """是否获取到真实名称（数据源失败时返回占位名称 股票{代码}）"""
+        return bool(self.name) and self.name != f'股票{self.symbol}'
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def render(self) -> str:
+        """渲染为工具返回给LLM的文本"""
+        return (f"股票代码: {self.symbol}\n"
+                f"股票名称: {self.name or '未知'}\n"
+                f"所属地区: {self.area}\n"
+                f"所属行业: {self.industry}\n"
+                f"上市市场: {self.market}\n"
+                f"上市日期: {self.list_date}\n"
+                f"数据来源: {self.source}\n")
+
+
+@dataclass
+class StockQuote:
+    """由K线计算的最新行情"""
+    symbol: str
+    price: float
+    prev_close: float
+    volume: Optional[float] = None
+    trade_date: Optional[str] = None
+    name: Optional[str] = None
+
+    @property
+    def change(self) -> float:
+        return self.price - self.prev_close
+
+    @property
+    def change_pct(self) -> float:
+        return self.change / self.prev_close * 100 if self.prev_close else 0.0
+
+
+@dataclass
+class StockBars:
+    """
+    一次行情获取的结构化结果
+
+    bars 在各调用方之间共享（单飞合并、进程内缓存），调用方不应原地修改。
+    """
+    symbol: str
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    source: str = 'unknown'
+    bars: pd.DataFrame = field(default_factory=pd.DataFrame)
+    name: Optional[str] = None
+    error: Optional[str] = None
+    # 只提供文本结果的数据源（已弃用的通达信接口）
+    text: Optional[str] = None
+    # 来自过期缓存
+    stale: bool = False
+
+    @classmethod
+    def failed(cls, symbol: str, error: str, source: str = 'unknown',
+               start_date: str = None, end_date: str = None) -> 'StockBars':
+        """获取失败的结果"""
+        return cls(symbol=symbol, start_date=start_date, end_date=end_date, source=source, error=error)
+
+    @property
+    def ok(self) -> bool:
+        """是否获取到有效数据"""
+        if self.error:
+            return False
+        if self.text is not None:
+            return "❌" not in self.text and "错误" not in self.text
+        return self.bars is not None and not self.bars.empty
+
+    @property
+    def empty(self) -> bool:
+        """未出错但没有数据（停牌、区间内无交易日或数据尚未发布）"""
+        if self.error or self.text is not None:
+            return False
+        return self.bars is None or self.bars.empty
+
+    def column(self, field_name: str) -> Optional[pd.Series]:
+        """按标准字段名（date/open/high/low/close/volume）读取列，兼容各数据源列名"""
+        if self.bars is None:
+            return None
+        for name in _COLUMN_ALIASES[field_name]:
+            if name in self.bars.columns:
+                series = self.bars[name]
+                return series if field_name == 'date' else pd.to_numeric(series, errors='coerce')
+        return None
+
+    def quote(self) -> Optional[StockQuote]:
+        """最新行情（无K线或无收盘价时返回None）"""
+        close = self.column('close')
+        if close is None or close.dropna().empty:
+            return None
+        close = close.dropna()
+        price = float(close.iloc[-1])
+        prev_close = float(close.iloc[-2]) if len(close) > 1 else price
+
+        volume = self.column('volume')
+        latest_volume = None
+        if volume is not None and not pd.isna(volume.iloc[-1]):
+            latest_volume = float(volume.iloc[-1])
+
+        dates = self.column('date')
+        trade_date = str(dates.iloc[-1])[:10] if dates is not None else None
+        return StockQuote(symbol=self.symbol, price=price, prev_close=prev_close,
+                          volume=latest_volume, trade_date=trade_date, name=self.name)
+
+    def render(self) -> str:
+        """渲染为工具返回给LLM的文本（只在工具边界调用）"""
+        if self.text is not None:
+            return self.text
+        if self.error:
+            return self.error if self.error.startswith("❌") else f"❌ {self.error}"
+        if self.empty:
+            return f"❌ 未能获取{self.symbol}的股票数据"
+
+        label = _SOURCE_LABELS.get(self.source, self.source)
+        title = f"{self.name}({self.symbol})" if self.name else self.symbol
+        lines = [
+            f"📊 {title} - {label}数据",
+            f"股票代码: {self.symbol}",
+        ]
+        if self.name:
+            lines.append(f"股票名称: {self.name}")
+        lines += [
+            f"数据期间: {self.start_date} 至 {self.end_date}",
+            f"数据条数: {len(self.bars)}条",
+            "",
+        ]
+
+        quote = self.quote()
+        if quote is not None:
+            lines += [
+                f"💰 最新价格: ¥{quote.price:.2f}",
+                f"📈 涨跌额: {quote.change:+.2f} ({quote.change_pct:+.2f}%)",
+                "",
+                "📊 价格统计:",
+            ]
+            high, low, close, volume = (self.column(name) for name in ('high', 'low', 'close', 'volume'))
+            if high is not None:
+                lines.append(f"   最高价: ¥{high.max():.2f}")
+            if low is not None:
+                lines.append(f"   最低价: ¥{low.min():.2f}")
+            lines.append(f"   平均价: ¥{close.mean():.2f}")
+            if volume is not None:
+                lines.append(f"   成交量: {volume.sum():,.0f}股")
+            lines.append("")
+
+        display_rows = min(RECENT_ROWS, len(self.bars))
+        lines.append(f"最新{display_rows}天数据:")
+        # 使用pandas选项确保在各种显示环境下都能完整显示
+        with pd.option_context('display.max_rows', None,
+                               'display.max_columns', None,
+                               'display.width', None,
+                               'display.max_colwidth', None):
+            lines.append(self.bars.tail(display_rows).to_string(index=False))
+
+        if self.stale:
+            lines += ["", "⚠️ 注意: 使用的是过期缓存数据"]
+        return "\n".join(lines)
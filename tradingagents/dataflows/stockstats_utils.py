@@ -1,21 +1,37 @@
 import pandas as pd
 import yfinance as yf
 from stockstats import wrap
-from typing import Annotated
+from typing import Annotated, List
 import os
+import threading
 from .config import get_config
 
 
+# In-process cache of loaded price files keyed by (path, mtime), so that
+# repeated indicator lookups do not re-read and re-parse the same CSV.
+_price_frame_cache = {}
+_price_frame_lock = threading.Lock()
+_PRICE_FRAME_CACHE_SIZE = 32
+
+
+def _read_price_csv(path: str) -> pd.DataFrame:
+    """Read a YFin price CSV once per file version and return a copy."""
+    key = (path, os.path.getmtime(path))
+    with _price_frame_lock:
+        cached = _price_frame_cache.get(key)
+    if cached is None:
+        cached = pd.read_csv(path)
+        with _price_frame_lock:
+            if len(_price_frame_cache) >= _PRICE_FRAME_CACHE_SIZE:
+                _price_frame_cache.pop(next(iter(_price_frame_cache)))
+            _price_frame_cache[key] = cached
+    return cached.copy()
+
+
 class StockstatsUtils:
     @staticmethod
-    def get_stock_stats(
+    def load_price_frame(
         symbol: Annotated[str, "ticker symbol for the company"],
-        indicator: Annotated[
-            str, "quantitative indicators based off of the stock data for the company"
-        ],
-        curr_date: Annotated[
-            str, "curr date for retrieving stock price data, YYYY-mm-dd"
-        ],
         data_dir: Annotated[
             str,
             "directory where the stock data is stored.",
@@ -24,58 +40,114 @@ class StockstatsUtils:
             bool,
             "whether to use online tools to fetch data or offline tools. If True, will use online tools.",
         ] = False,
-    ):
-        df = None
-        data = None
-
+    ) -> pd.DataFrame:
+        """
+        Load the full price history used for indicator computation, with a
+        ``Date`` column formatted as YYYY-mm-dd.
+        """
         if not online:
             try:
-                data = pd.read_csv(
+                data = _read_price_csv(
                     os.path.join(
                         data_dir,
                         f"{symbol}-YFin-data-2015-01-01-2025-03-25.csv",
                     )
                 )
-                df = wrap(data)
             except FileNotFoundError:
                 raise Exception("Stockstats fail: Yahoo Finance data not fetched yet!")
+            data["Date"] = pd.to_datetime(data["Date"], utc=True).dt.strftime("%Y-%m-%d")
+            return data
+
+        # Get today's date as YYYY-mm-dd to add to cache
+        today_date = pd.Timestamp.today()
+        end_date = today_date
+        start_date = today_date - pd.DateOffset(years=15)
+        start_date = start_date.strftime("%Y-%m-%d")
+        end_date = end_date.strftime("%Y-%m-%d")
+
+        # Get config and ensure cache directory exists
+        config = get_config()
+        os.makedirs(config["data_cache_dir"], exist_ok=True)
+
+        data_file = os.path.join(
+            config["data_cache_dir"],
+            f"{symbol}-YFin-data-{start_date}-{end_date}.csv",
+        )
+
+        if os.path.exists(data_file):
+            data = _read_price_csv(data_file)
         else:
-            # Get today's date as YYYY-mm-dd to add to cache
-            today_date = pd.Timestamp.today()
-            curr_date = pd.to_datetime(curr_date)
-
-            end_date = today_date
-            start_date = today_date - pd.DateOffset(years=15)
-            start_date = start_date.strftime("%Y-%m-%d")
-            end_date = end_date.strftime("%Y-%m-%d")
-
-            # Get config and ensure cache directory exists
-            config = get_config()
-            os.makedirs(config["data_cache_dir"], exist_ok=True)
-
-            data_file = os.path.join(
-                config["data_cache_dir"],
-                f"{symbol}-YFin-data-{start_date}-{end_date}.csv",
+            data = yf.download(
+                symbol,
+                start=start_date,
+                end=end_date,
+                multi_level_index=False,
+                progress=False,
+                auto_adjust=True,
             )
+            data = data.reset_index()
+            data.to_csv(data_file, index=False)
 
-            if os.path.exists(data_file):
-                data = pd.read_csv(data_file)
-                data["Date"] = pd.to_datetime(data["Date"])
-            else:
-                data = yf.download(
-                    symbol,
-                    start=start_date,
-                    end=end_date,
-                    multi_level_index=False,
-                    progress=False,
-                    auto_adjust=True,
-                )
-                data = data.reset_index()
-                data.to_csv(data_file, index=False)
+        data["Date"] = pd.to_datetime(data["Date"]).dt.strftime("%Y-%m-%d")
+        return data
+
+    @staticmethod
+    def get_stock_stats_window(
+        symbol: Annotated[str, "ticker symbol for the company"],
+        indicators: Annotated[
+            List[str], "quantitative indicators to compute on one shared frame"
+        ],
+        start_date: Annotated[str, "window start date, YYYY-mm-dd"],
+        end_date: Annotated[str, "window end date, YYYY-mm-dd"],
+        data_dir: Annotated[
+            str,
+            "directory where the stock data is stored.",
+        ],
+        online: Annotated[
+            bool,
+            "whether to use online tools to fetch data or offline tools. If True, will use online tools.",
+        ] = False,
+    ) -> pd.DataFrame:
+        """
+        Load the price history once, compute every requested indicator column
+        in a single pass over the full series, and return the rows whose
+        ``Date`` falls inside [start_date, end_date].
+
+        Indicators are computed on the full history (not just the window) so
+        that long look-backs such as ``close_200_sma`` match the per-day values.
+        """
+        data = StockstatsUtils.load_price_frame(symbol, data_dir, online)
+        dates = data["Date"].copy()
+        df = wrap(data)
+        for indicator in indicators:
+            df[indicator]  # trigger stockstats to calculate the indicator
+
+        result = pd.DataFrame({"Date": dates.values})
+        for indicator in indicators:
+            result[indicator] = df[indicator].values
+        mask = (result["Date"] >= start_date) & (result["Date"] <= end_date)
+        return result.loc[mask].reset_index(drop=True)
 
-            df = wrap(data)
-            df["Date"] = df["Date"].dt.strftime("%Y-%m-%d")
-            curr_date = curr_date.strftime("%Y-%m-%d")
+    @staticmethod
+    def get_stock_stats(
+        symbol: Annotated[str, "ticker symbol for the company"],
+        indicator: Annotated[
+            str, "quantitative indicators based off of the stock data for the company"
+        ],
+        curr_date: Annotated[
+            str, "curr date for retrieving stock price data, YYYY-mm-dd"
+        ],
+        data_dir: Annotated[
+            str,
+            "directory where the stock data is stored.",
+        ],
+        online: Annotated[
+            bool,
+            "whether to use online tools to fetch data or offline tools. If True, will use online tools.",
+        ] = False,
+    ):
+        df = wrap(StockstatsUtils.load_price_frame(symbol, data_dir, online))
+        curr_date = pd.to_datetime(curr_date).strftime("%Y-%m-%d")
 
         df[indicator]  # trigger stockstats to calculate the indicator
         matching_rows = df[df["Date"].str.startswith(curr_date)]
@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+股票代码索引
+覆盖A股、港股和美股的本地代码/名称索引，供股票搜索和公司名称解析使用：
+- 单个可内存映射的索引文件，查询时不需要加载全部数据，也不发起网络请求
+- 排序键表 + 二分查找：代码精确匹配、代码/名称/拼音首字母前缀匹配，
+  名称和代码的所有后缀也写入键表，子串匹配转化为前缀匹配
+- 后台线程按周期批量刷新，刷新完成前查询返回空结果，调用方回退到原有逻辑
+"""
+
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+try:
+    from pypinyin import lazy_pinyin, Style
+    PYPINYIN_AVAILABLE = True
+except ImportError:
+    PYPINYIN_AVAILABLE = False
+
+
+MARKET_CHINA = 'china_a'
+MARKET_HK = 'hong_kong'
+MARKET_US = 'us'
+
+_MAGIC = b'TASYMIX1'
+_HEADER = struct.Struct('<8sIIQ4x')  # magic, 记录数, 键数, 构建时间
+_FIELD_SEP = '\x1f'
+
+# 键的命名空间：精确代码 < 前缀 < 子串，查询时按此优先级合并结果
+_NS_CODE = b'c'
+_NS_PREFIX = b'p'
+_NS_SUFFIX = b's'
+
+_CJK = re.compile(r'[一-鿿]')
+_TICKER_SUFFIX = re.compile(r'\.(SZ|SH|SS|BJ|HK)$', re.IGNORECASE)
+
+
+@dataclass
+class SymbolEntry:
+    """索引中的一只股票"""
+    code: str      # A股6位代码 / 港股5位代码 / 美股代码
+    name: str
+    market: str    # china_a / hong_kong / us
+    ts_code: str = ''
+
+    @property
+    def display_code(self) -> str:
+        """系统中使用的代码格式（港股为 0700.HK）"""
+        if self.market == MARKET_HK:
+            return f"{self.code[-4:] if self.code.startswith('0') else self.code}.HK"
+        return self.code
+
+
+def _normalize_text(text: str) -> str:
+    return re.sub(r'\s+', '', str(text)).lower()
+
+
+def _china_ts_code(code: str) -> str:
+    if code.startswith(('6', '9')):
+        return f"{code}.SH"
+    if code.startswith(('4', '8')):
+        return f"{code}.BJ"
+    return f"{code}.SZ"
+
+
+def parse_ticker(ticker: str) -> List[Tuple[str, str]]:
+    """将用户输入的代码解析为可能的 (市场, 标准代码)"""
+    raw = str(ticker).strip().upper()
+    is_hk = raw.endswith('.HK')
+    code = _TICKER_SUFFIX.sub('', raw)
+    if code.startswith('105.') or code.startswith('106.'):
+        code = code.split('.', 1)[1]
+
+    if code.isdigit():
+        if is_hk or len(code) <= 5:
+            return [(MARKET_HK, code.zfill(5))]
+        if len(code) == 6:
+            return [(MARKET_CHINA, code)]
+        return []
+    if code.isalpha() or re.match(r'^[A-Z]+[.\-][A-Z]$', code):
+        return [(MARKET_US, code)]
+    return []
+
+
+def _code_key(market: str, code: str) -> bytes:
+    return _NS_CODE + f"{market}:{code}".encode('utf-8')
+
+
+def _entry_keys(entry: SymbolEntry) -> Iterable[bytes]:
+    """生成一只股票的所有查询键（不含命名空间外的重复项）"""
+    yield _code_key(entry.market, entry.code)
+
+    code = entry.code.lower()
+    name = _normalize_text(entry.name)
+    prefix_terms = {code, name}
+    if entry.market == MARKET_HK:
+        prefix_terms.add(code.lstrip('0'))
+    if PYPINYIN_AVAILABLE and _CJK.search(entry.name):
+        initials = ''.join(lazy_pinyin(entry.name, style=Style.FIRST_LETTER))
+        prefix_terms.add(_normalize_text(initials))
+    for term in prefix_terms:
+        if term:
+            yield _NS_PREFIX + term.encode('utf-8')
+
+    suffix_terms = set()
+    for i in range(1, len(code)):
+        suffix_terms.add(code[i:])
+    if _CJK.search(name):
+        for i in range(1, len(name)):
+            suffix_terms.add(name[i:])
+    else:
+        # 英文名称只索引单词开头，避免后缀数量过多
+        words = re.split(r'[\s.,&\-]+', str(entry.name).lower())
+        for i in range(1, len(words)):
+            suffix_terms.add(''.join(words[i:]))
+    for term in suffix_terms - prefix_terms:
+        if term:
+            yield _NS_SUFFIX + term.encode('utf-8')
+
+
+class SymbolIndex:
+    """内存映射的股票代码索引"""
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: 索引文件路径（不存在时索引为空，等待 build/refresh）
+        """
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._file = None
+        self._mm: Optional[mmap.mmap] = None
+        self._n_records = 0
+        self._n_keys = 0
+        self.built_at = 0.0
+        self._open()
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    @property
+    def count(self) -> int:
+        return self._n_records
+
+    def is_ready(self) -> bool:
+        return self._n_records > 0
+
+    def get(self, ticker: str) -> Optional[SymbolEntry]:
+        """按代码精确查找"""
+        with self._lock:
+            if not self._n_keys:
+                return None
+            for market, code in parse_ticker(ticker):
+                target = _code_key(market, code)
+                pos = self._lower_bound(target)
+                if pos < self._n_keys and self._key(pos) == target:
+                    return self._record(int(self._key_rows[pos]))
+        return None
+
+    def get_name(self, ticker: str) -> Optional[str]:
+        """按代码解析公司名称，未收录时返回None"""
+        entry = self.get(ticker)
+        return entry.name if entry else None
+
+    def search(self, keyword: str, limit: Optional[int] = 20, market: str = None) -> List[SymbolEntry]:
+        """
+        搜索股票：代码精确匹配 > 代码/名称/拼音首字母前缀匹配 > 名称/代码子串匹配
+
+        Args:
+            keyword: 关键词
+            limit: 最多返回条数，None表示不限制
+            market: 只返回指定市场（china_a / hong_kong / us）
+        """
+        query = _normalize_text(_TICKER_SUFFIX.sub('', str(keyword).strip()))
+        if not query or (limit is not None and limit <= 0):
+            return []
+
+        results: List[SymbolEntry] = []
+        seen = set()
+
+        def full() -> bool:
+            return limit is not None and len(results) >= limit
+
+        def collect(row: int) -> bool:
+            if row in seen:
+                return full()
+            seen.add(row)
+            entry = self._record(row)
+            if market is None or entry.market == market:
+                results.append(entry)
+            return full()
+
+        with self._lock:
+            if not self._n_keys:
+                return []
+            exact = self.get(keyword)
+            if exact is not None and (market is None or exact.market == market):
+                results.append(exact)
+                seen.add(self._row_of(exact))
+            for namespace in (_NS_PREFIX, _NS_SUFFIX):
+                if full():
+                    break
+                target = namespace + query.encode('utf-8')
+                pos = self._lower_bound(target)
+                while pos < self._n_keys and self._key(pos).startswith(target):
+                    if collect(int(self._key_rows[pos])):
+                        break
+                    pos += 1
+        return results
+
+    # ------------------------------------------------------------------
+    # 构建
+    # ------------------------------------------------------------------
+
+    def build(self, entries: Iterable[SymbolEntry]) -> int:
+        """用给定股票列表重建索引文件，返回收录数量"""
+        unique: Dict[Tuple[str, str], SymbolEntry] = {}
+        for entry in entries:
+            if entry.code and entry.name:
+                unique[(entry.market, entry.code)] = entry
+        records = list(unique.values())
+
+        record_blobs = [_FIELD_SEP.join((e.code, e.name, e.market, e.ts_code)).encode('utf-8') for e in records]
+        keys = sorted({(key, row) for row, entry in enumerate(records) for key in _entry_keys(entry)})
+
+        record_offsets = np.zeros(len(records) + 1, dtype='<u4')
+        np.cumsum([len(blob) for blob in record_blobs], out=record_offsets[1:])
+        key_offsets = np.zeros(len(keys) + 1, dtype='<u4')
+        np.cumsum([len(key) for key, _ in keys], out=key_offsets[1:])
+        key_rows = np.asarray([row for _, row in keys], dtype='<u4')
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, len(records), len(keys), int(time.time())))
+            f.write(record_offsets.tobytes())
+            f.write(key_offsets.tobytes())
+            f.write(key_rows.tobytes())
+            f.write(b''.join(record_blobs))
+            f.write(b''.join(key for key, _ in keys))
+
+        with self._lock:
+            # 先释放旧的内存映射，Windows下被映射的文件不能替换
+            self._close()
+            os.replace(tmp_path, self.path)
+            self._open()
+        logger.info(f"📇 股票代码索引已构建: {len(records)} 只股票, {len(keys)} 个查询键")
+        return len(records)
+
+    def refresh(self, loaders: Iterable[Callable[[], List[SymbolEntry]]] = None) -> int:
+        """从各数据源批量加载股票列表并重建索引"""
+        loaders = loaders if loaders is not None else DEFAULT_LOADERS
+        entries: List[SymbolEntry] = []
+        for loader in loaders:
+            try:
+                loaded = loader()
+                entries.extend(loaded)
+                logger.debug(f"📇 {loader.__name__}: {len(loaded)} 条")
+            except Exception as e:
+                logger.warning(f"⚠️ 股票列表加载失败({loader.__name__}): {e}")
+        if not entries:
+            return 0
+        return self.build(entries)
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    # ------------------------------------------------------------------
+    # 内部方法（调用方持有锁）
+    # ------------------------------------------------------------------
+
+    def _open(self):
+        if not self.path.exists() or self.path.stat().st_size < _HEADER.size:
+            return
+        try:
+            self._file = open(self.path, 'rb')
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, n_records, n_keys, built_at = _HEADER.unpack_from(self._mm, 0)
+            if magic != _MAGIC:
+                raise ValueError("索引文件格式不匹配")
+
+            offset = _HEADER.size
+            self._record_offsets = np.frombuffer(self._mm, dtype='<u4', count=n_records + 1, offset=offset)
+            offset += (n_records + 1) * 4
+            self._key_offsets = np.frombuffer(self._mm, dtype='<u4', count=n_keys + 1, offset=offset)
+            offset += (n_keys + 1) * 4
+            self._key_rows = np.frombuffer(self._mm, dtype='<u4', count=n_keys, offset=offset)
+            offset += n_keys * 4
+            self._records_base = offset
+            self._keys_base = offset + int(self._record_offsets[-1])
+            self._n_records, self._n_keys, self.built_at = n_records, n_keys, float(built_at)
+        except Exception as e:
+            logger.warning(f"⚠️ 股票代码索引文件无效，等待重建: {e}")
+            self._close()
+
+    def _close(self):
+        # numpy视图引用着mmap，需先释放
+        self._record_offsets = self._key_offsets = self._key_rows = None
+        self._n_records = self._n_keys = 0
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _key(self, i: int) -> bytes:
+        start = self._keys_base + int(self._key_offsets[i])
+        return self._mm[start:self._keys_base + int(self._key_offsets[i + 1])]
+
+    def _lower_bound(self, target: bytes) -> int:
+        lo, hi = 0, self._n_keys
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _record(self, row: int) -> SymbolEntry:
+        start = self._records_base + int(self._record_offsets[row])
+        blob = self._mm[start:self._records_base + int(self._record_offsets[row + 1])]
+        code, name, market, ts_code = blob.decode('utf-8').split(_FIELD_SEP)
+        return SymbolEntry(code=code, name=name, market=market, ts_code=ts_code)
+
+    def _row_of(self, entry: SymbolEntry) -> int:
+        pos = self._lower_bound(_code_key(entry.market, entry.code))
+        return int(self._key_rows[pos])
+
+
+# ----------------------------------------------------------------------
+# 数据源
+# ----------------------------------------------------------------------
+
+def _load_builtin_symbols() -> List[SymbolEntry]:
+    """内置的常用股票名称映射，保证离线时也能解析常见股票"""
+    from tradingagents.utils.news_filter import STOCK_COMPANY_MAPPING
+    from tradingagents.dataflows.improved_hk_utils import get_improved_hk_provider
+
+    entries = [SymbolEntry(code, name, MARKET_CHINA, _china_ts_code(code))
+               for code, name in STOCK_COMPANY_MAPPING.items() if code.isdigit() and len(code) == 6]
+    for code, name in get_improved_hk_provider().hk_stock_names.items():
+        if code.isdigit():
+            entries.append(SymbolEntry(code.zfill(5), name, MARKET_HK))
+    entries.extend(SymbolEntry(code, name, MARKET_US) for code, name in BUILTIN_US_NAMES.items())
+    return entries
+
+
+def _load_china_symbols() -> List[SymbolEntry]:
+    """A股列表（AKShare）"""
+    from tradingagents.dataflows.akshare_utils import get_akshare_provider
+    provider = get_akshare_provider()
+    if not provider.connected:
+        return []
+    data = provider.ak.stock_info_a_code_name()
+    return [SymbolEntry(str(code).zfill(6), str(name).strip(), MARKET_CHINA, _china_ts_code(str(code).zfill(6)))
+            for code, name in zip(data['code'], data['name'])]
+
+
+def _load_hk_symbols() -> List[SymbolEntry]:
+    """港股列表（AKShare）"""
+    from tradingagents.dataflows.akshare_utils import get_akshare_provider
+    provider = get_akshare_provider()
+    if not provider.connected:
+        return []
+    data = provider.ak.stock_hk_spot_em()
+    return [SymbolEntry(str(code).zfill(5), str(name).strip(), MARKET_HK)
+            for code, name in zip(data['代码'], data['名称'])]
+
+
+def _load_us_symbols() -> List[SymbolEntry]:
+    """美股列表（AKShare，代码格式为 105.AAPL）"""
+    from tradingagents.dataflows.akshare_utils import get_akshare_provider
+    provider = get_akshare_provider()
+    if not provider.connected:
+        return []
+    data = provider.ak.stock_us_spot_em()
+    return [SymbolEntry(str(code).split('.', 1)[-1].upper(), str(name).strip(), MARKET_US)
+            for code, name in zip(data['代码'], data['名称'])]
+
+
+BUILTIN_US_NAMES = {
+    'AAPL': '苹果公司',
+    'TSLA': '特斯拉',
+    'NVDA': '英伟达',
+    'MSFT': '微软',
+    'GOOGL': '谷歌',
+    'AMZN': '亚马逊',
+    'META': 'Meta',
+    'NFLX': '奈飞',
+}
+
+# 后加载的数据源覆盖先加载的同代码条目
+DEFAULT_LOADERS = [_load_builtin_symbols, _load_china_symbols, _load_hk_symbols, _load_us_symbols]
+
+
+# ----------------------------------------------------------------------
+# 全局索引与定期刷新
+# ----------------------------------------------------------------------
+
+_symbol_index = None
+_symbol_index_lock = threading.Lock()
+_refresh_thread: Optional[threading.Thread] = None
+_last_refresh_attempt = 0.0
+
+# 刷新失败后的最短重试间隔（秒）
+_REFRESH_RETRY_SECONDS = 600
+
+
+def get_symbol_index() -> SymbolIndex:
+    """获取全局股票代码索引；索引缺失或过期时在后台线程中刷新"""
+    global _symbol_index
+    if _symbol_index is None:
+        with _symbol_index_lock:
+            if _symbol_index is None:
+                from tradingagents.default_config import DEFAULT_CONFIG
+                path = os.getenv('SYMBOL_INDEX_PATH') or os.path.join(
+                    DEFAULT_CONFIG["data_cache_dir"], "symbol_universe.idx")
+                _symbol_index = SymbolIndex(Path(path))
+    _schedule_refresh(_symbol_index)
+    return _symbol_index
+
+
+def _schedule_refresh(index: SymbolIndex):
+    global _refresh_thread, _last_refresh_attempt
+    if os.getenv('SYMBOL_INDEX_AUTO_REFRESH', 'true').lower() != 'true':
+        return
+    max_age = float(os.getenv('SYMBOL_INDEX_REFRESH_HOURS', '24')) * 3600
+    now = time.time()
+    if index.is_ready() and now - index.built_at < max_age:
+        return
+    with _symbol_index_lock:
+        if (_refresh_thread is not None and _refresh_thread.is_alive()) or \
+                now - _last_refresh_attempt < _REFRESH_RETRY_SECONDS:
+            return
+        _last_refresh_attempt = now
+        _refresh_thread = threading.Thread(target=index.refresh, name="symbol-index-refresh", daemon=True)
+        _refresh_thread.start()
+
+
+def lookup_company_name(ticker: str) -> Optional[str]:
+    """从本地索引解析公司名称，索引未就绪或未收录时返回None"""
+    try:
+        return get_symbol_index().get_name(ticker)
+    except Exception as e:
+        logger.debug(f"📇 股票代码索引查询失败: {e}")
+        return None
+
+
+def search_symbols(keyword: str, limit: Optional[int] = 20, market: str = None) -> List[SymbolEntry]:
+    """从本地索引搜索股票，索引未就绪时返回空列表"""
+    try:
+        return get_symbol_index().search(keyword, limit=limit, market=market)
+    except Exception as e:
+        logger.debug(f"📇 股票代码索引查询失败: {e}")
+        return []
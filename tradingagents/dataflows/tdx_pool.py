@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+通达信连接池
+- 启动时并行探测所有服务器的延迟并排序，保留最快的几条连接
+- 请求从池中借用连接，不再在请求路径上做连接检测
+- 后台线程定期对空闲连接做心跳检测，重连失效连接并补足连接数
+- K线按 get_security_bars 的偏移量分页，多个连接并行拉取，突破单次800条的限制
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+try:
+    from pytdx.hq import TdxHq_API
+    TDX_AVAILABLE = True
+except ImportError:
+    TDX_AVAILABLE = False
+
+
+DEFAULT_TDX_SERVERS = [
+    {'ip': '115.238.56.198', 'port': 7709},
+    {'ip': '115.238.90.165', 'port': 7709},
+    {'ip': '180.153.18.170', 'port': 7709},
+    {'ip': '119.147.212.81', 'port': 7709},  # 备用
+]
+
+# get_security_bars 单次请求的最大条数
+TDX_MAX_BARS_PER_REQUEST = 800
+
+
+def load_tdx_servers(config_file: str = 'tdx_servers_config.json') -> List[Dict[str, Any]]:
+    """加载服务器列表：优先使用配置文件中的可用服务器，否则使用默认列表"""
+    try:
+        if os.path.exists(config_file):
+            with open(config_file, 'r', encoding='utf-8') as f:
+                servers = json.load(f).get('working_servers', [])
+            if servers:
+                logger.debug(f"🔍 [DEBUG] 从配置文件加载了 {len(servers)} 个服务器")
+                return servers
+    except Exception as e:
+        logger.debug(f"🔍 [DEBUG] 读取服务器配置失败: {e}")
+    return list(DEFAULT_TDX_SERVERS)
+
+
+class TdxPoolUnavailable(Exception):
+    """连接池没有可用连接"""
+
+
+class _PooledClient:
+    """池中的一条连接"""
+
+    def __init__(self, api, server: Dict[str, Any]):
+        self.api = api
+        self.server = server
+        self.healthy = True
+
+
+class _PooledApi:
+    """按方法调用借用连接的API代理，接口与 TdxHq_API 一致"""
+
+    def __init__(self, pool: "TdxClientPool"):
+        self._pool = pool
+
+    def __getattr__(self, name: str):
+        def call(*args, **kwargs):
+            with self._pool.client() as api:
+                return getattr(api, name)(*args, **kwargs)
+        return call
+
+
+class TdxClientPool:
+    """通达信行情连接池"""
+
+    def __init__(self, servers: List[Dict[str, Any]] = None, size: int = 4,
+                 api_factory: Callable[[], Any] = None, timeout: float = 5.0,
+                 health_check_interval: float = 60.0, page_size: int = TDX_MAX_BARS_PER_REQUEST):
+        """
+        初始化连接池（首次借用连接时才探测服务器并建立连接）
+
+        Args:
+            servers: 服务器列表 [{'ip': ..., 'port': ...}]，默认读取 tdx_servers_config.json
+            size: 保持的连接数
+            api_factory: 创建API实例的工厂函数，默认 TdxHq_API
+            timeout: 连接超时和等待空闲连接的超时（秒）
+            health_check_interval: 后台心跳检测间隔（秒），0表示不启动后台检测
+            page_size: 分页获取K线时每页条数
+        """
+        if api_factory is None:
+            if not TDX_AVAILABLE:
+                raise ImportError("pytdx库未安装，请运行: pip install pytdx")
+            api_factory = lambda: TdxHq_API(raise_exception=True)
+
+        self.servers = servers if servers is not None else load_tdx_servers()
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.page_size = min(int(page_size), TDX_MAX_BARS_PER_REQUEST)
+        self.ranked_servers: List[Dict[str, Any]] = []
+        self.api = _PooledApi(self)
+
+        self._api_factory = api_factory
+        self._idle: "queue.Queue[_PooledClient]" = queue.Queue()
+        self._lock = threading.RLock()
+        self._live = 0
+        self._next_server = 0
+        self._started = False
+        self._stop = threading.Event()
+        self._health_thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+
+    def start(self) -> bool:
+        """探测服务器延迟并建立连接，返回是否有可用连接"""
+        with self._lock:
+            if self._started:
+                return self._live > 0
+
+            probed = self._probe_servers()
+            self.ranked_servers = [dict(server, latency=round(latency, 4)) for latency, server, _ in probed]
+            if self.ranked_servers:
+                summary = ', '.join(f"{s['ip']}({s['latency'] * 1000:.0f}ms)" for s in self.ranked_servers[:3])
+                logger.info(f"✅ 通达信服务器延迟排序: {summary}")
+
+            # 复用探测时建立的连接，最快的优先
+            for _, server, api in probed:
+                if self._live < self.size:
+                    self._add(api, server)
+                else:
+                    self._disconnect(api)
+            while self._live < self.size and self._open_one():
+                pass
+            # 连接建立后才标记启动，并发的首次请求在锁上等待
+            self._started = True
+
+            if self._live == 0:
+                logger.error("❌ 所有数据服务器连接失败")
+            elif self.health_check_interval > 0 and self._health_thread is None:
+                self._health_thread = threading.Thread(target=self._health_loop, name="tdx-pool-health",
+                                                       daemon=True)
+                self._health_thread.start()
+            return self._live > 0
+
+    def close(self):
+        """停止后台检测并断开所有连接"""
+        self._stop.set()
+        with self._lock:
+            while True:
+                try:
+                    pooled = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                self._disconnect(pooled.api)
+                self._live -= 1
+            self._started = False
+
+    @property
+    def live_connections(self) -> int:
+        return self._live
+
+    def is_available(self) -> bool:
+        """是否有可用连接（不发起网络请求）"""
+        return self._started and self._live > 0
+
+    # ------------------------------------------------------------------
+    # 借用连接
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def client(self):
+        """借用一条连接；调用中抛出异常的连接会被替换"""
+        if not self._started:
+            self.start()
+        if self._live == 0:
+            raise TdxPoolUnavailable("无可用的通达信连接")
+        try:
+            pooled = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TdxPoolUnavailable("等待通达信空闲连接超时")
+
+        try:
+            yield pooled.api
+        except Exception:
+            pooled.healthy = False
+            raise
+        finally:
+            if pooled.healthy:
+                self._idle.put(pooled)
+            else:
+                self._replace(pooled)
+
+    def fetch_bars(self, category: int, market: int, code: str, count: int) -> List[Dict[str, Any]]:
+        """
+        分页并行获取最近 count 条K线
+
+        Returns:
+            List[Dict]: 按时间升序排列的K线
+        """
+        offsets = list(range(0, max(int(count), 0), self.page_size))
+        if not offsets:
+            return []
+
+        def fetch_page(offset: int) -> List[Dict[str, Any]]:
+            size = min(self.page_size, count - offset)
+            last_error = None
+            for _ in range(2):
+                try:
+                    with self.client() as api:
+                        return list(api.get_security_bars(category, market, code, offset, size) or [])
+                except TdxPoolUnavailable:
+                    raise
+                except Exception as e:
+                    # 失败的连接已被替换，换一条连接重试
+                    last_error = e
+            raise RuntimeError(f"获取K线失败: {code} offset={offset}: {last_error}")
+
+        if len(offsets) == 1:
+            pages = [fetch_page(0)]
+        else:
+            with ThreadPoolExecutor(max_workers=min(len(offsets), self.size),
+                                    thread_name_prefix="tdx-bars") as executor:
+                pages = list(executor.map(fetch_page, offsets))
+
+        # 偏移量0是最近的一页，每页内部按时间升序
+        bars = []
+        for page in reversed(pages):
+            bars.extend(page)
+        logger.debug(f"📊 [通达信] {code} 分 {len(pages)} 页获取 {len(bars)} 条K线")
+        return bars
+
+    # ------------------------------------------------------------------
+    # 健康检测
+    # ------------------------------------------------------------------
+
+    def check_health(self):
+        """逐个心跳检测空闲连接，替换失效连接并补足连接数"""
+        for _ in range(self._idle.qsize()):
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                healthy = bool(pooled.api.get_security_count(0))
+            except Exception:
+                healthy = False
+            if healthy:
+                self._idle.put(pooled)
+            else:
+                logger.warning(f"⚠️ 通达信连接失效，重新连接: {pooled.server['ip']}:{pooled.server['port']}")
+                self._replace(pooled)
+
+        with self._lock:
+            while self._live < self.size and self._open_one():
+                pass
+
+    def _health_loop(self):
+        while not self._stop.wait(self.health_check_interval):
+            try:
+                self.check_health()
+            except Exception as e:
+                logger.error(f"通达信连接检测失败: {e}")
+
+    # ------------------------------------------------------------------
+    # 内部方法
+    # ------------------------------------------------------------------
+
+    def _probe_servers(self) -> List[Tuple[float, Dict[str, Any], Any]]:
+        """并行连接所有服务器，返回按延迟排序的 (延迟, 服务器, 已连接API)"""
+        def probe(server):
+            api = self._api_factory()
+            started = time.perf_counter()
+            try:
+                if api.connect(server['ip'], server['port'], time_out=self.timeout) and api.get_security_count(0):
+                    return time.perf_counter() - started, server, api
+            except Exception as e:
+                logger.debug(f"🔍 [DEBUG] 服务器 {server['ip']}:{server['port']} 探测失败: {e}")
+            self._disconnect(api)
+            return None
+
+        if not self.servers:
+            return []
+        with ThreadPoolExecutor(max_workers=min(len(self.servers), 16), thread_name_prefix="tdx-probe") as executor:
+            results = [result for result in executor.map(probe, self.servers) if result is not None]
+        return sorted(results, key=lambda result: result[0])
+
+    def _connect(self, server: Dict[str, Any]):
+        api = self._api_factory()
+        try:
+            if api.connect(server['ip'], server['port'], time_out=self.timeout):
+                return api
+        except Exception as e:
+            logger.debug(f"🔍 [DEBUG] 服务器 {server['ip']}:{server['port']} 连接失败: {e}")
+        self._disconnect(api)
+        return None
+
+    def _open_one(self) -> bool:
+        """按延迟顺序轮流连接排名靠前的服务器，成功返回True"""
+        candidates = self.ranked_servers or self.servers
+        for _ in range(len(candidates)):
+            server = candidates[self._next_server % len(candidates)]
+            self._next_server += 1
+            api = self._connect(server)
+            if api is not None:
+                self._add(api, server)
+                return True
+        return False
+
+    def _add(self, api, server: Dict[str, Any]):
+        with self._lock:
+            self._live += 1
+        self._idle.put(_PooledClient(api, server))
+
+    def _replace(self, pooled: _PooledClient):
+        self._disconnect(pooled.api)
+        with self._lock:
+            self._live -= 1
+            if not self._stop.is_set():
+                self._open_one()
+
+    @staticmethod
+    def _disconnect(api):
+        try:
+            api.disconnect()
+        except Exception:
+            pass
+
+
+# 全局连接池实例
+_tdx_pool = None
+_tdx_pool_lock = threading.Lock()
+
+def get_tdx_pool() -> TdxClientPool:
+    """获取全局通达信连接池"""
+    global _tdx_pool
+    if _tdx_pool is None:
+        with _tdx_pool_lock:
+            if _tdx_pool is None:
+                _tdx_pool = TdxClientPool(
+                    size=int(os.getenv('TDX_POOL_SIZE', '4')),
+                    health_check_interval=float(os.getenv('TDX_HEALTH_CHECK_INTERVAL', '60')),
+                )
+    return _tdx_pool
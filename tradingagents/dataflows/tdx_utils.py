@@ -42,8 +42,8 @@ except ImportError:
 try:
     # 中国股票数据Python接口
     import pytdx
-    from pytdx.hq import TdxHq_API
     from pytdx.exhq import TdxExHq_API
+    from .tdx_pool import get_tdx_pool
     TDX_AVAILABLE = True
 except ImportError:
     TDX_AVAILABLE = False
@@ -58,6 +58,7 @@ class TongDaXinDataProvider:
         logger.debug(f"🔍 [DEBUG] 初始化通达信数据提供器...")
         self.api = None
         self.exapi = None  # 扩展行情API
+        self.pool = None
         self.connected = False
 
         logger.debug(f"🔍 [DEBUG] 检查pytdx库可用性: {TDX_AVAILABLE}")
@@ -68,98 +69,38 @@ class TongDaXinDataProvider:
         logger.debug(f"✅ [DEBUG] pytdx库检查通过")
     
     def connect(self):
-        """连接数据服务器"""
+        """连接数据服务器（使用共享连接池，首次连接时按延迟排序服务器）"""
         logger.debug(f"🔍 [DEBUG] 开始连接数据服务器...")
         try:
-            # 尝试从配置文件加载可用服务器
-            logger.debug(f"🔍 [DEBUG] 加载服务器配置...")
-            working_servers = self._load_working_servers()
-
-            # 如果没有配置文件，使用默认服务器列表
-            if not working_servers:
-                logger.debug(f"🔍 [DEBUG] 未找到配置文件，使用默认服务器列表")
-                working_servers = [
-                    {'ip': '115.238.56.198', 'port': 7709},
-                    {'ip': '115.238.90.165', 'port': 7709},
-                    {'ip': '180.153.18.170', 'port': 7709},
-                    {'ip': '119.147.212.81', 'port': 7709},  # 备用
-                ]
-            else:
-                logger.debug(f"🔍 [DEBUG] 从配置文件加载了 {len(working_servers)} 个服务器")
-
-            # 尝试连接可用服务器
-            logger.debug(f"🔍 [DEBUG] 创建Tushare数据接口实例...")
-            self.api = TdxHq_API()
-            logger.debug(f"🔍 [DEBUG] 开始尝试连接服务器...")
-
-            for i, server in enumerate(working_servers):
-                try:
-                    logger.debug(f"🔍 [DEBUG] 尝试连接服务器 {i+1}/{len(working_servers)}: {server['ip']}:{server['port']}")
-                    result = self.api.connect(server['ip'], server['port'])
-                    logger.debug(f"🔍 [DEBUG] 连接结果: {result}")
-                    if result:
-                        logger.info(f"✅ Tushare数据接口连接成功: {server['ip']}:{server['port']}")
-                        self.connected = True
-                        return True
-                except Exception as e:
-                    logger.error(f"⚠️ 服务器 {server['ip']}:{server['port']} 连接失败: {e}")
-                    continue
-
-            logger.error(f"❌ 所有数据服务器连接失败")
-            self.connected = False
-            return False
+            self.pool = get_tdx_pool()
+            self.connected = self.pool.start()
+            if self.connected:
+                self.api = self.pool.api
+                best = self.pool.ranked_servers[0] if self.pool.ranked_servers else None
+                if best:
+                    logger.info(f"✅ Tushare数据接口连接成功: {best['ip']}:{best['port']} "
+                                f"(连接池 {self.pool.live_connections} 条)")
+            return self.connected
 
         except Exception as e:
             logger.error(f"❌ Tushare数据接口连接失败: {e}")
             self.connected = False
             return False
 
-    def _load_working_servers(self):
-        """加载可用服务器配置"""
-        try:
-            import json
-            import os
-
-            config_file = 'tdx_servers_config.json'
-            if os.path.exists(config_file):
-                with open(config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    return config.get('working_servers', [])
-        except Exception:
-            pass
-        return []
-    
     def disconnect(self):
-        """断开连接"""
-        try:
-            if self.api:
-                self.api.disconnect()
-            if self.exapi:
-                self.exapi.disconnect()
-            self.connected = False
-            logger.info(f"✅ Tushare数据接口连接已断开")
-        except:
-            pass
+        """断开连接（共享连接池由全局实例管理，这里只释放引用）"""
+        self.api = None
+        self.connected = False
+        logger.info(f"✅ Tushare数据接口连接已断开")
 
     def is_connected(self):
-        """检查连接状态"""
-        if not self.connected or not self.api:
-            return False
-
-        # 尝试简单的API调用来验证连接是否有效
-        try:
-            # 获取市场信息作为连接测试
-            result = self.api.get_security_count(0)  # 获取深圳市场股票数量
-            return result is not None and result > 0
-        except Exception as e:
-            logger.error(f"🔍 [DEBUG] 连接测试失败: {e}")
-            self.connected = False
-            return False
+        """检查连接状态（连接有效性由连接池后台检测，不发起网络请求）"""
+        return bool(self.connected and self.api and self.pool and self.pool.is_available())
     
     def _get_stock_name(self, stock_code: str) -> str:
         """
         获取股票名称
-        优先级：缓存 -> MongoDB -> 常用股票映射 -> API获取（仅深圳市场） -> 默认格式
+        优先级：缓存 -> 股票代码索引 -> MongoDB -> 常用股票映射 -> API获取（仅深圳市场） -> 默认格式
         Args:
             stock_code: 股票代码
         Returns:
@@ -171,7 +112,14 @@ class TongDaXinDataProvider:
         if stock_code in _stock_name_cache:
             return _stock_name_cache[stock_code]
         
-        # 优先从MongoDB获取
+        # 本地股票代码索引（无网络请求）
+        from .symbol_index import lookup_company_name
+        index_name = lookup_company_name(stock_code)
+        if index_name:
+            _stock_name_cache[stock_code] = index_name
+            return index_name
+        
+        # 其次从MongoDB获取
         mongodb_name = _get_stock_name_from_mongodb(stock_code)
         if mongodb_name:
             _stock_name_cache[stock_code] = mongodb_name
@@ -286,18 +234,17 @@ class TongDaXinDataProvider:
         try:
             market = self._get_market_code(stock_code)
             
-            # 计算需要获取的数据量
+            # 计算需要获取的数据量（偏移量0对应最新一根K线，因此从开始日期算到今天）
             start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-            end_dt = datetime.strptime(end_date, '%Y-%m-%d')
-            days_diff = (end_dt - start_dt).days
+            days_diff = (datetime.now() - start_dt).days
             
-            # 根据周期调整数据量
+            # 根据周期调整数据量，超过单次800条的部分由连接池分页并行获取
             if period == 'D':
-                count = min(days_diff + 10, 800)  # 日线最多800条
+                count = days_diff + 10
             elif period == 'W':
-                count = min(days_diff // 7 + 10, 800)
+                count = days_diff // 7 + 10
             elif period == 'M':
-                count = min(days_diff // 30 + 10, 800)
+                count = days_diff // 30 + 10
             else:
                 count = 800
             
@@ -305,7 +252,7 @@ class TongDaXinDataProvider:
             category_map = {'D': 9, 'W': 5, 'M': 6}
             category = category_map.get(period, 9)
             
-            data = self.api.get_security_bars(category, market, stock_code, 0, count)
+            data = self.pool.fetch_bars(category, market, stock_code, count)
             
             if not data:
                 return pd.DataFrame()
@@ -412,10 +359,11 @@ class TongDaXinDataProvider:
                 return []
         
         try:
-            # 中国股票数据没有直接的搜索API，这里提供一个简化的实现
-            # 实际使用中可以维护一个股票代码表
+            # 中国股票数据没有直接的搜索API，使用本地股票代码索引
+            from .symbol_index import search_symbols, MARKET_CHINA
+            entries = search_symbols(keyword, limit=10, market=MARKET_CHINA)
             
-            # 常见股票代码映射
+            # 索引未就绪时使用常见股票代码映射
             stock_mapping = {
                 '平安银行': '000001',
                 '万科A': '000002', 
@@ -429,20 +377,25 @@ class TongDaXinDataProvider:
                 '工商银行': '601398'
             }
             
+            if entries:
+                candidates = [(entry.name, entry.code) for entry in entries]
+            else:
+                candidates = [(name, code) for name, code in stock_mapping.items()
+                              if keyword.lower() in name.lower() or keyword in code]
+            
             results = []
             
             # 按关键词搜索
-            for name, code in stock_mapping.items():
-                if keyword.lower() in name.lower() or keyword in code:
-                    # 获取实时数据
-                    realtime_data = self.get_real_time_data(code)
-                    if realtime_data:
-                        results.append({
-                            'code': code,
-                            'name': name,
-                            'price': realtime_data.get('price', 0),
-                            'change_percent': realtime_data.get('change_percent', 0)
-                        })
+            for name, code in candidates:
+                # 获取实时数据
+                realtime_data = self.get_real_time_data(code)
+                if realtime_data:
+                    results.append({
+                        'code': code,
+                        'name': name,
+                        'price': realtime_data.get('price', 0),
+                        'change_percent': realtime_data.get('change_percent', 0)
+                    })
             
             return results
             
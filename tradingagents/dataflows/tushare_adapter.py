@@ -15,6 +15,8 @@ warnings.filterwarnings('ignore')
 from tradingagents.utils.logging_init import get_logger
 logger = get_logger("default")
 
+from .price_adjustment import get_adjustment_engine, restore_raw_prices
+
 # 导入Tushare工具
 try:
     from .tushare_utils import get_tushare_provider
@@ -69,7 +71,8 @@ class TushareDataAdapter:
             logger.error("❌ Tushare不可用")
     
     def get_stock_data(self, symbol: str, start_date: str = None, end_date: str = None, 
-                      data_type: str = "daily") -> pd.DataFrame:
+                      data_type: str = "daily", use_cache: bool = True,
+                      adjust_mode: Optional[str] = 'forward') -> pd.DataFrame:
         """
         获取股票数据
         
@@ -78,6 +81,8 @@ class TushareDataAdapter:
             start_date: 开始日期
             end_date: 结束日期
             data_type: 数据类型 ("daily", "realtime")
+            use_cache: 是否查找文件缓存（K线缓存补齐缺口时需要精确区间，应关闭）
+            adjust_mode: 日线复权方式，None 表示返回未复权数据（拼接多段数据后再调用 adjust_bars）
             
         Returns:
             DataFrame: 股票数据
@@ -96,7 +101,8 @@ class TushareDataAdapter:
 
             if data_type == "daily":
                 logger.info(f"🔍 [股票代码追踪] 调用 _get_daily_data，传入参数: symbol='{symbol}'")
-                return self._get_daily_data(symbol, start_date, end_date)
+                return self._get_daily_data(symbol, start_date, end_date, use_cache=use_cache,
+                                            adjust_mode=adjust_mode)
             elif data_type == "realtime":
                 return self._get_realtime_data(symbol)
             else:
@@ -107,7 +113,8 @@ class TushareDataAdapter:
             logger.error(f"❌ 获取{symbol}数据失败: {e}")
             return pd.DataFrame()
     
-    def _get_daily_data(self, symbol: str, start_date: str = None, end_date: str = None) -> pd.DataFrame:
+    def _get_daily_data(self, symbol: str, start_date: str = None, end_date: str = None,
+                        use_cache: bool = True, adjust_mode: Optional[str] = 'forward') -> pd.DataFrame:
         """获取日线数据"""
 
         # 记录详细的调用信息
@@ -115,8 +122,8 @@ class TushareDataAdapter:
         logger.info(f"🔍 [TushareAdapter详细日志] 输入参数: symbol='{symbol}', start_date='{start_date}', end_date='{end_date}'")
         logger.info(f"🔍 [TushareAdapter详细日志] 缓存启用状态: {self.enable_cache}")
 
-        # 1. 尝试从缓存获取
-        if self.enable_cache:
+        # 1. 尝试从缓存获取（文件缓存中只有复权数据）
+        if self.enable_cache and use_cache and adjust_mode is not None:
             try:
                 logger.info(f"🔍 [TushareAdapter详细日志] 开始查找缓存数据...")
                 cache_key = self.cache_manager.find_cached_stock_data(
@@ -158,7 +165,7 @@ class TushareDataAdapter:
 
         import time
         provider_start_time = time.time()
-        data = self.provider.get_stock_daily(symbol, start_date, end_date)
+        data = self.provider.get_stock_daily(symbol, start_date, end_date, adjust_mode=adjust_mode)
         provider_duration = time.time() - provider_start_time
 
         logger.info(f"🔍 [TushareAdapter详细日志] Provider调用完成，耗时: {provider_duration:.3f}秒")
@@ -188,6 +195,41 @@ class TushareDataAdapter:
                 logger.warning(f"⚠️ [TushareAdapter详细日志] DataFrame为空: {data.empty}")
             return pd.DataFrame()
     
+    def get_snapshot_data(self, symbol: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        """
+        从全市场日线快照读取数据（不调用API）
+
+        Returns:
+            DataFrame: 与 get_stock_data 相同格式的未复权日线，复权由 adjust_bars 在拼接完整区间后统一计算；
+            快照未覆盖请求区间时返回None
+        """
+        from .market_snapshot import get_snapshot_bars
+
+        try:
+            raw = get_snapshot_bars(symbol, start_date, end_date)
+        except Exception as e:
+            logger.warning(f"⚠️ 读取全市场快照失败，改为请求API: {e}")
+            return None
+        if raw is None or raw.empty or self.provider is None:
+            return raw
+        logger.debug(f"📦 从全市场快照获取{symbol}数据: {len(raw)}条")
+        return self._standardize_data(self.provider.prepare_daily_data(raw, adjust_mode=None))
+
+    def adjust_bars(self, data: pd.DataFrame, mode: str = 'forward') -> pd.DataFrame:
+        """
+        对拼接好的完整区间日线（get_stock_data 标准化格式）统一计算复权价格
+
+        已带复权列的旧缓存数据先还原为未复权价格，避免各段锚定不同基准价造成除权日前后的假跳空。
+        """
+        if data is None or data.empty or 'pct_change' not in data.columns:
+            return data
+        raw = restore_raw_prices(data)
+        symbol = str(raw['code'].iloc[0]) if 'code' in raw.columns else None
+        adjusted = get_adjustment_engine().adjust(raw, mode=mode, symbol=symbol,
+                                                  date_column='date', pct_column='pct_change')
+        logger.debug(f"📊 [Tushare] 完整区间复权完成({mode})，数据条数: {len(adjusted)}")
+        return adjusted
+
     def _get_realtime_data(self, symbol: str) -> pd.DataFrame:
         """获取实时数据（使用最新日线数据）"""
         
@@ -331,12 +373,13 @@ class TushareDataAdapter:
             logger.error(f"❌ 获取{symbol}股票信息失败: {e}")
             return {'symbol': symbol, 'name': f'股票{symbol}', 'source': 'unknown'}
     
-    def search_stocks(self, keyword: str) -> pd.DataFrame:
+    def search_stocks(self, keyword: str, limit: Optional[int] = None) -> pd.DataFrame:
         """
         搜索股票
         
         Args:
             keyword: 搜索关键词
+            limit: 最多返回条数，None表示返回全部匹配
             
         Returns:
             DataFrame: 搜索结果
@@ -346,7 +389,7 @@ class TushareDataAdapter:
             return pd.DataFrame()
 
         try:
-            results = self.provider.search_stocks(keyword)
+            results = self.provider.search_stocks(keyword, limit=limit)
 
             if results is not None and not results.empty:
                 logger.debug(f"✅ 搜索'{keyword}'成功: {len(results)}条结果")
@@ -28,6 +28,8 @@ except ImportError:
     CACHE_AVAILABLE = False
     logger.warning("⚠️ 缓存管理器不可用")
 
+from .price_adjustment import get_adjustment_engine
+
 # 导入Tushare
 try:
     import tushare as ts
@@ -151,7 +153,8 @@ class TushareProvider:
             logger.error(f"❌ 获取股票列表失败: {e}")
             return pd.DataFrame()
     
-    def get_stock_daily(self, symbol: str, start_date: str = None, end_date: str = None) -> pd.DataFrame:
+    def get_stock_daily(self, symbol: str, start_date: str = None, end_date: str = None,
+                        adjust_mode: str = 'forward') -> pd.DataFrame:
         """
         获取股票日线数据
         
@@ -159,6 +162,7 @@ class TushareProvider:
             symbol: 股票代码（如：000001.SZ）
             start_date: 开始日期（YYYYMMDD）
             end_date: 结束日期（YYYYMMDD）
+            adjust_mode: 复权方式，'forward'（前复权）、'backward'（后复权）或 None（不复权）
             
         Returns:
             DataFrame: 日线数据
@@ -244,20 +248,14 @@ class TushareProvider:
             if data is not None and not data.empty:
                 # 数据预处理
                 logger.info(f"🔍 [Tushare详细日志] 开始数据预处理...")
-                data = data.sort_values('trade_date')
-                data['trade_date'] = pd.to_datetime(data['trade_date'])
-
-                # 计算前复权价格（基于pct_chg重新计算连续价格）
-                logger.info(f"🔍 [Tushare详细日志] 开始计算前复权价格...")
-                data = self._calculate_forward_adjusted_prices(data)
-                logger.info(f"🔍 [Tushare详细日志] 前复权价格计算完成")
+                data = self.prepare_daily_data(data, adjust_mode=adjust_mode)
 
                 logger.info(f"🔍 [Tushare详细日志] 数据预处理完成")
 
                 logger.info(f"✅ 获取{ts_code}数据成功: {len(data)}条")
 
-                # 缓存数据
-                if self.enable_cache and self.cache_manager:
+                # 缓存数据（只缓存复权数据，未复权数据由调用方拼接后再复权）
+                if self.enable_cache and self.cache_manager and adjust_mode is not None:
                     try:
                         logger.info(f"🔍 [Tushare详细日志] 开始缓存数据...")
                         cache_key = self.cache_manager.save_stock_data(
@@ -286,78 +284,108 @@ class TushareProvider:
             logger.error(f"❌ [Tushare详细日志] 异常堆栈: {traceback.format_exc()}")
             return pd.DataFrame()
 
-    def _calculate_forward_adjusted_prices(self, data: pd.DataFrame) -> pd.DataFrame:
+    def prepare_daily_data(self, data: pd.DataFrame, adjust_mode: str = 'forward') -> pd.DataFrame:
         """
-        基于pct_chg计算前复权价格
-
-        Tushare的daily接口返回除权价格，在除权日会出现价格跳跃。
-        使用pct_chg（涨跌幅）重新计算连续的前复权价格，确保价格序列的连续性。
+        日线原始数据预处理：按日期排序、转换日期类型并计算复权价格
 
         Args:
-            data: 包含除权价格和pct_chg的DataFrame
+            data: daily 接口返回的原始日线数据
+            adjust_mode: 复权方式，'forward'（前复权）、'backward'（后复权）或 None（不复权）
 
         Returns:
-            DataFrame: 包含前复权价格的数据
+            DataFrame: 预处理后的日线数据
         """
-        if data.empty or 'pct_chg' not in data.columns:
-            logger.warning("⚠️ 数据为空或缺少pct_chg列，无法计算前复权价格")
+        data = data.sort_values('trade_date').copy()
+        data['trade_date'] = pd.to_datetime(data['trade_date'].astype(str))
+        if adjust_mode is None:
             return data
 
-        try:
-            # 复制数据避免修改原始数据
-            adjusted_data = data.copy()
+        # 计算复权价格（基于pct_chg重新计算连续价格）
+        logger.debug(f"🔍 [Tushare] 开始计算复权价格({adjust_mode})...")
+        return self._calculate_adjusted_prices(data, mode=adjust_mode)
 
-            # 确保数据按日期排序
-            adjusted_data = adjusted_data.sort_values('trade_date').reset_index(drop=True)
+    def get_trade_dates(self, start_date: str, end_date: str) -> List[str]:
+        """
+        获取区间内的交易日（上交所交易日历）
 
-            # 保存原始价格列（用于对比）
-            adjusted_data['close_raw'] = adjusted_data['close'].copy()
-            adjusted_data['open_raw'] = adjusted_data['open'].copy()
-            adjusted_data['high_raw'] = adjusted_data['high'].copy()
-            adjusted_data['low_raw'] = adjusted_data['low'].copy()
+        Args:
+            start_date: 开始日期（YYYY-MM-DD 或 YYYYMMDD）
+            end_date: 结束日期（YYYY-MM-DD 或 YYYYMMDD）
 
-            # 从最新的收盘价开始，向前计算前复权价格
-            # 使用最后一天的收盘价作为基准
-            latest_close = float(adjusted_data.iloc[-1]['close'])
+        Returns:
+            List[str]: 升序的交易日列表（YYYYMMDD）
+        """
+        if not self.connected:
+            return []
+        calendar = self.api.trade_cal(exchange='SSE', start_date=start_date.replace('-', ''),
+                                      end_date=end_date.replace('-', ''), is_open='1')
+        if calendar is None or calendar.empty:
+            return []
+        return sorted(str(d) for d in calendar['cal_date'])
+
+    def get_daily_snapshot(self, trade_date: str) -> pd.DataFrame:
+        """
+        获取指定交易日全市场所有股票的日线数据（一次API调用）
 
-            # 计算前复权收盘价
-            adjusted_closes = [latest_close]
+        Args:
+            trade_date: 交易日（YYYY-MM-DD 或 YYYYMMDD）
 
-            # 从倒数第二天开始向前计算
-            for i in range(len(adjusted_data) - 2, -1, -1):
-                pct_change = float(adjusted_data.iloc[i + 1]['pct_chg']) / 100.0  # 转换为小数
+        Returns:
+            DataFrame: 未复权的原始日线数据，每只股票一行
+        """
+        if not self.connected:
+            logger.error("❌ Tushare未连接，无法获取全市场日线")
+            return pd.DataFrame()
+        trade_date = trade_date.replace('-', '')
+        data = self.api.daily(trade_date=trade_date)
+        if data is None:
+            return pd.DataFrame()
+        logger.info(f"📦 获取{trade_date}全市场日线: {len(data)}只股票")
+        return data
 
-                # 前一天的前复权收盘价 = 今天的前复权收盘价 / (1 + 今天的涨跌幅)
-                prev_close = adjusted_closes[0] / (1 + pct_change)
-                adjusted_closes.insert(0, prev_close)
+    def _calculate_forward_adjusted_prices(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        基于pct_chg计算前复权价格
+
+        Tushare的daily接口返回除权价格，在除权日会出现价格跳跃。
+        使用pct_chg（涨跌幅）重新计算连续的前复权价格，确保价格序列的连续性。
+
+        Args:
+            data: 包含除权价格和pct_chg的DataFrame
+
+        Returns:
+            DataFrame: 包含前复权价格的数据
+        """
+        return self._calculate_adjusted_prices(data, mode='forward')
 
-            # 更新收盘价
-            adjusted_data['close'] = adjusted_closes
+    def _calculate_adjusted_prices(self, data: pd.DataFrame, mode: str = 'forward') -> pd.DataFrame:
+        """
+        基于pct_chg计算复权价格（向量化计算，累计因子按股票缓存）
 
-            # 计算其他价格的调整比例
-            for i in range(len(adjusted_data)):
-                if adjusted_data.iloc[i]['close_raw'] != 0:  # 避免除零
-                    # 计算调整比例
-                    adjustment_ratio = adjusted_data.iloc[i]['close'] / adjusted_data.iloc[i]['close_raw']
+        Args:
+            data: 包含除权价格和pct_chg的DataFrame
+            mode: 'forward'（前复权）或 'backward'（后复权）
 
-                    # 应用调整比例到其他价格
-                    adjusted_data.iloc[i, adjusted_data.columns.get_loc('open')] = adjusted_data.iloc[i]['open_raw'] * adjustment_ratio
-                    adjusted_data.iloc[i, adjusted_data.columns.get_loc('high')] = adjusted_data.iloc[i]['high_raw'] * adjustment_ratio
-                    adjusted_data.iloc[i, adjusted_data.columns.get_loc('low')] = adjusted_data.iloc[i]['low_raw'] * adjustment_ratio
+        Returns:
+            DataFrame: 包含复权价格的数据，原始价格保存在 *_raw 列
+        """
+        if data.empty or 'pct_chg' not in data.columns:
+            logger.warning("⚠️ 数据为空或缺少pct_chg列，无法计算复权价格")
+            return data
 
-            # 添加标记表示这是前复权价格
-            adjusted_data['price_type'] = 'forward_adjusted'
+        try:
+            adjusted_data = get_adjustment_engine().adjust(data, mode=mode)
 
-            logger.info(f"✅ 前复权价格计算完成，数据条数: {len(adjusted_data)}")
-            logger.info(f"📊 价格调整范围: 最早调整比例 {adjusted_data.iloc[0]['close'] / adjusted_data.iloc[0]['close_raw']:.4f}")
+            logger.info(f"✅ 复权价格计算完成({mode})，数据条数: {len(adjusted_data)}")
+            logger.info(f"📊 价格调整范围: 最早调整比例 {adjusted_data['adj_factor'].iloc[0]:.4f}")
 
             return adjusted_data
 
         except Exception as e:
-            logger.error(f"❌ 前复权价格计算失败: {e}")
+            logger.error(f"❌ 复权价格计算失败: {e}")
             logger.error(f"❌ 返回原始数据")
             return data
-    
+
     def get_stock_info(self, symbol: str) -> Dict:
         """
         获取股票基本信息
@@ -513,17 +541,34 @@ class TushareProvider:
             logger.info(f"🔍 [股票代码追踪] 默认深圳证券交易所: '{symbol}' -> '{result}'")
             return result
     
-    def search_stocks(self, keyword: str) -> pd.DataFrame:
+    def search_stocks(self, keyword: str, limit: Optional[int] = None) -> pd.DataFrame:
         """
         搜索股票
         
         Args:
             keyword: 搜索关键词
+            limit: 最多返回条数，None表示返回全部匹配
             
         Returns:
-            DataFrame: 搜索结果
+            DataFrame: 搜索结果，字段与 get_stock_list 相同
         """
         try:
+            # 优先使用本地股票代码索引，避免每次扫描全部股票列表
+            from .symbol_index import search_symbols, MARKET_CHINA
+            entries = search_symbols(keyword, limit=limit, market=MARKET_CHINA)
+            if entries:
+                results = pd.DataFrame([{'ts_code': e.ts_code, 'symbol': e.code, 'name': e.name}
+                                        for e in entries])
+                # 索引只有代码和名称，按ts_code补全行业、地区等字段，保持索引的匹配顺序
+                stock_list = self.get_stock_list()
+                if isinstance(stock_list, pd.DataFrame) and not stock_list.empty:
+                    details = stock_list.drop(columns=['symbol', 'name'], errors='ignore').drop_duplicates('ts_code')
+                    results = results.merge(details, on='ts_code', how='left')
+                    detail_columns = [c for c in details.columns if c != 'ts_code']
+                    results[detail_columns] = results[detail_columns].fillna('')
+                logger.debug(f"🔍 搜索'{keyword}'找到{len(results)}只股票（代码索引）")
+                return results
+
             stock_list = self.get_stock_list()
             
             if stock_list.empty:
@@ -537,6 +582,8 @@ class TushareProvider:
             )
             
             results = stock_list[mask]
+            if limit is not None:
+                results = results.head(limit)
             logger.debug(f"🔍 搜索'{keyword}'找到{len(results)}只股票")
             
             return results
@@ -16,6 +16,15 @@ from tradingagents.utils.logging_init import get_logger
 logger = get_logger("default")
 
 
+# 各分析师写入的报告字段（并行模式下每个分支只回写自己的字段）
+ANALYST_REPORT_FIELDS = {
+    "market": "market_report",
+    "social": "sentiment_report",
+    "news": "news_report",
+    "fundamentals": "fundamentals_report",
+}
+
+
 class GraphSetup:
     """Handles the setup and configuration of the agent graph."""
 
@@ -159,13 +168,9 @@ class GraphSetup:
         # Create workflow
         workflow = StateGraph(AgentState)
 
-        # Add analyst nodes to the graph
-        for analyst_type, node in analyst_nodes.items():
-            workflow.add_node(f"{analyst_type.capitalize()} Analyst", node)
-            workflow.add_node(
-                f"Msg Clear {analyst_type.capitalize()}", delete_nodes[analyst_type]
-            )
-            workflow.add_node(f"tools_{analyst_type}", tool_nodes[analyst_type])
+        parallel_analysts = (
+            self.config.get("parallel_analysts", False) and len(selected_analysts) > 1
+        )
 
         # Add other nodes
         workflow.add_node("Bull Researcher", bull_researcher_node)
@@ -177,31 +182,46 @@ class GraphSetup:
         workflow.add_node("Safe Analyst", safe_analyst)
         workflow.add_node("Risk Judge", risk_manager_node)
 
-        # Define edges
-        # Start with the first analyst
-        first_analyst = selected_analysts[0]
-        workflow.add_edge(START, f"{first_analyst.capitalize()} Analyst")
-
-        # Connect analysts in sequence
-        for i, analyst_type in enumerate(selected_analysts):
-            current_analyst = f"{analyst_type.capitalize()} Analyst"
-            current_tools = f"tools_{analyst_type}"
-            current_clear = f"Msg Clear {analyst_type.capitalize()}"
-
-            # Add conditional edges for current analyst
-            workflow.add_conditional_edges(
-                current_analyst,
-                getattr(self.conditional_logic, f"should_continue_{analyst_type}"),
-                [current_tools, current_clear],
+        if parallel_analysts:
+            # 各分析师作为独立分支并行运行，全部完成后再进入多空研究员辩论
+            logger.info(f"⚡ 分析师并行模式: {selected_analysts}")
+            self._add_parallel_analysts(
+                workflow, selected_analysts, analyst_nodes, tool_nodes
             )
-            workflow.add_edge(current_tools, current_analyst)
-
-            # Connect to next analyst or to Bull Researcher if this is the last analyst
-            if i < len(selected_analysts) - 1:
-                next_analyst = f"{selected_analysts[i+1].capitalize()} Analyst"
-                workflow.add_edge(current_clear, next_analyst)
-            else:
-                workflow.add_edge(current_clear, "Bull Researcher")
+        else:
+            # Add analyst nodes to the graph
+            for analyst_type, node in analyst_nodes.items():
+                workflow.add_node(f"{analyst_type.capitalize()} Analyst", node)
+                workflow.add_node(
+                    f"Msg Clear {analyst_type.capitalize()}", delete_nodes[analyst_type]
+                )
+                workflow.add_node(f"tools_{analyst_type}", tool_nodes[analyst_type])
+
+            # Define edges
+            # Start with the first analyst
+            first_analyst = selected_analysts[0]
+            workflow.add_edge(START, f"{first_analyst.capitalize()} Analyst")
+
+            # Connect analysts in sequence
+            for i, analyst_type in enumerate(selected_analysts):
+                current_analyst = f"{analyst_type.capitalize()} Analyst"
+                current_tools = f"tools_{analyst_type}"
+                current_clear = f"Msg Clear {analyst_type.capitalize()}"
+
+                # Add conditional edges for current analyst
+                workflow.add_conditional_edges(
+                    current_analyst,
+                    getattr(self.conditional_logic, f"should_continue_{analyst_type}"),
+                    [current_tools, current_clear],
+                )
+                workflow.add_edge(current_tools, current_analyst)
+
+                # Connect to next analyst or to Bull Researcher if this is the last analyst
+                if i < len(selected_analysts) - 1:
+                    next_analyst = f"{selected_analysts[i+1].capitalize()} Analyst"
+                    workflow.add_edge(current_clear, next_analyst)
+                else:
+                    workflow.add_edge(current_clear, "Bull Researcher")
 
         # Add remaining edges
         workflow.add_conditional_edges(
@@ -251,3 +271,55 @@ class GraphSetup:
 
         # Compile and return
         return workflow.compile()
+
+    def _create_analyst_branch(self, analyst_type, analyst_node, tool_node):
+        """Compile one analyst and its tool loop into an isolated branch.
+
+        The branch runs on its own message scratchpad seeded with the company
+        name (the same starting point the sequential chain gives each analyst
+        after a Msg Clear), and only writes back its own report field so that
+        branches running in parallel never update the same state key.
+        """
+        analyst_name = f"{analyst_type.capitalize()} Analyst"
+        tools_name = f"tools_{analyst_type}"
+        clear_name = f"Msg Clear {analyst_type.capitalize()}"
+        report_field = ANALYST_REPORT_FIELDS[analyst_type]
+
+        branch = StateGraph(AgentState)
+        branch.add_node(analyst_name, analyst_node)
+        branch.add_node(tools_name, tool_node)
+        branch.add_edge(START, analyst_name)
+        branch.add_conditional_edges(
+            analyst_name,
+            getattr(self.conditional_logic, f"should_continue_{analyst_type}"),
+            {tools_name: tools_name, clear_name: END},
+        )
+        branch.add_edge(tools_name, analyst_name)
+        compiled_branch = branch.compile()
+
+        def run_branch(state, config):
+            branch_state = dict(state)
+            branch_state["messages"] = [("human", state["company_of_interest"])]
+            result = compiled_branch.invoke(branch_state, config)
+            return {report_field: result.get(report_field, "")}
+
+        return run_branch
+
+    def _add_parallel_analysts(self, workflow, selected_analysts, analyst_nodes, tool_nodes):
+        """Fan out the selected analysts from START and join them before the researchers."""
+        branch_names = []
+        for analyst_type in selected_analysts:
+            branch_name = f"{analyst_type.capitalize()} Analyst"
+            workflow.add_node(
+                branch_name,
+                self._create_analyst_branch(
+                    analyst_type, analyst_nodes[analyst_type], tool_nodes[analyst_type]
+                ),
+            )
+            workflow.add_edge(START, branch_name)
+            branch_names.append(branch_name)
+
+        # 所有分支完成后清理消息，保持与串行模式相同的最终状态
+        workflow.add_node("Msg Clear Analysts", create_msg_delete())
+        workflow.add_edge(branch_names, "Msg Clear Analysts")
+        workflow.add_edge("Msg Clear Analysts", "Bull Researcher")
@@ -0,0 +1,67 @@
+# TradingAgents/graph/streaming.py
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Tuple
+
+from langchain_core.messages import AIMessageChunk
+
+# 导入统一日志系统
+from tradingagents.utils.logging_init import get_logger
+logger = get_logger("default")
+
+
+# 事件类型：节点完成后的完整状态 / LLM输出的增量文本
+STREAM_VALUES = "values"
+STREAM_TOKEN = "token"
+
+
+@dataclass
+class TokenDelta:
+    """One piece of LLM output and the graph node that produced it."""
+
+    node: str
+    text: str
+
+
+def _chunk_text(content: Any) -> str:
+    """Extract the text of a message chunk (string or list of content blocks)."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            block.get("text", "") if isinstance(block, dict) else str(block)
+            for block in content
+            if not isinstance(block, dict) or block.get("type") == "text"
+        )
+    return ""
+
+
+def iter_graph_events(graph, state: Dict[str, Any], args: Dict[str, Any]) -> Iterator[Tuple[str, Any]]:
+    """Run a compiled graph and yield ``(STREAM_VALUES, state)`` after each step
+    and ``(STREAM_TOKEN, TokenDelta)`` for every piece of LLM output.
+
+    Subscribing to LangGraph's ``messages`` stream makes the chat models stream
+    their output, so text reaches the caller at time-to-first-token instead of
+    when the whole reply is done. Tool call chunks and tool outputs are skipped;
+    they show up in the following ``values`` state as before. Output of nodes
+    inside subgraphs (parallel analyst branches) is reported under the inner
+    node name.
+    """
+    stream_args = dict(args)
+    stream_args["stream_mode"] = [STREAM_VALUES, "messages"]
+    # Include subgraphs so analysts running as parallel branches stream too
+    stream_args["subgraphs"] = True
+
+    for namespace, mode, payload in graph.stream(state, **stream_args):
+        if mode == STREAM_VALUES:
+            # Only the top-level graph state; branch states are internal
+            if not namespace:
+                yield STREAM_VALUES, payload
+            continue
+
+        message, metadata = payload
+        if not isinstance(message, AIMessageChunk):
+            continue
+        text = _chunk_text(message.content)
+        if text:
+            yield STREAM_TOKEN, TokenDelta(node=metadata.get("langgraph_node", ""), text=text)
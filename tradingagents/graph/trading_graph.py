@@ -1,10 +1,13 @@
 # TradingAgents/graph/trading_graph.py
 
 import os
+import time
+import threading
 from pathlib import Path
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date
-from typing import Dict, Any, Tuple, List, Optional
+from typing import Dict, Any, Tuple, List, Optional, Iterable, Iterator, Callable
 
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
@@ -29,12 +32,14 @@ from tradingagents.agents.utils.agent_states import (
     RiskDebateState,
 )
 from tradingagents.dataflows.interface import set_config
+from tradingagents.dataflows.prefetch import prefetch_stock_data
 
 from .conditional_logic import ConditionalLogic
 from .setup import GraphSetup
 from .propagation import Propagator
 from .reflection import Reflector
 from .signal_processing import SignalProcessor
+from .streaming import STREAM_TOKEN, TokenDelta, iter_graph_events
 
 
 class TradingAgentsGraph:
@@ -314,6 +319,8 @@ class TradingAgentsGraph:
         self.curr_state = None
         self.ticker = None
         self.log_states_dict = {}  # date to full state dict
+        self._log_states_by_ticker = {}  # ticker to {date: full state dict}
+        self._state_lock = threading.Lock()
 
         # Set up the graph
         self.graph = self.graph_setup.setup_graph(selected_analysts)
@@ -328,9 +335,11 @@ class TradingAgentsGraph:
                     # online tools
                     self.toolkit.get_YFin_data_online,
                     self.toolkit.get_stockstats_indicators_report_online,
+                    self.toolkit.get_stockstats_indicators_batch_report_online,
                     # offline tools
                     self.toolkit.get_YFin_data,
                     self.toolkit.get_stockstats_indicators_report,
+                    self.toolkit.get_stockstats_indicators_batch_report,
                 ]
             ),
             "social": ToolNode(
@@ -365,8 +374,14 @@ class TradingAgentsGraph:
             ),
         }
 
-    def propagate(self, company_name, trade_date):
-        """Run the trading agents graph for a company on a specific date."""
+    def propagate(self, company_name, trade_date, on_token: Optional[Callable[[TokenDelta], None]] = None):
+        """Run the trading agents graph for a company on a specific date.
+
+        When ``on_token`` is given the graph runs in streaming mode: the chat
+        models stream their replies and ``on_token`` receives every output
+        delta, tagged with the graph node that produced it, as soon as the
+        model emits it. The returned state and decision are the same.
+        """
 
         # 添加详细的接收日志
         logger.debug(f"🔍 [GRAPH DEBUG] ===== TradingAgentsGraph.propagate 接收参数 =====")
@@ -376,6 +391,81 @@ class TradingAgentsGraph:
         self.ticker = company_name
         logger.debug(f"🔍 [GRAPH DEBUG] 设置self.ticker: '{self.ticker}'")
 
+        final_state = self._run_graph(company_name, trade_date, on_token)
+
+        # Store current state for reflection
+        self.curr_state = final_state
+
+        # Log state
+        self._log_state(trade_date, final_state, company_name)
+
+        # Return decision and processed signal
+        return final_state, self.process_signal(final_state["final_trade_decision"], company_name)
+
+    def propagate_batch(
+        self,
+        requests: Iterable[Tuple[str, str]],
+        max_workers: Optional[int] = None,
+        prefetch: bool = True,
+    ) -> Iterator[Dict[str, Any]]:
+        """Run the graph for many (ticker, trade_date) pairs, reusing this graph and its clients.
+
+        Data for all tickers is prefetched concurrently first, then tickers are
+        analyzed with at most ``max_workers`` graph runs in flight. Results are
+        yielded as each ticker finishes; a failing ticker yields a result with
+        ``error`` set and does not affect the others.
+
+        Each result is a dict with ``ticker``, ``trade_date``, ``final_state``,
+        ``decision``, ``error`` and ``elapsed`` (seconds).
+        """
+        pairs = [(str(ticker), str(trade_date)) for ticker, trade_date in requests]
+        if not pairs:
+            return
+        if max_workers is None:
+            max_workers = self.config.get("batch_max_workers", 4)
+        max_workers = max(1, min(int(max_workers), len(pairs)))
+
+        logger.info(f"📊 [批量分析] 开始分析 {len(pairs)} 个任务，并发数: {max_workers}")
+        if prefetch:
+            try:
+                prefetch_stock_data(pairs, max_workers=max_workers * 2)
+            except Exception as e:
+                # 预取只是加速手段，失败时由分析师工具各自获取数据
+                logger.warning(f"⚠️ [批量分析] 数据预取失败，继续分析: {e}")
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="propagate") as executor:
+            futures = [executor.submit(self._propagate_one, ticker, trade_date)
+                       for ticker, trade_date in pairs]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def _propagate_one(self, company_name: str, trade_date: str) -> Dict[str, Any]:
+        """Run one ticker of a batch, capturing any failure in the result."""
+        start = time.time()
+        result = {
+            "ticker": company_name,
+            "trade_date": trade_date,
+            "final_state": None,
+            "decision": None,
+            "error": None,
+            "elapsed": 0.0,
+        }
+        try:
+            final_state = self._run_graph(company_name, trade_date)
+            with self._state_lock:
+                self.curr_state = final_state
+            self._log_state(trade_date, final_state, company_name)
+            result["final_state"] = final_state
+            result["decision"] = self.process_signal(final_state["final_trade_decision"], company_name)
+            logger.info(f"✅ [批量分析] {company_name} ({trade_date}) 分析完成")
+        except Exception as e:
+            logger.error(f"❌ [批量分析] {company_name} ({trade_date}) 分析失败: {e}")
+            result["error"] = str(e)
+        result["elapsed"] = time.time() - start
+        return result
+
+    def _run_graph(self, company_name, trade_date, on_token: Optional[Callable[[TokenDelta], None]] = None):
+        """Invoke the compiled graph for one ticker without touching shared run state."""
         # Initialize state
         logger.debug(f"🔍 [GRAPH DEBUG] 创建初始状态，传递参数: company_name='{company_name}', trade_date='{trade_date}'")
         init_agent_state = self.propagator.create_initial_state(
@@ -385,7 +475,19 @@ class TradingAgentsGraph:
         logger.debug(f"🔍 [GRAPH DEBUG] 初始状态中的trade_date: '{init_agent_state.get('trade_date', 'NOT_FOUND')}'")
         args = self.propagator.get_graph_args()
 
-        if self.debug:
+        if on_token is not None:
+            # Streaming mode: forward LLM output deltas while the graph runs
+            final_state = None
+            for kind, payload in iter_graph_events(self.graph, init_agent_state, args):
+                if kind == STREAM_TOKEN:
+                    try:
+                        on_token(payload)
+                    except Exception as e:
+                        # 显示回调失败不应该中断分析
+                        logger.debug(f"⚠️ [流式输出] 回调失败: {e}")
+                else:
+                    final_state = payload
+        elif self.debug:
             # Debug mode with tracing
             trace = []
             for chunk in self.graph.stream(init_agent_state, **args):
@@ -400,18 +502,12 @@ class TradingAgentsGraph:
             # Standard mode without tracing
             final_state = self.graph.invoke(init_agent_state, **args)
 
-        # Store current state for reflection
-        self.curr_state = final_state
-
-        # Log state
-        self._log_state(trade_date, final_state)
-
-        # Return decision and processed signal
-        return final_state, self.process_signal(final_state["final_trade_decision"], company_name)
+        return final_state
 
-    def _log_state(self, trade_date, final_state):
+    def _log_state(self, trade_date, final_state, ticker=None):
         """Log the final state to a JSON file."""
-        self.log_states_dict[str(trade_date)] = {
+        ticker = ticker or self.ticker
+        entry = {
             "company_of_interest": final_state["company_of_interest"],
             "trade_date": final_state["trade_date"],
             "market_report": final_state["market_report"],
@@ -441,15 +537,21 @@ class TradingAgentsGraph:
             "final_trade_decision": final_state["final_trade_decision"],
         }
 
-        # Save to file
-        directory = Path(f"eval_results/{self.ticker}/TradingAgentsStrategy_logs/")
-        directory.mkdir(parents=True, exist_ok=True)
-
-        with open(
-            f"eval_results/{self.ticker}/TradingAgentsStrategy_logs/full_states_log.json",
-            "w",
-        ) as f:
-            json.dump(self.log_states_dict, f, indent=4)
+        with self._state_lock:
+            states = self._log_states_by_ticker.setdefault(ticker, {})
+            states[str(trade_date)] = entry
+            if ticker == self.ticker:
+                self.log_states_dict = states
+
+            # Save to file
+            directory = Path(f"eval_results/{ticker}/TradingAgentsStrategy_logs/")
+            directory.mkdir(parents=True, exist_ok=True)
+
+            with open(
+                f"eval_results/{ticker}/TradingAgentsStrategy_logs/full_states_log.json",
+                "w",
+            ) as f:
+                json.dump(states, f, indent=4)
 
     def reflect_and_remember(self, returns_losses):
         """Reflect on decisions and update memory based on returns."""
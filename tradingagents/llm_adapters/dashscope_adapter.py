@@ -5,17 +5,25 @@
 
 import os
 import json
+import asyncio
 from typing import Any, Dict, List, Optional, Union, Iterator, AsyncIterator, Sequence
 from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_core.messages import BaseMessage, AIMessage, HumanMessage, SystemMessage
-from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.messages import BaseMessage, AIMessage, AIMessageChunk, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
 from langchain_core.callbacks.manager import CallbackManagerForLLMRun, AsyncCallbackManagerForLLMRun
 from langchain_core.tools import BaseTool
 from langchain_core.utils.function_calling import convert_to_openai_tool
 from pydantic import Field, SecretStr
 import dashscope
 from dashscope import Generation
+try:
+    # 较早版本的 SDK 没有异步接口
+    from dashscope import AioGeneration
+    AIO_GENERATION_AVAILABLE = True
+except ImportError:
+    AIO_GENERATION_AVAILABLE = False
 from ..config.config_manager import token_tracker
+from .response_cache import acached_generate, cached_generate, cached_stream
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
@@ -100,7 +108,67 @@ class ChatDashScope(BaseChatModel):
         run_manager: Optional[CallbackManagerForLLMRun] = None,
         **kwargs: Any,
     ) -> ChatResult:
-        """生成聊天回复"""
+        """生成聊天回复（经过LLM响应缓存）"""
+        return cached_generate(self, "dashscope", messages, stop, kwargs,
+                               lambda: self._call_dashscope(messages, stop, run_manager, **kwargs))
+
+    def _call_dashscope(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """调用 DashScope API 生成聊天回复"""
+        request_params = self._build_request_params(messages, stop, kwargs)
+        try:
+            # 调用 DashScope API
+            response = Generation.call(**request_params)
+            return self._parse_response(response, messages, kwargs)
+        except Exception as e:
+            raise Exception(f"Error calling DashScope API: {str(e)}")
+    
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """异步生成聊天回复（经过LLM响应缓存）"""
+        return await acached_generate(self, "dashscope", messages, stop, kwargs,
+                                      lambda: self._acall_dashscope(messages, stop, run_manager, **kwargs))
+    
+    async def _acall_dashscope(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """
+        异步调用 DashScope API 生成聊天回复
+        
+        AioGeneration 复用 SDK 进程内共享的 aiohttp 连接池，等待响应期间不阻塞事件循环，
+        多个智能体和多个分析任务可以共用一个事件循环并发请求。
+        """
+        request_params = self._build_request_params(messages, stop, kwargs)
+        try:
+            if AIO_GENERATION_AVAILABLE:
+                response = await AioGeneration.call(**request_params)
+            else:
+                response = await asyncio.to_thread(Generation.call, **request_params)
+            return self._parse_response(response, messages, kwargs)
+        except Exception as e:
+            raise Exception(f"Error calling DashScope API: {str(e)}")
+    
+    def _build_request_params(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]],
+        kwargs: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """准备 DashScope 请求参数"""
         
         # 转换消息格式
         dashscope_messages = self._convert_messages_to_dashscope_format(messages)
@@ -121,79 +189,108 @@ class ChatDashScope(BaseChatModel):
         
         # 合并额外参数
         request_params.update(kwargs)
+        return request_params
+    
+    def _parse_response(self, response: Any, messages: List[BaseMessage], kwargs: Dict[str, Any]) -> ChatResult:
+        """解析 DashScope 响应并记录token使用量"""
+        if response.status_code != 200:
+            raise Exception(f"DashScope API error: {response.code} - {response.message}")
         
-        try:
-            # 调用 DashScope API
-            response = Generation.call(**request_params)
-            
-            if response.status_code == 200:
-                # 解析响应
-                output = response.output
-                message_content = output.choices[0].message.content
-                
-                # 提取token使用量信息
-                input_tokens = 0
-                output_tokens = 0
-                
-                # DashScope API响应中包含usage信息
-                if hasattr(response, 'usage') and response.usage:
-                    usage = response.usage
-                    # 根据API文档，usage可能包含input_tokens和output_tokens
-                    if hasattr(usage, 'input_tokens'):
-                        input_tokens = usage.input_tokens
-                    if hasattr(usage, 'output_tokens'):
-                        output_tokens = usage.output_tokens
-                    # 有些情况下可能是total_tokens
-                    elif hasattr(usage, 'total_tokens'):
-                        # 估算输入和输出token（如果没有分别提供）
-                        total_tokens = usage.total_tokens
-                        # 简单估算：假设输入占30%，输出占70%
-                        input_tokens = int(total_tokens * 0.3)
-                        output_tokens = int(total_tokens * 0.7)
-                
-                # 记录token使用量
-                if input_tokens > 0 or output_tokens > 0:
-                    try:
-                        # 生成会话ID（如果没有提供）
-                        session_id = kwargs.get('session_id', f"dashscope_{hash(str(messages))%10000}")
-                        analysis_type = kwargs.get('analysis_type', 'stock_analysis')
-                        
-                        # 使用TokenTracker记录使用量
-                        token_tracker.track_usage(
-                            provider="dashscope",
-                            model_name=self.model,
-                            input_tokens=input_tokens,
-                            output_tokens=output_tokens,
-                            session_id=session_id,
-                            analysis_type=analysis_type
-                        )
-                    except Exception as track_error:
-                        # 记录失败不应该影响主要功能
-                        logger.info(f"Token tracking failed: {track_error}")
-                
-                # 创建 AI 消息
-                ai_message = AIMessage(content=message_content)
-                
-                # 创建生成结果
-                generation = ChatGeneration(message=ai_message)
-                
-                return ChatResult(generations=[generation])
-            else:
-                raise Exception(f"DashScope API error: {response.code} - {response.message}")
-                
-        except Exception as e:
-            raise Exception(f"Error calling DashScope API: {str(e)}")
+        # 解析响应
+        output = response.output
+        message_content = output.choices[0].message.content
+        
+        # 记录token使用量
+        self._track_usage(getattr(response, 'usage', None), messages, kwargs)
+        
+        # 创建 AI 消息
+        ai_message = AIMessage(content=message_content)
+        
+        # 创建生成结果
+        generation = ChatGeneration(message=ai_message)
+        
+        return ChatResult(generations=[generation])
     
-    async def _agenerate(
+    def _stream(
         self,
         messages: List[BaseMessage],
         stop: Optional[List[str]] = None,
-        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
         **kwargs: Any,
-    ) -> ChatResult:
-        """异步生成聊天回复"""
-        # 目前使用同步方法，后续可以实现真正的异步
-        return self._generate(messages, stop, run_manager, **kwargs)
+    ) -> Iterator[ChatGenerationChunk]:
+        """流式生成聊天回复（经过LLM响应缓存）"""
+        yield from cached_stream(self, "dashscope", messages, stop, kwargs,
+                                 lambda: self._stream_dashscope(messages, stop, **kwargs))
+    
+    def _stream_dashscope(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        """
+        调用 DashScope 流式接口，逐段输出增量文本
+        
+        每个响应块都带有截至当前的累计用量，流结束后按最后一块记录一次token使用量。
+        """
+        request_params = self._build_request_params(messages, stop, kwargs)
+        request_params.update(stream=True, incremental_output=True)
+        
+        usage = None
+        try:
+            for response in Generation.call(**request_params):
+                if response.status_code != 200:
+                    raise Exception(f"DashScope API error: {response.code} - {response.message}")
+                usage = getattr(response, 'usage', None) or usage
+                text = response.output.choices[0].message.content
+                if text:
+                    yield ChatGenerationChunk(message=AIMessageChunk(content=text))
+        except Exception as e:
+            raise Exception(f"Error calling DashScope API: {str(e)}")
+        
+        self._track_usage(usage, messages, kwargs)
+    
+    def _track_usage(self, usage: Any, messages: List[BaseMessage], kwargs: Dict[str, Any]):
+        """从 DashScope 的 usage 信息中提取并记录token使用量"""
+        
+        # 提取token使用量信息
+        input_tokens = 0
+        output_tokens = 0
+        
+        # DashScope API响应中包含usage信息
+        if usage:
+            # 根据API文档，usage可能包含input_tokens和output_tokens
+            if hasattr(usage, 'input_tokens'):
+                input_tokens = usage.input_tokens
+            if hasattr(usage, 'output_tokens'):
+                output_tokens = usage.output_tokens
+            # 有些情况下可能是total_tokens
+            elif hasattr(usage, 'total_tokens'):
+                # 估算输入和输出token（如果没有分别提供）
+                total_tokens = usage.total_tokens
+                # 简单估算：假设输入占30%，输出占70%
+                input_tokens = int(total_tokens * 0.3)
+                output_tokens = int(total_tokens * 0.7)
+        
+        # 记录token使用量
+        if input_tokens > 0 or output_tokens > 0:
+            try:
+                # 生成会话ID（如果没有提供）
+                session_id = kwargs.get('session_id', f"dashscope_{hash(str(messages))%10000}")
+                analysis_type = kwargs.get('analysis_type', 'stock_analysis')
+                
+                # 使用TokenTracker记录使用量
+                token_tracker.track_usage(
+                    provider="dashscope",
+                    model_name=self.model,
+                    input_tokens=input_tokens,
+                    output_tokens=output_tokens,
+                    session_id=session_id,
+                    analysis_type=analysis_type
+                )
+            except Exception as track_error:
+                # 记录失败不应该影响主要功能
+                logger.info(f"Token tracking failed: {track_error}")
     
     def bind_tools(
         self,
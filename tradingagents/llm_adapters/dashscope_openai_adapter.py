@@ -10,6 +10,8 @@ from langchain_openai import ChatOpenAI
 from langchain_core.tools import BaseTool
 from pydantic import Field, SecretStr
 from ..config.config_manager import token_tracker
+from .response_cache import acached_generate, cached_generate, cached_stream
+from .streaming import stream_with_result
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
@@ -60,13 +62,44 @@ class ChatDashScopeOpenAI(ChatOpenAI):
         api_base = getattr(self, 'base_url', None) or getattr(self, 'openai_api_base', None) or kwargs.get('base_url', 'unknown')
         logger.info(f"   API Base: {api_base}")
     
-    def _generate(self, *args, **kwargs):
-        """重写生成方法，添加 token 使用量追踪"""
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        """重写生成方法，经过LLM响应缓存（命中时不调用API、不重复计费）"""
+        return cached_generate(self, "dashscope", messages, stop, kwargs,
+                               lambda: self._generate_and_track(messages, stop, run_manager, **kwargs))
+
+    def _generate_and_track(self, messages, stop=None, run_manager=None, **kwargs):
+        """调用父类的生成方法，添加 token 使用量追踪"""
         
         # 调用父类的生成方法
-        result = super()._generate(*args, **kwargs)
-        
-        # 追踪 token 使用量
+        result = super()._generate(messages, stop, run_manager, **kwargs)
+        self._track_token_usage(result, messages, kwargs)
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        """异步生成方法，使用父类的异步客户端（共享的 httpx 连接池），不阻塞事件循环"""
+        return await acached_generate(self, "dashscope", messages, stop, kwargs,
+                                      lambda: self._agenerate_and_track(messages, stop, run_manager, **kwargs))
+
+    async def _agenerate_and_track(self, messages, stop=None, run_manager=None, **kwargs):
+        """调用父类的异步生成方法，添加 token 使用量追踪"""
+        result = await super()._agenerate(messages, stop, run_manager, **kwargs)
+        self._track_token_usage(result, messages, kwargs)
+        return result
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        """流式生成方法，经过LLM响应缓存，流结束后按最后一块的用量追踪 token"""
+        yield from cached_stream(self, "dashscope", messages, stop, kwargs,
+                                 lambda: self._stream_and_track(messages, stop, run_manager, **kwargs))
+
+    def _stream_and_track(self, messages, stop=None, run_manager=None, **kwargs):
+        """调用父类的流式方法，流结束后添加 token 使用量追踪"""
+        # 请求在最后一块中返回用量，保证计费准确
+        stream_kwargs = {'stream_usage': True, **kwargs}
+        chunks = super()._stream(messages, stop, run_manager, **stream_kwargs)
+        return stream_with_result(chunks, lambda result: self._track_token_usage(result, messages, kwargs))
+
+    def _track_token_usage(self, result, messages, kwargs):
+        """追踪 token 使用量"""
         try:
             # 从结果中提取 token 使用信息
             if hasattr(result, 'llm_output') and result.llm_output:
@@ -77,7 +110,7 @@ class ChatDashScopeOpenAI(ChatOpenAI):
                 
                 if input_tokens > 0 or output_tokens > 0:
                     # 生成会话ID
-                    session_id = kwargs.get('session_id', f"dashscope_openai_{hash(str(args))%10000}")
+                    session_id = kwargs.get('session_id', f"dashscope_openai_{hash(str(messages))%10000}")
                     analysis_type = kwargs.get('analysis_type', 'stock_analysis')
                     
                     # 使用 TokenTracker 记录使用量
@@ -93,8 +126,6 @@ class ChatDashScopeOpenAI(ChatOpenAI):
         except Exception as track_error:
             # token 追踪失败不应该影响主要功能
             logger.error(f"⚠️ Token 追踪失败: {track_error}")
-        
-        return result
 
 
 # 支持的模型列表
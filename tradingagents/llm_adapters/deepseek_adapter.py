@@ -3,12 +3,15 @@ DeepSeek LLM适配器，支持Token使用统计
 """
 
 import os
-import time
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, Iterator, List, Optional, Union
 from langchain_core.messages import BaseMessage, AIMessage, HumanMessage, SystemMessage
-from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
 from langchain_openai import ChatOpenAI
-from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+
+from .response_cache import acached_generate, cached_generate, cached_stream
+from .streaming import stream_with_result
+from .token_counter import count_message_tokens, get_token_counter
 
 # 导入统一日志系统
 from tradingagents.utils.logging_init import setup_llm_logging
@@ -82,11 +85,21 @@ class ChatDeepSeek(ChatOpenAI):
         **kwargs: Any,
     ) -> ChatResult:
         """
-        生成聊天响应，并记录token使用量
+        生成聊天响应（经过LLM响应缓存，命中时不重复记录token使用量）
         """
+        return cached_generate(self, "deepseek", messages, stop, kwargs,
+                               lambda: self._generate_and_track(messages, stop, run_manager, **kwargs))
 
-        # 记录开始时间
-        start_time = time.time()
+    def _generate_and_track(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """
+        调用API生成聊天响应，并记录token使用量
+        """
 
         # 提取并移除自定义参数，避免传递给父类
         session_id = kwargs.pop('session_id', None)
@@ -95,69 +108,148 @@ class ChatDeepSeek(ChatOpenAI):
         try:
             # 调用父类方法生成响应
             result = super()._generate(messages, stop, run_manager, **kwargs)
+            self._record_usage(messages, result, session_id, analysis_type)
+            return result
             
-            # 提取token使用量
-            input_tokens = 0
-            output_tokens = 0
-            
-            # 尝试从响应中提取token使用量
-            if hasattr(result, 'llm_output') and result.llm_output:
-                token_usage = result.llm_output.get('token_usage', {})
-                if token_usage:
-                    input_tokens = token_usage.get('prompt_tokens', 0)
-                    output_tokens = token_usage.get('completion_tokens', 0)
-            
-            # 如果没有获取到token使用量，进行估算
-            if input_tokens == 0 and output_tokens == 0:
-                input_tokens = self._estimate_input_tokens(messages)
-                output_tokens = self._estimate_output_tokens(result)
-                logger.debug(f"🔍 [DeepSeek] 使用估算token: 输入={input_tokens}, 输出={output_tokens}")
-            else:
-                logger.info(f"📊 [DeepSeek] 实际token使用: 输入={input_tokens}, 输出={output_tokens}")
-            
-            # 记录token使用量
-            if TOKEN_TRACKING_ENABLED and (input_tokens > 0 or output_tokens > 0):
-                try:
-                    # 使用提取的参数或生成默认值
-                    if session_id is None:
-                        session_id = f"deepseek_{hash(str(messages))%10000}"
-                    if analysis_type is None:
-                        analysis_type = 'stock_analysis'
+        except Exception as e:
+            logger.error(f"❌ [DeepSeek] 调用失败: {e}", exc_info=True)
+            raise
 
-                    # 记录使用量
-                    usage_record = token_tracker.track_usage(
-                        provider="deepseek",
-                        model_name=self.model_name,
-                        input_tokens=input_tokens,
-                        output_tokens=output_tokens,
-                        session_id=session_id,
-                        analysis_type=analysis_type
-                    )
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """
+        异步生成聊天响应（经过LLM响应缓存）
 
-                    if usage_record:
-                        if usage_record.cost == 0.0:
-                            logger.warning(f"⚠️ [DeepSeek] 成本计算为0，可能配置有问题")
-                        else:
-                            logger.info(f"💰 [DeepSeek] 本次调用成本: ¥{usage_record.cost:.6f}")
+        使用 ChatOpenAI 的异步客户端（共享的 httpx 连接池），等待响应期间不阻塞事件循环
+        """
+        return await acached_generate(self, "deepseek", messages, stop, kwargs,
+                                      lambda: self._agenerate_and_track(messages, stop, run_manager, **kwargs))
 
-                        # 使用统一日志管理器的Token记录方法
-                        logger_manager = get_logger_manager()
-                        logger_manager.log_token_usage(
-                            logger, "deepseek", self.model_name,
-                            input_tokens, output_tokens, usage_record.cost,
-                            session_id
-                        )
-                    else:
-                        logger.warning(f"⚠️ [DeepSeek] 未创建使用记录")
+    async def _agenerate_and_track(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """
+        异步调用API生成聊天响应，并记录token使用量
+        """
+        session_id = kwargs.pop('session_id', None)
+        analysis_type = kwargs.pop('analysis_type', None)
 
-                except Exception as track_error:
-                    logger.error(f"⚠️ [DeepSeek] Token统计失败: {track_error}", exc_info=True)
-            
+        try:
+            result = await super()._agenerate(messages, stop, run_manager, **kwargs)
+            self._record_usage(messages, result, session_id, analysis_type)
             return result
-            
+
         except Exception as e:
-            logger.error(f"❌ [DeepSeek] 调用失败: {e}", exc_info=True)
+            logger.error(f"❌ [DeepSeek] 异步调用失败: {e}", exc_info=True)
             raise
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        """
+        流式生成聊天响应（经过LLM响应缓存），流结束后按最后一块的用量记录token使用量
+        """
+        yield from cached_stream(self, "deepseek", messages, stop, kwargs,
+                                 lambda: self._stream_and_track(messages, stop, run_manager, **kwargs))
+
+    def _stream_and_track(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        """
+        调用流式API并在流结束后记录token使用量
+        """
+        session_id = kwargs.pop('session_id', None)
+        analysis_type = kwargs.pop('analysis_type', None)
+        # 请求在最后一块中返回用量，保证计费准确
+        kwargs.setdefault('stream_usage', True)
+
+        chunks = super()._stream(messages, stop, run_manager, **kwargs)
+        yield from stream_with_result(
+            chunks, lambda result: self._record_usage(messages, result, session_id, analysis_type))
+
+    def _record_usage(
+        self,
+        messages: List[BaseMessage],
+        result: ChatResult,
+        session_id: Optional[str],
+        analysis_type: Optional[str],
+    ):
+        """
+        提取并记录token使用量
+        """
+        # 提取token使用量
+        input_tokens = 0
+        output_tokens = 0
+        
+        # 尝试从响应中提取token使用量
+        if hasattr(result, 'llm_output') and result.llm_output:
+            token_usage = result.llm_output.get('token_usage', {})
+            if token_usage:
+                input_tokens = token_usage.get('prompt_tokens', 0)
+                output_tokens = token_usage.get('completion_tokens', 0)
+        
+        # 如果没有获取到token使用量，进行估算
+        if input_tokens == 0 and output_tokens == 0:
+            input_tokens = self._estimate_input_tokens(messages)
+            output_tokens = self._estimate_output_tokens(result)
+            logger.debug(f"🔍 [DeepSeek] 使用估算token: 输入={input_tokens}, 输出={output_tokens}")
+        else:
+            logger.info(f"📊 [DeepSeek] 实际token使用: 输入={input_tokens}, 输出={output_tokens}")
+        
+        # 记录token使用量
+        if TOKEN_TRACKING_ENABLED and (input_tokens > 0 or output_tokens > 0):
+            try:
+                # 使用提取的参数或生成默认值
+                if session_id is None:
+                    session_id = f"deepseek_{hash(str(messages))%10000}"
+                if analysis_type is None:
+                    analysis_type = 'stock_analysis'
+
+                # 记录使用量
+                usage_record = token_tracker.track_usage(
+                    provider="deepseek",
+                    model_name=self.model_name,
+                    input_tokens=input_tokens,
+                    output_tokens=output_tokens,
+                    session_id=session_id,
+                    analysis_type=analysis_type
+                )
+
+                if usage_record:
+                    if usage_record.cost == 0.0:
+                        logger.warning(f"⚠️ [DeepSeek] 成本计算为0，可能配置有问题")
+                    else:
+                        logger.info(f"💰 [DeepSeek] 本次调用成本: ¥{usage_record.cost:.6f}")
+
+                    # 使用统一日志管理器的Token记录方法
+                    logger_manager = get_logger_manager()
+                    logger_manager.log_token_usage(
+                        logger, "deepseek", self.model_name,
+                        input_tokens, output_tokens, usage_record.cost,
+                        session_id
+                    )
+                else:
+                    logger.warning(f"⚠️ [DeepSeek] 未创建使用记录")
+
+            except Exception as track_error:
+                logger.error(f"⚠️ [DeepSeek] Token统计失败: {track_error}", exc_info=True)
     
     def _estimate_input_tokens(self, messages: List[BaseMessage]) -> int:
         """
@@ -169,15 +261,7 @@ class ChatDeepSeek(ChatOpenAI):
         Returns:
             估算的输入token数量
         """
-        total_chars = 0
-        for message in messages:
-            if hasattr(message, 'content'):
-                total_chars += len(str(message.content))
-        
-        # 粗略估算：中文约1.5字符/token，英文约4字符/token
-        # 这里使用保守估算：2字符/token
-        estimated_tokens = max(1, total_chars // 2)
-        return estimated_tokens
+        return max(1, count_message_tokens(messages, "deepseek", self.model_name))
     
     def _estimate_output_tokens(self, result: ChatResult) -> int:
         """
@@ -189,14 +273,13 @@ class ChatDeepSeek(ChatOpenAI):
         Returns:
             估算的输出token数量
         """
-        total_chars = 0
+        counter = get_token_counter("deepseek", self.model_name)
+        total_tokens = 0
         for generation in result.generations:
             if hasattr(generation, 'message') and hasattr(generation.message, 'content'):
-                total_chars += len(str(generation.message.content))
+                total_tokens += counter.count(str(generation.message.content))
         
-        # 粗略估算：2字符/token
-        estimated_tokens = max(1, total_chars // 2)
-        return estimated_tokens
+        return max(1, total_tokens)
     
     def invoke(
         self,
@@ -5,13 +5,15 @@ Google AI OpenAI兼容适配器
 """
 
 import os
-from typing import Any, Dict, List, Optional, Union, Sequence
+from typing import Any, Dict, Iterator, List, Optional, Union, Sequence
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.tools import BaseTool
-from langchain_core.messages import BaseMessage, AIMessage, HumanMessage, SystemMessage
-from langchain_core.outputs import LLMResult
+from langchain_core.messages import BaseMessage, AIMessage, AIMessageChunk, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGenerationChunk, LLMResult
 from pydantic import Field, SecretStr
 from ..config.config_manager import token_tracker
+from .response_cache import LLMCacheMissError, cached_generate, cached_stream
+from .streaming import stream_with_result
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
@@ -53,9 +55,9 @@ class ChatGoogleOpenAI(ChatGoogleGenerativeAI):
     def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, **kwargs) -> LLMResult:
         """重写生成方法，优化工具调用处理和内容格式"""
         
-        try:
+        def call_api() -> LLMResult:
             # 调用父类的生成方法
-            result = super()._generate(messages, stop, **kwargs)
+            result = super(ChatGoogleOpenAI, self)._generate(messages, stop, **kwargs)
             
             # 优化返回内容格式
             if result and result.generations:
@@ -66,9 +68,14 @@ class ChatGoogleOpenAI(ChatGoogleGenerativeAI):
             
             # 追踪 token 使用量
             self._track_token_usage(result, kwargs)
-            
             return result
+        
+        try:
+            # 经过LLM响应缓存，调用失败的错误结果不会被记录
+            return cached_generate(self, "google", messages, stop, kwargs, call_api)
             
+        except LLMCacheMissError:
+            raise
         except Exception as e:
             logger.error(f"❌ Google AI 生成失败: {e}")
             # 返回一个包含错误信息的结果，而不是抛出异常
@@ -77,6 +84,42 @@ class ChatGoogleOpenAI(ChatGoogleGenerativeAI):
             error_generation = ChatGeneration(message=error_message)
             return LLMResult(generations=[[error_generation]])
     
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        """重写流式生成方法：经过LLM响应缓存，流结束后补充新闻内容格式并追踪 token 使用量"""
+        
+        def call_api() -> Iterator[ChatGenerationChunk]:
+            chunks = super(ChatGoogleOpenAI, self)._stream(messages, stop, run_manager, **kwargs)
+            return stream_with_result(self._optimize_stream_content(chunks),
+                                      lambda result: self._track_token_usage(result, kwargs))
+        
+        try:
+            yield from cached_stream(self, "google", messages, stop, kwargs, call_api)
+        except LLMCacheMissError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Google AI 流式生成失败: {e}")
+            # 与非流式调用一致，输出错误信息而不是抛出异常
+            yield ChatGenerationChunk(message=AIMessageChunk(content=f"Google AI 调用失败: {str(e)}"))
+    
+    def _optimize_stream_content(self, chunks: Iterator[ChatGenerationChunk]) -> Iterator[ChatGenerationChunk]:
+        """逐块转发流式输出，流结束后把新闻内容缺少的格式信息作为最后一块补充（已输出的内容不能再修改）"""
+        content = ""
+        for chunk in chunks:
+            if isinstance(chunk.message.content, str):
+                content += chunk.message.content
+            yield chunk
+        
+        if not content or not self._is_news_content(content):
+            return
+        enhanced = self._enhance_news_content(content)
+        start = enhanced.find(content)
+        prefix, suffix = enhanced[:start].strip(), enhanced[start + len(content):]
+        extra = (f"\n\n{prefix}" if prefix else "") + suffix
+        if extra:
+            logger.debug(f"🔧 [Google适配器] 流式输出补充新闻内容格式: {len(extra)} 字符")
+            yield ChatGenerationChunk(message=AIMessageChunk(content=extra))
+    
     def _optimize_message_content(self, message: BaseMessage):
         """优化消息内容格式，确保包含新闻特征关键词"""
         
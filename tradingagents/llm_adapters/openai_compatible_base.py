@@ -5,11 +5,15 @@ OpenAI兼容适配器基类
 
 import os
 import time
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, Iterator, List, Optional, Union
 from langchain_core.messages import BaseMessage
-from langchain_core.outputs import ChatResult
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
 from langchain_openai import ChatOpenAI
-from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+
+from .response_cache import acached_generate, cached_generate, cached_stream
+from .streaming import stream_with_result
+from .token_counter import MESSAGE_OVERHEAD_TOKENS, get_token_counter
 
 # 导入统一日志系统
 from tradingagents.utils.logging_init import setup_llm_logging
@@ -28,6 +32,9 @@ except ImportError:
     TOKEN_TRACKING_ENABLED = False
     logger.warning("⚠️ Token跟踪功能未启用")
 
+# 千帆输入超长时，剩余空间至少有这么多token才截断保留最早的消息，否则整条丢弃
+_MIN_TRUNCATED_MESSAGE_TOKENS = 200
+
 
 class OpenAICompatibleBase(ChatOpenAI):
     """
@@ -122,19 +129,62 @@ class OpenAICompatibleBase(ChatOpenAI):
         **kwargs: Any,
     ) -> ChatResult:
         """
-        生成聊天响应，并记录token使用量
+        生成聊天响应，并记录token使用量（命中LLM响应缓存时不调用API）
         """
         
-        # 记录开始时间
-        start_time = time.time()
+        def call_api() -> ChatResult:
+            # 记录开始时间
+            start_time = time.time()
+            
+            # 调用父类生成方法
+            result = super(OpenAICompatibleBase, self)._generate(messages, stop, run_manager, **kwargs)
+            
+            # 记录token使用
+            self._track_token_usage(result, kwargs, start_time)
+            return result
         
-        # 调用父类生成方法
-        result = super()._generate(messages, stop, run_manager, **kwargs)
+        return cached_generate(self, self.provider_name or "openai_compatible", messages, stop, kwargs, call_api)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """
+        异步生成聊天响应，并记录token使用量
+        使用 ChatOpenAI 的异步客户端（共享的 httpx 连接池），等待响应期间不阻塞事件循环
+        """
+        
+        async def call_api() -> ChatResult:
+            start_time = time.time()
+            result = await super(OpenAICompatibleBase, self)._agenerate(messages, stop, run_manager, **kwargs)
+            self._track_token_usage(result, kwargs, start_time)
+            return result
+        
+        return await acached_generate(self, self.provider_name or "openai_compatible", messages, stop, kwargs,
+                                      call_api)
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        """
+        流式生成聊天响应（经过LLM响应缓存），流结束后记录token使用量
+        """
         
-        # 记录token使用
-        self._track_token_usage(result, kwargs, start_time)
+        def call_api() -> Iterator[ChatGenerationChunk]:
+            start_time = time.time()
+            # 请求在最后一块中返回用量，保证计费准确
+            stream_kwargs = {'stream_usage': True, **kwargs}
+            chunks = super(OpenAICompatibleBase, self)._stream(messages, stop, run_manager, **stream_kwargs)
+            return stream_with_result(chunks, lambda result: self._track_token_usage(result, kwargs, start_time))
         
-        return result
+        yield from cached_stream(self, self.provider_name or "openai_compatible", messages, stop, kwargs, call_api)
 
     def _track_token_usage(self, result: ChatResult, kwargs: Dict, start_time: float):
         """记录token使用量并输出日志"""
@@ -240,36 +290,32 @@ class ChatQianfanOpenAI(OpenAICompatibleBase):
         )
     
     def _estimate_tokens(self, text: str) -> int:
-        """估算文本的token数量（千帆模型专用）"""
-        # 千帆模型的token估算：中文约1.5字符/token，英文约4字符/token
-        # 保守估算：2字符/token
-        return max(1, len(text) // 2)
+        """计算文本的token数量（千帆模型专用）"""
+        return get_token_counter("qianfan", self.model_name).count(text)
     
     def _truncate_messages(self, messages: List[BaseMessage], max_tokens: int = 4500) -> List[BaseMessage]:
         """截断消息以适应千帆模型的token限制"""
         # 为千帆模型预留一些token空间，使用4500而不是5120
+        counter = get_token_counter("qianfan", self.model_name)
         truncated_messages = []
         total_tokens = 0
         
         # 从最后一条消息开始，向前保留消息
         for message in reversed(messages):
             content = str(message.content) if hasattr(message, 'content') else str(message)
-            message_tokens = self._estimate_tokens(content)
+            message_tokens = counter.count(content) + MESSAGE_OVERHEAD_TOKENS
             
             if total_tokens + message_tokens <= max_tokens:
                 truncated_messages.insert(0, message)
                 total_tokens += message_tokens
             else:
-                # 如果是第一条消息且超长，进行内容截断
-                if not truncated_messages:
-                    remaining_tokens = max_tokens - 100  # 预留100个token
-                    max_chars = remaining_tokens * 2  # 2字符/token
-                    truncated_content = content[:max_chars] + "...(内容已截断)"
-                    
-                    # 创建截断后的消息
-                    if hasattr(message, 'content'):
-                        message.content = truncated_content
-                    truncated_messages.insert(0, message)
+                # 放不下的消息截断内容保留开头部分，剩余空间太小时才整条丢弃
+                remaining_tokens = max_tokens - total_tokens - MESSAGE_OVERHEAD_TOKENS
+                if remaining_tokens >= _MIN_TRUNCATED_MESSAGE_TOKENS or not truncated_messages:
+                    truncated_content = counter.truncate(content, max(remaining_tokens, 0),
+                                                         marker="...(内容已截断)")
+                    truncated_messages.insert(0, message.model_copy(update={'content': truncated_content}))
+                    logger.warning(f"⚠️ 千帆模型输入过长，已截断消息内容: {message_tokens} -> {remaining_tokens} tokens")
                 break
         
         if len(truncated_messages) < len(messages):
@@ -292,6 +338,26 @@ class ChatQianfanOpenAI(OpenAICompatibleBase):
         # 调用父类的_generate方法
         return super()._generate(truncated_messages, stop, run_manager, **kwargs)
 
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """异步生成聊天响应，包含千帆模型的token截断逻辑"""
+        return await super()._agenerate(self._truncate_messages(messages), stop, run_manager, **kwargs)
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        """流式生成聊天响应，包含千帆模型的token截断逻辑"""
+        yield from super()._stream(self._truncate_messages(messages), stop, run_manager, **kwargs)
+
 
 class ChatCustomOpenAI(OpenAICompatibleBase):
     """自定义OpenAI端点适配器（代理/聚合平台）"""
@@ -0,0 +1,468 @@
+"""
+LLM响应缓存
+按 (提供商, 模型, 消息, 工具, 采样参数, 停止词) 的规范化哈希缓存模型回复，
+模式由 TRADINGAGENTS_LLM_CACHE_MODE 控制：
+- off: 不缓存（默认）
+- record: 命中时直接返回已记录的回复，未命中时调用模型并记录
+- replay: 只返回已记录的回复，未命中抛出 LLMCacheMissError，不访问模型接口，
+  用于离线、全速地运行完整分析流程（测试和基准测试）
+后端支持SQLite（单文件，压缩存储）和文件目录（每条回复一个JSON文件，便于作为测试夹具提交），
+超过有效期的记录在 record 模式下视为未命中，超过条目上限时按最近访问时间淘汰。
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence
+
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from tradingagents.dataflows import cache_codec
+from .streaming import chunk_from_result, stream_with_result
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+MODE_OFF = 'off'
+MODE_RECORD = 'record'
+MODE_REPLAY = 'replay'
+
+# 缓存键格式版本，规范化规则变化时递增，使旧记录自然失效
+KEY_VERSION = 1
+
+# 参与缓存键的模型采样参数
+_SAMPLING_PARAMS = ('temperature', 'max_tokens', 'top_p')
+
+# 只用于统计或传输方式、不影响模型输出的调用参数
+_IGNORED_KWARGS = {'session_id', 'analysis_type', 'stream_usage'}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_responses (
+    cache_key TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    response BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_responses_last_access
+    ON llm_responses (last_access);
+"""
+
+
+class LLMCacheMissError(RuntimeError):
+    """replay 模式下请求没有对应的已记录回复"""
+
+
+def _json_default(value: Any) -> Any:
+    """工具定义等非JSON对象的规范化表示"""
+    if hasattr(value, 'model_dump'):
+        return value.model_dump()
+    if hasattr(value, 'dict'):
+        return value.dict()
+    return str(value)
+
+
+def _canonical_message(message: BaseMessage) -> Dict[str, Any]:
+    """
+    只保留影响模型输出的消息字段
+
+    消息id、响应元数据和token统计每次运行都不同，不参与缓存键。
+    """
+    data: Dict[str, Any] = {'type': message.type, 'content': message.content}
+    for attr in ('name', 'tool_call_id'):
+        value = getattr(message, attr, None)
+        if value:
+            data[attr] = value
+    tool_calls = getattr(message, 'tool_calls', None)
+    if tool_calls:
+        data['tool_calls'] = [{'name': call.get('name'), 'args': call.get('args'), 'id': call.get('id')}
+                              for call in tool_calls]
+    return data
+
+
+def make_cache_key(provider: str, model: str, messages: Sequence[BaseMessage],
+                   tools: Optional[Sequence[Any]] = None, stop: Optional[Sequence[str]] = None,
+                   params: Optional[Dict[str, Any]] = None) -> str:
+    """计算请求的规范化哈希：字段顺序、消息id等不影响结果"""
+    payload = {
+        'version': KEY_VERSION,
+        'provider': provider,
+        'model': model,
+        'messages': [_canonical_message(message) for message in messages],
+        'tools': list(tools) if tools else None,
+        'stop': list(stop) if stop else None,
+        'params': params or {},
+    }
+    text = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(',', ':'),
+                      default=_json_default)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def serialize_result(result: ChatResult) -> str:
+    """将模型回复序列化为JSON文本（包含工具调用和token统计）"""
+    payload = {
+        'generations': [{'message': message_to_dict(generation.message),
+                         'generation_info': generation.generation_info}
+                        for generation in result.generations],
+        'llm_output': result.llm_output,
+    }
+    return json.dumps(payload, ensure_ascii=False, default=_json_default)
+
+
+def deserialize_result(text: str) -> ChatResult:
+    """由JSON文本还原模型回复"""
+    payload = json.loads(text)
+    generations = [ChatGeneration(message=messages_from_dict([item['message']])[0],
+                                  generation_info=item.get('generation_info'))
+                   for item in payload['generations']]
+    return ChatResult(generations=generations, llm_output=payload.get('llm_output'))
+
+
+class SQLiteResponseStore:
+    """SQLite后端：单文件存储，回复经 cache_codec 压缩"""
+
+    def __init__(self, db_path: Path):
+        db_path = Path(db_path)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = db_path
+        self._conn = sqlite3.connect(str(db_path), timeout=30, check_same_thread=False)
+        try:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.DatabaseError as e:
+            logger.debug(f"SQLite WAL模式不可用，使用默认日志模式: {e}")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute(
+            "SELECT response, created_at FROM llm_responses WHERE cache_key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self._conn.execute("UPDATE llm_responses SET last_access = ? WHERE cache_key = ?", (time.time(), key))
+        self._conn.commit()
+        return {'response': cache_codec.loads(row[0])[0], 'created_at': row[1]}
+
+    def put(self, key: str, provider: str, model: str, response: str):
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO llm_responses "
+            "(cache_key, provider, model, response, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, provider, model, cache_codec.dumps(response), now, now))
+        self._conn.commit()
+
+    def delete(self, key: str):
+        self._conn.execute("DELETE FROM llm_responses WHERE cache_key = ?", (key,))
+        self._conn.commit()
+
+    def count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+
+    def evict(self, remove: int):
+        self._conn.execute(
+            "DELETE FROM llm_responses WHERE cache_key IN ("
+            "SELECT cache_key FROM llm_responses ORDER BY last_access ASC, rowid ASC LIMIT ?)",
+            (remove,))
+        self._conn.commit()
+
+    def clear(self):
+        self._conn.execute("DELETE FROM llm_responses")
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+class FileResponseStore:
+    """文件后端：每条回复一个JSON文件，文件修改时间记录最近访问"""
+
+    def __init__(self, directory: Path):
+        self.path = Path(directory)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def _file(self, key: str) -> Path:
+        return self.path / f"{key}.json"
+
+    def _files(self) -> List[Path]:
+        return list(self.path.glob("*.json"))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._file(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return {'response': json.dumps(record['response'], ensure_ascii=False),
+                'created_at': record['created_at']}
+
+    def put(self, key: str, provider: str, model: str, response: str):
+        record = {
+            'provider': provider,
+            'model': model,
+            'created_at': time.time(),
+            'response': json.loads(response),
+        }
+        path = self._file(key)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def delete(self, key: str):
+        self._file(key).unlink(missing_ok=True)
+
+    def count(self) -> int:
+        return len(self._files())
+
+    def evict(self, remove: int):
+        files = sorted(self._files(), key=lambda path: path.stat().st_mtime)
+        for path in files[:remove]:
+            path.unlink(missing_ok=True)
+
+    def clear(self):
+        for path in self._files():
+            path.unlink(missing_ok=True)
+
+    def close(self):
+        pass
+
+
+class LLMResponseCache:
+    """带有效期和条目上限的LLM响应缓存"""
+
+    def __init__(self, mode: str = MODE_RECORD, backend: str = 'sqlite', path: Optional[Path] = None,
+                 ttl_seconds: float = 0, max_entries: int = 5000):
+        """
+        初始化LLM响应缓存
+
+        Args:
+            mode: record（读写）或 replay（只读，未命中抛出 LLMCacheMissError）
+            backend: sqlite 或 file
+            path: SQLite文件路径或文件后端目录
+            ttl_seconds: 有效期，0表示不过期；replay 模式忽略有效期
+            max_entries: 条目上限，超过后淘汰最久未访问的10%
+        """
+        if mode not in (MODE_RECORD, MODE_REPLAY):
+            raise ValueError(f"不支持的LLM缓存模式: {mode}")
+        if backend not in ('sqlite', 'file'):
+            raise ValueError(f"不支持的LLM缓存后端: {backend}")
+        self.mode = mode
+        self.backend = backend
+        self.ttl_seconds = max(0.0, float(ttl_seconds))
+        self.max_entries = max(1, int(max_entries))
+        self._store = SQLiteResponseStore(path) if backend == 'sqlite' else FileResponseStore(path)
+        self._lock = threading.RLock()
+
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._writes = 0
+        self._evictions = 0
+
+    @property
+    def replay(self) -> bool:
+        return self.mode == MODE_REPLAY
+
+    def get(self, key: str) -> Optional[ChatResult]:
+        """读取已记录的回复，未命中或已过期返回None"""
+        with self._lock:
+            try:
+                record = self._store.get(key)
+            except Exception as e:
+                logger.warning(f"⚠️ LLM响应缓存读取失败: {e}")
+                record = None
+
+            if record is not None and not self.replay and self.ttl_seconds \
+                    and time.time() - record['created_at'] > self.ttl_seconds:
+                self._expired += 1
+                self._store.delete(key)
+                record = None
+
+            if record is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            return deserialize_result(record['response'])
+
+    def put(self, key: str, provider: str, model: str, result: ChatResult):
+        """记录模型回复（replay 模式不写入）"""
+        if self.replay or not result.generations:
+            return
+        with self._lock:
+            try:
+                self._store.put(key, provider, model, serialize_result(result))
+                self._writes += 1
+                self._evict()
+            except Exception as e:
+                logger.warning(f"⚠️ LLM响应缓存写入失败: {e}")
+
+    def clear(self):
+        """清空所有记录"""
+        with self._lock:
+            self._store.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'mode': self.mode,
+                'backend': self.backend,
+                'path': str(self._store.path),
+                'entries': self._store.count(),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                'expired': self._expired,
+                'writes': self._writes,
+                'evictions': self._evictions,
+            }
+
+    def close(self):
+        """关闭后端"""
+        with self._lock:
+            self._store.close()
+
+    def _evict(self):
+        count = self._store.count()
+        if count <= self.max_entries:
+            return
+        # 一次多淘汰一部分，避免每次写入都触发淘汰
+        remove = count - int(self.max_entries * 0.9)
+        self._store.evict(remove)
+        self._evictions += remove
+        logger.debug(f"🗑️ LLM响应缓存淘汰 {remove} 条")
+
+
+# 全局LLM响应缓存实例
+_llm_response_cache = None
+_llm_response_cache_settings = None
+_llm_response_cache_lock = threading.Lock()
+
+def _cache_settings() -> tuple:
+    """从环境变量读取缓存配置"""
+    mode = os.getenv('TRADINGAGENTS_LLM_CACHE_MODE', MODE_OFF).strip().lower()
+    backend = os.getenv('TRADINGAGENTS_LLM_CACHE_BACKEND', 'sqlite').strip().lower()
+    path = os.getenv('TRADINGAGENTS_LLM_CACHE_PATH')
+    if not path:
+        from tradingagents.default_config import DEFAULT_CONFIG
+        name = "llm_response_cache.db" if backend == 'sqlite' else "llm_responses"
+        path = os.path.join(DEFAULT_CONFIG["data_cache_dir"], name)
+    ttl_hours = float(os.getenv('TRADINGAGENTS_LLM_CACHE_TTL_HOURS', '24'))
+    max_entries = int(os.getenv('TRADINGAGENTS_LLM_CACHE_MAX_ENTRIES', '5000'))
+    return mode, backend, path, ttl_hours, max_entries
+
+
+def get_llm_response_cache() -> Optional[LLMResponseCache]:
+    """获取全局LLM响应缓存实例，未启用时返回None；环境变量变化后重新创建"""
+    global _llm_response_cache, _llm_response_cache_settings
+    settings = _cache_settings()
+    if settings[0] not in (MODE_RECORD, MODE_REPLAY):
+        return None
+    if settings != _llm_response_cache_settings:
+        with _llm_response_cache_lock:
+            if settings != _llm_response_cache_settings:
+                mode, backend, path, ttl_hours, max_entries = settings
+                if _llm_response_cache is not None:
+                    _llm_response_cache.close()
+                _llm_response_cache = LLMResponseCache(mode, backend, path, ttl_hours * 3600, max_entries)
+                _llm_response_cache_settings = settings
+                logger.info(f"🎞️ LLM响应缓存已启用: 模式={mode}, 后端={backend}, 路径={path}")
+    return _llm_response_cache
+
+
+def _lookup(cache: LLMResponseCache, llm: Any, provider: str, messages: List[BaseMessage],
+            stop: Optional[List[str]], kwargs: Dict[str, Any]) -> tuple:
+    """计算请求的缓存键并查找已记录的回复，返回 (缓存键, 模型名称, 回复或None)"""
+    model = str(getattr(llm, 'model_name', None) or getattr(llm, 'model', None) or 'unknown')
+    params = {name: getattr(llm, name) for name in _SAMPLING_PARAMS if getattr(llm, name, None) is not None}
+    params.update({name: value for name, value in kwargs.items()
+                   if name not in _IGNORED_KWARGS and name != 'tools'})
+    tools = kwargs.get('tools') or getattr(llm, '_tools', None)
+    key = make_cache_key(provider, model, messages, tools, stop, params)
+
+    result = cache.get(key)
+    if result is not None:
+        logger.debug(f"🎞️ [{provider}] LLM响应缓存命中: {model} {key[:12]}")
+    elif cache.replay:
+        raise LLMCacheMissError(
+            f"LLM响应缓存未命中 (replay模式): provider={provider}, model={model}, key={key[:12]}。"
+            f"请先以 TRADINGAGENTS_LLM_CACHE_MODE=record 运行一次以记录回复")
+    return key, model, result
+
+
+def cached_generate(llm: Any, provider: str, messages: List[BaseMessage], stop: Optional[List[str]],
+                    kwargs: Dict[str, Any], generate: Callable[[], ChatResult]) -> ChatResult:
+    """
+    经过响应缓存执行一次模型调用
+
+    Args:
+        llm: 发起调用的模型实例，读取模型名称、采样参数和已绑定的工具
+        provider: 提供商名称
+        messages: 请求消息
+        stop: 停止词
+        kwargs: 传给 _generate 的调用参数（工具定义、tool_choice 等）
+        generate: 实际调用模型（含token统计）的无参函数，命中缓存时不调用，也不重复计费
+
+    Raises:
+        LLMCacheMissError: replay 模式下没有对应的已记录回复
+    """
+    cache = get_llm_response_cache()
+    if cache is None:
+        return generate()
+
+    key, model, result = _lookup(cache, llm, provider, messages, stop, kwargs)
+    if result is not None:
+        return result
+    result = generate()
+    cache.put(key, provider, model, result)
+    return result
+
+
+async def acached_generate(llm: Any, provider: str, messages: List[BaseMessage], stop: Optional[List[str]],
+                           kwargs: Dict[str, Any], agenerate: Callable[[], Awaitable[ChatResult]]) -> ChatResult:
+    """
+    cached_generate 的异步版本，agenerate 为返回协程的无参函数
+
+    缓存读写是本地SQLite/文件的毫秒级操作，直接在事件循环中执行。
+    """
+    cache = get_llm_response_cache()
+    if cache is None:
+        return await agenerate()
+
+    key, model, result = _lookup(cache, llm, provider, messages, stop, kwargs)
+    if result is not None:
+        return result
+    result = await agenerate()
+    cache.put(key, provider, model, result)
+    return result
+
+
+def cached_stream(llm: Any, provider: str, messages: List[BaseMessage], stop: Optional[List[str]],
+                  kwargs: Dict[str, Any], stream: Callable[[], Iterator[ChatGenerationChunk]]
+                  ) -> Iterator[ChatGenerationChunk]:
+    """
+    cached_generate 的流式版本，stream 为返回流式块迭代器的无参函数
+
+    与非流式调用使用相同的缓存键：命中时一次性输出完整回复，未命中时逐块转发，流结束后记录完整回复。
+    """
+    cache = get_llm_response_cache()
+    if cache is None:
+        yield from stream()
+        return
+
+    key, model, result = _lookup(cache, llm, provider, messages, stop, kwargs)
+    if result is not None:
+        yield chunk_from_result(result)
+        return
+    yield from stream_with_result(stream(), lambda full: cache.put(key, provider, model, full))
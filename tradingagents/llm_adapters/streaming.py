@@ -0,0 +1,57 @@
+"""
+流式生成辅助函数
+适配器的 _stream 逐块转发模型输出，流结束后把拼接出的完整回复交给token统计和响应缓存，
+使流式调用与非流式调用的计费、缓存行为一致。
+"""
+
+from typing import Callable, Iterator, Optional
+
+from langchain_core.messages import AIMessage, AIMessageChunk, message_chunk_to_message
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+def result_from_chunk(chunk: Optional[ChatGenerationChunk]) -> ChatResult:
+    """
+    把拼接后的流式输出转换为完整回复
+
+    流式块中的用量（usage_metadata）写入 llm_output['token_usage']，与非流式调用的格式相同，
+    适配器的token统计逻辑无需区分两种调用方式。
+    """
+    if chunk is None:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=""))], llm_output={})
+
+    message = message_chunk_to_message(chunk.message)
+    usage = getattr(message, 'usage_metadata', None) or {}
+    llm_output = {}
+    if usage:
+        llm_output['token_usage'] = {
+            'prompt_tokens': usage.get('input_tokens', 0),
+            'completion_tokens': usage.get('output_tokens', 0),
+            'total_tokens': usage.get('total_tokens', 0),
+        }
+    return ChatResult(generations=[ChatGeneration(message=message, generation_info=chunk.generation_info)],
+                      llm_output=llm_output)
+
+
+def chunk_from_result(result: ChatResult) -> ChatGenerationChunk:
+    """把完整回复转换为单个流式块（响应缓存命中时一次性输出）"""
+    message = result.generations[0].message
+    return ChatGenerationChunk(message=AIMessageChunk(
+        content=message.content,
+        additional_kwargs=message.additional_kwargs,
+        tool_calls=getattr(message, 'tool_calls', None) or [],
+    ))
+
+
+def stream_with_result(chunks: Iterator[ChatGenerationChunk],
+                       on_complete: Callable[[ChatResult], None]) -> Iterator[ChatGenerationChunk]:
+    """
+    逐块转发流式输出，流正常结束后以完整回复调用 on_complete
+
+    调用方中途停止读取时不会调用 on_complete（不完整的回复不计入缓存）。
+    """
+    full = None
+    for chunk in chunks:
+        full = chunk if full is None else full + chunk
+        yield chunk
+    on_complete(result_from_chunk(full))
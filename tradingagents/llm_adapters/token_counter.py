@@ -0,0 +1,180 @@
+"""
+按提供商计算token数量
+优先使用与模型一致的本地分词器：通义千问使用 DashScope SDK 自带的 Qwen BPE 词表，
+OpenAI/Google/Anthropic 等使用 tiktoken；DeepSeek、千帆没有可离线使用的官方分词器，
+使用同为中文优化字节级BPE的 Qwen 词表计算。分词器都不可用时按字符类别估算。
+
+分词器按名称只加载一次，同一文本的计数结果缓存在进程内（辩论中各智能体反复使用相同的分析报告）。
+"""
+
+import math
+import re
+from functools import lru_cache
+from typing import Any, List, Optional
+
+# 导入统一日志系统
+from tradingagents.utils.logging_init import get_logger
+logger = get_logger("agents")
+
+
+TOKENIZER_QWEN = 'qwen'
+TOKENIZER_HEURISTIC = 'heuristic'
+
+# 各提供商优先使用的分词器，依次尝试
+_QWEN_FIRST = [TOKENIZER_QWEN, 'tiktoken:cl100k_base']
+_TIKTOKEN_FIRST = ['tiktoken:{model}', 'tiktoken:o200k_base', 'tiktoken:cl100k_base', TOKENIZER_QWEN]
+_PROVIDER_TOKENIZERS = {
+    'dashscope': _QWEN_FIRST,
+    'alibaba': _QWEN_FIRST,
+    'deepseek': _QWEN_FIRST,
+    'qianfan': _QWEN_FIRST,
+}
+
+# 每条消息的角色、分隔符等额外开销
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_CJK_PATTERN = re.compile(r'[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]')
+
+
+@lru_cache(maxsize=None)
+def _load_encoder(name: str) -> Optional[Any]:
+    """加载分词器（带 encode/decode 方法），不可用时返回None，结果按名称缓存"""
+    try:
+        if name == TOKENIZER_QWEN:
+            from dashscope import get_tokenizer
+            return get_tokenizer('qwen-turbo')
+        if name.startswith('tiktoken:'):
+            import tiktoken
+            target = name[len('tiktoken:'):]
+            try:
+                return tiktoken.encoding_for_model(target)
+            except KeyError:
+                return tiktoken.get_encoding(target)
+    except Exception as e:
+        logger.debug(f"🔢 [Token计数] 分词器 {name} 不可用: {e}")
+    return None
+
+
+def _heuristic_count(text: str) -> int:
+    """按字符类别估算：中日韩字符约1 token/字，其他字符约4字符/token"""
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+class TokenCounter:
+    """文本token计数与按token截断"""
+
+    def __init__(self, name: str, encoder: Optional[Any] = None):
+        self.name = name
+        self.encoder = encoder
+
+    def _encode(self, text: str) -> List[int]:
+        if self.name.startswith('tiktoken:'):
+            return self.encoder.encode(text, disallowed_special=())
+        return self.encoder.encode(text)
+
+    def count(self, text: str) -> int:
+        """计算文本的token数量"""
+        if not text:
+            return 0
+        return _cached_count(self, text)
+
+    def _count(self, text: str) -> int:
+        if self.encoder is None:
+            return _heuristic_count(text)
+        return len(self._encode(text))
+
+    def truncate(self, text: str, max_tokens: int, keep: str = 'head', marker: str = '') -> str:
+        """
+        把文本截断到 max_tokens 以内（包含省略标记）
+
+        Args:
+            keep: 'head' 保留开头，'tail' 保留结尾，'middle' 保留开头和结尾、省略中间
+            marker: 插入在省略位置的标记
+        """
+        if self.count(text) <= max_tokens:
+            return text
+        available = max_tokens - self.count(marker)
+        if available <= 0:
+            return ''
+
+        if keep == 'middle':
+            head = self._slice(text, available - available // 2, from_end=False)
+            tail = self._slice(text, available // 2, from_end=True)
+            return head + marker + tail
+        if keep == 'tail':
+            return marker + self._slice(text, available, from_end=True)
+        return self._slice(text, available, from_end=False) + marker
+
+    def _slice(self, text: str, max_tokens: int, from_end: bool) -> str:
+        """取文本开头或结尾不超过 max_tokens 的部分"""
+        if max_tokens <= 0:
+            return ''
+        if self.encoder is not None:
+            tokens = self._encode(text)
+            tokens = tokens[-max_tokens:] if from_end else tokens[:max_tokens]
+            # 切在多字节字符中间时会产生替换字符，去掉即可
+            return self.encoder.decode(tokens).strip('\ufffd')
+
+        # 估算模式：按比例取字符后逐步收缩
+        length = min(len(text), max(1, len(text) * max_tokens // max(1, self._count(text))))
+        while length > 0:
+            part = text[-length:] if from_end else text[:length]
+            if self._count(part) <= max_tokens:
+                return part
+            length = length * 9 // 10
+        return ''
+
+
+@lru_cache(maxsize=1024)
+def _cached_count(counter: TokenCounter, text: str) -> int:
+    return counter._count(text)
+
+
+@lru_cache(maxsize=64)
+def get_token_counter(provider: Optional[str] = None, model: Optional[str] = None) -> TokenCounter:
+    """获取提供商/模型对应的token计数器（按参数缓存）"""
+    provider = (provider or '').lower()
+    model = model or ''
+    candidates = _PROVIDER_TOKENIZERS.get(provider)
+    if candidates is None:
+        candidates = _QWEN_FIRST if model.lower().startswith(('qwen', 'deepseek', 'ernie')) else _TIKTOKEN_FIRST
+
+    for candidate in candidates:
+        if '{model}' in candidate and not model:
+            continue
+        name = candidate.format(model=model)
+        encoder = _load_encoder(name)
+        if encoder is not None:
+            return TokenCounter(name, encoder)
+
+    logger.warning(f"🔢 [Token计数] {provider or model or 'default'} 无可用分词器，使用字符估算")
+    return TokenCounter(TOKENIZER_HEURISTIC)
+
+
+def count_tokens(text: str, provider: Optional[str] = None, model: Optional[str] = None) -> int:
+    """计算文本在指定提供商/模型下的token数量"""
+    return get_token_counter(provider, model).count(text)
+
+
+def count_message_tokens(messages: List[Any], provider: Optional[str] = None, model: Optional[str] = None) -> int:
+    """计算消息列表的输入token数量（含每条消息的格式开销）"""
+    counter = get_token_counter(provider, model)
+    total = 0
+    for message in messages:
+        content = getattr(message, 'content', message)
+        total += counter.count(content if isinstance(content, str) else str(content)) + MESSAGE_OVERHEAD_TOKENS
+    return total
+
+
+def llm_provider_and_model(llm: Any) -> tuple:
+    """从LLM实例推断 (提供商, 模型名称)，用于选择分词器"""
+    model = str(getattr(llm, 'model_name', None) or getattr(llm, 'model', None) or '')
+    provider = getattr(llm, 'provider_name', None)
+    if not provider:
+        class_name = type(llm).__name__.lower()
+        for name in ('dashscope', 'deepseek', 'qianfan', 'google', 'anthropic'):
+            if name in class_name:
+                provider = name
+                break
+    return provider, model
@@ -255,6 +255,13 @@ def get_company_name(ticker: str) -> str:
     if company_name:
         logger.debug(f"[公司映射] {ticker} -> {company_name}")
         return company_name
+
+    # 映射表未收录时查询本地股票代码索引
+    from tradingagents.dataflows.symbol_index import lookup_company_name
+    company_name = lookup_company_name(ticker)
+    if company_name:
+        logger.debug(f"[公司映射] 股票代码索引: {ticker} -> {company_name}")
+        return company_name
     else:
         # 如果没有映射，返回默认名称
         default_name = f"股票{clean_ticker}"
@@ -1271,7 +1271,8 @@ def main():
                             llm_provider=config['llm_provider'],
                             market_type=form_data.get('market_type', '美股'),
                             llm_model=config['llm_model'],
-                            progress_callback=progress_callback
+                            progress_callback=progress_callback,
+                            token_callback=lambda delta: async_tracker.append_stream(delta.node, delta.text)
                         )
 
                         # 标记分析完成并保存结果（不访问session state）
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 异步进度显示组件
-支持定时刷新，从Redis或文件获取进度状态
+支持定时刷新，从Redis或文件读取新的进度事件
 """
 
 import streamlit as st
@@ -31,6 +31,7 @@ class AsyncProgressDisplay:
         
         # 初始化状态
         self.last_update = 0
+        self.last_seq = None
         self.is_completed = False
         
         logger.info(f"📊 [异步显示] 初始化: {analysis_id}, 刷新间隔: {refresh_interval}s")
@@ -50,8 +51,11 @@ class AsyncProgressDisplay:
             self.status_text.error("❌ 无法获取分析进度，请检查分析是否正在运行")
             return False
         
-        # 更新显示
-        self._render_progress(progress_data)
+        # 更新显示（没有新的进度事件时不重复渲染）
+        seq = progress_data.get('seq')
+        if seq is None or seq != self.last_seq:
+            self._render_progress(progress_data)
+            self.last_seq = seq
         self.last_update = current_time
         
         # 检查是否完成
@@ -584,6 +588,12 @@ def display_static_progress_with_controls(analysis_id: str, show_refresh_control
     else:
         st.info(f"{status_icon} **当前状态**: {last_message}")
 
+        # 显示智能体正在生成的内容（流式输出）
+        streaming = progress_data.get('streaming')
+        if streaming and streaming.get('text'):
+            with st.expander(f"✍️ 实时输出: {streaming.get('node', '')}", expanded=True):
+                st.markdown(streaming['text'])
+
     # 显示刷新控制的条件：
     # 1. 需要显示刷新控件 AND
     # 2. (分析正在运行 OR 分析刚开始还没有状态)
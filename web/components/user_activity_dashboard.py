@@ -78,25 +78,26 @@ def render_user_activity_dashboard():
         st.warning("📭 未找到符合条件的活动记录")
         return
     
-    # 显示统计概览
+    # 显示统计概览（来自汇总表，不受列表条数限制）
+    stats = user_activity_logger.get_activity_statistics(
+        username=username_filter if username_filter else None,
+        action_type=action_type_filter,
+        start_date=start_date,
+        end_date=end_date
+    )
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("📊 总活动数", len(activities))
+        st.metric("📊 总活动数", stats["total_activities"])
     
     with col2:
-        unique_users = len(set(a['username'] for a in activities))
-        st.metric("👥 活跃用户", unique_users)
+        st.metric("👥 活跃用户", stats["unique_users"])
     
     with col3:
-        successful_activities = sum(1 for a in activities if a.get('success', True))
-        success_rate = (successful_activities / len(activities) * 100) if activities else 0
-        st.metric("✅ 成功率", f"{success_rate:.1f}%")
+        st.metric("✅ 成功率", f"{stats['success_rate']:.1f}%")
     
     with col4:
-        durations = [a.get('duration_ms', 0) for a in activities if a.get('duration_ms')]
-        avg_duration = sum(durations) / len(durations) if durations else 0
-        st.metric("⏱️ 平均耗时", f"{avg_duration:.0f}ms")
+        st.metric("⏱️ 平均耗时", f"{stats['average_duration']:.0f}ms")
     
     # 标签页
     tab1, tab2, tab3, tab4 = st.tabs(["📈 统计图表", "📋 活动列表", "👥 用户分析", "📤 导出数据"])
@@ -367,30 +368,27 @@ def render_activity_summary_widget():
     end_date = datetime.now()
     start_date = end_date - timedelta(hours=24)
     
-    activities = user_activity_logger.get_user_activities(
-        start_date=start_date,
-        end_date=end_date,
-        limit=500
-    )
+    stats = user_activity_logger.get_activity_statistics(start_date=start_date, end_date=end_date)
     
-    if activities:
+    if stats["total_activities"]:
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            st.metric("📊 24小时活动", len(activities))
+            st.metric("📊 24小时活动", stats["total_activities"])
         
         with col2:
-            unique_users = len(set(a['username'] for a in activities))
-            st.metric("👥 活跃用户", unique_users)
+            st.metric("👥 活跃用户", stats["unique_users"])
         
         with col3:
-            successful = sum(1 for a in activities if a.get('success', True))
-            success_rate = (successful / len(activities) * 100) if activities else 0
-            st.metric("✅ 成功率", f"{success_rate:.1f}%")
+            st.metric("✅ 成功率", f"{stats['success_rate']:.1f}%")
         
         # 显示最近的几条活动
         st.write("🕐 最近活动:")
-        recent_activities = activities[:5]
+        recent_activities = user_activity_logger.get_user_activities(
+            start_date=start_date,
+            end_date=end_date,
+            limit=5
+        )
         for activity in recent_activities:
             timestamp = datetime.fromtimestamp(activity['timestamp'])
             success_icon = "✅" if activity.get('success', True) else "❌"
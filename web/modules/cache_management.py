@@ -239,6 +239,52 @@ def main():
         """)
     
     st.markdown("---")
+
+    # 数据源健康状态
+    st.subheader("📡 数据源健康")
+    try:
+        from tradingagents.dataflows.source_router import get_source_health_stats
+        health = get_source_health_stats()
+        if health['sources']:
+            import pandas as pd
+            circuit_labels = {'closed': '🟢 正常', 'half_open': '🟡 试探中', 'open': '🔴 熔断'}
+            rows = []
+            for name, stats in sorted(health['sources'].items()):
+                rows.append({
+                    'source': name,
+                    'circuit': circuit_labels.get(stats['circuit'], stats['circuit']),
+                    'window': stats['window'],
+                    'p50': stats['p50_latency'],
+                    'p95': stats['p95_latency'],
+                    'error_rate': f"{stats['error_rate']:.1%}",
+                    'empty_rate': f"{stats['empty_rate']:.1%}",
+                    'last_error': stats['last_error'] or '',
+                })
+            st.dataframe(
+                pd.DataFrame(rows),
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "source": st.column_config.TextColumn("数据源", width="small"),
+                    "circuit": st.column_config.TextColumn("熔断状态", width="small"),
+                    "window": st.column_config.NumberColumn("样本数", width="small"),
+                    "p50": st.column_config.NumberColumn("p50延迟(秒)", format="%.2f", width="small"),
+                    "p95": st.column_config.NumberColumn("p95延迟(秒)", format="%.2f", width="small"),
+                    "error_rate": st.column_config.TextColumn("错误率", width="small"),
+                    "empty_rate": st.column_config.TextColumn("空结果率", width="small"),
+                    "last_error": st.column_config.TextColumn("最近错误", width="large")
+                }
+            )
+            hedging = health['hedging']
+            if hedging['hedge_after_seconds'] > 0:
+                st.caption(f"🔀 对冲请求: {hedging['hedged']} 次，其中备用数据源先返回 {hedging['hedge_wins']} 次"
+                           f"（阈值 {hedging['hedge_after_seconds']} 秒）")
+        else:
+            st.info("📭 本进程尚未请求A股数据源，暂无健康统计")
+    except Exception as e:
+        st.error(f"读取数据源健康统计失败: {e}")
+
+    st.markdown("---")
     
     # 缓存详情
     st.subheader("📋 缓存详情")
@@ -256,35 +302,28 @@ def main():
     
     # 显示缓存文件列表
     try:
-        metadata_files = list(cache.metadata_dir.glob("*_meta.json"))
+        # 通过元数据索引按缓存时间倒序查询
+        entries = cache.metadata_index.list_entries(data_type=data_type)
         
-        if metadata_files:
-            import json
+        if entries:
             from datetime import datetime
             
             cache_items = []
-            for metadata_file in metadata_files:
+            for metadata in entries:
                 try:
-                    with open(metadata_file, 'r', encoding='utf-8') as f:
-                        metadata = json.load(f)
-                    
-                    if metadata.get('data_type') == data_type:
-                        cached_at = datetime.fromisoformat(metadata['cached_at'])
-                        cache_items.append({
-                            'symbol': metadata.get('symbol', 'N/A'),
-                            'data_source': metadata.get('data_source', 'N/A'),
-                            'cached_at': cached_at.strftime('%Y-%m-%d %H:%M:%S'),
-                            'start_date': metadata.get('start_date', 'N/A'),
-                            'end_date': metadata.get('end_date', 'N/A'),
-                            'file_path': metadata.get('file_path', 'N/A')
-                        })
+                    cached_at = datetime.fromisoformat(metadata['cached_at'])
+                    cache_items.append({
+                        'symbol': metadata.get('symbol', 'N/A'),
+                        'data_source': metadata.get('data_source', 'N/A'),
+                        'cached_at': cached_at.strftime('%Y-%m-%d %H:%M:%S'),
+                        'start_date': metadata.get('start_date', 'N/A'),
+                        'end_date': metadata.get('end_date', 'N/A'),
+                        'file_path': metadata.get('file_path', 'N/A')
+                    })
                 except Exception:
                     continue
             
             if cache_items:
-                # 按缓存时间排序
-                cache_items.sort(key=lambda x: x['cached_at'], reverse=True)
-                
                 # 显示表格
                 import pandas as pd
                 df = pd.DataFrame(cache_items)
@@ -307,7 +346,7 @@ def main():
             else:
                 st.info(f"📭 暂无 {data_type} 类型的缓存文件")
         else:
-            st.info("📭 暂无缓存文件")
+            st.info(f"📭 暂无 {data_type} 类型的缓存文件")
             
     except Exception as e:
         st.error(f"读取缓存详情失败: {e}")
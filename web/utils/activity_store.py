@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+用户活动存储
+SQLite存储用户活动记录，按时间、用户名和活动类型建立索引，写入时同步维护按小时和按天的汇总：
+- 查询按时间倒序走索引，取到 limit 条即停止，不再逐个解析每日JSONL文件
+- 统计整天用天汇总、整小时用小时汇总，只有首尾不足一小时的部分扫描明细
+- 写入先进入内存队列，由后台线程批量提交
+"""
+
+import atexit
+import json
+import sqlite3
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('user_activity')
+
+
+BUCKET_HOUR = 'hour'
+BUCKET_DAY = 'day'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS activities (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    username TEXT NOT NULL,
+    action_type TEXT NOT NULL,
+    action_name TEXT,
+    success INTEGER NOT NULL DEFAULT 1,
+    duration_ms INTEGER,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_activities_ts ON activities (ts);
+CREATE INDEX IF NOT EXISTS idx_activities_user_ts ON activities (username, ts);
+CREATE INDEX IF NOT EXISTS idx_activities_type_ts ON activities (action_type, ts);
+
+CREATE TABLE IF NOT EXISTS activity_rollups (
+    bucket TEXT NOT NULL,
+    period_start REAL NOT NULL,
+    username TEXT NOT NULL,
+    action_type TEXT NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    successes INTEGER NOT NULL DEFAULT 0,
+    duration_sum INTEGER NOT NULL DEFAULT 0,
+    duration_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket, period_start, username, action_type)
+);
+"""
+
+_UPSERT_ROLLUP = """
+INSERT INTO activity_rollups (bucket, period_start, username, action_type, total, successes,
+                              duration_sum, duration_count)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (bucket, period_start, username, action_type) DO UPDATE SET
+    total = total + excluded.total,
+    successes = successes + excluded.successes,
+    duration_sum = duration_sum + excluded.duration_sum,
+    duration_count = duration_count + excluded.duration_count
+"""
+
+
+def _hour_start(ts: float) -> float:
+    return datetime.fromtimestamp(ts).replace(minute=0, second=0, microsecond=0).timestamp()
+
+
+def _day_start(ts: float) -> float:
+    return datetime.fromtimestamp(ts).replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+
+def _next_hour(ts: float) -> float:
+    return (datetime.fromtimestamp(_hour_start(ts)) + timedelta(hours=1)).timestamp()
+
+
+def _next_day(ts: float) -> float:
+    return (datetime.fromtimestamp(_day_start(ts)) + timedelta(days=1)).timestamp()
+
+
+def _to_row(activity: Dict[str, Any]) -> tuple:
+    return (float(activity['timestamp']), activity.get('username') or 'anonymous',
+            activity.get('action_type') or 'unknown', activity.get('action_name'),
+            1 if activity.get('success', True) else 0, activity.get('duration_ms'),
+            json.dumps(activity, ensure_ascii=False))
+
+
+class ActivityStore:
+    """带索引和汇总表的用户活动存储"""
+
+    def __init__(self, db_path: Path, flush_interval: float = 1.0, batch_size: int = 200):
+        """
+        初始化活动存储
+
+        Args:
+            db_path: SQLite文件路径
+            flush_interval: 后台提交间隔（秒）
+            batch_size: 待写入记录达到该数量时立即提交
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        self._pending: List[tuple] = []
+        self._pending_lock = threading.Lock()
+        self._conn_lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn_lock:
+            try:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            except sqlite3.DatabaseError as e:
+                logger.debug(f"SQLite WAL模式不可用，使用默认日志模式: {e}")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+        self._wake = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        self._closed = False
+        atexit.register(self.close)
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def append(self, activity: Dict[str, Any]):
+        """追加一条活动记录（由后台线程批量写入）"""
+        with self._pending_lock:
+            self._pending.append(_to_row(activity))
+            pending = len(self._pending)
+        self._ensure_writer()
+        if pending >= self.batch_size:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """立即写入所有待写入记录并更新汇总，返回写入条数"""
+        with self._conn_lock:
+            with self._pending_lock:
+                rows, self._pending = self._pending, []
+            if not rows:
+                return 0
+            self._insert_locked(rows)
+            self._conn.commit()
+            return len(rows)
+
+    def import_legacy_jsonl(self, activity_dir: Path) -> int:
+        """导入旧版每日JSONL文件，导入后重命名为 *.jsonl.migrated"""
+        imported = 0
+        for activity_file in sorted(Path(activity_dir).glob("user_activities_*.jsonl")):
+            try:
+                rows = []
+                with open(activity_file, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        if line.strip():
+                            rows.append(_to_row(json.loads(line)))
+                with self._conn_lock:
+                    self._insert_locked(rows)
+                    self._conn.commit()
+                activity_file.replace(activity_file.with_name(activity_file.name + '.migrated'))
+                imported += len(rows)
+            except Exception as e:
+                logger.error(f"❌ 迁移活动文件失败 {activity_file}: {e}")
+        if imported:
+            logger.info(f"✅ 已将 {imported} 条活动记录迁移到 {self.db_path.name}")
+        return imported
+
+    def delete_before(self, cutoff: datetime) -> int:
+        """删除早于 cutoff 的明细和汇总，返回删除的明细条数"""
+        self.flush()
+        cutoff_ts = cutoff.timestamp()
+        with self._conn_lock:
+            removed = self._conn.execute("DELETE FROM activities WHERE ts < ?", (cutoff_ts,)).rowcount
+            self._conn.execute("DELETE FROM activity_rollups WHERE bucket = ? AND period_start < ?",
+                               (BUCKET_HOUR, _hour_start(cutoff_ts)))
+            self._conn.execute("DELETE FROM activity_rollups WHERE bucket = ? AND period_start < ?",
+                               (BUCKET_DAY, _day_start(cutoff_ts)))
+            self._conn.commit()
+        return removed
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def iter_activities(self, username: str = None, action_type: str = None,
+                        start_ts: float = None, end_ts: float = None,
+                        limit: int = None) -> Iterator[Dict[str, Any]]:
+        """按时间倒序逐条返回活动记录，取够 limit 条即停止"""
+        where, params = self._filters(username, action_type, start_ts, end_ts)
+        sql = f"SELECT payload FROM activities{where} ORDER BY ts DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        self.flush()
+        with self._conn_lock:
+            cursor = self._conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(200)
+                if not rows:
+                    break
+                for row in rows:
+                    yield json.loads(row['payload'])
+
+    def query(self, username: str = None, action_type: str = None, start_ts: float = None,
+              end_ts: float = None, limit: int = None) -> List[Dict[str, Any]]:
+        """按时间倒序返回活动记录列表"""
+        return list(self.iter_activities(username, action_type, start_ts, end_ts, limit))
+
+    def get_statistics(self, start_ts: float, end_ts: float, username: str = None,
+                       action_type: str = None) -> Dict[str, Any]:
+        """
+        汇总时间范围内的活动统计
+
+        整天的部分读天汇总，整小时的部分读小时汇总，首尾不足一小时的部分扫描明细
+        """
+        self.flush()
+        counts: Dict[Tuple[float, str, str], List[int]] = defaultdict(lambda: [0, 0, 0, 0])
+
+        def add(period_start, user, act_type, total, successes, duration_sum, duration_count):
+            key = (_day_start(period_start), user, act_type)
+            entry = counts[key]
+            entry[0] += total
+            entry[1] += successes
+            entry[2] += duration_sum or 0
+            entry[3] += duration_count
+
+        with self._conn_lock:
+            for kind, lo, hi in self._plan_segments(start_ts, end_ts):
+                if kind is None:
+                    where, params = self._filters(username, action_type, lo, hi)
+                    rows = self._conn.execute(
+                        f"SELECT ts, username, action_type, success, duration_ms FROM activities{where}",
+                        params).fetchall()
+                    for row in rows:
+                        duration = row['duration_ms']
+                        add(row['ts'], row['username'], row['action_type'], 1, row['success'],
+                            duration if duration else 0, 1 if duration else 0)
+                else:
+                    conditions = ["bucket = ?", "period_start >= ?", "period_start < ?"]
+                    params = [kind, lo, hi]
+                    if username:
+                        conditions.append("username = ?")
+                        params.append(username)
+                    if action_type:
+                        conditions.append("action_type = ?")
+                        params.append(action_type)
+                    rows = self._conn.execute(
+                        "SELECT period_start, username, action_type, total, successes, duration_sum, "
+                        f"duration_count FROM activity_rollups WHERE {' AND '.join(conditions)}",
+                        params).fetchall()
+                    for row in rows:
+                        add(*tuple(row))
+
+        stats = {
+            "total_activities": 0,
+            "unique_users": 0,
+            "activity_types": {},
+            "daily_activities": {},
+            "user_activities": {},
+            "success_rate": 0,
+            "average_duration": 0
+        }
+        successes = duration_sum = duration_count = 0
+        for (day, user, act_type), (total, ok, d_sum, d_count) in sorted(counts.items()):
+            if not total:
+                continue
+            date_str = datetime.fromtimestamp(day).strftime('%Y-%m-%d')
+            stats["total_activities"] += total
+            stats["activity_types"][act_type] = stats["activity_types"].get(act_type, 0) + total
+            stats["user_activities"][user] = stats["user_activities"].get(user, 0) + total
+            stats["daily_activities"][date_str] = stats["daily_activities"].get(date_str, 0) + total
+            successes += ok
+            duration_sum += d_sum
+            duration_count += d_count
+
+        stats["unique_users"] = len(stats["user_activities"])
+        if stats["total_activities"]:
+            stats["success_rate"] = successes / stats["total_activities"] * 100
+        if duration_count:
+            stats["average_duration"] = duration_sum / duration_count
+        return stats
+
+    def count(self) -> int:
+        """记录总数（含待写入记录）"""
+        self.flush()
+        with self._conn_lock:
+            return self._conn.execute("SELECT COUNT(*) FROM activities").fetchone()[0]
+
+    def close(self):
+        """写入剩余记录并停止后台线程"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"❌ 写入活动记录失败: {e}")
+
+    # ------------------------------------------------------------------
+    # 内部方法
+    # ------------------------------------------------------------------
+
+    def _insert_locked(self, rows: List[tuple]):
+        self._conn.executemany(
+            "INSERT INTO activities (ts, username, action_type, action_name, success, duration_ms, payload) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+        # 先在内存中按桶合并，再逐桶累加到汇总表
+        rollups: Dict[Tuple[str, float, str, str], List[int]] = defaultdict(lambda: [0, 0, 0, 0])
+        for ts, username, action_type, _, success, duration_ms, _ in rows:
+            for bucket, period_start in ((BUCKET_HOUR, _hour_start(ts)), (BUCKET_DAY, _day_start(ts))):
+                entry = rollups[(bucket, period_start, username, action_type)]
+                entry[0] += 1
+                entry[1] += success
+                if duration_ms:
+                    entry[2] += int(duration_ms)
+                    entry[3] += 1
+        self._conn.executemany(_UPSERT_ROLLUP, [key + tuple(value) for key, value in rollups.items()])
+
+    @staticmethod
+    def _filters(username: Optional[str], action_type: Optional[str],
+                 start_ts: Optional[float], end_ts: Optional[float]):
+        conditions, params = [], []
+        if username:
+            conditions.append("username = ?")
+            params.append(username)
+        if action_type:
+            conditions.append("action_type = ?")
+            params.append(action_type)
+        if start_ts is not None:
+            conditions.append("ts >= ?")
+            params.append(start_ts)
+        if end_ts is not None:
+            conditions.append("ts < ?")
+            params.append(end_ts)
+        where = (" WHERE " + " AND ".join(conditions)) if conditions else ""
+        return where, params
+
+    @staticmethod
+    def _plan_segments(start_ts: float, end_ts: float) -> List[Tuple[Optional[str], float, float]]:
+        """把 [start_ts, end_ts) 拆成 明细/小时汇总/天汇总 三类区间，kind为None表示扫描明细"""
+        segments = []
+        cursor = start_ts
+        if cursor >= end_ts:
+            return segments
+
+        def emit(kind, lo, hi):
+            if hi > lo:
+                segments.append((kind, lo, hi))
+
+        # 开头不足一小时的部分
+        if _hour_start(cursor) != cursor:
+            boundary = min(_next_hour(cursor), end_ts)
+            emit(None, cursor, boundary)
+            cursor = boundary
+        # 开头不足一天的整小时
+        if cursor < end_ts and _day_start(cursor) != cursor:
+            boundary = min(_next_day(cursor), _hour_start(end_ts))
+            emit(BUCKET_HOUR, cursor, boundary)
+            cursor = max(cursor, boundary)
+        # 中间的整天
+        if cursor < end_ts and _day_start(cursor) == cursor:
+            boundary = max(_day_start(end_ts), cursor)
+            emit(BUCKET_DAY, cursor, boundary)
+            cursor = boundary
+        # 结尾不足一天的整小时，以及不足一小时的部分
+        if cursor < end_ts:
+            boundary = max(_hour_start(end_ts), cursor)
+            emit(BUCKET_HOUR, cursor, boundary)
+            emit(None, boundary, end_ts)
+        return segments
+
+    def _ensure_writer(self):
+        if self._writer is not None or self._closed:
+            return
+        with self._pending_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name="activity-store-writer", daemon=True)
+                self._writer.start()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"❌ 写入活动记录失败: {e}")
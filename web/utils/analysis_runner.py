@@ -4,7 +4,11 @@
 
 import sys
 import os
+import json
 import uuid
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
 from dotenv import load_dotenv
@@ -33,6 +37,41 @@ except ImportError:
     TOKEN_TRACKING_ENABLED = False
     logger.warning("⚠️ Token跟踪功能未启用")
 
+# 空闲的交易图（按分析师列表和配置复用，避免每次分析都重建LLM客户端和记忆库）
+# propagate 会修改图实例上的运行状态（当前股票、状态日志），同一实例同一时间只借给一个分析任务，
+# 并发的相同配置各自创建实例；空闲实例总数超过上限时淘汰最久未使用的配置
+GRAPH_CACHE_MAX_SIZE = 4
+_graph_cache = OrderedDict()  # cache_key -> [空闲的图实例]
+_graph_cache_lock = threading.Lock()
+
+@contextmanager
+def lease_trading_graph(analysts, config):
+    """借出可复用的交易图实例，使用结束后归还"""
+    from tradingagents.graph.trading_graph import TradingAgentsGraph
+
+    cache_key = (tuple(analysts), json.dumps(config, sort_keys=True, default=str))
+    with _graph_cache_lock:
+        idle = _graph_cache.get(cache_key)
+        graph = idle.pop() if idle else None
+    if graph is None:
+        graph = TradingAgentsGraph(analysts, config=config, debug=False)
+    else:
+        logger.info("♻️ 复用已初始化的分析引擎")
+
+    try:
+        yield graph
+    finally:
+        with _graph_cache_lock:
+            _graph_cache.setdefault(cache_key, []).append(graph)
+            _graph_cache.move_to_end(cache_key)
+            idle_count = sum(len(graphs) for graphs in _graph_cache.values())
+            while idle_count > GRAPH_CACHE_MAX_SIZE:
+                oldest_key, graphs = next(iter(_graph_cache.items()))
+                graphs.pop(0)
+                if not graphs:
+                    del _graph_cache[oldest_key]
+                idle_count -= 1
+
 def translate_analyst_labels(text):
     """将分析师的英文标签转换为中文"""
     if not text:
@@ -97,7 +136,8 @@ def extract_risk_assessment(state):
         logger.info(f"提取风险评估数据时出错: {e}")
         return None
 
-def run_stock_analysis(stock_symbol, analysis_date, analysts, research_depth, llm_provider, llm_model, market_type="美股", progress_callback=None):
+def run_stock_analysis(stock_symbol, analysis_date, analysts, research_depth, llm_provider, llm_model, market_type="美股", progress_callback=None,
+                       token_callback=None):
     """执行股票分析
 
     Args:
@@ -108,6 +148,7 @@ def run_stock_analysis(stock_symbol, analysis_date, analysts, research_depth, ll
         llm_provider: LLM提供商 (dashscope/deepseek/google)
         llm_model: 大模型名称
         progress_callback: 进度回调函数，用于更新UI状态
+        token_callback: 流式输出回调函数，接收智能体逐段生成的文本（TokenDelta）
     """
 
     def update_progress(message, step=None, total_steps=None):
@@ -248,7 +289,6 @@ def run_stock_analysis(stock_symbol, analysis_date, analysts, research_depth, ll
 
     try:
         # 导入必要的模块
-        from tradingagents.graph.trading_graph import TradingAgentsGraph
         from tradingagents.default_config import DEFAULT_CONFIG
 
         # 创建配置
@@ -470,16 +510,15 @@ def run_stock_analysis(stock_symbol, analysis_date, analysts, research_depth, ll
 
         # 初始化交易图
         update_progress("🔧 初始化分析引擎...")
-        graph = TradingAgentsGraph(analysts, config=config, debug=False)
-
-        # 执行分析
-        update_progress(f"📊 开始分析 {formatted_symbol} 股票，这可能需要几分钟时间...")
-        logger.debug(f"🔍 [RUNNER DEBUG] ===== 调用graph.propagate =====")
-        logger.debug(f"🔍 [RUNNER DEBUG] 传递给graph.propagate的参数:")
-        logger.debug(f"🔍 [RUNNER DEBUG]   symbol: '{formatted_symbol}'")
-        logger.debug(f"🔍 [RUNNER DEBUG]   date: '{analysis_date}'")
-
-        state, decision = graph.propagate(formatted_symbol, analysis_date)
+        with lease_trading_graph(analysts, config) as graph:
+            # 执行分析
+            update_progress(f"📊 开始分析 {formatted_symbol} 股票，这可能需要几分钟时间...")
+            logger.debug(f"🔍 [RUNNER DEBUG] ===== 调用graph.propagate =====")
+            logger.debug(f"🔍 [RUNNER DEBUG] 传递给graph.propagate的参数:")
+            logger.debug(f"🔍 [RUNNER DEBUG]   symbol: '{formatted_symbol}'")
+            logger.debug(f"🔍 [RUNNER DEBUG]   date: '{analysis_date}'")
+
+            state, decision = graph.propagate(formatted_symbol, analysis_date, on_token=token_callback)
 
         # 调试信息
         logger.debug(f"🔍 [DEBUG] 分析完成，decision类型: {type(decision)}")
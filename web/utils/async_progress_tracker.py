@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 异步进度跟踪器
-支持Redis和文件两种存储方式，前端定时轮询获取进度
+支持Redis和文件两种存储方式，进度以增量事件追加写入，前端定时轮询获取新事件
 """
 
 import json
@@ -16,6 +16,14 @@ from pathlib import Path
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('async_progress')
 
+from .progress_events import (
+    EVENT_INIT, EVENT_TOKENS, EVENT_UPDATE, RedisProgressEventLog, file_event_log,
+    get_event_logs, get_redis_client, progress_state_cache,
+)
+
+# 流式输出事件的最短写出间隔（秒）
+STREAM_FLUSH_SECONDS = 0.5
+
 def safe_serialize(obj):
     """安全序列化对象，处理不可序列化的类型"""
     # 特殊处理LangChain消息对象
@@ -105,12 +113,28 @@ class AsyncProgressTracker:
         # 尝试初始化Redis，失败则使用文件
         self.redis_client = None
         self.use_redis = self._init_redis()
-        
-        if not self.use_redis:
+        if self.use_redis:
+            self.event_log = RedisProgressEventLog(self.redis_client)
+        else:
             # 使用文件存储
-            self.progress_file = f"./data/progress_{analysis_id}.json"
-            os.makedirs(os.path.dirname(self.progress_file), exist_ok=True)
-        
+            self.event_log = file_event_log
+            self.progress_file = str(file_event_log.path(analysis_id))
+            try:
+                file_event_log.cleanup_expired()
+            except Exception as e:
+                logger.debug(f"📊 [异步进度] 清理过期进度文件失败: {e}")
+
+        # 事件序号和上次写出的字段值，每次只写出变化的字段
+        self._event_seq = 0
+        self._emitted: Dict[str, Any] = {}
+        # 进度事件和流式输出事件共用序号，写出时加锁
+        self._event_lock = threading.RLock()
+
+        # 流式输出缓冲：(节点, 文本片段)，切换节点或超过刷新间隔时写出一条事件
+        self._stream_node: Optional[str] = None
+        self._stream_buffer: List[str] = []
+        self._stream_flushed_at = time.time()
+
         # 保存初始状态
         self._save_progress()
         
@@ -119,7 +143,6 @@ class AsyncProgressTracker:
         # 注册到日志系统进行自动进度更新
         try:
             from .progress_log_handler import register_analysis_tracker
-            import threading
 
             # 使用超时机制避免死锁
             def register_with_timeout():
@@ -143,49 +166,12 @@ class AsyncProgressTracker:
             print(f"❌ [进度集成] 跟踪器注册异常: {e}")
     
     def _init_redis(self) -> bool:
-        """初始化Redis连接"""
-        try:
-            # 首先检查REDIS_ENABLED环境变量
-            redis_enabled_raw = os.getenv('REDIS_ENABLED', 'false')
-            redis_enabled = redis_enabled_raw.lower()
-            logger.info(f"🔍 [Redis检查] REDIS_ENABLED原值='{redis_enabled_raw}' -> 处理后='{redis_enabled}'")
-
-            if redis_enabled != 'true':
-                logger.info(f"📊 [异步进度] Redis已禁用，使用文件存储")
-                return False
-
-            import redis
-
-            # 从环境变量获取Redis配置
-            redis_host = os.getenv('REDIS_HOST', 'localhost')
-            redis_port = int(os.getenv('REDIS_PORT', 6379))
-            redis_password = os.getenv('REDIS_PASSWORD', None)
-            redis_db = int(os.getenv('REDIS_DB', 0))
-
-            # 创建Redis连接
-            if redis_password:
-                self.redis_client = redis.Redis(
-                    host=redis_host,
-                    port=redis_port,
-                    password=redis_password,
-                    db=redis_db,
-                    decode_responses=True
-                )
-            else:
-                self.redis_client = redis.Redis(
-                    host=redis_host,
-                    port=redis_port,
-                    db=redis_db,
-                    decode_responses=True
-                )
-
-            # 测试连接
-            self.redis_client.ping()
-            logger.info(f"📊 [异步进度] Redis连接成功: {redis_host}:{redis_port}")
-            return True
-        except Exception as e:
-            logger.warning(f"📊 [异步进度] Redis连接失败，使用文件存储: {e}")
+        """初始化Redis连接（使用共享连接池）"""
+        self.redis_client = get_redis_client()
+        if self.redis_client is None:
+            logger.info(f"📊 [异步进度] Redis未启用或不可用，使用文件存储")
             return False
+        return True
     
     def _generate_dynamic_steps(self) -> List[Dict]:
         """根据分析师数量和研究深度动态生成分析步骤"""
@@ -500,60 +486,86 @@ class AsyncProgressTracker:
 
         return remaining
     
-    def _save_progress(self):
-        """保存进度到存储"""
-        try:
-            current_step_name = self.progress_data.get('current_step_name', '未知')
-            progress_pct = self.progress_data.get('progress_percentage', 0)
-            status = self.progress_data.get('status', 'running')
-
-            if self.use_redis:
-                # 保存到Redis（安全序列化）
-                key = f"progress:{self.analysis_id}"
-                safe_data = safe_serialize(self.progress_data)
-                data_json = json.dumps(safe_data, ensure_ascii=False)
-                self.redis_client.setex(key, 3600, data_json)  # 1小时过期
-
-                logger.info(f"📊 [Redis写入] {self.analysis_id} -> {status} | {current_step_name} | {progress_pct:.1f}%")
-                logger.debug(f"📊 [Redis详情] 键: {key}, 数据大小: {len(data_json)} 字节")
-            else:
-                # 保存到文件（安全序列化）
-                safe_data = safe_serialize(self.progress_data)
-                with open(self.progress_file, 'w', encoding='utf-8') as f:
-                    json.dump(safe_data, f, ensure_ascii=False, indent=2)
+    def append_stream(self, node: str, text: str):
+        """追加智能体的流式输出，按节点缓冲后批量写出"""
+        with self._event_lock:
+            if node != self._stream_node:
+                self._flush_stream()
+                self._stream_node = node
+            self._stream_buffer.append(text)
+            if time.time() - self._stream_flushed_at >= STREAM_FLUSH_SECONDS:
+                self._flush_stream()
+
+    def _flush_stream(self):
+        """把缓冲的流式输出写为一条 tokens 事件"""
+        with self._event_lock:
+            self._stream_flushed_at = time.time()
+            if not self._stream_buffer:
+                return
+            text = ''.join(self._stream_buffer)
+            self._stream_buffer = []
+
+            self._event_seq += 1
+            event = {
+                'seq': self._event_seq,
+                'type': EVENT_TOKENS,
+                'time': self._stream_flushed_at,
+                'data': {'node': self._stream_node, 'text': text},
+            }
+            try:
+                self.event_log.append(self.analysis_id, event)
+            except Exception as e:
+                # 流式输出只用于实时展示，写出失败直接丢弃
+                self._event_seq -= 1
+                logger.debug(f"📊 [异步进度] 流式输出写出失败: {e}")
 
-                logger.info(f"📊 [文件写入] {self.analysis_id} -> {status} | {current_step_name} | {progress_pct:.1f}%")
-                logger.debug(f"📊 [文件详情] 路径: {self.progress_file}")
+    def _save_progress(self):
+        """追加一条进度事件，只包含自上次保存以来变化的字段"""
+        with self._event_lock:
+            self._save_changed_fields()
+
+    def _save_changed_fields(self):
+        changed = {key: value for key, value in self.progress_data.items()
+                   if key not in self._emitted or self._emitted[key] != value}
+        if not changed and self._event_seq > 0:
+            return
+
+        self._event_seq += 1
+        event = {
+            'seq': self._event_seq,
+            # 尚未写出过字段（首次保存或切换存储后）时写出完整状态
+            'type': EVENT_INIT if not self._emitted else EVENT_UPDATE,
+            'time': self.progress_data.get('last_update', time.time()),
+            'data': safe_serialize(changed),
+        }
+        current_step_name = self.progress_data.get('current_step_name', '未知')
+        progress_pct = self.progress_data.get('progress_percentage', 0)
+        status = self.progress_data.get('status', 'running')
 
+        try:
+            self.event_log.append(self.analysis_id, event)
+            logger.info(f"📊 [进度事件] {self.analysis_id} #{self._event_seq} -> {status} | {current_step_name} | {progress_pct:.1f}%")
+            logger.debug(f"📊 [进度事件] 变化字段: {list(changed)}")
         except Exception as e:
             logger.error(f"📊 [异步进度] 保存失败: {e}")
-            # 尝试备用存储方式
+            if self.event_log is file_event_log:
+                self._event_seq -= 1
+                return
+            # Redis失败，切换到文件存储，重新写出完整状态；序号接着已写出的事件继续，
+            # 读取方按上次读到的序号从文件中读到后续事件
+            logger.warning(f"📊 [异步进度] Redis保存失败，切换到文件存储")
+            self.use_redis = False
+            self.event_log = file_event_log
+            self.progress_file = str(file_event_log.path(self.analysis_id))
+            self._event_seq -= 1
+            self._emitted = {}
             try:
-                if self.use_redis:
-                    # Redis失败，尝试文件存储
-                    logger.warning(f"📊 [异步进度] Redis保存失败，尝试文件存储")
-                    backup_file = f"./data/progress_{self.analysis_id}.json"
-                    os.makedirs(os.path.dirname(backup_file), exist_ok=True)
-                    safe_data = safe_serialize(self.progress_data)
-                    with open(backup_file, 'w', encoding='utf-8') as f:
-                        json.dump(safe_data, f, ensure_ascii=False, indent=2)
-                    logger.info(f"📊 [备用存储] 文件保存成功: {backup_file}")
-                else:
-                    # 文件存储失败，尝试简化数据
-                    logger.warning(f"📊 [异步进度] 文件保存失败，尝试简化数据")
-                    simplified_data = {
-                        'analysis_id': self.analysis_id,
-                        'status': self.progress_data.get('status', 'unknown'),
-                        'progress_percentage': self.progress_data.get('progress_percentage', 0),
-                        'last_message': str(self.progress_data.get('last_message', '')),
-                        'last_update': self.progress_data.get('last_update', time.time())
-                    }
-                    backup_file = f"./data/progress_{self.analysis_id}.json"
-                    with open(backup_file, 'w', encoding='utf-8') as f:
-                        json.dump(simplified_data, f, ensure_ascii=False, indent=2)
-                    logger.info(f"📊 [备用存储] 简化数据保存成功: {backup_file}")
+                self._save_progress()
             except Exception as backup_e:
                 logger.error(f"📊 [异步进度] 备用存储也失败: {backup_e}")
+            return
+
+        self._emitted.update(changed)
     
     def get_progress(self) -> Dict[str, Any]:
         """获取当前进度"""
@@ -561,6 +573,7 @@ class AsyncProgressTracker:
     
     def mark_completed(self, message: str = "分析完成", results: Any = None):
         """标记分析完成"""
+        self._flush_stream()
         self.update_progress(message)
         self.progress_data['status'] = 'completed'
         self.progress_data['progress_percentage'] = 100.0
@@ -587,6 +600,7 @@ class AsyncProgressTracker:
     
     def mark_failed(self, error_message: str):
         """标记分析失败"""
+        self._flush_stream()
         self.progress_data['status'] = 'failed'
         self.progress_data['last_message'] = f"分析失败: {error_message}"
         self.progress_data['last_update'] = time.time()
@@ -601,47 +615,22 @@ class AsyncProgressTracker:
             pass
 
 def get_progress_by_id(analysis_id: str) -> Optional[Dict[str, Any]]:
-    """根据分析ID获取进度"""
+    """根据分析ID获取进度（只读取上次之后的新事件）"""
     try:
-        # 检查REDIS_ENABLED环境变量
-        redis_enabled = os.getenv('REDIS_ENABLED', 'false').lower() == 'true'
+        progress_data = progress_state_cache.get(analysis_id)
+        if progress_data is not None:
+            return progress_data
 
-        # 如果Redis启用，先尝试Redis
-        if redis_enabled:
+        # 兼容旧版本写出的完整快照
+        redis_client = get_redis_client()
+        if redis_client is not None:
             try:
-                import redis
-
-                # 从环境变量获取Redis配置
-                redis_host = os.getenv('REDIS_HOST', 'localhost')
-                redis_port = int(os.getenv('REDIS_PORT', 6379))
-                redis_password = os.getenv('REDIS_PASSWORD', None)
-                redis_db = int(os.getenv('REDIS_DB', 0))
-
-                # 创建Redis连接
-                if redis_password:
-                    redis_client = redis.Redis(
-                        host=redis_host,
-                        port=redis_port,
-                        password=redis_password,
-                        db=redis_db,
-                        decode_responses=True
-                    )
-                else:
-                    redis_client = redis.Redis(
-                        host=redis_host,
-                        port=redis_port,
-                        db=redis_db,
-                        decode_responses=True
-                    )
-
-                key = f"progress:{analysis_id}"
-                data = redis_client.get(key)
+                data = redis_client.get(f"progress:{analysis_id}")
                 if data:
                     return json.loads(data)
             except Exception as e:
                 logger.debug(f"📊 [异步进度] Redis读取失败: {e}")
 
-        # 尝试文件
         progress_file = f"./data/progress_{analysis_id}.json"
         if os.path.exists(progress_file):
             with open(progress_file, 'r', encoding='utf-8') as f:
@@ -667,79 +656,25 @@ def format_time(seconds: float) -> str:
 def get_latest_analysis_id() -> Optional[str]:
     """获取最新的分析ID"""
     try:
-        # 检查REDIS_ENABLED环境变量
-        redis_enabled = os.getenv('REDIS_ENABLED', 'false').lower() == 'true'
-
-        # 如果Redis启用，先尝试从Redis获取
-        if redis_enabled:
+        for event_log in get_event_logs():
             try:
-                import redis
-
-                # 从环境变量获取Redis配置
-                redis_host = os.getenv('REDIS_HOST', 'localhost')
-                redis_port = int(os.getenv('REDIS_PORT', 6379))
-                redis_password = os.getenv('REDIS_PASSWORD', None)
-                redis_db = int(os.getenv('REDIS_DB', 0))
-
-                # 创建Redis连接
-                if redis_password:
-                    redis_client = redis.Redis(
-                        host=redis_host,
-                        port=redis_port,
-                        password=redis_password,
-                        db=redis_db,
-                        decode_responses=True
-                    )
-                else:
-                    redis_client = redis.Redis(
-                        host=redis_host,
-                        port=redis_port,
-                        db=redis_db,
-                        decode_responses=True
-                    )
-
-                # 获取所有progress键
-                keys = redis_client.keys("progress:*")
-                if not keys:
-                    return None
-
-                # 获取每个键的数据，找到最新的
-                latest_time = 0
-                latest_id = None
-
-                for key in keys:
-                    try:
-                        data = redis_client.get(key)
-                        if data:
-                            progress_data = json.loads(data)
-                            last_update = progress_data.get('last_update', 0)
-                            if last_update > latest_time:
-                                latest_time = last_update
-                                # 从键名中提取analysis_id (去掉"progress:"前缀)
-                                latest_id = key.replace('progress:', '')
-                    except Exception:
-                        continue
-
+                latest_id = event_log.latest_analysis_id()
                 if latest_id:
                     logger.info(f"📊 [恢复分析] 找到最新分析ID: {latest_id}")
                     return latest_id
-
             except Exception as e:
-                logger.debug(f"📊 [恢复分析] Redis查找失败: {e}")
+                logger.debug(f"📊 [恢复分析] {type(event_log).__name__} 查找失败: {e}")
 
-        # 如果Redis失败或未启用，尝试从文件查找
+        # 兼容旧版本写出的完整快照文件
         data_dir = Path("data")
         if data_dir.exists():
             progress_files = list(data_dir.glob("progress_*.json"))
             if progress_files:
                 # 按修改时间排序，获取最新的
                 latest_file = max(progress_files, key=lambda f: f.stat().st_mtime)
-                # 从文件名提取analysis_id
-                filename = latest_file.name
-                if filename.startswith("progress_") and filename.endswith(".json"):
-                    analysis_id = filename[9:-5]  # 去掉前缀和后缀
-                    logger.debug(f"📊 [恢复分析] 从文件找到最新分析ID: {analysis_id}")
-                    return analysis_id
+                analysis_id = latest_file.name[9:-5]  # 去掉前缀和后缀
+                logger.debug(f"📊 [恢复分析] 从文件找到最新分析ID: {analysis_id}")
+                return analysis_id
 
         return None
     except Exception as e:
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+分析进度事件流
+进度跟踪器每次更新只追加一条增量事件（变化的字段），前端按序号读取新事件并合并出当前状态：
+- Redis：每个分析一个 Stream（progress_events:{id}），条目ID即事件序号；
+  最近更新时间记录在有序集合 progress_index 中，查找最新分析不再需要 KEYS 扫描
+- 文件：./data/progress_{id}.events.jsonl 追加写入，读取方记录已读到的字节偏移；
+  超过有效期未更新的事件文件连同旧版本的 progress_{id}.json 一起删除
+
+Redis客户端使用进程内共享的连接池。
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('async_progress')
+
+
+EVENT_INIT = 'init'
+EVENT_UPDATE = 'update'
+# 智能体流式输出的增量文本，合并到状态的 streaming 字段
+EVENT_TOKENS = 'tokens'
+
+# 状态中保留的流式输出长度（字符），完整内容随节点报告写入
+STREAM_TAIL_CHARS = 2000
+
+PROGRESS_TTL_SECONDS = 3600
+_STREAM_PREFIX = 'progress_events:'
+_INDEX_KEY = 'progress_index'
+
+
+# ----------------------------------------------------------------------
+# 共享Redis连接池
+# ----------------------------------------------------------------------
+
+_redis_client = None
+_redis_lock = threading.Lock()
+_redis_failed_at = 0.0
+# 连接失败后的重试间隔（秒），避免每次轮询都尝试连接
+_REDIS_RETRY_SECONDS = 30
+
+
+def get_redis_client():
+    """获取共享连接池的Redis客户端，未启用或不可用时返回None"""
+    global _redis_client, _redis_failed_at
+    if os.getenv('REDIS_ENABLED', 'false').lower() != 'true':
+        return None
+    if _redis_client is not None:
+        return _redis_client
+    if time.time() - _redis_failed_at < _REDIS_RETRY_SECONDS:
+        return None
+
+    with _redis_lock:
+        if _redis_client is None:
+            try:
+                import redis
+
+                pool = redis.ConnectionPool(
+                    host=os.getenv('REDIS_HOST', 'localhost'),
+                    port=int(os.getenv('REDIS_PORT', 6379)),
+                    password=os.getenv('REDIS_PASSWORD', None) or None,
+                    db=int(os.getenv('REDIS_DB', 0)),
+                    decode_responses=True,
+                    max_connections=int(os.getenv('REDIS_MAX_CONNECTIONS', 20)),
+                )
+                client = redis.Redis(connection_pool=pool)
+                client.ping()
+                _redis_client = client
+                logger.info("📊 [进度事件] Redis连接池已建立")
+            except Exception as e:
+                _redis_failed_at = time.time()
+                logger.warning(f"📊 [进度事件] Redis连接失败，使用文件存储: {e}")
+    return _redis_client
+
+
+# ----------------------------------------------------------------------
+# 事件存储
+# ----------------------------------------------------------------------
+
+class RedisProgressEventLog:
+    """基于Redis Stream的进度事件流"""
+
+    def __init__(self, client, ttl: int = PROGRESS_TTL_SECONDS):
+        self.client = client
+        self.ttl = ttl
+
+    def append(self, analysis_id: str, event: Dict[str, Any]):
+        key = _STREAM_PREFIX + analysis_id
+        pipe = self.client.pipeline(transaction=False)
+        pipe.xadd(key, {'data': json.dumps(event, ensure_ascii=False)}, id=f"{event['seq']}-0")
+        pipe.expire(key, self.ttl)
+        pipe.zadd(_INDEX_KEY, {analysis_id: event.get('time', time.time())})
+        pipe.execute()
+
+    def read_since(self, analysis_id: str, last_seq: int = 0) -> List[Dict[str, Any]]:
+        entries = self.client.xrange(_STREAM_PREFIX + analysis_id, min=f"{last_seq + 1}-0", max='+')
+        return [json.loads(fields['data']) for _, fields in entries]
+
+    def latest_analysis_id(self) -> Optional[str]:
+        # 顺便清理过期分析的索引
+        self.client.zremrangebyscore(_INDEX_KEY, 0, time.time() - self.ttl)
+        latest = self.client.zrevrange(_INDEX_KEY, 0, 0)
+        return latest[0] if latest else None
+
+
+class FileProgressEventLog:
+    """基于追加写入JSONL文件的进度事件流"""
+
+    def __init__(self, data_dir: str = "./data", ttl: int = PROGRESS_TTL_SECONDS):
+        self.data_dir = Path(data_dir)
+        self.ttl = ttl
+        # 每个分析已读到的 (序号, 字节偏移)，后续读取从偏移处继续
+        self._cursors: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def path(self, analysis_id: str) -> Path:
+        return self.data_dir / f"progress_{analysis_id}.events.jsonl"
+
+    def append(self, analysis_id: str, event: Dict[str, Any]):
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        line = json.dumps(event, ensure_ascii=False) + '\n'
+        with open(self.path(analysis_id), 'a', encoding='utf-8') as f:
+            f.write(line)
+
+    def read_since(self, analysis_id: str, last_seq: int = 0) -> List[Dict[str, Any]]:
+        path = self.path(analysis_id)
+        if not path.exists():
+            return []
+        with self._lock:
+            cursor_seq, offset = self._cursors.get(analysis_id, (0, 0))
+        if cursor_seq > last_seq:
+            offset = 0
+
+        events = []
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                # 只消费完整写入的行
+                if not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+                event = json.loads(line)
+                if event['seq'] > last_seq:
+                    events.append(event)
+                cursor_seq = event['seq']
+        with self._lock:
+            self._cursors[analysis_id] = (cursor_seq, offset)
+        return events
+
+    def remove(self, analysis_id: str):
+        """删除分析的事件文件和旧版本的完整快照文件"""
+        for path in (self.path(analysis_id), self.data_dir / f"progress_{analysis_id}.json"):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._cursors.pop(analysis_id, None)
+
+    def cleanup_expired(self) -> int:
+        """删除超过有效期未更新的分析进度文件，返回删除的分析数量"""
+        if not self.data_dir.exists():
+            return 0
+        updated_at: Dict[str, float] = {}
+        for path in self.data_dir.glob("progress_*.json*"):
+            name = path.name[len("progress_"):]
+            for suffix in (".events.jsonl", ".json"):
+                if name.endswith(suffix):
+                    analysis_id = name[:-len(suffix)]
+                    try:
+                        mtime = path.stat().st_mtime
+                    except OSError:
+                        break
+                    updated_at[analysis_id] = max(updated_at.get(analysis_id, 0.0), mtime)
+                    break
+
+        expire_before = time.time() - self.ttl
+        expired = [analysis_id for analysis_id, mtime in updated_at.items() if mtime < expire_before]
+        for analysis_id in expired:
+            self.remove(analysis_id)
+        if expired:
+            logger.debug(f"📊 [进度事件] 已清理{len(expired)}个过期分析的进度文件")
+        return len(expired)
+
+    def latest_analysis_id(self) -> Optional[str]:
+        if not self.data_dir.exists():
+            return None
+        # 顺便清理过期分析的进度文件
+        self.cleanup_expired()
+        files = list(self.data_dir.glob("progress_*.events.jsonl"))
+        if not files:
+            return None
+        latest = max(files, key=lambda f: f.stat().st_mtime)
+        return latest.name[len("progress_"):-len(".events.jsonl")]
+
+
+file_event_log = FileProgressEventLog()
+
+
+def get_event_logs() -> List[Any]:
+    """按优先级返回可用的事件存储（Redis优先，文件兜底）"""
+    client = get_redis_client()
+    logs = [RedisProgressEventLog(client)] if client is not None else []
+    logs.append(file_event_log)
+    return logs
+
+
+# ----------------------------------------------------------------------
+# 状态合并
+# ----------------------------------------------------------------------
+
+def apply_progress_events(state: Optional[Dict[str, Any]], events: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """把增量事件合并到进度状态上"""
+    for event in events:
+        if event['type'] == EVENT_INIT or state is None:
+            state = dict(event['data'])
+        elif event['type'] == EVENT_TOKENS:
+            data = event['data']
+            streaming = state.get('streaming') or {}
+            text = data['text']
+            if streaming.get('node') == data['node']:
+                text = streaming.get('text', '') + text
+            state['streaming'] = {'node': data['node'], 'text': text[-STREAM_TAIL_CHARS:]}
+        else:
+            state.update(event['data'])
+        state['seq'] = event['seq']
+    return state
+
+
+def read_progress_events(analysis_id: str, last_seq: int = 0) -> List[Dict[str, Any]]:
+    """读取序号大于 last_seq 的所有进度事件"""
+    for log in get_event_logs():
+        try:
+            events = log.read_since(analysis_id, last_seq)
+            if events:
+                return events
+        except Exception as e:
+            logger.debug(f"📊 [进度事件] 读取失败({type(log).__name__}): {e}")
+    return []
+
+
+class ProgressStateCache:
+    """按分析缓存已合并的状态，每次轮询只读取新事件"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            state = self._states.get(analysis_id)
+            last_seq = state['seq'] if state else 0
+
+        events = read_progress_events(analysis_id, last_seq)
+        if not events:
+            return dict(state) if state else None
+
+        with self._lock:
+            state = apply_progress_events(dict(state) if state else None, events)
+            self._states[analysis_id] = state
+            while len(self._states) > self.max_entries:
+                self._states.pop(next(iter(self._states)))
+            return dict(state)
+
+
+progress_state_cache = ProgressStateCache()